@@ -38,6 +38,7 @@ from handler import (
 )
 from producer import publish
 from utils.timeout_utils import func_timeout, FunctionTimedOut
+from utils.job_tracing import traced_consumer
 
 WORKER_TIMEOUT_SECONDS = 300
 
@@ -57,6 +58,7 @@ def ack_message(ch, delivery_tag):
         print("Channel is already closed, so we can't ACK this message")
 
 
+@traced_consumer
 def do_work(ch, method, properties, body):
     message_type = properties.content_type
 
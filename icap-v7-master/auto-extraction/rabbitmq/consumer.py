@@ -33,6 +33,7 @@ from producer import publish
 # Add parent directory to path to import utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils import Config
+from utils.job_tracing import traced_consumer
 
 credentials = pika.PlainCredentials(Config.RABBITMQ_USERNAME, Config.RABBITMQ_PASSWORD)
 
@@ -45,6 +46,7 @@ def ack_message(ch, delivery_tag):
         print("Channel is already closed, so we can't ACK this message")
 
 
+@traced_consumer
 def do_work(ch, method, properties, body):
     message_type = properties.content_type
 
@@ -19,6 +19,7 @@ Main Features:
 
 import json
 import threading
+import time
 import pika
 import sys
 import os
@@ -26,6 +27,7 @@ import os
 # Add parent directory to path to import utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils import Config
+from utils.job_tracing import get_publish_headers, trace_publish
 
 credentials = pika.PlainCredentials(Config.RABBITMQ_USERNAME, Config.RABBITMQ_PASSWORD)
 props = {"connection_name": "extraction_publisher"}
@@ -62,18 +64,24 @@ def _get_connection_and_channel():
 def publish(method, queue_name, body):
     """Publish a JSON serialized message to a Rabbitmq queue. Reuses connection per thread."""
     print("Message received to publish")
+    start = time.perf_counter()
+    payload = json.dumps(body)
     for attempt in range(2):
         try:
             _connection, channel = _get_connection_and_channel()
             channel.basic_publish(
                 exchange="",
                 routing_key=queue_name,
-                body=json.dumps(body),
+                body=payload,
                 properties=pika.BasicProperties(
                     content_type=method,
                     delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE,
+                    headers=get_publish_headers(),
                 ),
             )
+            trace_publish(
+                method, queue_name, body, len(payload), time.perf_counter() - start
+            )
             return
         except (
             pika.exceptions.AMQPConnectionError,
@@ -5,9 +5,15 @@ Provides centralized Redis connection and data operations.
 """
 
 import json
+import zlib
 import redis
 from .config import Config
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 
 # Connect to Redis instance using centralized config
 redis_instance = redis.Redis(
@@ -18,11 +24,26 @@ redis_instance = redis.Redis(
 )
 
 
+def decode_redis_payload(data):
+    """Decode a job payload that may be zlib/zstd compressed by the backend"""
+    if isinstance(data, (bytes, bytearray)):
+        if data[:4] == b"\x28\xb5\x2f\xfd":
+            if zstandard is None:
+                raise ValueError(
+                    "Payload is zstd compressed but zstandard is not installed, "
+                    "install it or set PAYLOAD_CODEC=zlib on the backend"
+                )
+            data = zstandard.ZstdDecompressor().decompress(bytes(data))
+        elif data[:1] == b"\x78":
+            data = zlib.decompress(data)
+    return json.loads(data)
+
+
 def get_redis_data(job_id):
     """Retrieve information from redis"""
     data = redis_instance.get(job_id)
     if data:
-        return json.loads(data)
+        return decode_redis_payload(data)
     return None
 
 
@@ -30,7 +51,7 @@ def set_redis_data(job_id, key_name, result_data):
     """Set partial information in redis for given key"""
     data = redis_instance.get(job_id)
     if data:
-        data = json.loads(data)
+        data = decode_redis_payload(data)
     else:
         data = {}
     
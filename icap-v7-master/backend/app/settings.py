@@ -388,6 +388,18 @@ DATETIME_FORMAT = "Y-m-d H:i:s"
 USE_L10N = False
 SAVE_TRANSACTION_LOG = int(os.getenv("SAVE_TRANSACTION_LOG", 0))
 
+# Batch status logs are buffered and written by a background thread
+BATCH_LOG_WRITE_BEHIND = bool(int(os.getenv("BATCH_LOG_WRITE_BEHIND", "1")))
+BATCH_LOG_FLUSH_INTERVAL = float(os.getenv("BATCH_LOG_FLUSH_INTERVAL", "0.2"))
+BATCH_LOG_MAX_BATCH_SIZE = int(os.getenv("BATCH_LOG_MAX_BATCH_SIZE", "200"))
+# Writers block once this many logs wait to be persisted
+BATCH_LOG_MAX_QUEUE_SIZE = int(os.getenv("BATCH_LOG_MAX_QUEUE_SIZE", "10000"))
+
+# Layout XML pages are parsed in worker processes when building ra_json
+# 0 = up to 4 processes, 1 = parse in the consumer process
+RAJSON_WORKERS = int(os.getenv("RAJSON_WORKERS", "0"))
+RAJSON_PARALLEL_MIN_PAGES = int(os.getenv("RAJSON_PARALLEL_MIN_PAGES", "4"))
+
 # Django import export settings
 IMPORT_EXPORT_USE_TRANSACTIONS = True
 
@@ -0,0 +1,88 @@
+# Generated by Django 5.1.4 on 2026-10-19 00:23
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently, without locking the batch tables
+    atomic = False
+
+    dependencies = [
+        ('core', '0122_alter_trainbatch_custom_data_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='batch',
+            index=models.Index(fields=['created_at', 'id'], name='batch_created_at_id'),
+        ),
+        AddIndexConcurrently(
+            model_name='batch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('id', models.TextField())), name='gin_trgm_ops'), name='batch_id_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='batch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('definition_id', models.TextField())), name='gin_trgm_ops'), name='batch_definition_id_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='batch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('vendor', models.TextField())), name='gin_trgm_ops'), name='batch_vendor_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='batch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('type', models.TextField())), name='gin_trgm_ops'), name='batch_type_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='batch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('project', models.TextField())), name='gin_trgm_ops'), name='batch_project_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='emailbatch',
+            index=models.Index(fields=['created_at', 'id'], name='emailbatch_created_at_id'),
+        ),
+        AddIndexConcurrently(
+            model_name='emailbatch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('id', models.TextField())), name='gin_trgm_ops'), name='emailbatch_id_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='emailbatch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('email_from', models.TextField())), name='gin_trgm_ops'), name='emailbatch_email_from_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='emailbatch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('email_subject', models.TextField())), name='gin_trgm_ops'), name='emailbatch_subject_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='emailbatch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('matched_profile_name', models.TextField())), name='gin_trgm_ops'), name='emailbatch_profile_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='emailbatch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('confirmation_numbers', models.TextField())), name='gin_trgm_ops'), name='emailbatch_confirmation_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='trainbatch',
+            index=models.Index(fields=['created_at', 'id'], name='trainbatch_created_at_id'),
+        ),
+        AddIndexConcurrently(
+            model_name='trainbatch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('id', models.TextField())), name='gin_trgm_ops'), name='trainbatch_id_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='trainbatch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('matched_profile_name', models.TextField())), name='gin_trgm_ops'), name='trainbatch_profile_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='trainbatch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('customer', models.TextField())), name='gin_trgm_ops'), name='trainbatch_customer_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='trainbatch',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('custom_data', models.TextField())), name='gin_trgm_ops'), name='trainbatch_custom_data_trgm'),
+        ),
+    ]
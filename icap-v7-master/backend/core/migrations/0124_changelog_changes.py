@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-19 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0123_batch_list_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelog',
+            name='changes',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
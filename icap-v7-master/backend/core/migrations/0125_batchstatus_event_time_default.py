@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-19 00:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0124_changelog_changes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='batchstatus',
+            name='event_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -21,7 +21,8 @@ Dependencies:
     - apps from django.apps
     - models, connection from django.db
     - UniqueConstraint from django.db.models
-    - Lower from django.db.models.functions
+    - Lower, Cast, Upper from django.db.models.functions
+    - GinIndex, OpClass from django.contrib.postgres.indexes
     - caches, cache from django.core.cache
     - ProfileDocument from dashboard.models
     - post_save from django.db.models.signals
@@ -39,7 +40,8 @@ import re
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import UniqueConstraint
-from django.db.models.functions import Lower
+from django.db.models.functions import Lower, Cast, Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.cache import cache
 from django.conf import settings
 from dashboard.models import ProfileDocument
@@ -49,6 +51,18 @@ from utils.create_default_definitions import DefaultDefinitions
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
+
+def trigram_index(field_name, name):
+    """
+    Trigram index serving '<field>__icontains' filters, which Postgres runs
+    as UPPER(<field>::text) LIKE UPPER('%...%')
+    """
+    return GinIndex(
+        OpClass(Upper(Cast(field_name, models.TextField())), name="gin_trgm_ops"),
+        name=name,
+    )
+
+
 class ApplicationSettings(models.Model):
     data = models.JSONField(default=dict)
 
@@ -141,6 +155,14 @@ class Batch(models.Model):
 
     class Meta:
         verbose_name_plural = "Batches"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="batch_created_at_id"),
+            trigram_index("id", "batch_id_trgm"),
+            trigram_index("definition_id", "batch_definition_id_trgm"),
+            trigram_index("vendor", "batch_vendor_trgm"),
+            trigram_index("type", "batch_type_trgm"),
+            trigram_index("project", "batch_project_trgm"),
+        ]
 
     def __str__(self):
         return f"{self.id}"
@@ -191,6 +213,14 @@ class EmailBatch(models.Model):
 
     class Meta:
         verbose_name_plural = "Email Batches"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="emailbatch_created_at_id"),
+            trigram_index("id", "emailbatch_id_trgm"),
+            trigram_index("email_from", "emailbatch_email_from_trgm"),
+            trigram_index("email_subject", "emailbatch_subject_trgm"),
+            trigram_index("matched_profile_name", "emailbatch_profile_trgm"),
+            trigram_index("confirmation_numbers", "emailbatch_confirmation_trgm"),
+        ]
 
     def __str__(self):
         return f"{self.id}"
@@ -263,6 +293,13 @@ class TrainBatch(models.Model):
 
     class Meta:
         verbose_name_plural = "Train Batches"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="trainbatch_created_at_id"),
+            trigram_index("id", "trainbatch_id_trgm"),
+            trigram_index("matched_profile_name", "trainbatch_profile_trgm"),
+            trigram_index("customer", "trainbatch_customer_trgm"),
+            trigram_index("custom_data", "trainbatch_custom_data_trgm"),
+        ]
 
     def __str__(self):
         return f"{self.id}"
@@ -314,7 +351,8 @@ class BatchStatus(models.Model):
     sub_message = models.CharField(max_length=255, blank=True, null=True)
     remarks = models.TextField(blank=True, null=True)
     action = models.CharField(max_length=100, blank=True, null=True)
-    event_time = models.DateTimeField(auto_now=True)
+    # Time the status was written, rows buffered by the log writer are saved later
+    event_time = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name_plural = "Batch Status"
@@ -521,6 +559,9 @@ class ChangeLog(models.Model):
 
     # New values
     new_data_path = models.CharField(max_length=255, blank=True, null=True)
+
+    # Changed paths with their old and new values, bounded per field
+    changes = models.JSONField(null=True, blank=True)
     
     # IP address and user agent
     ip_address = models.GenericIPAddressField(null=True, blank=True)
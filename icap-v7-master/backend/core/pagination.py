@@ -13,14 +13,109 @@ Description:
     This file set the pagination configurations.
 
 Dependencies:
+    - json, base64
+    - datetime from datetime
     - PageNumberPagination from rest_framework.pagination
+    - NotFound from rest_framework.exceptions
+    - Response from rest_framework.response
+    - replace_query_param from rest_framework.utils.urls
+    - Q from django.db.models
 
 Main Features:
     - Set default pagination parameters.
+    - Keyset (cursor) pagination on (created_at, id) for large batch tables.
 """
+import json
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
 
 class PaginationMeta(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 100
+
+
+class KeysetPagination(PaginationMeta):
+    """
+    Page numbers by default. When the 'cursor' query parameter is sent (empty
+    for the first page), pages are read by (created_at, id) instead of OFFSET
+    and rows are not counted.
+
+    Cursor pages are ordered by created_at then id, newest first when
+    'sort_desc' is 'true'. The response has the 'results' and the 'next'
+    link, which is null on the last page.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def use_cursor(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def encode_cursor(self, instance):
+        position = [instance.created_at.isoformat(), instance.pk]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(created_at), pk
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.use_cursor(request)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        descending = request.query_params.get("sort_desc", "false") == "true"
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            # 'created_at <=' first, so the (created_at, id) index gives the range
+            if descending:
+                queryset = queryset.filter(
+                    Q(created_at__lte=created_at)
+                    & (Q(created_at__lt=created_at) | Q(pk__lt=pk))
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__gte=created_at)
+                    & (Q(created_at__gt=created_at) | Q(pk__gt=pk))
+                )
+
+        if descending:
+            queryset = queryset.order_by("-created_at", "-pk")
+        else:
+            queryset = queryset.order_by("created_at", "pk")
+
+        # One more row tells whether there is a next page
+        page = list(queryset[: page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({"next": self.get_next_link(), "results": data})
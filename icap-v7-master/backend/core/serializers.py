@@ -283,6 +283,7 @@ class ChangeLogSerializer(serializers.ModelSerializer):
             "module",
             "module_id",
             "change_category",
+            "changes",
             "created_at",
             "updated_at",
         ]
\ No newline at end of file
@@ -26,7 +26,7 @@ Dependencies:
     - Response from rest_framework.response
     - datetime from datetime
     - models, serializers from core
-    - PaginationMeta from core.pagination
+    - PaginationMeta, KeysetPagination from core.pagination
     - Profile, Project, Template from dashboard.models
     - ProjectSerializer from dashboard.serializers
     - batch_awaiting_datacap from utils.utils
@@ -61,7 +61,7 @@ from core.permissions import IsAdminUser
 
 from rabbitmq_producer import publish
 from core import models, serializers
-from core.pagination import PaginationMeta
+from core.pagination import PaginationMeta, KeysetPagination
 from pipeline.utils.process_batch_utils import write_parent_batch_log
 
 from django.db import transaction
@@ -303,7 +303,7 @@ class BatchViewSet(viewsets.ModelViewSet):
     queryset = models.Batch.objects.all().order_by("id")
     list_serializer_class = serializers.BatchListSerializer
     serializer_class = serializers.BatchSerializer
-    pagination_class = PaginationMeta
+    pagination_class = KeysetPagination
 
     @action(detail=False, methods=["post"], name="List with POST")
     def filter_list(self, request, *args, **kwargs):
@@ -456,6 +456,9 @@ class BatchViewSet(viewsets.ModelViewSet):
 
             # if not template_name and not project_countries:
             #     queryset = queryset.model.objects.none()
+        elif self.action == "retrieve":
+            # Large JSON column the serializer does not return
+            queryset = queryset.defer("ra_json")
 
         if sort_by:
             sort_keyword = f"-{sort_by}" if sort_desc == "true" else sort_by
@@ -467,7 +470,9 @@ class BatchViewSet(viewsets.ModelViewSet):
         """
         Append necessary profile information
         """
-        batch = self.queryset.filter(id=self.kwargs.get("pk")).first()
+        batch = (
+            self.queryset.filter(id=self.kwargs.get("pk")).only("definition_id").first()
+        )
         multi_shipment = False
 
         if batch and batch.definition_id:
@@ -508,7 +513,7 @@ class EmailBatchViewSet(viewsets.ModelViewSet):
     queryset = models.EmailBatch.objects.all().order_by("id")
     list_serializer_class = serializers.EmailBatchSerializer
     serializer_class = serializers.EmailBatchSerializer
-    pagination_class = PaginationMeta
+    pagination_class = KeysetPagination
 
     @action(detail=False, methods=["post"], name="List with POST")
     def filter_list(self, request, *args, **kwargs):
@@ -730,17 +735,23 @@ class EmailBatchViewSet(viewsets.ModelViewSet):
                 else:
                     queryset = queryset.none()
 
+            # Combined with OR rather than UNION, so the result can still be
+            # filtered and ordered (keyset pagination) on the indexes
             if self.request.user.is_superuser:
-                queryset = queryset.union(empty_profiles)
-                queryset = queryset.union(null_profiles)
+                queryset = queryset | empty_profiles | null_profiles
             elif id:
                 specific_id = models.EmailBatch.objects.filter(
                     status="failed", id=id
                 ).only(*fields)
-                queryset = queryset.union(specific_id)
+                queryset = queryset | specific_id
 
             if not project_countries:
                 queryset = queryset.model.objects.none()
+        elif self.action == "retrieve":
+            # Large JSON columns the serializer does not return
+            queryset = queryset.defer(
+                "assembled_results", "api_response", "additional_docs_to_upload"
+            )
         if sort_by:
             sort_keyword = f"-{sort_by}" if sort_desc == "true" else sort_by
             queryset = queryset.order_by(sort_keyword)
@@ -768,7 +779,7 @@ class TrainBatchViewSet(viewsets.ModelViewSet):
     queryset = models.TrainBatch.objects.all().order_by("id")
     list_serializer_class = serializers.TrainBatchSerializer
     serializer_class = serializers.TrainBatchSerializer
-    pagination_class = PaginationMeta
+    pagination_class = KeysetPagination
 
     @action(detail=False, methods=["post"], name="List with POST")
     def filter_list(self, request, *args, **kwargs):
@@ -915,30 +926,21 @@ class TrainBatchViewSet(viewsets.ModelViewSet):
                 else:
                     queryset = queryset.none()
 
-            # Annotate for customer sorting before union (union doesn't support annotate)
-            if sort_by == "customer":
-                queryset = queryset.annotate(
-                    customer_display=Coalesce("customer", "custom_data", Value(""))
-                )
-                empty_profiles = empty_profiles.annotate(
-                    customer_display=Coalesce("customer", "custom_data", Value(""))
-                )
-                null_profiles = null_profiles.annotate(
-                    customer_display=Coalesce("customer", "custom_data", Value(""))
-                )
-
+            # Combined with OR rather than UNION, so the result can still be
+            # filtered and ordered (keyset pagination) on the indexes
             if self.request.user.is_superuser and extension_type == "all":
-                queryset = queryset.union(empty_profiles)
-                queryset = queryset.union(null_profiles)
+                queryset = queryset | empty_profiles | null_profiles
 
             if not project_countries:
                 queryset = queryset.model.objects.none()
-        else:
-            # For non-list actions, annotate if sorting by customer
-            if sort_by == "customer":
-                queryset = queryset.annotate(
-                    customer_display=Coalesce("customer", "custom_data", Value(""))
-                )
+        elif self.action == "retrieve":
+            # Large JSON columns the serializer does not return
+            queryset = queryset.defer("ra_json", "manual_classification_data")
+
+        if sort_by == "customer":
+            queryset = queryset.annotate(
+                customer_display=Coalesce("customer", "custom_data", Value(""))
+            )
 
         if sort_by:
             if sort_by == "customer":
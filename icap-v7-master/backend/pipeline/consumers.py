@@ -23,6 +23,7 @@ Dependencies:
 Main Features:
     - Websocket connections status.
     - Process incoming messages.
+    - Throttle and coalesce status updates per group.
 """
 import datetime
 import json
@@ -51,6 +52,14 @@ AI_AGENT_PORT = os.getenv("AI_AGENT_PORT")
 
 AI_AGENT_URI = f"ws://{AI_AGENT_HOST}:{AI_AGENT_PORT}"
 
+# Minimum seconds between two status messages of the same group and connection
+WS_THROTTLE_INTERVAL = float(os.getenv("WS_THROTTLE_INTERVAL", "0.5"))
+LATEST_ONLY_EVENT_TYPES = {
+    "batch_status_tag",
+    "email_batch_status_tag",
+    "train_batch_status_tag",
+}
+
 
 class StatusConsumer(AsyncWebsocketConsumer):
     ai_agent_handlers = {}
@@ -91,10 +100,19 @@ class StatusConsumer(AsyncWebsocketConsumer):
         # initialize per-connection presence rooms tracking
         self.presence_rooms = {}
 
+        # per-group throttling state, see queue_event
+        self.pending_events = {}
+        self.last_sent_at = {}
+        self.last_sent_data = {}
+        self.flush_tasks = {}
+
         if cache.delete(ws_ticket):
             await self.accept()
 
     async def disconnect(self, close_code):
+        for task in getattr(self, "flush_tasks", {}).values():
+            task.cancel()
+
         # On disconnect, attempt to unregister any presence entries associated
         # with this websocket connection and broadcast editor_left events.
         try:
@@ -213,53 +231,91 @@ class StatusConsumer(AsyncWebsocketConsumer):
                 "message": data.get("data", {}),
             })
 
-    async def batch_status(self, event):
-        data = event["data"]
+    async def queue_event(self, event_type, event):
+        """
+        Rate limit status updates per group to one message every
+        WS_THROTTLE_INTERVAL seconds. Updates arriving in between are
+        coalesced: status tags keep only the latest value, log style events
+        (batch_status, timeline, ai_agent_response) are sent together.
+        """
+        items = event.get("items") or [event["data"]]
+        key = (event_type, self.get_group_key(items[-1]))
 
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "data": data,
-                    "type": "batch_status",
-                }
-            )
-        )
+        pending = self.pending_events.setdefault(key, [])
+        if event_type in LATEST_ONLY_EVENT_TYPES:
+            pending[:] = items[-1:]
+        else:
+            pending.extend(items)
 
-    async def batch_status_tag(self, event):
-        data = event["data"]
+        if key in self.flush_tasks:
+            return
 
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "data": data,
-                    "type": "batch_status_tag",
-                }
-            )
-        )
+        loop = asyncio.get_running_loop()
+        delay = self.last_sent_at.get(key, 0) + WS_THROTTLE_INTERVAL - loop.time()
+        if delay <= 0:
+            await self.flush_events(key)
+        else:
+            self.flush_tasks[key] = asyncio.create_task(self.flush_events_later(key, delay))
+
+    async def flush_events_later(self, key, delay):
+        await asyncio.sleep(delay)
+        self.flush_tasks.pop(key, None)
+        await self.flush_events(key)
+
+    async def flush_events(self, key):
+        """Send coalesced updates of one group as a single message"""
+        items = self.pending_events.pop(key, [])
+        if not items:
+            return
 
-    async def email_batch_status_tag(self, event):
-        data = event["data"]
+        event_type, _ = key
+        self.last_sent_at[key] = asyncio.get_running_loop().time()
 
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "data": data,
-                    "type": "email_batch_status_tag",
-                }
-            )
-        )
+        if event_type in LATEST_ONLY_EVENT_TYPES:
+            # Skip unchanged tags, clients already show this status
+            if self.last_sent_data.get(key) == items[-1]:
+                return
+            self.last_sent_data[key] = items[-1]
+
+        if len(items) == 1:
+            payload = {"data": items[0], "type": event_type}
+        elif not all(isinstance(item, dict) for item in items):
+            payload = {"type": event_type, "items": items}
+        else:
+            # Send shared fields once and only the differing fields per item
+            common = {
+                k: v
+                for k, v in items[0].items()
+                if all(k in item and item[k] == v for item in items[1:])
+            }
+            payload = {
+                "type": event_type,
+                "common": common,
+                "items": [
+                    {k: v for k, v in item.items() if k not in common}
+                    for item in items
+                ],
+            }
+
+        await self.send(text_data=json.dumps(payload))
+
+    @staticmethod
+    def get_group_key(data):
+        if isinstance(data, dict):
+            return data.get("batch_id") or data.get("timeline_id")
+        return None
+
+    async def batch_status(self, event):
+        await self.queue_event("batch_status", event)
+
+    async def batch_status_tag(self, event):
+        await self.queue_event("batch_status_tag", event)
+
+    async def email_batch_status_tag(self, event):
+        await self.queue_event("email_batch_status_tag", event)
     
     async def train_batch_status_tag(self, event):
-        data = event["data"]
-
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "data": data,
-                    "type": "train_batch_status_tag",
-                }
-            )
-        )
+        await self.queue_event("train_batch_status_tag", event)
     
     async def test_models_status(self, event):
         data = event["data"]
@@ -285,16 +341,7 @@ class StatusConsumer(AsyncWebsocketConsumer):
             )
         )
     async def timeline(self, event):
-        data = event["data"]
-
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "data": data,
-                    "type": "timeline",
-                }
-            )
-        )
+        await self.queue_event("timeline", event)
 
     async def timeline_tag(self, event):
         data = event["data"]
@@ -309,16 +356,7 @@ class StatusConsumer(AsyncWebsocketConsumer):
         )
 
     async def ai_agent_response(self, event):
-        data = event["data"]
-
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "data": data,
-                    "type": "ai_agent_response",
-                }
-            )
-        )
+        await self.queue_event("ai_agent_response", event)
 
     async def editor_joined(self, event):
         """Handle editor joined presence event"""
@@ -18,14 +18,71 @@ Dependencies:
 
 Main Features:
     - Modify ra_json to data_json.
+    - Reduce ra_json and definitions to a single document or table without copying.
 """
 from copy import deepcopy
 
 
+def copy_without_children(node, memo=None):
+    """
+    Copy a node with its 'children' replaced by an empty list.
+
+    Only the node attributes are deep copied, the children subtree (pages,
+    blocks, lines and words) is never traversed.
+    """
+    memo = {} if memo is None else memo
+    node_copy = {
+        key: [] if key == "children" else deepcopy(value, memo)
+        for key, value in node.items()
+    }
+    node_copy.setdefault("children", [])
+    return node_copy
+
+
+def reduce_ra_json_for_document(ra_json, document_id):
+    """
+    Remove childerns for not required documents
+
+    The root and document dictionaries are rebuilt, the children of the
+    required document are shared with the given ra_json instead of copied.
+    """
+    return {
+        **ra_json,
+        "nodes": [
+            {**doc} if doc["id"] == document_id else {**doc, "children": []}
+            for doc in ra_json["nodes"]
+        ],
+    }
+
+
+def reduce_definitions_for_table(definitions, table_unique_id):
+    """Remove not required tables from definitions, the kept tables are shared."""
+    return [
+        {
+            **definition,
+            "table": [
+                table
+                for table in definition["table"]
+                if table["table_unique_id"] == table_unique_id
+            ],
+        }
+        for definition in definitions
+    ]
+
+
 class DataJson:
     def __init__(self, ra_json):
         """Initialize the DataJson class instance"""
-        self.data_json = deepcopy(ra_json)
+        memo = {}
+        self.data_json = {
+            key: value if key == "nodes" else deepcopy(value, memo)
+            for key, value in ra_json.items()
+        }
+        self.data_json["nodes"] = [
+            copy_without_children(document, memo)
+            for document in ra_json["nodes"]
+            if document["type"] != "docBuilder"
+        ]
 
     def process(self):
         """
@@ -38,20 +95,11 @@ class DataJson:
             data_json (dict): Updated JSON data with filtered nodes.
 
         Process Details:
-            - Loop through the 'nodes' in the JSON data.
-            - Exclude nodes of type 'docBuilder'.
-            - Remove the 'children' data from the remaining nodes.
-            - Update the JSON data with the filtered nodes.
+            - Nodes of type 'docBuilder' are excluded while copying.
+            - The remaining nodes are copied without their 'children' data.
 
         Notes:
-            - To prevent modification the original data used deepcopy.
+            - ra_json is never modified, only the kept document attributes are
+              copied so the page/word tree is not walked.
         """
-        documents = self.data_json["nodes"]
-        new_documents = []
-        for document in documents:
-            if document["type"] != "docBuilder":
-                document["children"] = []
-                new_documents.append(document)
-
-        self.data_json["nodes"] = new_documents
         return self.data_json
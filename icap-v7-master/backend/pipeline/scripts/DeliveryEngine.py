@@ -0,0 +1,267 @@
+"""
+Organization: AIDocbuilder Inc.
+File: scripts/DeliveryEngine.py
+Version: 6.0
+
+Description:
+    This script sends output deliveries (JSON, documents, timestamps) to the
+    destination APIs over shared keep-alive connections.
+
+Dependencies:
+    - os, time, random, threading, traceback
+    - requests, HTTPAdapter from requests.adapters
+    - NewConnectionError from urllib3.exceptions
+    - ThreadPoolExecutor from concurrent.futures
+    - connection from django.db
+
+Main Features:
+    - Shared requests session with a connection pool sized for concurrent uploads.
+    - Token bucket rate limiting per destination host.
+    - Retry with jittered exponential backoff, only where a retry can not deliver twice.
+    - Access token cache respecting 'expires_in'.
+    - Bounded concurrent execution of document uploads.
+"""
+
+import os
+import time
+import random
+import threading
+import traceback
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from django.db import connection
+
+DELIVERY_TIMEOUT = int(os.getenv("DELIVERY_TIMEOUT", 300))
+DELIVERY_MAX_RETRIES = int(os.getenv("DELIVERY_MAX_RETRIES", 3))
+DELIVERY_BACKOFF_BASE = float(os.getenv("DELIVERY_BACKOFF_BASE", 1))
+DELIVERY_BACKOFF_MAX = float(os.getenv("DELIVERY_BACKOFF_MAX", 30))
+# Requests per second and burst size per destination host, 0 disables the limit
+DELIVERY_RATE_LIMIT = float(os.getenv("DELIVERY_RATE_LIMIT", 10))
+DELIVERY_RATE_BURST = int(os.getenv("DELIVERY_RATE_BURST", 10))
+# Documents of a shipment uploaded at the same time
+DOC_UPLOAD_WORKERS = int(os.getenv("DOC_UPLOAD_WORKERS", 8))
+# Cached access tokens are renewed this many seconds before they expire
+TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", 60))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# Answers telling the request was not processed, retried for every method
+REJECTED_STATUS_CODES = {429, 503}
+# Gateway failures, the request may have been processed
+GATEWAY_STATUS_CODES = {502, 504}
+
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=max(10, DOC_UPLOAD_WORKERS))
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
+
+class TokenBucket:
+    """Allow 'rate' requests per second on average, with bursts up to 'capacity'"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request can be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class TokenCache:
+    """
+    Access tokens by key, reused until TOKEN_REFRESH_MARGIN seconds before
+    they expire. Concurrent callers of an expired key wait for one refresh.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def _get_valid(self, key):
+        with self._lock:
+            entry = self._tokens.get(key)
+        if entry and entry[1] - TOKEN_REFRESH_MARGIN > time.monotonic():
+            return entry[0]
+        return None
+
+    def get(self, key, fetch_token):
+        """Cached token of key, fetch_token() returns a new (token, expires_in)"""
+        token = self._get_valid(key)
+        if token:
+            return token
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            token = self._get_valid(key)
+            if token:
+                return token
+
+            token, expires_in = fetch_token()
+            with self._lock:
+                self._tokens[key] = (token, time.monotonic() + float(expires_in))
+        return token
+
+    def drop(self, key):
+        """Forget a token the destination rejected"""
+        with self._lock:
+            self._tokens.pop(key, None)
+
+
+token_cache = TokenCache()
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(url):
+    """Token bucket of the destination host of url, None if rate limiting is disabled"""
+    if DELIVERY_RATE_LIMIT <= 0:
+        return None
+
+    host = urlsplit(url).netloc.lower()
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(host)
+        if limiter is None:
+            limiter = TokenBucket(DELIVERY_RATE_LIMIT, DELIVERY_RATE_BURST)
+            _rate_limiters[host] = limiter
+    return limiter
+
+
+def get_backoff(attempt, retry_after=None):
+    """Seconds to wait before the next attempt, full jitter unless the server said"""
+    if retry_after and str(retry_after).isdigit():
+        return min(float(retry_after), DELIVERY_BACKOFF_MAX)
+    return random.uniform(0, min(DELIVERY_BACKOFF_MAX, DELIVERY_BACKOFF_BASE * 2**attempt))
+
+
+def was_not_sent(ex):
+    """The request failed before a connection to the server was made"""
+    if isinstance(ex, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(ex.args[0], "reason", None) if ex.args else None
+    return isinstance(ex, requests.ConnectionError) and isinstance(
+        reason, NewConnectionError
+    )
+
+
+def is_retryable_error(method, ex):
+    if method in IDEMPOTENT_METHODS:
+        return isinstance(ex, (requests.ConnectionError, requests.Timeout))
+    return was_not_sent(ex)
+
+
+def is_retryable_response(method, response):
+    if response.status_code in REJECTED_STATUS_CODES:
+        return True
+    return method in IDEMPOTENT_METHODS and response.status_code in GATEWAY_STATUS_CODES
+
+
+def rewind_files(files):
+    """Rewind uploaded file objects so a retry sends them again from the start"""
+    if not files:
+        return
+    values = files.values() if isinstance(files, dict) else [value for _, value in files]
+    for value in values:
+        file_object = value[1] if isinstance(value, (tuple, list)) else value
+        if hasattr(file_object, "seek"):
+            file_object.seek(0)
+
+
+def deliver(method, url, **kwargs):
+    """
+    Send a request to a destination API.
+
+    Args:
+        method (str): HTTP method.
+        url (str): Destination URL.
+        kwargs: Passed to 'requests.Session.request'.
+
+    Returns:
+        response (requests.Response): Last response received.
+
+    Process Details:
+        - Wait for the rate limiter of the destination host.
+        - Send the request through the shared keep-alive session.
+        - Retry with jittered exponential backoff, honoring 'Retry-After'.
+
+    Notes:
+        - Retries never deliver twice: non idempotent requests (POST, PATCH) are only
+          retried when they did not reach the server or were rejected with 429/503.
+        - The last response is returned as is, whatever its status code.
+    """
+    method = method.upper()
+    kwargs.setdefault("timeout", DELIVERY_TIMEOUT)
+    rate_limiter = get_rate_limiter(url)
+
+    for attempt in range(DELIVERY_MAX_RETRIES + 1):
+        rewind_files(kwargs.get("files"))
+        if rate_limiter:
+            rate_limiter.acquire()
+
+        last_attempt = attempt == DELIVERY_MAX_RETRIES
+        try:
+            response = session.request(method, url, **kwargs)
+        except requests.RequestException as ex:
+            if last_attempt or not is_retryable_error(method, ex):
+                raise
+            sleep_for = get_backoff(attempt)
+            print(f"Delivery to {url} failed: {ex}. Retrying in {sleep_for:.1f} seconds.")
+        else:
+            if last_attempt or not is_retryable_response(method, response):
+                return response
+            sleep_for = get_backoff(attempt, response.headers.get("Retry-After"))
+            print(
+                f"Delivery to {url} answered {response.status_code}. Retrying in {sleep_for:.1f} seconds."
+            )
+            response.close()
+
+        time.sleep(sleep_for)
+
+
+def deliver_concurrently(send, items, max_workers=DOC_UPLOAD_WORKERS):
+    """
+    Run send(item) for every item, at most 'max_workers' at a time.
+
+    Returns:
+        results (list): (result, error, trace) per item in the order of 'items',
+                        error is the exception raised by a failed send.
+
+    Notes:
+        - Sends must not depend on each other, results are handled by the caller in order.
+        - Database connections opened by a worker thread are closed with it.
+    """
+
+    def run(item, in_thread):
+        try:
+            return send(item), None, None
+        except Exception as ex:
+            return None, ex, traceback.format_exc()
+        finally:
+            if in_thread:
+                connection.close()
+
+    if len(items) <= 1 or max_workers <= 1:
+        return [run(item, False) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(lambda item: run(item, True), items))
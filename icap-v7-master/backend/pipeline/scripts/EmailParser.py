@@ -24,7 +24,7 @@ Dependencies:
     - ApplicationSettings from core.models
     - detect_garbled_text, remove_null_characters from utils.utils
     - policy from email
-    - BytesParser from email.parser
+    - BytesFeedParser from email.parser
 
 Main Features:
     - Extract metadata (to, from, cc, subject) from email files.
@@ -32,15 +32,20 @@ Main Features:
     - Save attachments while filtering unsupported file types.
     - Convert email content to PDF.
     - Replace embedded image references with local paths.
+    - Stream attachments to disk and hash them while writing.
 """
 
+import base64
+import binascii
+import hashlib
 import json
 import os
 from email import policy, errors, _header_value_parser
 from email import utils as email_utils
 from email._parseaddr import _parsedate_tz
 from email.headerregistry import DateHeader
-from email.parser import BytesParser
+from email.message import EmailMessage
+from email.parser import BytesFeedParser
 from email.header import decode_header
 import extract_msg
 from extract_msg.enums import ErrorBehavior
@@ -69,6 +74,13 @@ from core.models import ApplicationSettings
 
 IMG_FILE_TYPES = ["PNG", "JPEG", "JPG"]
 
+# Bytes fed to the email parser at once, attachments are decoded to disk in
+# chunks of the same size instead of being decoded in memory
+EMAIL_PARSE_CHUNK_SIZE = int(os.getenv("EMAIL_PARSE_CHUNK_SIZE", 1024 * 1024))
+# Parts whose content is the decoded payload (email.contentmanager), only
+# these are decoded incrementally
+STREAMED_MAINTYPES = ("application", "image", "audio", "video")
+
 
 def clean_emails(input_string):
     """
@@ -473,6 +485,26 @@ def get_safe_email_field(msg, field_name, escape_html=True):
     return value
 
 
+def load_eml(eml_file):
+    """Parse an eml file, fed to the parser in chunks of EMAIL_PARSE_CHUNK_SIZE"""
+    parser = BytesFeedParser(policy=policy.default)
+    with open(eml_file, "rb") as file:
+        for chunk in iter(lambda: file.read(EMAIL_PARSE_CHUNK_SIZE), b""):
+            parser.feed(chunk)
+    return parser.close()
+
+
+def load_eml_headers(eml_file):
+    """Parse only the header block of an eml file, the body is never read"""
+    parser = BytesFeedParser(policy=policy.default)
+    with open(eml_file, "rb") as file:
+        for line in file:
+            parser.feed(line)
+            if line in (b"\r\n", b"\n"):
+                break
+    return parser.close()
+
+
 def parse_eml_metadata(eml_file):
     """
     Parse metadata from eml file type
@@ -487,7 +519,7 @@ def parse_eml_metadata(eml_file):
         - 'email_subject' (str): Subject line of the email.
 
     Process Details:
-        - Open the .eml file using the 'BytesParser' library.
+        - Parse the header block of the .eml file using 'load_eml_headers'.
         - Extract and clean the "To" field using the 'clean_emails'.
         - Extract the sender and "CC" field email addresses using 'extract_email_from_cc'.
         - Remove null characters from the email subject.
@@ -495,21 +527,22 @@ def parse_eml_metadata(eml_file):
     Notes:
         - Assume the 'eml_file' parameter is a valid path to a .eml file.
     """
-    with open(eml_file, "rb") as file:
-        msg = BytesParser(policy=policy.default).parse(file)
-        email_to = get_key_ignoring_case(msg, "to")
-        email_to = clean_emails(email_to)
-        email_from = get_key_ignoring_case(msg, "from")
-        email_cc = get_key_ignoring_case(msg, "cc")
+    msg = load_eml_headers(eml_file)
+    email_to = get_key_ignoring_case(msg, "to")
+    email_to = clean_emails(email_to)
+    email_from = get_key_ignoring_case(msg, "from")
+    email_cc = get_key_ignoring_case(msg, "cc")
 
-        email_from, email_cc = extract_email_from_cc(email_from, email_cc)
+    email_from, email_cc = extract_email_from_cc(email_from, email_cc)
 
-        email_subject = get_key_ignoring_case(msg, "subject")
+    email_subject = get_key_ignoring_case(msg, "subject")
 
     return email_to, email_from, email_cc, email_subject
 
 
-def parse_eml(eml_file, show_embedded_img, email_body=False, jap_eng_convert=False):
+def parse_eml(
+    eml_file, show_embedded_img, email_body=False, jap_eng_convert=False, msg=None
+):
     """
     Parse email body and find out the grabled error from eml file type.
 
@@ -517,13 +550,14 @@ def parse_eml(eml_file, show_embedded_img, email_body=False, jap_eng_convert=Fal
         eml_file (str): Path to the .eml file to be parsed.
         show_embedded_img (bool): Flag to embedded images should be retained.
         email_body (bool): Flag to parse and return the email body.
+        msg (EmailMessage): Already parsed eml file, loaded from 'eml_file' if None.
 
     Returns:
         soup: HTML formatted email body with metadata if 'email_body' is True, or 'None'.
         garbled_error: List of errors related to garbled text detection.
 
     Process Details:
-        - Load the .eml file using the 'BytesParser' library.
+        - Load the .eml file using 'load_eml'.
         - Parse the email subject and check for garbled text.
         - If 'email_body' is True extract and process the email's HTML body using BeautifulSoup.
         - Insert email metadata (From, Sent, To, Subject) at the top of the body.
@@ -535,8 +569,8 @@ def parse_eml(eml_file, show_embedded_img, email_body=False, jap_eng_convert=Fal
         - Ensure the extracted email content is well-formatted.
         - Garbled text detection in both the subject and body.
     """
-    with open(eml_file, "rb") as file:
-        msg = BytesParser(policy=policy.default).parse(file)
+    if msg is None:
+        msg = load_eml(eml_file)
 
     garbled_error = []
     email_subject = get_key_ignoring_case(msg, "subject")
@@ -609,6 +643,116 @@ def parse_eml(eml_file, show_embedded_img, email_body=False, jap_eng_convert=Fal
     return None, garbled_error
 
 
+def iter_payload_bytes(payload):
+    """Raw payload of a parsed part as bytes, in chunks of EMAIL_PARSE_CHUNK_SIZE"""
+    for start in range(0, len(payload), EMAIL_PARSE_CHUNK_SIZE):
+        chunk = payload[start : start + EMAIL_PARSE_CHUNK_SIZE]
+        yield chunk.encode("ascii", "surrogateescape")
+
+
+def iter_base64_payload(payload):
+    """
+    Decode a base64 payload chunk by chunk.
+
+    Raises binascii.Error on anything but well formed base64, those payloads
+    are left to the lenient decoding of the email library.
+    """
+    carry = b""
+    for chunk in iter_payload_bytes(payload):
+        data = carry + chunk.translate(None, b"\r\n")
+        # Padding can only end the payload, it is decoded with the last chunk
+        end = 0 if b"=" in data else len(data) - len(data) % 4
+        if end:
+            yield base64.b64decode(data[:end], validate=True)
+        carry = data[end:]
+
+    if carry:
+        missing_padding = b"==="[: 4 - len(carry) % 4] if len(carry) % 4 else b""
+        yield base64.b64decode(carry + missing_padding, validate=True)
+
+
+def iter_quoted_printable_payload(payload):
+    """Decode a quoted-printable payload chunk by chunk, split on line ends"""
+    carry = b""
+    for chunk in iter_payload_bytes(payload):
+        data = carry + chunk
+        end = data.rfind(b"\n") + 1
+        if end:
+            yield binascii.a2b_qp(data[:end])
+        carry = data[end:]
+
+    if carry:
+        yield binascii.a2b_qp(carry)
+
+
+def iter_decoded_payload(part):
+    """
+    Decoded content of an attachment part in chunks, same bytes as
+    part.get_content(). None if the part is not decoded incrementally.
+    """
+    payload = part.get_payload()
+    if (
+        part.get_content_maintype() not in STREAMED_MAINTYPES
+        or not isinstance(payload, str)
+    ):
+        return None
+
+    cte = str(part.get("content-transfer-encoding", "")).lower()
+    if cte == "base64":
+        return iter_base64_payload(payload)
+    if cte == "quoted-printable":
+        return iter_quoted_printable_payload(payload)
+    if cte in ("x-uuencode", "uuencode", "uue", "x-uue"):
+        return None
+    return iter_payload_bytes(payload)
+
+
+def write_chunks(chunks, file_path):
+    """Write bytes chunks to file_path and return their sha256"""
+    content_hash = hashlib.sha256()
+    with open(file_path, "wb") as file:
+        for chunk in chunks:
+            file.write(chunk)
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def get_file_hash(file_path):
+    """sha256 of a file, read in chunks"""
+    content_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(EMAIL_PARSE_CHUNK_SIZE), b""):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def write_attachment_data(attachment_data, file_path):
+    """
+    Write attachment data to file_path and return the sha256 of the file.
+
+    attachment_data is the content (str or bytes) or the email part itself,
+    parts are decoded into the file chunk by chunk when their encoding allows.
+    """
+    if isinstance(attachment_data, EmailMessage):
+        chunks = iter_decoded_payload(attachment_data)
+        if chunks is not None:
+            try:
+                return write_chunks(chunks, file_path)
+            except ValueError:
+                # Malformed or non ascii payload, decoded by the email library
+                pass
+        attachment_data = attachment_data.get_content()
+
+    if isinstance(attachment_data, str):
+        with open(file_path, "w") as attachment_file:
+            attachment_file.write(attachment_data)
+            return hashlib.sha256(
+                attachment_data.encode(attachment_file.encoding)
+            ).hexdigest()
+
+    return write_chunks([attachment_data], file_path)
+
+
 # Manage attachment files and embedded images
 def write_attachment_to_file(
     attachment_data,
@@ -617,17 +761,19 @@ def write_attachment_to_file(
     duplicate_filename_count,
     show_embedded_img,
     garbled_error,
+    attachment_hashes=None,
 ):
     """
     Process and save email attachments and handle unsupported file types, duplicate filenames.
 
     Args:
-        attachment_data (str): Data of the attachment to be saved.
+        attachment_data (str | bytes | EmailMessage): Data of the attachment to be saved, or the email part to decode it from.
         attachments_folder (str): Directory where attachments will be saved.
         filename (str): Name of the attachment file.
         show_embedded_img (bool): Flag to embedded image files are allowed.
         unsupported_files (list): List to filename of unsupported file types.
         garbled_error (list): List of error related to garbled text detection.
+        attachment_hashes (dict): Saved attachment path to sha256 of its content, updated in place.
 
     Returns:
         duplicate_filename_count (int): Updated count of duplicate filenames.
@@ -638,11 +784,13 @@ def write_attachment_to_file(
         - In case of filename being too long or containing null characters added to 'garbled_error'.
         - Duplicate filename is handled by appending a counter to the filename.
         - If the attachment is an Excel file .xls converted to '.xlsx' and saved accordingly.
+        - Email parts are decoded to disk chunk by chunk and hashed while writing.
 
     Notes:
         - Handle unsupported file types.
         - Handle error related to the file-saving process.
     """
+
     global IMG_FILE_TYPES
 
     unsupported_mime_types = get_unsupported_mime_types()
@@ -677,8 +825,7 @@ def write_attachment_to_file(
         if extension == "XLS":
             # Write XLS data to temporary file
             temp_xls = os.path.join(attachments_folder, f"temp_{int(time.time())}.xls")
-            with open(temp_xls, "wb") as f:
-                f.write(attachment_data)
+            write_attachment_data(attachment_data, temp_xls)
 
             try:
                 # Validate XLS first
@@ -693,6 +840,8 @@ def write_attachment_to_file(
                     attachments_folder, xlsx_filename, duplicate_filename_count
                 )
                 convert_xls_to_xlsx(temp_xls, xlsx_path)
+                if attachment_hashes is not None:
+                    attachment_hashes[xlsx_path] = get_file_hash(xlsx_path)
 
                 # Cleanup after successful execution
                 if os.path.exists(temp_xls):
@@ -707,12 +856,9 @@ def write_attachment_to_file(
                 garbled_error.append(f"Error: {filename} is not a valid XLS file.")
                 return duplicate_filename_count, garbled_error
 
-        if isinstance(attachment_data, str):
-            with open(attachment_path, "w") as attachment_file:
-                attachment_file.write(attachment_data)
-        else:
-            with open(attachment_path, "wb") as attachment_file:
-                attachment_file.write(attachment_data)
+        content_hash = write_attachment_data(attachment_data, attachment_path)
+        if attachment_hashes is not None:
+            attachment_hashes[attachment_path] = content_hash
 
     except OSError as e:
         if e.errno == 36:  # Filename too long error
@@ -805,6 +951,7 @@ def process_email_part(
     show_embedded_img,
     unsupported_files,
     garbled_error,
+    attachment_hashes=None,
 ):
     """
     Recursively processes email parts to extract, validate, and save attachments.
@@ -816,6 +963,7 @@ def process_email_part(
         show_embedded_img (bool): Flag to embedded image files are allowed.
         unsupported_files (list): List to filename of unsupported file types.
         garbled_error (list): List of error related to garbled text detection.
+        attachment_hashes (dict): Saved attachment path to sha256 of its content, updated in place.
 
     Returns:
         duplicate_filename_count (int): Updated count of duplicate filenames.
@@ -841,6 +989,7 @@ def process_email_part(
                 show_embedded_img,
                 unsupported_files,
                 garbled_error,
+                attachment_hashes,
             )
     else:
         # Process single part (non-multipart)
@@ -848,17 +997,18 @@ def process_email_part(
         if filename:
             filename = remove_null_characters(filename)
             filename = lowercase_extension(filename)
-            attachment_data = part.get_content()
             collect_unsupported_files(show_embedded_img, unsupported_files, filename)
 
-            # Save the attachment to a file and handle errors
+            # Save the attachment to a file and handle errors, the part is
+            # decoded while writing
             duplicate_filename_count, garbled_error = write_attachment_to_file(
-                attachment_data,
+                part,
                 attachments_folder,
                 filename,
                 duplicate_filename_count,
                 show_embedded_img,
                 garbled_error,
+                attachment_hashes,
             )
 
             # Check for garbled text in the filename
@@ -903,7 +1053,11 @@ def decoded_iso_jp_text(full_text):
 
 
 def save_msg_attachment(
-    duplicate_filename_count, attachment_data, attachments_folder=".", filename=None
+    duplicate_filename_count,
+    attachment_data,
+    attachments_folder=".",
+    filename=None,
+    attachment_hashes=None,
 ):
     """
     Save .msg email attachment data to the specified directory.
@@ -913,6 +1067,7 @@ def save_msg_attachment(
         attachment_data (str): Data of the attachment to be saved.
         attachments_folder (str): Directory where attachments will be saved.
         filename (str): Name of the attachment file.
+        attachment_hashes (dict): Saved attachment path to sha256 of its content, updated in place.
 
     Returns:
         duplicate_filename_count (int): Updated duplicate filename counter.
@@ -932,16 +1087,18 @@ def save_msg_attachment(
 
     # Handle different types of attachment data
     if isinstance(attachment_data, (bytes, bytearray)):
-        with open(output_path, "wb") as f:
-            f.write(attachment_data)
+        content_hash = write_chunks([attachment_data], output_path)
+        if attachment_hashes is not None:
+            attachment_hashes[output_path] = content_hash
         print(f"Saved bytes attachment: {filename}")
 
     elif isinstance(attachment_data, extract_msg.Message):
         try:
             msg_data = extract_message_data(attachment_data)
 
-            with open(output_path, "wb") as f:
-                f.write(msg_data)
+            content_hash = write_chunks([msg_data], output_path)
+            if attachment_hashes is not None:
+                attachment_hashes[output_path] = content_hash
 
             print(f"Saved message attachment: {filename}")
         except Exception as e:
@@ -953,7 +1110,7 @@ def save_msg_attachment(
     return duplicate_filename_count
 
 
-def save_attachments(email_file, attachments_folder, show_embedded_img):
+def save_attachments(email_file, attachments_folder, show_embedded_img, eml_msg=None):
     """
     Process email (.msg and .eml) file, extract and save attachments to the specified folder.
 
@@ -961,15 +1118,18 @@ def save_attachments(email_file, attachments_folder, show_embedded_img):
         email_file (str): Path to the email file.
         attachments_folder (str): Directory where attachments will be saved.
         show_embedded_img (bool): Flag to embedded image files are allowed.
+        eml_msg (EmailMessage): Already parsed .eml file, loaded from 'email_file' if None.
 
     Returns:
         unsupported_files (list): List of unsupported files that could not be saved.
         garbled_error (list): List of errors related to garbled issue during processing.
+        attachment_hashes (dict): Saved attachment path to sha256 of its content.
 
     Process Details:
         - Check whether the email file is in '.msg' or '.eml' format.
         - If the email is in '.msg' format, it extract attachments and process them.
         - If the email is in `.eml` format, it parse the email, iterate through attachments, and process them.
+        - '.eml' attachments are decoded to disk chunk by chunk, not in memory.
 
     Notes:
         - For each attachment, it validate, remove unsupported characters and check for embedded image file.
@@ -977,6 +1137,7 @@ def save_attachments(email_file, attachments_folder, show_embedded_img):
     """
     unsupported_files = []
     garbled_error = []  # renamed from garbled_error
+    attachment_hashes = {}
 
     try:
         duplicate_filename_count = 0
@@ -1011,6 +1172,7 @@ def save_attachments(email_file, attachments_folder, show_embedded_img):
                             attachment_data,
                             attachments_folder,
                             filename,
+                            attachment_hashes,
                         )
                         continue
 
@@ -1021,6 +1183,7 @@ def save_attachments(email_file, attachments_folder, show_embedded_img):
                         duplicate_filename_count,
                         show_embedded_img,
                         garbled_error,
+                        attachment_hashes,
                     )
                 except Exception as e:
                     print(f"Error saving attachment '{filename}': {str(e)}")
@@ -1033,8 +1196,7 @@ def save_attachments(email_file, attachments_folder, show_embedded_img):
                     )
             msg.close()
         elif email_file.lower().endswith(".eml"):
-            with open(email_file, "rb") as file:
-                msg = BytesParser(policy=policy.default).parse(file)
+            msg = eml_msg if eml_msg is not None else load_eml(email_file)
 
             for part in msg.iter_attachments():
                 # Check if the part needs further processing
@@ -1059,6 +1221,7 @@ def save_attachments(email_file, attachments_folder, show_embedded_img):
                                         duplicate_filename_count,
                                         show_embedded_img,
                                         garbled_error,
+                                        attachment_hashes,
                                     )
                                 )
                             except Exception as e:
@@ -1074,6 +1237,7 @@ def save_attachments(email_file, attachments_folder, show_embedded_img):
                             show_embedded_img,
                             unsupported_files,
                             garbled_error,
+                            attachment_hashes,
                         )
                 else:
                     # Handle non-multipart parts directly
@@ -1083,7 +1247,6 @@ def save_attachments(email_file, attachments_folder, show_embedded_img):
                         filename = decoded_iso_jp_text(filename)
                     # removing unsupported dot with "."
                     filename = replace_special_dot(filename)
-                    attachment_data = part.get_content()
                     collect_unsupported_files(
                         show_embedded_img, unsupported_files, filename
                     )
@@ -1093,12 +1256,13 @@ def save_attachments(email_file, attachments_folder, show_embedded_img):
                         try:
                             duplicate_filename_count, garbled_error = (
                                 write_attachment_to_file(
-                                    attachment_data,
+                                    part,
                                     attachments_folder,
                                     filename,
                                     duplicate_filename_count,
                                     show_embedded_img,
                                     garbled_error,
+                                    attachment_hashes,
                                 )
                             )
                         except Exception as e:
@@ -1114,7 +1278,7 @@ def save_attachments(email_file, attachments_folder, show_embedded_img):
     except Exception as e:
         print(traceback.print_exc())
 
-    return unsupported_files, garbled_error
+    return unsupported_files, garbled_error, attachment_hashes
 
 
 def get_attached_eml_subject(part):
@@ -1226,10 +1390,11 @@ def parse_email(
         - attachments_folder (str): Path to the folder where attachments are saved.
         - unsupported_files (list): List of files with unsupported formats that were not saved.
         - garbled_all_error (list): List of errors related to garbled text or processing issues.
+        - attachment_hashes (dict): Saved attachment path to sha256 of its content.
 
     Process Details:
         - Check the email file type '.eml' or '.msg' and process it accordingly.
-        - For '.eml' files, it calls the 'parse_eml' function.
+        - For '.eml' files, it parses the file once and calls the 'parse_eml' function.
         - For '.msg' files, it calls the 'parse_msg' function.
         - It extract the email body as HTML and save it to a specified output folder.
         - It save attachments to a separate folder, handle unsupported files and detect garbled text.
@@ -1240,14 +1405,21 @@ def parse_email(
         - Embedded images are handled depending on the 'show_embedded_img' flag and the folder is cleaned up after conversion.
     """
     garbled_all_error = []
+    eml_msg = None
     print(show_embedded_img)
     print(type(show_embedded_img))
 
     # Open Email and extract Meta info
     if email_file_name.lower().endswith(".eml"):
+        # Parsed once, shared by the body and the attachments
+        eml_msg = load_eml(email_file_path)
         with safe_tag_eq():
             html_output, garbled_error = parse_eml(
-                email_file_path, show_embedded_img, email_body_exists, jap_eng_convert
+                email_file_path,
+                show_embedded_img,
+                email_body_exists,
+                jap_eng_convert,
+                msg=eml_msg,
             )
         if garbled_error:
             garbled_all_error.extend(garbled_error)
@@ -1282,8 +1454,8 @@ def parse_email(
     os.makedirs(attachments_folder, exist_ok=True)
 
     # save_attachments returns any unsupported files it is unable to save
-    unsupported_files, garbled_error = save_attachments(
-        email_file_path, attachments_folder, show_embedded_img
+    unsupported_files, garbled_error, attachment_hashes = save_attachments(
+        email_file_path, attachments_folder, show_embedded_img, eml_msg
     )
     if garbled_error:
         garbled_all_error.extend(garbled_error)
@@ -1308,12 +1480,19 @@ def parse_email(
             ):
                 file_path = os.path.join(attachments_folder, file_name)
                 os.remove(file_path)
+                attachment_hashes.pop(file_path, None)
 
     except Exception as ex:
         print(f"Error during cleanup: {str(ex)}")
         print(traceback.format_exc())
 
-    return (pdf_path, attachments_folder, unsupported_files, garbled_all_error)
+    return (
+        pdf_path,
+        attachments_folder,
+        unsupported_files,
+        garbled_all_error,
+        attachment_hashes,
+    )
 
 
 # Here we applied Monkey Patching to modify the Email library
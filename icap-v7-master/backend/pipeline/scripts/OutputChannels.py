@@ -1,21 +1,45 @@
 import re
 import base64
-import requests
 from datetime import timedelta
 from django.utils import timezone
 
-_session = requests.Session()
+from pipeline.scripts.DeliveryEngine import (
+    TOKEN_REFRESH_MARGIN,
+    deliver,
+    token_cache,
+)
 
 
 class OutputChannels:
     def __init__(self, channel):
         self.channel = channel
 
+    def get_token_cache_key(self):
+        """OAuth2 tokens are cached per channel and credentials"""
+        return (
+            "output_channel",
+            self.channel.pk,
+            self.channel.token_url,
+            self.channel.client_id,
+            self.channel.username,
+            self.channel.scope,
+        )
+
     def get_oauth2_token(self):
-        """Fetch a new OAuth2 token if expired or missing"""
+        """OAuth2 token of the channel, shared by every request until it expires"""
+        return token_cache.get(self.get_token_cache_key(), self.fetch_oauth2_token)
+
+    def drop_oauth2_token(self):
+        """Forget the token after the destination rejected it"""
+        token_cache.drop(self.get_token_cache_key())
+        self.channel.token_expires_at = None
+
+    def fetch_oauth2_token(self):
+        """Fetch a new OAuth2 token if expired or missing, returns (token, expires_in)"""
         if self.channel.token and self.channel.token_expires_at:
-            if self.channel.token_expires_at > timezone.now():
-                return self.channel.token
+            expires_in = (self.channel.token_expires_at - timezone.now()).total_seconds()
+            if expires_in > TOKEN_REFRESH_MARGIN:
+                return self.channel.token, expires_in
 
         if not (
             self.channel.token_url
@@ -38,7 +62,8 @@ class OutputChannels:
         if self.channel.scope:
             data["scope"] = self.channel.scope
 
-        response = requests.post(
+        response = deliver(
+            "POST",
             self.channel.token_url,
             data=data,
         )
@@ -55,7 +80,7 @@ class OutputChannels:
             self.channel.save(update_fields=["_token", "token_expires_at"])
         except:
             pass
-        return token
+        return token, expires_in
 
     def get_headers_and_auth(self):
         """Prepare headers or auth"""
@@ -77,6 +102,24 @@ class OutputChannels:
 
         return headers
 
+    def send(self, method, url, headers=None, **kwargs):
+        """
+        Send a request with the channel authentication.
+        A rejected OAuth2 token is renewed and the request sent once more.
+        """
+        response = deliver(
+            method, url, headers={**self.get_headers_and_auth(), **(headers or {})}, **kwargs
+        )
+        if response.status_code == 401 and self.channel.auth_type == "oauth2":
+            self.drop_oauth2_token()
+            response = deliver(
+                method,
+                url,
+                headers={**self.get_headers_and_auth(), **(headers or {})},
+                **kwargs
+            )
+        return response
+
     def dynamic_api_call(self, request_data, files=None, payload=None):
         """Function to make dynamic endpoint call"""
         try:
@@ -87,9 +130,7 @@ class OutputChannels:
                 pattern = r"\{\{\s*" + re.escape(key) + r"\s*\}\}"
                 endpoint_url = re.sub(pattern, str(value), endpoint_url)
 
-            headers = self.get_headers_and_auth()
             request_kwargs = {
-                "headers": headers,
                 "timeout": 300,
             }
 
@@ -99,7 +140,7 @@ class OutputChannels:
             if files is not None:
                 request_kwargs["files"] = files
 
-            response = _session.request(
+            response = self.send(
                 request_type,
                 endpoint_url,
                 **request_kwargs
@@ -127,7 +168,7 @@ class OutputChannels:
             request_type = self.channel.request_type
             endpoint_url = self.channel.endpoint_url
             headers = self.get_timestamp_headers()
-            response = _session.request(
+            response = deliver(
                 request_type,
                 endpoint_url,
                 data=form_data,
@@ -148,10 +189,10 @@ class OutputChannels:
             if shipment_id:
                 endpoint_url = f"{endpoint_url.rstrip('/')}/{shipment_id}"
 
-            headers = self.get_headers_and_auth()
+            headers = {}
             if case_id:
                 headers["case_id"] = case_id
-            response = _session.request(
+            response = self.send(
                 request_type,
                 endpoint_url,
                 json=final_json,
@@ -167,10 +208,10 @@ class OutputChannels:
     def send_document(self, form_data, files, case_id=None):
         """Main function to send document"""
         try:
-            headers = self.get_headers_and_auth()
+            headers = {}
             if case_id:
                 headers["case_id"] = case_id
-            response = _session.request(
+            response = self.send(
                 self.channel.request_type,
                 self.channel.endpoint_url,
                 data=form_data,
@@ -18,6 +18,7 @@ Dependencies:
     - load_workbook from openpyxl
     - get_column_letter from openpyxl.utils
     - EmailParsedDocument, TrainParsedDocument from core.models
+    - build_layout_pages from pipeline.utils.layout_xml_utils
 
 Main Features:
     - Extracts document, page, and element data recursively from XML layout files.
@@ -36,10 +37,12 @@ import xml.etree.ElementTree as ET
 from copy import deepcopy
 import zipfile
 
+from django.conf import settings
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter
 from core.models import EmailParsedDocument, TrainParsedDocument, ApplicationSettings
 from dashboard.models import Profile
+from pipeline.utils.layout_xml_utils import build_layout_pages
 
 
 def json_default(value):
@@ -185,6 +188,14 @@ class RAJson:
             - The 'IMAGEFILE' attribute is converted to lowercase for consistency.
             - The XML file path is assumed to follow the format '{page_id}_layout.xml'.
         """
+        xml_file_path, export_attrs = self.get_page_export_attrs(P)
+
+        page_attrs = self.process_PAGE(xml_file_path)
+        page_attrs.update(export_attrs)
+        return page_attrs
+
+    def get_page_export_attrs(self, P):
+        """Return the layout XML file path and the export variables of a Page element"""
         page_id = P.get("id")
         export_attrs = {}
         for V in P.findall("./V"):
@@ -197,10 +208,29 @@ class RAJson:
                 export_attrs[key] = V.text
 
         xml_file_path = os.path.join(self.input_folder_path, f"{page_id}_layout.xml")
+        return xml_file_path, export_attrs
 
-        page_attrs = self.process_PAGE(xml_file_path)
-        page_attrs.update(export_attrs)
-        return page_attrs
+    def process_pages(self, pages):
+        """
+        Build the pages of a document from their layout XML files.
+
+        Pages are streamed with iterparse and get their hierarchical IDs while
+        parsing, so the result equals 'pre_process_PAGE' followed by 'assign_id'.
+        Larger documents are parsed in worker processes (RAJSON_WORKERS).
+
+        Args:
+            pages (list): Page elements from the export XML.
+
+        Returns:
+            list: Page dictionaries in document order.
+        """
+        page_jobs = [self.get_page_export_attrs(P) for P in pages]
+        return build_layout_pages(
+            page_jobs,
+            self.NODES,
+            workers=settings.RAJSON_WORKERS,
+            parallel_min_pages=settings.RAJSON_PARALLEL_MIN_PAGES,
+        )
 
     def _process_shapes_excel_xml(self, excel_file_path):
         shape_dict = {}
@@ -580,7 +610,7 @@ class RAJson:
                             valid_pages.append(P)
                             break
 
-            attrs["children"] = [self.pre_process_PAGE(P) for P in valid_pages]
+            attrs["children"] = self.process_pages(valid_pages)
 
             return attrs
 
@@ -837,9 +867,8 @@ class RAJson:
     def process_folder(self):
         """
         This function is wrapper to all processes.
-        First it generates dictionary object for all XML files in given input_folder_path.
-        Then it calls assign_id function to recursively provide IDs to all child elements of PAGE Elements.
-        Then dumps JSON to the disk.
+        It generates dictionary object for all XML files in given input_folder_path.
+        IDs of all child elements of PAGE Elements are assigned while pages are parsed.
 
         Args:
             Operates on class attributes.
@@ -849,22 +878,15 @@ class RAJson:
 
         Process Details:
             - The 'process_export_file' function is called to generate a JSON-like structure containing file nodes.
-            - For files with '.pdf' or '.docx' extensions, each page is processed using 'assign_id' to ensure unique identification.
+            - Pages of '.pdf' or '.docx' files already carry hierarchical IDs (see 'process_pages').
 
         Notes:
             - The function assume that 'result_json' follow a specific schema where:
                 - 'nodes' is a list of documents.
                 - Each document has an 'ext' key for file extension and a 'children' key for pages.
-            - Only files with '.pdf' or '.docx' extensions are considered for ID assignment.
         """
         result_json = self.process_export_file()
 
-        for document in result_json["nodes"]:
-            extension = document.get("ext", ".pdf")
-            if extension in [".pdf", ".docx"]:
-                for page in document["children"]:
-                    self.assign_id(page)
-
         # Skip generating DB JSONs
         # self.create_DB_json(result_json)
 
@@ -0,0 +1,152 @@
+"""
+Organization: AIDocbuilder Inc.
+File: pipeline/tests/test_data_json.py
+Version: 6.0
+
+Description:
+    Tests that building data_json and reducing ra_json / definitions for a
+    single document or table never mutate the shared input structures.
+
+Dependencies:
+    - deepcopy from copy
+    - DataJson, copy_without_children, reduce_ra_json_for_document,
+      reduce_definitions_for_table from pipeline.scripts.DataJson
+"""
+from copy import deepcopy
+
+from pipeline.scripts.DataJson import (
+    DataJson,
+    copy_without_children,
+    reduce_definitions_for_table,
+    reduce_ra_json_for_document,
+)
+
+
+def get_ra_json():
+    def get_document(document_id, doc_type="document"):
+        return {
+            "id": document_id,
+            "type": doc_type,
+            "DocType": "Invoice",
+            "attributes": {"pages": [0, 1], "meta": {"lang": "en"}},
+            "children": [
+                {
+                    "id": f"{document_id}-page-0",
+                    "type": "page",
+                    "children": [
+                        {
+                            "id": f"{document_id}-block-0",
+                            "type": "block",
+                            "children": [{"id": f"{document_id}-word-0", "v": "A"}],
+                        }
+                    ],
+                }
+            ],
+        }
+
+    return {
+        "id": "batch-1",
+        "BatchVersion": "v1",
+        "attributes": {"settings": {"ocr": True}},
+        "nodes": [
+            get_document("doc-1"),
+            get_document("doc-2"),
+            get_document("doc-3", doc_type="docBuilder"),
+        ],
+    }
+
+
+def get_definitions():
+    return [
+        {
+            "id": "definition-1",
+            "type": "invoice",
+            "key": [{"keyId": "key-1"}],
+            "table": [
+                {"table_unique_id": "table-1", "columns": [{"name": "qty"}]},
+                {"table_unique_id": "table-2", "columns": [{"name": "price"}]},
+            ],
+        },
+        {
+            "id": "definition-2",
+            "type": "awb",
+            "key": [],
+            "table": [{"table_unique_id": "table-3", "columns": []}],
+        },
+    ]
+
+
+def test_copy_without_children_does_not_mutate_node():
+    ra_json = get_ra_json()
+    expected = deepcopy(ra_json)
+    node = ra_json["nodes"][0]
+
+    node_copy = copy_without_children(node)
+    node_copy["DocType"] = "Changed"
+    node_copy["attributes"]["meta"]["lang"] = "de"
+    node_copy["attributes"]["pages"].append(2)
+    node_copy["children"].append({"id": "new"})
+
+    assert ra_json == expected
+    assert node["children"] == expected["nodes"][0]["children"]
+
+
+def test_data_json_does_not_mutate_ra_json():
+    ra_json = get_ra_json()
+    expected = deepcopy(ra_json)
+
+    data_json = DataJson(ra_json).process()
+    assert [document["id"] for document in data_json["nodes"]] == ["doc-1", "doc-2"]
+    assert all(document["children"] == [] for document in data_json["nodes"])
+
+    data_json["BatchVersion"] = "v2"
+    data_json["attributes"]["settings"]["ocr"] = False
+    data_json["nodes"].append({"id": "doc-4"})
+    for document in data_json["nodes"][:2]:
+        document["DocType"] = "Changed"
+        document["attributes"]["meta"]["lang"] = "de"
+        document["children"].append({"id": "new"})
+
+    assert ra_json == expected
+
+
+def test_reduce_ra_json_for_document_does_not_mutate_ra_json():
+    ra_json = get_ra_json()
+    expected = deepcopy(ra_json)
+
+    reduced = reduce_ra_json_for_document(ra_json, "doc-2")
+    assert [document["children"] == [] for document in reduced["nodes"]] == [
+        True,
+        False,
+        True,
+    ]
+    # The kept document subtree is shared, not copied
+    assert reduced["nodes"][1]["children"] is ra_json["nodes"][1]["children"]
+
+    reduced["BatchVersion"] = "v2"
+    reduced["nodes"].append({"id": "doc-4"})
+    for document in reduced["nodes"][:3]:
+        document["DocType"] = "Changed"
+        document["children"] = []
+
+    assert ra_json == expected
+
+
+def test_reduce_definitions_for_table_does_not_mutate_definitions():
+    definitions = get_definitions()
+    expected = deepcopy(definitions)
+
+    reduced = reduce_definitions_for_table(definitions, "table-2")
+    assert [
+        [table["table_unique_id"] for table in definition["table"]]
+        for definition in reduced
+    ] == [["table-2"], []]
+    # The kept table is shared, not copied
+    assert reduced[0]["table"][0] is definitions[0]["table"][1]
+
+    reduced.append({"id": "definition-3"})
+    for definition in reduced[:2]:
+        definition["type"] = "changed"
+        definition["table"].append({"table_unique_id": "table-4"})
+
+    assert definitions == expected
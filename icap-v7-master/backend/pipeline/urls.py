@@ -105,4 +105,6 @@ urlpatterns = [
     path("get_test_json/",views.get_test_json),
     path("qdrant_vector_db/",views.qdrant_vector_db),
     path("get_spreadjs_license/",views.get_spreadjs_license),
+    path("job_trace_summary/", views.job_trace_summary),
+    path("job_trace/<str:job_id>/", views.job_trace),
 ]
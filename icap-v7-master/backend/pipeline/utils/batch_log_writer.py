@@ -0,0 +1,242 @@
+"""
+Organization: AIDocbuilder Inc.
+File: pipeline/utils/batch_log_writer.py
+Version: 6.0
+
+Description:
+    Write-behind buffer for batch status logs. BatchStatus timeline rows are
+    queued by the pipeline consumer and persisted from a background thread
+    with bulk_create. Batch status updates stay synchronous, handlers read
+    them back right away. Request paths write synchronously.
+
+Dependencies:
+    - atexit, queue, threading, time, traceback
+    - close_old_connections, transaction from django.db
+    - timezone from django.utils
+    - async_to_sync from asgiref.sync, get_channel_layer from channels.layers
+    - BatchStatus from core.models
+    - BatchStatusSerializer from core.serializers
+
+Main Features:
+    - Batched BatchStatus inserts preserving per batch order.
+    - One merged batch_status websocket message per batch and flush window.
+    - Explicit flush for stage boundaries.
+    - Bounded queue, per row inserts when a bulk insert fails.
+"""
+import atexit
+import queue
+import threading
+import time
+import traceback
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.models import BatchStatus
+from core.serializers import BatchStatusSerializer
+
+BATCH_STATUS_FIELDS = (
+    "batch_id",
+    "status",
+    "message",
+    "sub_message",
+    "remarks",
+    "action",
+    "event_time",
+)
+
+# Queued by flush() to close the current window early
+FLUSH_MARKER = object()
+
+# Threads whose logs go through the writer, see enable_write_behind()
+_thread_state = threading.local()
+
+
+def enable_write_behind():
+    """
+    Buffer the batch logs written by the current thread.
+
+    Called by the pipeline consumer for the thread processing a message,
+    which flushes at the end of the stage. Other threads (e.g. HTTP requests)
+    write synchronously and read their own writes back.
+    """
+    _thread_state.write_behind = True
+
+
+def is_write_behind_enabled():
+    return getattr(_thread_state, "write_behind", False)
+
+
+class BatchLogWriter:
+    """
+    Buffer batch logs in memory and persist them from a single background thread.
+
+    Entries are drained in FIFO order so BatchStatus rows keep the order in
+    which they were written for every batch.
+    """
+
+    def __init__(self, flush_interval=0.2, max_batch_size=200, max_queue_size=10000):
+        self.group_send = async_to_sync(get_channel_layer().group_send)
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        # Bounded, writers wait for the background thread when it falls behind
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._start_lock = threading.Lock()
+        self._thread = None
+        # Sequence counters let flush() wait only for entries queued before it
+        self._progress = threading.Condition()
+        self._queued = 0
+        self._persisted = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="batch-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def write(self, **kwargs):
+        """Queue a BatchStatus row"""
+        self._ensure_started()
+        # Timeline order is the order of writes, not of the flushes
+        kwargs.setdefault("event_time", timezone.now())
+        with self._progress:
+            self._queued += 1
+        # Outside the lock, the writer thread takes it while the queue is full
+        self._queue.put(kwargs)
+
+    def flush(self):
+        """Persist every queued log, blocking until done"""
+        if self._thread is not None and self._thread.is_alive():
+            with self._progress:
+                target = self._queued
+            # Wake the writer so it does not wait for the window to close
+            self._queue.put(FLUSH_MARKER)
+            with self._progress:
+                self._progress.wait_for(lambda: self._persisted >= target)
+            return
+        # Writer thread is gone (e.g. interpreter shutdown), write inline
+        while not self._queue.empty():
+            entries = self._drain(block=False)
+            if entries:
+                self._write_entries(entries)
+
+    def _drain(self, block):
+        """Collect queued entries, waiting up to one flush window when blocking"""
+        entries = []
+        try:
+            if block:
+                deadline = None
+                while len(entries) < self.max_batch_size:
+                    if deadline is None:
+                        entry = self._queue.get()
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        entry = self._queue.get(timeout=remaining)
+                    if entry is FLUSH_MARKER:
+                        break
+                    entries.append(entry)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+            while len(entries) < self.max_batch_size:
+                entry = self._queue.get_nowait()
+                if entry is not FLUSH_MARKER:
+                    entries.append(entry)
+        except queue.Empty:
+            pass
+        return entries
+
+    def _run(self):
+        while True:
+            entries = self._drain(block=True)
+            if entries:
+                self._write_entries(entries)
+
+    def _write_entries(self, entries):
+        close_old_connections()
+        try:
+            rows = [
+                BatchStatus(**{k: kwargs[k] for k in BATCH_STATUS_FIELDS if k in kwargs})
+                for kwargs in entries
+            ]
+            rows = self._save_rows(rows)
+            # bulk_create skips the post_save signal, publish the timeline here
+            self._publish_rows(rows)
+        except Exception:
+            print(traceback.format_exc())
+        finally:
+            with self._progress:
+                self._persisted += len(entries)
+                self._progress.notify_all()
+
+    def _save_rows(self, rows):
+        """Bulk insert the rows, one by one if that fails. Returns the saved rows."""
+        try:
+            with transaction.atomic():
+                BatchStatus.objects.bulk_create(rows)
+            return rows
+        except Exception:
+            print(traceback.format_exc())
+
+        saved = []
+        for row in rows:
+            # Ids set by the rolled back bulk insert are not in the table
+            row.pk = None
+            row._state.adding = True
+            try:
+                row.save()
+                saved.append(row)
+            except Exception:
+                print(f"Batch log of {row.batch_id} not saved: {row.status} {row.message}")
+                print(traceback.format_exc())
+        return saved
+
+    def _publish_rows(self, rows):
+        group_items = {}
+        for row in rows:
+            group_items.setdefault(row.batch_id, []).append(
+                dict(BatchStatusSerializer(row).data)
+            )
+
+        for batch_id, items in group_items.items():
+            event = {"type": "batch_status", "data": items[-1]}
+            if len(items) > 1:
+                event["items"] = items
+            try:
+                self.group_send(f"batch_status_{batch_id}", event)
+            except Exception:
+                print(traceback.format_exc())
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_batch_log_writer():
+    """Return the process wide writer, creating it on first use"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = BatchLogWriter(
+                    flush_interval=settings.BATCH_LOG_FLUSH_INTERVAL,
+                    max_batch_size=settings.BATCH_LOG_MAX_BATCH_SIZE,
+                    max_queue_size=settings.BATCH_LOG_MAX_QUEUE_SIZE,
+                )
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def flush_batch_logs():
+    """Flush pending batch logs, called at the end of every pipeline stage"""
+    if _writer is not None:
+        _writer.flush()
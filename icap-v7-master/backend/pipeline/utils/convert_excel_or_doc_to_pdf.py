@@ -1,12 +1,16 @@
+import atexit
 import json
 import logging
 import os
+import queue
 import shutil
+import signal
 import subprocess
 import sys
 import tempfile
-import time
+import threading
 import zipfile
+from contextlib import contextmanager
 from pathlib import Path
 import xml.etree.ElementTree as ET
 
@@ -20,6 +24,36 @@ EXCEL_FORMATS = {".xlsx", ".xls", ".xlsm", ".xlsb", ".ods"}
 WORD_FORMATS = {".docx", ".doc", ".docm", ".odt", ".rtf", ".txt"}
 ALL_SUPPORTED_FORMATS = EXCEL_FORMATS | WORD_FORMATS | {".pdf"}
 
+# Long-lived headless LibreOffice instances, 0 starts a new instance per conversion
+LIBREOFFICE_POOL_SIZE = int(os.getenv("LIBREOFFICE_POOL_SIZE", "2"))
+# Instances are restarted after this many conversions to release leaked memory
+LIBREOFFICE_MAX_CONVERSIONS = int(os.getenv("LIBREOFFICE_MAX_CONVERSIONS", "50"))
+LIBREOFFICE_START_TIMEOUT = int(os.getenv("LIBREOFFICE_START_TIMEOUT", "60"))
+# Seconds to wait for a free instance before starting a one-off instance
+LIBREOFFICE_LEASE_TIMEOUT = int(os.getenv("LIBREOFFICE_LEASE_TIMEOUT", "300"))
+# Python with the LibreOffice UNO bindings (python3-uno) running office_bridge.py,
+# the system python3 of the image, not the python of the backend
+LIBREOFFICE_UNO_PYTHON = os.getenv("LIBREOFFICE_UNO_PYTHON", "/usr/bin/python3")
+OFFICE_BRIDGE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "office_bridge.py")
+
+
+def check_uno_python():
+    """Checks that LIBREOFFICE_UNO_PYTHON can import uno."""
+    try:
+        result = subprocess.run(
+            [LIBREOFFICE_UNO_PYTHON, "-c", "import uno"], capture_output=True, timeout=30
+        )
+        if result.returncode == 0:
+            return True
+    except (subprocess.SubprocessError, OSError):
+        pass
+    logger.warning(
+        f"LibreOffice pool disabled: {LIBREOFFICE_UNO_PYTHON} can not import uno "
+        "(python3-uno), every conversion starts a new LibreOffice instance. "
+        "Set LIBREOFFICE_UNO_PYTHON or LIBREOFFICE_POOL_SIZE=0 to silence."
+    )
+    return False
+
 
 def check_libreoffice():
     """Checks for the presence of LibreOffice."""
@@ -42,18 +76,335 @@ def check_libreoffice():
 LIBREOFFICE_AVAILABLE = check_libreoffice()
 
 
+def get_convert_to(extension, filter_name=None, filter_data=None):
+    """Build the '--convert-to' argument of the LibreOffice command line."""
+    if filter_name is None:
+        return extension
+    if filter_data is None:
+        return f"{extension}:{filter_name}"
+    return f"{extension}:{filter_name}:{json.dumps(filter_data)}"
+
+
+class CommandLineSession:
+    """
+    Conversions through the 'libreoffice --convert-to' command line, each
+    conversion starts LibreOffice. Used when the pool is not available, the
+    instance profile is reused by later sessions so only the first one of a
+    profile pays for creating it.
+    """
+
+    def __init__(self, instance_profile):
+        self.instance_profile = instance_profile
+
+    def convert(
+        self,
+        input_file,
+        output_dir,
+        extension,
+        filter_name=None,
+        filter_data=None,
+        timeout=180,
+    ):
+        """Convert input_file to '<output_dir>/<stem>.<extension>', returns (success, stderr)."""
+        cmd = [
+            "libreoffice",
+            f"-env:UserInstallation=file://{self.instance_profile}",
+            "--headless",
+            "--convert-to",
+            get_convert_to(extension, filter_name, filter_data),
+            "--outdir",
+            output_dir,
+            input_file,
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        return result.returncode == 0, result.stderr.strip()
+
+    def close(self):
+        try:
+            subprocess.run(
+                [
+                    "libreoffice",
+                    f"-env:UserInstallation=file://{self.instance_profile}",
+                    "--terminate",
+                ],
+                capture_output=True,
+                timeout=10,
+            )
+        except:
+            pass
+
+
+class OfficeInstance:
+    """
+    A long-lived headless LibreOffice listening on a UNO pipe, driven through
+    an office_bridge.py process running under LIBREOFFICE_UNO_PYTHON.
+
+    The profile directory is kept for the lifetime of the process, restarts
+    after recycling or a crash reuse the warm profile.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.pipe_name = f"libreoffice_pool_{os.getpid()}_{index}"
+        self.instance_profile = (
+            f"/tmp/libreoffice_pool_{os.getpid()}_{index}"
+        )
+        self.process = None
+        self.bridge = None
+        self.conversions = 0
+
+    def start(self):
+        """Start LibreOffice and its bridge, raises RuntimeError on failure."""
+        os.makedirs(self.instance_profile, exist_ok=True)
+        self.process = subprocess.Popen(
+            [
+                "libreoffice",
+                f"-env:UserInstallation=file://{self.instance_profile}",
+                "--headless",
+                "--invisible",
+                "--nologo",
+                "--nodefault",
+                "--norestore",
+                "--nolockcheck",
+                f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            # Own process group, the launcher forks the actual soffice.bin
+            start_new_session=True,
+        )
+        self.bridge = subprocess.Popen(
+            [
+                LIBREOFFICE_UNO_PYTHON,
+                OFFICE_BRIDGE_SCRIPT,
+                self.pipe_name,
+                str(LIBREOFFICE_START_TIMEOUT),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            start_new_session=True,
+        )
+
+        # The bridge answers once connected, or gives up after the start timeout
+        success, error = self._read_response()
+        if not success:
+            self.kill()
+            raise RuntimeError(
+                f"LibreOffice instance {self.index} did not start: {error}"
+            )
+        self.conversions = 0
+        logger.info(f"LibreOffice instance {self.index} started")
+
+    def _request(self, cmd, **kwargs):
+        """Send one request to the bridge and return its (success, error) answer."""
+        try:
+            self.bridge.stdin.write(json.dumps({"cmd": cmd, **kwargs}) + "\n")
+            self.bridge.stdin.flush()
+        except (OSError, ValueError, AttributeError) as e:
+            return False, f"LibreOffice bridge is gone: {e}"
+        return self._read_response()
+
+    def _read_response(self):
+        try:
+            line = self.bridge.stdout.readline()
+        except (OSError, ValueError, AttributeError):
+            line = ""
+        if not line:
+            return False, "LibreOffice bridge exited"
+        response = json.loads(line)
+        return response["ok"], response.get("error", "")
+
+    def is_healthy(self):
+        """The processes are running and LibreOffice answers UNO calls."""
+        if self.process is None or self.process.poll() is not None:
+            return False
+        if self.bridge is None or self.bridge.poll() is not None:
+            return False
+        success, _ = self._request("ping")
+        return success
+
+    def kill(self):
+        """Kill the instance and its bridge, used for hung conversions and recycling."""
+        for process in (self.process, self.bridge):
+            if process is None:
+                continue
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        self.process = None
+        self.bridge = None
+
+    def stop(self):
+        """Terminate the instance gracefully, killing it if it does not exit."""
+        if self.process is None:
+            return
+        try:
+            self._request("terminate")
+            self.process.wait(timeout=10)
+        except Exception:
+            pass
+        self.kill()
+
+    def convert(
+        self,
+        input_file,
+        output_dir,
+        extension,
+        filter_name=None,
+        filter_data=None,
+        timeout=180,
+    ):
+        """
+        Convert input_file to '<output_dir>/<stem>.<extension>' like the command
+        line does, returns (success, error). The instance is killed when the
+        conversion takes longer than timeout.
+        """
+        output_file = os.path.join(output_dir, f"{Path(input_file).stem}.{extension}")
+        # A hung conversion blocks the bridge, killing it releases the read
+        timed_out = threading.Event()
+
+        def on_timeout():
+            timed_out.set()
+            self.kill()
+
+        watchdog = threading.Timer(timeout, on_timeout)
+        watchdog.start()
+        try:
+            success, error = self._request(
+                "convert",
+                input_file=input_file,
+                output_file=output_file,
+                extension=extension,
+                filter_name=filter_name,
+                filter_data=filter_data,
+            )
+        finally:
+            watchdog.cancel()
+            self.conversions += 1
+        if timed_out.is_set():
+            return False, f"Conversion timed out after {timeout} seconds"
+        return success, error
+
+
+class OfficePool:
+    """
+    Pool of long-lived LibreOffice instances. Instances are started on first
+    use, health checked on every lease and recycled after
+    LIBREOFFICE_MAX_CONVERSIONS conversions.
+    """
+
+    def __init__(self, size):
+        self.pid = os.getpid()
+        self.instances = [OfficeInstance(index) for index in range(size)]
+        self._idle = queue.Queue()
+        for instance in self.instances:
+            self._idle.put(instance)
+
+    def acquire(self):
+        """Lease an instance, raises queue.Empty or RuntimeError when none is usable."""
+        instance = self._idle.get(timeout=LIBREOFFICE_LEASE_TIMEOUT)
+        try:
+            if not instance.is_healthy():
+                instance.kill()
+                instance.start()
+        except Exception:
+            self._idle.put(instance)
+            raise
+        return instance
+
+    def release(self, instance):
+        if instance.conversions >= LIBREOFFICE_MAX_CONVERSIONS:
+            logger.info(f"Recycling LibreOffice instance {instance.index}")
+            # Started again on the next lease
+            instance.stop()
+        self._idle.put(instance)
+
+    def shutdown(self):
+        # Forked processes inherit the pool but not the LibreOffice processes
+        if os.getpid() != self.pid:
+            return
+        for instance in self.instances:
+            instance.stop()
+
+
+_office_pool = None
+_office_pool_lock = threading.Lock()
+# None until checked by the first get_office_pool() call
+_uno_python_available = None
+
+# Warm command line profiles, one per concurrent session of the process
+_idle_profiles = queue.Queue()
+
+
+def get_office_pool():
+    """Return the process wide pool, None when conversions can not be pooled."""
+    global _office_pool, _uno_python_available
+    if LIBREOFFICE_POOL_SIZE <= 0 or not LIBREOFFICE_AVAILABLE:
+        return None
+    with _office_pool_lock:
+        if _uno_python_available is None:
+            _uno_python_available = check_uno_python()
+        if not _uno_python_available:
+            return None
+        if _office_pool is None or _office_pool.pid != os.getpid():
+            _office_pool = OfficePool(LIBREOFFICE_POOL_SIZE)
+            atexit.register(_office_pool.shutdown)
+        return _office_pool
+
+
 class DocumentConverter:
     """
     A class focused on high-fidelity document conversion using a robust,
     two-step process for difficult Excel files.
     """
 
-    def _create_instance_profile(self):
-        """Create a temporary LibreOffice instance profile directory."""
-        instance_profile = f"/tmp/libreoffice_instance_{int(time.time())}_{os.getpid()}"
-        os.makedirs(instance_profile, exist_ok=True)
+    def _acquire_instance_profile(self):
+        """
+        Lease a LibreOffice instance profile directory, an idle warm one of
+        this process or a new one. Profiles are removed when the process exits.
+        """
+        try:
+            return _idle_profiles.get_nowait()
+        except queue.Empty:
+            pass
+        instance_profile = tempfile.mkdtemp(prefix=f"libreoffice_instance_{os.getpid()}_")
+        atexit.register(shutil.rmtree, instance_profile, ignore_errors=True)
         return instance_profile
 
+    @contextmanager
+    def _office_session(self):
+        """
+        Yield a LibreOffice session, a pooled instance when available or a
+        command line session with a new instance profile otherwise.
+        """
+        pool = get_office_pool()
+        if pool is not None:
+            try:
+                instance = pool.acquire()
+            except Exception as e:
+                logger.warning(
+                    f"LibreOffice pool unavailable, starting a new instance: {e}"
+                )
+            else:
+                try:
+                    yield instance
+                finally:
+                    pool.release(instance)
+                return
+
+        session = CommandLineSession(self._acquire_instance_profile())
+        try:
+            yield session
+        finally:
+            session.close()
+            _idle_profiles.put(session.instance_profile)
+
     def convert_file(self, input_file: str, output_pdf: str) -> bool:
         """Routes the conversion to the appropriate high-fidelity method."""
         if not LIBREOFFICE_AVAILABLE:
@@ -208,122 +559,104 @@ class DocumentConverter:
     def _convert_excel_two_step(self, input_file: str, output_pdf: str) -> bool:
         """
         Uses a robust two-step process (XLSX -> ODS -> PDF) to ensure
-        layout commands are respected.
+        layout commands are respected. Both steps run in one LibreOffice session.
         """
         logger.info(f"Starting robust two-step conversion for {Path(input_file).name}")
         temp_dir = tempfile.mkdtemp()
         sanitized_source = input_file
-        instance_profile = self._create_instance_profile()
         try:
-            sanitized_source = self._sanitize_print_settings(input_file)
+            with self._office_session() as session:
+                sanitized_source = self._sanitize_print_settings(input_file)
 
-            logger.info("Step 1: Converting to intermediate ODS format...")
-            cmd_step1 = [
-                "libreoffice",
-                f"-env:UserInstallation=file://{instance_profile}",
-                "--headless",
-                "--convert-to",
-                "ods",
-                "--outdir",
-                temp_dir,
-                sanitized_source,
-            ]
-            result_step1 = subprocess.run(
-                cmd_step1, capture_output=True, text=True, timeout=180
-            )
-
-            if result_step1.returncode != 0:
-                logger.error(
-                    f"Step 1 (to ODS) failed. Stderr: {result_step1.stderr.strip()}"
-                )
-                logger.info("Attempting direct PDF export fallback for Excel file.")
-                return self._convert_generic_with_libreoffice(
-                    sanitized_source, output_pdf
+                logger.info("Step 1: Converting to intermediate ODS format...")
+                success_step1, error_step1 = session.convert(
+                    sanitized_source, temp_dir, "ods", timeout=180
                 )
 
-            intermediate_ods = os.path.join(
-                temp_dir, f"{Path(sanitized_source).stem}.ods"
-            )
-            if not os.path.exists(intermediate_ods):
-                # Fallback: pick any ODS LibreOffice dropped in the temp directory.
-                fallback = next(
-                    (p for p in Path(temp_dir).glob("*.ods")),
-                    None,
-                )
-                if fallback and fallback.exists():
-                    intermediate_ods = str(fallback)
-                    logger.warning(
-                        "Expected ODS not found, but found %s. Using it.",
-                        fallback.name,
-                    )
-                else:
-                    logger.error(
-                        "Step 1 seemed to succeed, but intermediate ODS file was not created."
+                if not success_step1:
+                    logger.error(f"Step 1 (to ODS) failed. Stderr: {error_step1}")
+                    logger.info("Attempting direct PDF export fallback for Excel file.")
+                    return self._convert_generic_with_libreoffice(
+                        sanitized_source, output_pdf, session
                     )
-                    logger.error(
-                        "LibreOffice stdout: %s", result_step1.stdout.strip()
+
+                intermediate_ods = os.path.join(
+                    temp_dir, f"{Path(sanitized_source).stem}.ods"
+                )
+                if not os.path.exists(intermediate_ods):
+                    # Fallback: pick any ODS LibreOffice dropped in the temp directory.
+                    fallback = next(
+                        (p for p in Path(temp_dir).glob("*.ods")),
+                        None,
                     )
+                    if fallback and fallback.exists():
+                        intermediate_ods = str(fallback)
+                        logger.warning(
+                            "Expected ODS not found, but found %s. Using it.",
+                            fallback.name,
+                        )
+                    else:
+                        logger.error(
+                            "Step 1 seemed to succeed, but intermediate ODS file was not created."
+                        )
+                        logger.error("LibreOffice stderr: %s", error_step1)
+                        logger.info(
+                            "Attempting direct PDF export fallback for Excel file."
+                        )
+                        return self._convert_generic_with_libreoffice(
+                            sanitized_source, output_pdf, session
+                        )
+
+                logger.info("Step 1 successful. Intermediate ODS file created.")
+
+                logger.info(
+                    'Step 1.5: Setting page size to Tabloid (100"x100" landscape)...'
+                )
+                if not self._set_ods_page_size(
+                    intermediate_ods,
+                    width="20in",
+                    height="20in",
+                    orientation="landscape",
+                ):
                     logger.error(
-                        "LibreOffice stderr: %s", result_step1.stderr.strip()
+                        "Failed to modify ODS page size to Tabloid. Conversion will be aborted."
                     )
-                    logger.info(
-                        "Attempting direct PDF export fallback for Excel file."
-                    )
-                    return self._convert_generic_with_libreoffice(
-                        sanitized_source, output_pdf
-                    )
-
-            logger.info("Step 1 successful. Intermediate ODS file created.")
+                    return False
 
-            logger.info('Step 1.5: Setting page size to Tabloid (100"x100" landscape)...')
-            if not self._set_ods_page_size(
-                intermediate_ods, width="20in", height="20in", orientation="landscape"
-            ):
-                logger.error(
-                    "Failed to modify ODS page size to Tabloid. Conversion will be aborted."
+                logger.info(
+                    "Step 2: Converting ODS to PDF with aggressive scaling to fit Tabloid page..."
+                )
+                filter_data = {
+                    "SinglePageSheets": True,
+                    "FitToPage": True,
+                    "FitWidth": 1,
+                    "FitHeight": 1,
+                }
+                success_step2, error_step2 = session.convert(
+                    intermediate_ods,
+                    temp_dir,
+                    "pdf",
+                    filter_name="calc_pdf_Export",
+                    filter_data=filter_data,
+                    timeout=180,
                 )
-                return False
 
-            logger.info(
-                "Step 2: Converting ODS to PDF with aggressive scaling to fit Tabloid page..."
-            )
-            filter_data = {
-                "SinglePageSheets": True,
-                "FitToPage": True,
-                "FitWidth": 1,
-                "FitHeight": 1,
-            }
-            final_filter = f"pdf:calc_pdf_Export:{json.dumps(filter_data)}"
-            cmd_step2 = [
-                "libreoffice",
-                f"-env:UserInstallation=file://{instance_profile}",
-                "--headless",
-                "--convert-to",
-                final_filter,
-                "--outdir",
-                temp_dir,
-                intermediate_ods,
-            ]
-            result_step2 = subprocess.run(
-                cmd_step2, capture_output=True, text=True, timeout=180
-            )
+                if not success_step2:
+                    logger.error(f"Step 2 (ODS to PDF) failed. Stderr: {error_step2}")
+                    return False
 
-            if result_step2.returncode != 0:
-                logger.error(
-                    f"Step 2 (ODS to PDF) failed. Stderr: {result_step2.stderr.strip()}"
+                final_pdf_temp = os.path.join(
+                    temp_dir, f"{Path(intermediate_ods).stem}.pdf"
                 )
-                return False
-
-            final_pdf_temp = os.path.join(
-                temp_dir, f"{Path(intermediate_ods).stem}.pdf"
-            )
-            if os.path.exists(final_pdf_temp):
-                shutil.move(final_pdf_temp, output_pdf)
-                logger.info("Two-step conversion successful.")
-                return True
-            else:
-                logger.error("Step 2 seemed to succeed, but final PDF was not created.")
-                return False
+                if os.path.exists(final_pdf_temp):
+                    shutil.move(final_pdf_temp, output_pdf)
+                    logger.info("Two-step conversion successful.")
+                    return True
+                else:
+                    logger.error(
+                        "Step 2 seemed to succeed, but final PDF was not created."
+                    )
+                    return False
 
         except Exception as e:
             logger.error(f"Two-step conversion process failed with an exception: {e}")
@@ -335,64 +668,36 @@ class DocumentConverter:
                     os.remove(sanitized_source)
                 except OSError:
                     pass
-            try:
-                subprocess.run(
-                    [
-                        "libreoffice",
-                        f"-env:UserInstallation=file://{instance_profile}",
-                        "--terminate",
-                    ],
-                    capture_output=True,
-                    timeout=10,
-                )
-                shutil.rmtree(instance_profile, ignore_errors=True)
-            except:
-                pass
 
     def _convert_generic_with_libreoffice(
-        self, input_file: str, output_file: str
+        self, input_file: str, output_file: str, session=None
     ) -> bool:
-        """Standard LibreOffice conversion for non-Excel documents."""
+        """
+        Standard LibreOffice conversion for non-Excel documents, runs in the
+        given session or in a new one.
+        """
+        if session is None:
+            with self._office_session() as session:
+                return self._convert_generic_with_libreoffice(
+                    input_file, output_file, session
+                )
+
         temp_output_dir = tempfile.mkdtemp()
-        instance_profile = self._create_instance_profile()
         try:
-            cmd = [
-                "libreoffice",
-                f"-env:UserInstallation=file://{instance_profile}",
-                "--headless",
-                "--convert-to",
-                "pdf",
-                "--outdir",
-                temp_output_dir,
-                input_file,
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-            if result.returncode == 0:
+            success, error = session.convert(
+                input_file, temp_output_dir, "pdf", timeout=120
+            )
+            if success:
                 expected_pdf = os.path.join(
                     temp_output_dir, f"{Path(input_file).stem}.pdf"
                 )
                 if os.path.exists(expected_pdf):
                     shutil.move(expected_pdf, output_file)
                     return True
-            logger.error(
-                f"Standard LibreOffice conversion failed. Stderr: {result.stderr.strip()}"
-            )
+            logger.error(f"Standard LibreOffice conversion failed. Stderr: {error}")
             return False
         finally:
             shutil.rmtree(temp_output_dir, ignore_errors=True)
-            try:
-                subprocess.run(
-                    [
-                        "libreoffice",
-                        f"-env:UserInstallation=file://{instance_profile}",
-                        "--terminate",
-                    ],
-                    capture_output=True,
-                    timeout=10,
-                )
-                shutil.rmtree(instance_profile, ignore_errors=True)
-            except:
-                pass
 
     def print_capabilities(self):
         print("=" * 60)
@@ -401,6 +706,9 @@ class DocumentConverter:
         print(
             f"  LibreOffice:    {'Available' if LIBREOFFICE_AVAILABLE else 'Not Available (CRITICAL)'}"
         )
+        print(
+            f"  Instance pool:  {LIBREOFFICE_POOL_SIZE if get_office_pool() else 'Disabled'}"
+        )
         print("\nSTRATEGY: This definitive version uses a robust two-step process for")
         print("complex Excel files (XLSX -> ODS -> PDF). This forces LibreOffice to")
         print("correctly apply page scaling and ensures the highest layout fidelity.")
@@ -0,0 +1,167 @@
+"""
+Organization: AIDocbuilder Inc.
+File: pipeline/utils/layout_xml_utils.py
+Version: 6.0
+
+Description:
+    Streaming conversion of Datacap/OCR page layout XML files into the ra_json
+    page structure. Pages are parsed with iterparse, hierarchical ids are
+    assigned while parsing and pages can be parsed in worker processes.
+
+Dependencies:
+    - os, multiprocessing, threading, concurrent.futures
+    - xml.etree.ElementTree
+
+Main Features:
+    - Single pass page build, identical to RAJson.process_PAGE + assign_id.
+    - Parsed elements are released as soon as they are converted.
+    - Shared process pool for parsing pages in parallel.
+
+Notes:
+    - Keep this module free of Django imports, it runs in worker processes.
+"""
+import multiprocessing
+import os
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+def parse_layout_page(xml_file_path, nodes, export_attrs=None):
+    """
+    Convert a page layout XML file into a page dictionary with ids assigned.
+
+    Args:
+        xml_file_path (str): Path of the '<page_id>_layout.xml' file.
+        nodes (dict): Mapping of XML tags to ra_json element types (RAJson.NODES).
+        export_attrs (dict): Page variables from the export file, applied on top
+            of the PAGE attributes.
+
+    Returns:
+        dict: Page attributes with 'type', 'styles', 'children' and the export
+              attributes, children carrying '<parent_id>.<index>' ids.
+
+    Process Details:
+        - Only direct PAGE children and nested elements whose tag is in 'nodes'
+          are kept, anything else is skipped with its whole subtree.
+        - Children of words are never converted.
+        - 'children' is only set on elements that have converted children.
+    """
+    export_attrs = export_attrs or {}
+    page = None
+    # One entry per open element: (id, children, is_container, attrs), None when skipped
+    stack = []
+
+    for event, element in ET.iterparse(xml_file_path, events=("start", "end")):
+        if event == "start":
+            if page is None:
+                page = dict(element.attrib)
+                page["type"] = "page"
+                page["styles"] = []
+                page["children"] = []
+                # Ids are based on the final page id, export variables included
+                page_id = export_attrs.get("id", page.get("id"))
+                stack.append((page_id, page["children"], True, page))
+                continue
+
+            parent = stack[-1]
+            if parent is None or not parent[2]:
+                stack.append(None)
+                continue
+
+            parent_id, siblings = parent[0], parent[1]
+            if len(stack) == 1 and element.tag == "Style":
+                page["styles"].append(dict(element.attrib))
+                stack.append(None)
+                continue
+
+            if element.tag not in nodes:
+                stack.append(None)
+                continue
+
+            attrs = dict(element.attrib)
+            attrs["type"] = nodes[element.tag]
+            attrs["id"] = f"{parent_id}.{str(len(siblings) + 1).zfill(3)}"
+            siblings.append(attrs)
+            stack.append((attrs["id"], [], attrs["type"] != "word", attrs))
+
+        else:
+            entry = stack.pop()
+            # Children are attached once the element is closed, only if any
+            if entry is not None and stack and entry[1]:
+                entry[3]["children"] = entry[1]
+            # Release the converted element, the XML tree is not needed anymore
+            element.clear()
+
+    page.update(export_attrs)
+    return page
+
+
+_layout_pool = None
+_layout_pool_lock = threading.Lock()
+
+
+def get_layout_pool(workers):
+    """Return the shared process pool used to parse layout pages"""
+    global _layout_pool
+    with _layout_pool_lock:
+        if _layout_pool is None:
+            # forkserver, forking the threaded consumer could copy locks held
+            # by other threads. Workers are kept, the consumer module they
+            # import on start is only loaded once per worker.
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+            _layout_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _layout_pool
+
+
+def reset_layout_pool():
+    """Drop a broken pool so the next build starts a new one"""
+    global _layout_pool
+    with _layout_pool_lock:
+        if _layout_pool is not None:
+            _layout_pool.shutdown(wait=False)
+        _layout_pool = None
+
+
+def get_layout_workers(workers):
+    """Resolve the configured worker count, 0 means up to 4 processes"""
+    if workers <= 0:
+        workers = min(os.cpu_count() or 1, 4)
+    return workers
+
+
+def build_layout_pages(page_jobs, nodes, workers=1, parallel_min_pages=4):
+    """
+    Convert several layout pages, keeping the order of page_jobs.
+
+    Args:
+        page_jobs (list): (xml_file_path, export_attrs) tuples.
+        nodes (dict): Mapping of XML tags to ra_json element types.
+        workers (int): Worker processes, 0 = automatic, 1 = parse in process.
+        parallel_min_pages (int): Smaller documents are parsed in process.
+
+    Returns:
+        list: Page dictionaries in the order of page_jobs.
+    """
+    workers = get_layout_workers(workers)
+    if workers <= 1 or len(page_jobs) < parallel_min_pages:
+        return [parse_layout_page(path, nodes, export_attrs) for path, export_attrs in page_jobs]
+
+    paths = [path for path, _ in page_jobs]
+    export_attrs_list = [export_attrs for _, export_attrs in page_jobs]
+    try:
+        return list(
+            get_layout_pool(workers).map(
+                parse_layout_page,
+                paths,
+                [nodes] * len(page_jobs),
+                export_attrs_list,
+                chunksize=max(len(page_jobs) // (workers * 4), 1),
+            )
+        )
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM), fall back to parsing in process
+        reset_layout_pool()
+        return [parse_layout_page(path, nodes, export_attrs) for path, export_attrs in page_jobs]
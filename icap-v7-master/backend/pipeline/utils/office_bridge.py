@@ -0,0 +1,155 @@
+"""
+UNO bridge to a long-lived LibreOffice instance.
+
+Runs under the python LibreOffice ships its UNO bindings for (python3-uno,
+the system python3), not the python of the backend. The backend starts one
+bridge per pooled instance and sends it one JSON request per line on stdin,
+every request is answered with one JSON line on stdout.
+
+    python3 office_bridge.py <pipe name> <start timeout>
+
+Requests:
+    {"cmd": "convert", "input_file": ..., "output_file": ..., "extension": ...,
+     "filter_name": ..., "filter_data": ...}
+    {"cmd": "ping"}
+    {"cmd": "terminate"}
+
+Responses:
+    {"ok": true} or {"ok": false, "error": "..."}, a first response is sent
+    once connected to LibreOffice.
+"""
+import json
+import os
+import sys
+import time
+
+import uno
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+
+# Store filters of the intermediate formats, PDF filters depend on the document type
+STORE_FILTERS = {"ods": "calc8"}
+PDF_EXPORT_FILTERS = (
+    ("com.sun.star.sheet.SpreadsheetDocument", "calc_pdf_Export"),
+    ("com.sun.star.text.TextDocument", "writer_pdf_Export"),
+    ("com.sun.star.presentation.PresentationDocument", "impress_pdf_Export"),
+    ("com.sun.star.drawing.DrawingDocument", "draw_pdf_Export"),
+)
+
+
+def uno_property(name, value):
+    return PropertyValue(name, 0, value, 0)
+
+
+def connect(pipe_name, start_timeout):
+    """Return the Desktop of the instance listening on pipe_name"""
+    local_context = uno.getComponentContext()
+    resolver = local_context.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local_context
+    )
+    deadline = time.monotonic() + start_timeout
+    while True:
+        try:
+            context = resolver.resolve(
+                f"uno:pipe,name={pipe_name};urp;StarOffice.ComponentContext"
+            )
+            break
+        except NoConnectException:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"LibreOffice did not start on pipe {pipe_name}")
+            time.sleep(0.25)
+
+    return context.ServiceManager.createInstanceWithContext(
+        "com.sun.star.frame.Desktop", context
+    )
+
+
+def get_pdf_filter(document):
+    for service, filter_name in PDF_EXPORT_FILTERS:
+        if document.supportsService(service):
+            return filter_name
+    return "writer_pdf_Export"
+
+
+def convert(desktop, input_file, output_file, extension, filter_name=None, filter_data=None):
+    """Convert input_file to output_file, returns (success, error)."""
+    document = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(os.path.abspath(input_file)),
+        "_blank",
+        0,
+        (uno_property("Hidden", True),),
+    )
+    if document is None:
+        return False, f"LibreOffice could not load {os.path.basename(input_file)}"
+
+    try:
+        if filter_name is None:
+            if extension == "pdf":
+                filter_name = get_pdf_filter(document)
+            else:
+                filter_name = STORE_FILTERS[extension]
+        store_properties = [uno_property("FilterName", filter_name)]
+        if filter_data is not None:
+            store_properties.append(
+                uno_property(
+                    "FilterData",
+                    uno.Any(
+                        "[]com.sun.star.beans.PropertyValue",
+                        tuple(
+                            uno_property(name, value)
+                            for name, value in filter_data.items()
+                        ),
+                    ),
+                )
+            )
+        document.storeToURL(
+            uno.systemPathToFileUrl(os.path.abspath(output_file)),
+            tuple(store_properties),
+        )
+        return True, ""
+    finally:
+        try:
+            document.close(True)
+        except Exception:
+            pass
+
+
+def respond(ok, error=""):
+    sys.stdout.write(json.dumps({"ok": ok, "error": error}) + "\n")
+    sys.stdout.flush()
+
+
+def main(pipe_name, start_timeout):
+    try:
+        desktop = connect(pipe_name, start_timeout)
+    except Exception as e:
+        respond(False, str(e))
+        return 1
+    respond(True)
+
+    for line in sys.stdin:
+        try:
+            request = json.loads(line)
+            cmd = request.pop("cmd")
+            if cmd == "convert":
+                respond(*convert(desktop, **request))
+            elif cmd == "ping":
+                desktop.getFrames().getCount()
+                respond(True)
+            elif cmd == "terminate":
+                try:
+                    desktop.terminate()
+                except Exception:
+                    # The instance closes the connection while terminating
+                    pass
+                respond(True)
+                return 0
+            else:
+                respond(False, f"Unknown command {cmd}")
+        except Exception as e:
+            respond(False, str(e))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1], float(sys.argv[2])))
@@ -18,6 +18,7 @@ from utils.utils import (
     get_additional_doc_type,
 )
 from pipeline.scripts.OutputChannels import OutputChannels
+from pipeline.scripts.DeliveryEngine import deliver_concurrently
 from pipeline.utils.process_batch_utils import write_parent_batch_log
 from utils.logger_config import get_logger
 
@@ -1858,18 +1859,24 @@ def file_wise_doc_upload(
         - Iterate over 'files_list' and skip files that don't require upload.
         - Validate file status and avoid duplicate upload based on 'uploaded_doc_names'.
         - Extract document upload information using 'get_doc_upload_info'.
-        - Upload files using 'upload_document_to_edm' or 'upload_document_to_usa'.
+        - Upload files concurrently through the output channel.
+        - Handle the upload results in file order.
 
     Notes:
         - Log processing times and handle retries for failed upload.
         - Update 'api_response' and write log for error encountered during the process.
+        - Files uploaded while a retried upload was in flight are still recorded as uploaded.
     """
     email_id = email_instance.id
     edm_upload_error = False
     is_retrying = False
     break_outer_loop = False
     project = matched_profile_instance.project
+    mock_api = get_developer_settings("Mock API")
+    output_channel = OutputChannels(output_config)
 
+    # Prepared in order, uploaded concurrently, then handled in order again
+    uploads = []
     for idx, file_item in enumerate(files_list):
         file_name = file_item["name"]
         doc_type = file_item["matched_profile_doc__doc_type"]
@@ -1883,6 +1890,7 @@ def file_wise_doc_upload(
         except:
             pass
 
+        upload = {"idx": idx, "file_name": file_name, "error": None}
         try:
             info, case_id, file_path, doc_code = get_doc_upload_info(
                 file_item,
@@ -1893,28 +1901,16 @@ def file_wise_doc_upload(
                 matched_profile_instance,
             )
 
-            save_analyzer_log_time(
-                batch_id=email_id, field_name="each_document_upload_s"
-            )
-
-            if get_developer_settings("Mock API"):
-                status_code = 200
+            if mock_api:
                 info["mock_API"] = True
 
             elif "hg_bol" in project.lower():
                 ticket_data = api_response[index]
                 ticket_id = ticket_data.get("id")
-                data = {
+                upload["data"] = {
                     "service_id": email_instance.confirmation_numbers[0],
                     "ticket_id": ticket_id,
                 }
-                with open(file_path, "rb") as f:
-                    files = [("files", f)]
-                    response = OutputChannels(output_config).dynamic_api_call(data, files=files)
-                    print_api_response(response)
-                    status_code = response.status_code
-                    if status_code == 202:
-                        status_code = 200
 
             else:
                 doc_info = {
@@ -1922,43 +1918,65 @@ def file_wise_doc_upload(
                     "CW1doctype": doc_code,
                     "OriginCountry": filing_country,
                 }
-                form_data = {"documentinfo": json.dumps(doc_info)}
+                upload["form_data"] = {"documentinfo": json.dumps(doc_info)}
 
-                with open(file_path, "rb") as f:
-                    files = [("files", f)]
+            upload.update(info=info, case_id=case_id, file_path=file_path)
+        except Exception as error:
+            upload["error"] = (error, traceback.format_exc())
+        uploads.append(upload)
 
-                    response = OutputChannels(output_config).send_document(form_data, files, case_id)
-                    print_api_response(response)
-                    status_code = response.status_code
+    def send(upload):
+        if mock_api:
+            return 200
 
-            save_analyzer_log_time(
-                batch_id=email_id, field_name="each_document_upload_e"
-            )
+        with open(upload["file_path"], "rb") as f:
+            files = [("files", f)]
+            if "data" in upload:
+                response = output_channel.dynamic_api_call(upload["data"], files=files)
+            else:
+                response = output_channel.send_document(
+                    upload["form_data"], files, upload["case_id"]
+                )
+            print_api_response(response)
 
-            is_retrying, break_loop = handle_doc_upload_retry(
-                write_parent_batch_log, email_instance, status_code, info
-            )
+        status_code = response.status_code
+        if "data" in upload and status_code == 202:
+            status_code = 200
+        return status_code
 
-            if break_loop:
-                break_outer_loop = True
-                break
+    save_analyzer_log_time(batch_id=email_id, field_name="each_document_upload_s")
+    results = deliver_concurrently(
+        send, [upload for upload in uploads if upload["error"] is None]
+    )
+    save_analyzer_log_time(batch_id=email_id, field_name="each_document_upload_e")
 
-            edm_upload_error = post_doc_upload_process(
-                write_parent_batch_log,
-                email_instance,
-                status_code,
-                file_name,
-                info,
-                index,
-                additional_doc_item=None,
-                api_response=api_response,
-                idx=idx,
-            )
+    results = iter(results)
+    for upload in uploads:
+        file_name = upload["file_name"]
+        if upload["error"] is None:
+            status_code, error, trace = next(results)
+        else:
+            status_code, (error, trace) = None, upload["error"]
 
-            save_analyzer_log_time(batch_id=email_id, field_name="document_upload_e")
-        except Exception as error:
+        if break_outer_loop:
+            # Uploaded while the retried document was in flight, recorded so
+            # the retry does not send them again
+            if status_code == 200:
+                post_doc_upload_process(
+                    write_parent_batch_log,
+                    email_instance,
+                    status_code,
+                    file_name,
+                    upload["info"],
+                    index,
+                    additional_doc_item=None,
+                    api_response=api_response,
+                    idx=upload["idx"],
+                )
+            continue
+
+        if error is not None:
             edm_upload_error = True
-            trace = traceback.format_exc()
             message = (
                 f"Error occured while uploading document '{file_name}' to CW1 edoc."
             )
@@ -1966,7 +1984,6 @@ def file_wise_doc_upload(
                 "message": f"The following error occured in 'test_batch_p10' function : '{str(error.args[0])}' ",
                 "traceback": trace,
             }
-            error = traceback.format_exc()
 
             write_parent_batch_log(
                 message=message,
@@ -1975,6 +1992,30 @@ def file_wise_doc_upload(
                 action="display_error",
                 remarks=json.dumps(remarks, indent=4),
             )
+            continue
+
+        info = upload["info"]
+        is_retrying, break_loop = handle_doc_upload_retry(
+            write_parent_batch_log, email_instance, status_code, info
+        )
+
+        if break_loop:
+            break_outer_loop = True
+            continue
+
+        edm_upload_error = post_doc_upload_process(
+            write_parent_batch_log,
+            email_instance,
+            status_code,
+            file_name,
+            info,
+            index,
+            additional_doc_item=None,
+            api_response=api_response,
+            idx=upload["idx"],
+        )
+
+        save_analyzer_log_time(batch_id=email_id, field_name="document_upload_e")
 
     return edm_upload_error, is_retrying, break_outer_loop
 
@@ -21,11 +21,17 @@ from utils.utils import to_camel_case
 from core.models import Batch, BatchStatus, EmailBatch, TrainBatch, Definition
 from dashboard.models import Profile, Project
 from core.serializers import DefinitionSerializer
+from pipeline.utils.batch_log_writer import (
+    flush_batch_logs,
+    get_batch_log_writer,
+    is_write_behind_enabled,
+)
 
 channel_layer = get_channel_layer()
 
 BATCH_INPUT_PATH = settings.BATCH_INPUT_PATH_DOCKER
 BATCH_ID_PREFIX = os.getenv("BATCH_ID_PREFIX", "")
+BATCH_LOG_WRITE_BEHIND = settings.BATCH_LOG_WRITE_BEHIND
 
 
 def send_to_group(group, event_type, data):
@@ -86,8 +92,13 @@ def get_new_batch_id(infix="B"):
 
 def write_batch_status(**kwargs):
     """
-    Save status using BatchStatus model
+    Save status using BatchStatus model, queued on the pipeline consumer
+    threads. Callers update the batch status themselves, synchronously.
     """
+    if BATCH_LOG_WRITE_BEHIND and is_write_behind_enabled():
+        get_batch_log_writer().write(**kwargs)
+        return
+
     BatchStatus.objects.create(**kwargs)
 
 
@@ -165,6 +176,9 @@ def write_failed_log(**kwargs):
         return
     except Exception:
         print(traceback.format_exc())
+    finally:
+        # Failures end the current stage, make the final status visible now
+        flush_batch_logs()
 
 
 def prepare_parent_batch_path(parent_batch_id, sub_path="email-batches"):
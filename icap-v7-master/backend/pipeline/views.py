@@ -60,7 +60,7 @@ Dependencies:
       update_copy_batches_xml, save_manual_classification_data from utils.classification_utils
 
     - DataCap from pipeline.scripts.DataCap
-    - DataJson from pipeline.scripts.DataJson
+    - DataJson, reduce_ra_json_for_document, reduce_definitions_for_table from pipeline.scripts.DataJson
     - DJsonToExcel from pipeline.scripts.DJsonToExcel
     - parse_email, parse_email_metadata, detect_garbled_text from pipeline.scripts.EmailParser
     - OrganizeFiles from pipeline.scripts.OrganizeFiles
@@ -249,7 +249,11 @@ from utils.assembly_utils import (
     duplicate_shipment_id_checker,
 )
 from pipeline.scripts.DataCap import DataCap
-from pipeline.scripts.DataJson import DataJson
+from pipeline.scripts.DataJson import (
+    DataJson,
+    reduce_definitions_for_table,
+    reduce_ra_json_for_document,
+)
 from pipeline.scripts.DeFlattener import central_output_handler
 from pipeline.scripts.DJsonToExcel import DJsonToExcel
 from pipeline.scripts.EmailParser import (
@@ -262,6 +266,9 @@ from pipeline.scripts.OrganizeFiles import OrganizeFiles
 from pipeline.scripts.RAJson import RAJson
 
 from rabbitmq_producer import publish
+from utils.payload_codec import decode_payload, encode_payload
+from utils.zip_stream import zip_response
+from utils.job_tracing import get_job_trace, get_stage_summary
 from dashboard.views import get_profiles_data_by_ids
 from core.tasks import schedule_delayed_publish_to_rabbitmq
 
@@ -391,32 +398,6 @@ def send_batch_status_update(sender, instance, **kwargs):
     send_to_group(f"batch_status_{data['batch_id']}", "batch_status", data)
 
 
-def reduce_ra_json_for_document(ra_json, document_id):
-    """
-    Remove childerns for not required documents
-    """
-    ra_json = deepcopy(ra_json)
-    for doc in ra_json["nodes"]:
-        if doc["id"] != document_id:
-            doc["children"] = []
-
-    return ra_json
-
-
-def reduce_definitions_for_table(definitions, table_unique_id):
-    """Remove not required tables from definitions."""
-    definitions = deepcopy(definitions)
-    for definition in definitions:
-        definition_table = []
-        for table in definition["table"]:
-            if table["table_unique_id"] == table_unique_id:
-                definition_table.append(table)
-
-        definition["table"] = definition_table
-
-    return definitions
-
-
 def reduce_final_definitions_for_docbuilder(definitions, batch_type):
     """Update type of definitions"""
 
@@ -636,7 +617,7 @@ def test_batch_p1(request_data):
         "batch_id": batch_id,
         "document_id": document_id,
     }
-    redis_instance.set(job_id, json.dumps(job_details))
+    redis_instance.set(job_id, encode_payload(job_details))
 
     write_batch_log(
         batch_id=batch_id,
@@ -682,7 +663,7 @@ def test_batch_p1(request_data):
                 "profile_customers": list(profile_customers),
                 "dictionaries": dictionaries,
             }
-            redis_instance.set(job_id, json.dumps(job_details))
+            redis_instance.set(job_id, encode_payload(job_details))
         except:
             print("Error sending profile_keys", traceback.print_exc())
             pass
@@ -791,7 +772,7 @@ def test_batch_p1(request_data):
                 "batch_type": batch_type,
                 "project": project,
             }
-            redis_instance.set(job_id, json.dumps(job_details))
+            redis_instance.set(job_id, encode_payload(job_details))
             request_body = {
                 "job_id": job_id,
             }
@@ -841,7 +822,7 @@ def test_batch_p1(request_data):
         # Store original_data_json in Redis job_details before sending to extraction service
         if document_id:
             job_details["original_data_json"] = original_data_json or {}
-            redis_instance.set(job_id, json.dumps(job_details))
+            redis_instance.set(job_id, encode_payload(job_details))
 
             # Remove documents with empty children arrays
             if ra_json and "nodes" in ra_json:
@@ -901,7 +882,7 @@ def test_batch_p2_extraction_response(response_json):
         )
 
         job_id = response_json["job_id"]
-        job_info = json.loads(redis_instance.get(job_id))
+        job_info = decode_payload(redis_instance.get(job_id))
         definition_version = job_info.get(
             "definition_version", settings.DEFAULT_DEFINITION_VERSION
         )
@@ -976,7 +957,7 @@ def start_label_mapping_process(request_data):
             "batch_id": batch_id,
             "document_id": document_id,
         }
-        redis_instance.set(job_id, json.dumps(job_details))
+        redis_instance.set(job_id, encode_payload(job_details))
 
         batch_instance = Batch.objects.get(id=batch_id)
 
@@ -1064,7 +1045,7 @@ def label_mapping_response(response_json):
         )
 
         job_id = response_json["job_id"]
-        job_info = json.loads(redis_instance.get(job_id))
+        job_info = decode_payload(redis_instance.get(job_id))
         definition_version = job_info.get(
             "definition_version", settings.DEFAULT_DEFINITION_VERSION
         )
@@ -1109,7 +1090,7 @@ def test_batch_p2_batch_type(response_json):
     try:
         job_id = response_json.get("job_id", None)
         auto_extraction_data_json = response_json.get("auto_extraction_data_json", None)
-        job_info = json.loads(redis_instance.get(job_id))
+        job_info = decode_payload(redis_instance.get(job_id))
         batch_id = job_info["batch_id"]
         template = job_info.get("template", None)
         table_unique_id = job_info.get("table_unique_id", None)
@@ -1204,7 +1185,7 @@ def test_batch_p2_batch_type(response_json):
         # Preserve original_data_json if it was stored earlier
         if existing_original_data_json is not None:
             job_details["original_data_json"] = existing_original_data_json
-        redis_instance.set(job_id, json.dumps(job_details))
+        redis_instance.set(job_id, encode_payload(job_details))
         if trigger_manual_extraction(definitions):
             if batch_type in [".pdf", ".docx"]:
                 ###
@@ -1234,7 +1215,7 @@ def test_batch_p2_batch_type(response_json):
                 batch_instance.save()
             # Pass auto extraction data json
             job_details = {**job_details, "data_json": auto_extraction_data_json}
-            redis_instance.set(job_id, json.dumps(job_details))
+            redis_instance.set(job_id, encode_payload(job_details))
             write_batch_log(
                 batch_id=batch_id,
                 status="inprogress",
@@ -1266,7 +1247,7 @@ def test_batch_p2(response_json):
         job_id = response_json["job_id"]
 
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
 
         batch_id = job_info["batch_id"]
 
@@ -1328,7 +1309,7 @@ def test_batch_p3(response_json):
         job_id = response_json["job_id"]
 
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
         auto_extraction_data_json = job_info.get("auto_extraction_data_json", {})
         manual_extraction_data_json = job_info.get("data_json", {})
         original_data_json = job_info.get("original_data_json", {})
@@ -1406,7 +1387,7 @@ def test_batch_p3_merge_data_json(response_json):
 
         job_id = response_json["job_id"]
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
         batch_id = job_info["batch_id"]
         auto_extraction_data_json = job_info.get("auto_extraction_data_json", {})
         manual_extraction_data_json = job_info.get("data_json", {})
@@ -1464,7 +1445,7 @@ def test_batch_p3_merge_data_json(response_json):
             "definitions": definitions,
             "translation_codes": translation_codes,
         }
-        redis_instance.set(job_id, json.dumps(job_details))
+        redis_instance.set(job_id, encode_payload(job_details))
         request_body = {"job_id": job_id}
         write_batch_log(
             batch_id=batch_id,
@@ -1496,7 +1477,7 @@ def test_batch_p3b(response_json):
         job_id = response_json["job_id"]
 
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
 
         batch_id = job_info["batch_id"]
 
@@ -1558,7 +1539,7 @@ def test_batch_p3c(response_json):
         job_id = response_json["job_id"]
 
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
 
         batch_id = job_info["batch_id"]
 
@@ -1616,7 +1597,7 @@ def test_batch_p4(response_json):
         job_id = response_json["job_id"]
 
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
 
         batch_id = job_info["batch_id"]
         skip_post_processor = job_info["skip_post_processor"]
@@ -1685,7 +1666,7 @@ def test_batch_p5(response_json):
         print(f"{response_json=}")
         job_id = response_json["job_id"]
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
 
         batch_id = job_info["batch_id"]
 
@@ -1914,11 +1895,11 @@ def test_batch_p6b(request_data):
 
                 # retrive the job_id from redis
                 job_info = redis_instance.get(job_id)
-                job_info = json.loads(job_info)
+                job_info = decode_payload(job_info)
 
                 # Update the redis payload with latest data_json
                 job_info["data_json"] = batch_instance.data_json
-                redis_instance.set(job_id, json.dumps(job_info))
+                redis_instance.set(job_id, encode_payload(job_info))
 
                 request_body = {"job_id": job_id}
 
@@ -1958,7 +1939,7 @@ def test_batch_p6c(current_batch_id):
         batch_instance = Batch.objects.get(id=current_batch_id)
         try:
             job_info = redis_instance.get(batch_instance.job_id)
-            job_info = json.loads(job_info)
+            job_info = decode_payload(job_info)
         except:
             print(f"Error parsing job_info for job_id: {batch_instance.job_id}")
             return
@@ -2010,11 +1991,11 @@ def test_batch_p6c(current_batch_id):
 
                 try:
                     job_info = redis_instance.get(job_id)
-                    job_info = json.loads(job_info)
+                    job_info = decode_payload(job_info)
 
                     # Update the redis payload with latest data_json
                     job_info["data_json"] = batch_instance.data_json
-                    redis_instance.set(job_id, json.dumps(job_info))
+                    redis_instance.set(job_id, encode_payload(job_info))
                 except:
                     batch_path = os.path.join(BATCH_INPUT_PATH, batch_instance.sub_path)
 
@@ -2035,7 +2016,7 @@ def test_batch_p6c(current_batch_id):
                         "dictionaries": dictionaries,
                     }
 
-                    redis_instance.set(job_id, json.dumps(job_details))
+                    redis_instance.set(job_id, encode_payload(job_details))
 
                 request_body = {"job_id": job_id}
 
@@ -2076,7 +2057,7 @@ def test_batch_p7(response_json):
         # Get job info from redis
         try:
             job_info = redis_instance.get(job_id)
-            job_info = json.loads(job_info)
+            job_info = decode_payload(job_info)
         except:
             print(f"Error parsing job_info for job_id: {job_id}")
             return
@@ -3337,7 +3318,7 @@ def atm_process_p1(request_data):
             "template": template,
         }
 
-        redis_instance.set(job_id, json.dumps(job_details))
+        redis_instance.set(job_id, encode_payload(job_details))
 
         if batch_type in [".pdf", ".docx"]:
             ###
@@ -3369,7 +3350,7 @@ def atm_process_p2(response_json):
         job_id = response_json["job_id"]
 
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
 
         batch_id = job_info["batch_id"]
         batch_path = job_info["batch_path"]
@@ -4304,7 +4285,7 @@ def pre_classification_process_p1(request_data):
         }
 
         # Save job_details to Redis
-        redis_instance.set(job_id, json.dumps(job_details))
+        redis_instance.set(job_id, encode_payload(job_details))
 
         matched_profile = Profile.objects.get(name=profile_name)
         _, profile_documents = get_profile_doc_info(matched_profile)
@@ -4584,7 +4565,7 @@ def process_classify_batch_p1(request_data):
             "selected_doc_types": selected_doc_types,
         }
 
-        redis_instance.set(job_id, json.dumps(job_info))
+        redis_instance.set(job_id, encode_payload(job_info))
 
         document_matching_p1(
             write_parent_batch_log,
@@ -4666,7 +4647,7 @@ def process_classify_batch_p2(request_data):
         job_id = request_data["job_id"]
 
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
 
         batch_id = job_info["batch_id"]
         batch_path = job_info["batch_path"]
@@ -5760,6 +5741,7 @@ def process_train_batch_p1(request_data):
                     attachments_folder,
                     unsupported_file_type,
                     garbled_all_error,
+                    attachment_hashes,
                 ) = parse_email(
                     email_file_path,
                     email_file_name,
@@ -5797,6 +5779,7 @@ def process_train_batch_p1(request_data):
                         "type": "attachment",
                         "matched_doc": None,
                         "page_file": None,
+                        "content_hash": attachment_hashes.get(path),
                     }
                     attachments_files_data.append(result)
 
@@ -5830,7 +5813,7 @@ def process_train_batch_p1(request_data):
             "unsupported_file_type": unsupported_file_type,
         }
 
-        redis_instance.set(job_id, json.dumps(job_details))
+        redis_instance.set(job_id, encode_payload(job_details))
 
         # Send dense page detection request via RabbitMQ
         if is_dense_page_check_enabled(profile.project):
@@ -5898,7 +5881,7 @@ def process_train_batch_p2(request_data):
     try:
         job_id = request_data["job_id"]
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
 
         upload_type = job_info["upload_type"]
         files_data = job_info["files_data"]
@@ -6883,16 +6866,20 @@ def process_email_batch_p1(request_data):
                     show_embedded_img = True
                     break
 
-            pdf_path, attachments_folder, unsupported_file_type, garbled_all_error = (
-                parse_email(
-                    email_file_path,
-                    email_file_name,
-                    output_path,
-                    show_embedded_img,
-                    email_body_exists,
-                    jap_eng_convert,
-                    zoom_value,
-                )
+            (
+                pdf_path,
+                attachments_folder,
+                unsupported_file_type,
+                garbled_all_error,
+                attachment_hashes,
+            ) = parse_email(
+                email_file_path,
+                email_file_name,
+                output_path,
+                show_embedded_img,
+                email_body_exists,
+                jap_eng_convert,
+                zoom_value,
             )
             if garbled_all_error:
                 for error in garbled_all_error:
@@ -6929,6 +6916,7 @@ def process_email_batch_p1(request_data):
                     "type": "attachment",
                     "matched_doc": None,
                     "page_file": None,
+                    "content_hash": attachment_hashes.get(path),
                 }
                 files_data.append(result)
 
@@ -6952,7 +6940,7 @@ def process_email_batch_p1(request_data):
             "unsupported_file_type": unsupported_file_type,
         }
 
-        redis_instance.set(job_id, json.dumps(job_details))
+        redis_instance.set(job_id, encode_payload(job_details))
 
         # Send dense page detection request via RabbitMQ
         if is_dense_page_check_enabled(matched_profile.project):
@@ -7029,7 +7017,7 @@ def process_email_batch_p2(request_data):
     try:
         job_id = request_data["job_id"]
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
 
         upload_type = job_info["upload_type"]
         files_data = job_info["files_data"]
@@ -7506,12 +7494,7 @@ def download_transaction(request):
                     except Exception:
                         break
 
-        # Open BytesIO to grab in-memory ZIP contents
-        s = io.BytesIO()
-
-        # The zip compressor
-        zf = zipfile.ZipFile(s, "w")
-
+        entries = []
         for file in files:
             fname = "db_data.json"
 
@@ -7524,20 +7507,13 @@ def download_transaction(request):
                 zip_path = os.path.join(zip_subdir, fname)
 
             if file["file_data"]:
-                zf.writestr(zip_path, file["file_data"])
+                entries.append((zip_path, None, file["file_data"]))
 
             if file["file_path"]:
-                zf.write(file["file_path"], zip_path)
-
-        # Must close zip for all contents to be written
-        zf.close()
-
-        # Grab ZIP file from in-memory
-        resp = HttpResponse(s.getvalue())
-        resp["Content-Type"] = "application/x-zip-compressed"
-        resp["Content-Disposition"] = f"attachment; filename={zip_filename}"
+                entries.append((zip_path, file["file_path"], None))
 
-        return resp
+        # Archive is written while it is sent
+        return zip_response(entries, zip_filename)
 
     except Exception as error:
         print(traceback.format_exc())
@@ -7828,12 +7804,7 @@ def download_training_batch(request):
                     except Exception:
                         break
 
-        # Open BytesIO to grab in-memory ZIP contents
-        s = io.BytesIO()
-
-        # The zip compressor
-        zf = zipfile.ZipFile(s, "w")
-
+        entries = []
         for file in files:
             fname = "db_data.json"
 
@@ -7846,22 +7817,13 @@ def download_training_batch(request):
                 zip_path = os.path.join(zip_subdir, fname)
 
             if file["file_data"]:
-                zf.writestr(zip_path, file["file_data"])
+                entries.append((zip_path, None, file["file_data"]))
 
             if file["file_path"]:
-                zf.write(file["file_path"], zip_path)
-
-        # Must close zip for all contents to be written
-        zf.close()
-
-        print("------------zip_filename after zip made----------", zip_filename)
+                entries.append((zip_path, file["file_path"], None))
 
-        # Grab ZIP file from in-memory
-        resp = HttpResponse(s.getvalue())
-        resp["Content-Type"] = "application/x-zip-compressed"
-        resp["Content-Disposition"] = f"attachment; filename={zip_filename}"
-
-        return resp
+        # Archive is written while it is sent
+        return zip_response(entries, zip_filename)
 
     except Exception as error:
         print(traceback.format_exc())
@@ -9166,29 +9128,17 @@ def download_batch_zip(request):
         zip_subdir = batch_id
         zip_filename = f"{zip_subdir}.zip"
 
-        # Open BytesIO to grab in-memory ZIP contents
-        s = io.BytesIO()
-
-        # The zip compressor
-        zf = zipfile.ZipFile(s, "w")
-
+        entries = []
         for fpath in filenames:
             # Calculate path for file in zip
             fdir, fname = os.path.split(fpath)
             zip_path = os.path.join(zip_subdir, fname)
 
             # Add file, at correct path
-            zf.write(fpath, zip_path)
-
-        # Must close zip for all contents to be written
-        zf.close()
-
-        # Grab ZIP file from in-memory
-        resp = HttpResponse(s.getvalue())
-        resp["Content-Type"] = "application/x-zip-compressed"
-        resp["Content-Disposition"] = f"attachment; filename={zip_filename}"
+            entries.append((zip_path, fpath, None))
 
-        return resp
+        # Archive is written while it is sent
+        return zip_response(entries, zip_filename)
 
     except Exception as error:
         return Response(
@@ -9770,10 +9720,10 @@ def verify_manual_classification(request):
                 job_id = train_batch.job_id
 
                 job_info = redis_instance.get(job_id)
-                job_info = json.loads(job_info)
+                job_info = decode_payload(job_info)
                 job_info["matched_doc"] = matched_docs
 
-                redis_instance.set(job_id, json.dumps(job_info))
+                redis_instance.set(job_id, encode_payload(job_info))
 
                 request_data = {"job_id": job_id}
                 publish(
@@ -10074,7 +10024,7 @@ def process_dataset_batches(response_json):
     print("Trigger process_dataset_batches")
     job_id = response_json["job_id"]
     job_info = redis_instance.get(job_id)
-    job_info = json.loads(job_info)
+    job_info = decode_payload(job_info)
 
     train_batch_id = job_info["train_batch_id"]
     linked_batches = job_info["linked_batches"]
@@ -10233,7 +10183,7 @@ def create_training_dataset_batch(request):
             "linked_batches": linked_batches,
         }
 
-        redis_instance.set(job_id, json.dumps(job_details))
+        redis_instance.set(job_id, encode_payload(job_details))
 
         request_body = {"job_id": job_id}
 
@@ -11238,3 +11188,30 @@ def get_spreadjs_license(request):
     This endpoint is used by the frontend to initialize the SpreadJS library.
     """
     return Response({"license_key": settings.GRAPECITY_SPREADJS_LICENSE})
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def job_trace_summary(request):
+    """
+    Returns p50/p95 processing time, queue wait and payload size per service,
+    span kind and message type from the recorded job traces.
+    """
+    try:
+        return Response(get_stage_summary())
+    except Exception as error:
+        return Response(
+            {"detail": str(error)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def job_trace(request, job_id):
+    """Returns every span recorded for a job in order"""
+    try:
+        return Response(get_job_trace(job_id))
+    except Exception as error:
+        return Response(
+            {"detail": str(error)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
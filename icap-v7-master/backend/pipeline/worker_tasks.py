@@ -48,6 +48,7 @@ from utils.utils import (
     generate_copy_batches_xml,
 )
 from rabbitmq_producer import publish
+from utils.payload_codec import decode_payload, encode_payload
 from core.models import (
     Batch,
     EmailBatch,
@@ -109,7 +110,7 @@ def process_pdfs_and_docs_p1(
         if "parsed_doc_instance" in item and item["parsed_doc_instance"]:
             item["parsed_doc_instance"] = item["parsed_doc_instance"].to_dict()
 
-    redis_instance.set(job_id, json.dumps(job_details))
+    redis_instance.set(job_id, encode_payload(job_details))
 
     if not pdf_files:
         response_data = {
@@ -160,7 +161,7 @@ def process_pdfs_and_docs_p2(response_data):
         # Called from API callback
         job_id = response_data["job_id"]
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
 
         parent_batch_id = job_info["parent_batch_id"]
         matched_profile_name = job_info["matched_profile_name"]
@@ -339,7 +340,7 @@ def process_electronic_pdfs_p1(
         if "parsed_doc_instance" in item and item["parsed_doc_instance"]:
             item["parsed_doc_instance"] = item["parsed_doc_instance"].to_dict()
 
-    redis_instance.set(job_id, json.dumps(job_details))
+    redis_instance.set(job_id, encode_payload(job_details))
 
     # Publish message to preprocess queue
     payload = {
@@ -399,7 +400,7 @@ def process_electronic_pdfs_p2(response_data):
             return
 
         job_info = redis_instance.get(job_id)
-        job_info = json.loads(job_info)
+        job_info = decode_payload(job_info)
 
         batch_id = job_info["batch_id"]
         ra_json = job_info["ra_json"]
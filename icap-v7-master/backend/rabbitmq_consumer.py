@@ -15,7 +15,7 @@ Description:
     using worker threads, handling timeouts and publishing responses.
  
 Dependencies:
-    - os, time, json, pika, django
+    - os, time, pika, django
     - AMQPConnectionError, ConnectionClosedByBroker from pika.exceptions
     - partial from functools
     - Thread from threading
@@ -31,7 +31,6 @@ Main Features:
     - Handle timeouts for long-running tasks.
     - Publish error or success response back to specified Rabbitmq queue.
 """
-import json
 import os
 import time
 from functools import partial
@@ -88,6 +87,9 @@ from pipeline.worker_tasks import (
 )
 
 from utils.classification_utils import document_matching_p2, handle_ocr_mismatch
+from utils.payload_codec import decode_payload
+from pipeline.utils.batch_log_writer import enable_write_behind, flush_batch_logs
+from utils.job_tracing import traced_consumer
 
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST")
 RABBITMQ_PORT = os.getenv("RABBITMQ_PORT")
@@ -105,11 +107,26 @@ def ack_message(ch, delivery_tag):
         print("Channel is already closed, so we can't ACK this message")
 
 
+@traced_consumer
 def do_work(ch, method, properties, body):
     """"Process the job based on message type"""
     message_type = properties.content_type
-    data = json.loads(body)
+    data = decode_payload(body)
+    # Every message has its own thread, its batch logs are flushed below
+    enable_write_behind()
+    try:
+        process_message(message_type, data)
+    finally:
+        # Stage boundary, persist buffered batch logs even if the stage failed
+        flush_batch_logs()
 
+    delivery_tag = method.delivery_tag
+    cb = partial(ack_message, ch, delivery_tag)
+    ch.connection.add_callback_threadsafe(cb)
+
+
+def process_message(message_type, data):
+    """Dispatch the message to the pipeline step of its type"""
     if message_type == "batch_queued":
         test_batch_p1(data)
     elif message_type == "start_process_response":
@@ -183,10 +200,6 @@ def do_work(ch, method, properties, body):
     elif message_type == "electronic_pdf_response":
         process_electronic_pdfs_p2(data)
 
-    delivery_tag = method.delivery_tag
-    cb = partial(ack_message, ch, delivery_tag)
-    ch.connection.add_callback_threadsafe(cb)
-
 
 def callback(ch, method, properties, body):
     """Handle incoming messages"""
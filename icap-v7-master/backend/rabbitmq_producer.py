@@ -14,17 +14,22 @@ Description:
     This script facilitate publishing messages to Rabbitmq queues.
  
 Dependencies:
-    - os, json, pika
+    - os, pika
+    - encode_payload from utils.payload_codec
+    - get_publish_headers, trace_publish from utils.job_tracing
  
 Main Features:
     - Establish a connection to Rabbitmq.
     - Publish messages to specified queues with JSON.
 """
-import json
 import os
+import time
 
 import pika
 
+from utils.job_tracing import get_publish_headers, trace_publish
+from utils.payload_codec import encode_payload
+
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST")
 RABBITMQ_PORT = os.getenv("RABBITMQ_PORT")
 RABBITMQ_USERNAME = os.getenv("RABBITMQ_USERNAME")
@@ -45,6 +50,10 @@ def _get_connection_params():
 
 def publish(method, queue_name, body):
     """Publishe a JSON serialized message to a specified Rabbitmq queue"""
+    start = time.perf_counter()
+    # Plain JSON, consumers of the other services read the body with json.loads
+    payload = encode_payload(body, "json")
+
     params = _get_connection_params()
     connection = pika.BlockingConnection(params)
     channel = connection.channel()
@@ -52,10 +61,13 @@ def publish(method, queue_name, body):
     channel.basic_publish(
         exchange="",
         routing_key=queue_name,
-        body=json.dumps(body),
+        body=payload,
         properties=pika.BasicProperties(
-            method, delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE
+            method,
+            delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE,
+            headers=get_publish_headers(),
         ),
     )
 
     connection.close()
+    trace_publish(method, queue_name, body, len(payload), time.perf_counter() - start)
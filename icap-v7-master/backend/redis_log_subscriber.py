@@ -4,12 +4,13 @@ Subscribes to Redis channel for both AI agent and extraction service messages.
 Handles:
 1. Database persistence (AiAgentConversation & BatchStatus tables)
 2. Real-time WebSocket notifications to frontend via Django Channels
+3. Lag and queue depth metrics
 
 Architecture:
 - AI Agent & Extraction services publish messages to Redis channel
 - This unified service subscribes and processes all messages
-- Direct DB writes to PostgreSQL via Django ORM
-- WebSocket broadcasts via Django Channels
+- Messages are buffered for a few ms and written with bulk inserts
+- WebSocket broadcasts via Django Channels, merged per group
 - Single container replaces two separate bridge services
 """
 import asyncio
@@ -18,9 +19,11 @@ import json
 import logging
 import redis.asyncio as redis
 import os
+import time
 import django
 from channels.db import database_sync_to_async
 from channels.layers import get_channel_layer
+from django.db import transaction
 
 # Configure Django settings before imports
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
@@ -47,6 +50,13 @@ REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
 LOG_UPDATE_CHANNEL = os.getenv("LOG_UPDATE_CHANNEL") or "websocket_log_updates"
 
+# Micro-batching of DB writes and WebSocket notifications
+LOG_BATCH_WINDOW_MS = int(os.getenv("LOG_BATCH_WINDOW_MS", "50"))
+LOG_BATCH_MAX_ITEMS = int(os.getenv("LOG_BATCH_MAX_ITEMS", "100"))
+METRICS_INTERVAL = int(os.getenv("LOG_SUBSCRIBER_METRICS_INTERVAL", "30"))
+LAG_WARNING_MS = int(os.getenv("LOG_SUBSCRIBER_LAG_WARNING_MS", "2000"))
+LOG_SUBSCRIBER_METRICS_KEY = "redis_log_subscriber:metrics"
+
 
 class UnifiedRedisLogSubscriber:
     """
@@ -59,6 +69,14 @@ class UnifiedRedisLogSubscriber:
         self.redis_client = None
         self.pubsub = None
         self.message_count = {"agent": 0, "extraction": 0}
+        self.queue = asyncio.Queue()
+        self.metrics = {
+            "queue_depth": 0,
+            "last_lag_ms": 0,
+            "max_lag_ms": 0,
+            "batches": 0,
+            "messages": 0,
+        }
         
     async def connect_redis(self):
         """Establish Redis connection and subscribe to channel"""
@@ -88,162 +106,218 @@ class UnifiedRedisLogSubscriber:
         except Exception as e:
             logger.error(f"Error during disconnect: {e}")
     
-    async def process_ai_agent_message(self, message_data: dict):
+    def prepare_ai_agent_message(self, message_data: dict):
         """
-        Process AI agent message:
+        Prepare AI agent message:
         1. Transform data (agent name to title case)
-        2. Save to AiAgentConversation table
-        3. Broadcast to ai_agent_response_{batch_id} WebSocket group
+        2. Build AiAgentConversation row
+        3. Target ai_agent_response_{batch_id} WebSocket group
         """
-        try:
-            transaction_id = message_data.get("transaction_id")
-            batch_id = message_data.get("batch_id")
-            message_type = message_data.get("message_type")
-            agent_name = message_data.get("agent_name", "")
-            
-            # Transform agent name to title case
-            if agent_name:
-                message_data["agent_name"] = convert_to_title(agent_name)
-            
-            # Save to database
-            ai_agent_log_data = await self.write_ai_agent_log(
-                transaction_id=transaction_id,
-                batch_id=batch_id,
-                message_type=message_type,
-                message=message_data,
-            )
-            
-            # Broadcast to WebSocket group
-            await self.send_to_group(
-                group_name=f"ai_agent_response_{batch_id}",
-                message_type="ai_agent_response",
-                data=ai_agent_log_data
-            )
-            
-            self.message_count["agent"] += 1
-            logger.info(
-                f"[AI Agent] batch={batch_id}, agent={agent_name}, type={message_type}"
-            )
-            
-        except Exception as e:
-            logger.error(f"Error processing AI agent message: {e}", exc_info=True)
-    
-    async def process_extraction_message(self, message_data: dict):
+        batch_id = message_data.get("batch_id")
+        agent_name = message_data.get("agent_name", "")
+
+        # Transform agent name to title case
+        if agent_name:
+            message_data["agent_name"] = convert_to_title(agent_name)
+
+        instance = AiAgentConversation(
+            transaction_id=message_data.get("transaction_id"),
+            batch_id=batch_id,
+            type=message_data.get("message_type"),
+            message=message_data,
+        )
+        return instance, f"ai_agent_response_{batch_id}", "ai_agent_response"
+
+    def prepare_extraction_message(self, message_data: dict):
         """
-        Process extraction service message:
+        Prepare extraction service message:
         1. Build remarks from sub_messages and reasoning
-        2. Save to BatchStatus table
-        3. Broadcast to batch_status_{batch_id} WebSocket group
+        2. Build BatchStatus row
+        3. Target batch_status_{batch_id} WebSocket group
         """
-        try:
-            batch_id = message_data.get("batch_id")
-            title = message_data.get("title", "")
-            sub_messages_list = message_data.get("sub_messages_list", [])
-            reasoning = message_data.get("reasoning")
-            is_agent = message_data.get("is_agent", False)
-            
-            # Determine action and build remarks
-            action = "display_subprocess_messages"
-            remarks = {
-                'sub_messages': sub_messages_list,
-                'is_agent': is_agent
-            }
-            
-            if reasoning:
-                action = "display_json"
-                remarks['reasoning'] = reasoning
-            
-            # Save to database
-            batch_log_data = await self.write_batch_log(
-                batch_id=batch_id,
-                status="inprogress",
-                message=title,
-                remarks=json.dumps(remarks),
-                action=action,
-            )
-            
-            # Broadcast to WebSocket group
-            await self.send_to_group(
-                group_name=f"batch_status_{batch_id}",
-                message_type="batch_status",
-                data=batch_log_data
-            )
-            
-            self.message_count["extraction"] += 1
-            logger.info(
-                f"[Extraction] batch={batch_id}, title={title}, action={action}"
-            )
-            
-        except Exception as e:
-            logger.error(f"Error processing extraction message: {e}", exc_info=True)
-    
-    async def process_message(self, message_data: dict):
+        batch_id = message_data.get("batch_id")
+        reasoning = message_data.get("reasoning")
+
+        # Determine action and build remarks
+        action = "display_subprocess_messages"
+        remarks = {
+            'sub_messages': message_data.get("sub_messages_list", []),
+            'is_agent': message_data.get("is_agent", False)
+        }
+
+        if reasoning:
+            action = "display_json"
+            remarks['reasoning'] = reasoning
+
+        instance = BatchStatus(
+            batch_id=batch_id,
+            status="inprogress",
+            message=message_data.get("title", ""),
+            remarks=json.dumps(remarks),
+            action=action,
+        )
+        return instance, f"batch_status_{batch_id}", "batch_status"
+
+    async def process_messages(self, entries):
         """
-        Route message to appropriate handler based on is_agent flag.
-        
-        Messages with is_agent=True -> AI agent handler
-        Messages with is_agent=False or missing -> Extraction handler
+        Persist a micro-batch of messages and broadcast them.
+
+        Messages with is_agent=True -> AiAgentConversation
+        Messages with is_agent=False or missing -> BatchStatus
+        Rows are bulk inserted per table and WebSocket notifications are merged
+        into one channel layer message per group, keeping arrival order.
         """
-        try:
-            is_agent = message_data.get("is_agent", False)
-            
-            if is_agent:
-                await self.process_ai_agent_message(message_data)
-            else:
-                await self.process_extraction_message(message_data)
-                
-        except Exception as e:
-            logger.error(f"Error routing message: {e}", exc_info=True)
-    
+        prepared = []
+        for received_at, message_data in entries:
+            try:
+                if message_data.get("is_agent", False):
+                    prepared.append(self.prepare_ai_agent_message(message_data))
+                    self.message_count["agent"] += 1
+                else:
+                    prepared.append(self.prepare_extraction_message(message_data))
+                    self.message_count["extraction"] += 1
+            except Exception as e:
+                logger.error(f"Error routing message: {e}", exc_info=True)
+
+        if not prepared:
+            return
+
+        serialized = await self.write_logs(prepared)
+
+        group_items = {}
+        for (_, group_name, message_type), data in zip(prepared, serialized):
+            if data is None:
+                continue
+            group_items.setdefault((group_name, message_type), []).append(data)
+
+        for (group_name, message_type), items in group_items.items():
+            await self.send_to_group(group_name, message_type, items[-1], items=items)
+
+        now = time.monotonic()
+        self.metrics["last_lag_ms"] = round((now - entries[0][0]) * 1000, 2)
+        self.metrics["max_lag_ms"] = max(self.metrics["max_lag_ms"], self.metrics["last_lag_ms"])
+        self.metrics["batches"] += 1
+        self.metrics["messages"] += len(prepared)
+        logger.info(
+            f"Flushed {len(prepared)} messages to {len(group_items)} groups "
+            f"(lag={self.metrics['last_lag_ms']}ms, queue={self.queue.qsize()})"
+        )
+
     @database_sync_to_async
-    def write_ai_agent_log(self, transaction_id, batch_id, message_type, message):
+    def write_logs(self, prepared):
         """
-        Save AI agent message to AiAgentConversation table.
+        Bulk save prepared AiAgentConversation and BatchStatus rows.
         Uses Django ORM for direct PostgreSQL writes.
+
+        If the bulk insert fails, rows are saved one at a time and only the
+        rows that fail are dropped (None in the returned list).
         """
         try:
-            ai_agent_message_instance = AiAgentConversation.objects.create(
-                transaction_id=transaction_id,
-                batch_id=batch_id,
-                type=message_type,
-                message=message,
-            )
-            
-            serialized_message = AiAgentConversationSerializer(ai_agent_message_instance)
-            return serialized_message.data
-            
+            ai_agent_rows = [i for i, _, _ in prepared if isinstance(i, AiAgentConversation)]
+            batch_status_rows = [i for i, _, _ in prepared if isinstance(i, BatchStatus)]
+
+            with transaction.atomic():
+                if ai_agent_rows:
+                    AiAgentConversation.objects.bulk_create(ai_agent_rows)
+                if batch_status_rows:
+                    BatchStatus.objects.bulk_create(batch_status_rows)
+            saved = [instance for instance, _, _ in prepared]
+
         except Exception as e:
-            logger.error(f"Database write error (AI agent): {e}", exc_info=True)
-            raise
-    
-    @database_sync_to_async
-    def write_batch_log(self, **kwargs):
+            logger.error(
+                f"Bulk write of {len(prepared)} messages failed, saving them one by one: {e}"
+            )
+            saved = []
+            for instance, group_name, _ in prepared:
+                # Ids set by a rolled back bulk insert are not in the table
+                instance.pk = None
+                instance._state.adding = True
+                try:
+                    instance.save()
+                    saved.append(instance)
+                except Exception as e:
+                    logger.error(
+                        f"Database write error for {group_name}: {e} "
+                        f"({type(instance).__name__}: {instance.message!r:.200})",
+                        exc_info=True,
+                    )
+                    saved.append(None)
+
+        serialized = []
+        for instance in saved:
+            if instance is None:
+                serialized.append(None)
+            elif isinstance(instance, AiAgentConversation):
+                serialized.append(AiAgentConversationSerializer(instance).data)
+            else:
+                serialized.append(dict(BatchStatusSerializer(instance).data))
+        return serialized
+
+    async def batch_worker(self):
         """
-        Save extraction status to BatchStatus table.
-        Uses Django ORM for direct PostgreSQL writes.
+        Drain the message queue in micro-batches of up to LOG_BATCH_MAX_ITEMS
+        messages or LOG_BATCH_WINDOW_MS milliseconds, whichever comes first.
         """
-        try:
-            batch_status_instance = BatchStatus.objects.create(**kwargs)
-            batch_log_data = dict(BatchStatusSerializer(batch_status_instance).data)
-            return batch_log_data
-        except Exception as e:
-            logger.error(f"Database write error (extraction): {e}", exc_info=True)
-            raise
-    
-    async def send_to_group(self, group_name: str, message_type: str, data: dict):
+        window = LOG_BATCH_WINDOW_MS / 1000
+        while True:
+            entries = [await self.queue.get()]
+            deadline = time.monotonic() + window
+            while len(entries) < LOG_BATCH_MAX_ITEMS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entries.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self.process_messages(entries)
+            except Exception as e:
+                logger.error(f"Error processing batch: {e}", exc_info=True)
+            finally:
+                for _ in entries:
+                    self.queue.task_done()
+
+    async def report_metrics(self):
+        """
+        Periodically publish lag and queue depth so a lagging subscriber is visible.
+        Metrics are logged and stored in the LOG_SUBSCRIBER_METRICS_KEY redis hash.
+        """
+        while True:
+            await asyncio.sleep(METRICS_INTERVAL)
+            self.metrics["queue_depth"] = self.queue.qsize()
+            self.metrics["agent_messages"] = self.message_count["agent"]
+            self.metrics["extraction_messages"] = self.message_count["extraction"]
+
+            if self.metrics["max_lag_ms"] > LAG_WARNING_MS:
+                logger.warning(f"Subscriber falling behind: {self.metrics}")
+            else:
+                logger.info(f"Subscriber metrics: {self.metrics}")
+
+            try:
+                if self.redis_client:
+                    await self.redis_client.hset(LOG_SUBSCRIBER_METRICS_KEY, mapping=self.metrics)
+            except Exception as e:
+                logger.error(f"Failed to store metrics: {e}")
+
+            self.metrics["max_lag_ms"] = 0
+
+    async def send_to_group(self, group_name: str, message_type: str, data: dict, items=None):
         """
         Broadcast message to WebSocket group via Django Channels.
         Frontend clients subscribed to this group will receive real-time updates.
+        When items is given the consumer forwards every item in order.
         """
         try:
             channel_layer = get_channel_layer()
-            await channel_layer.group_send(
-                group_name,
-                {
-                    "type": message_type,
-                    "data": data
-                }
-            )
+            event = {
+                "type": message_type,
+                "data": data
+            }
+            if items is not None and len(items) > 1:
+                event["items"] = items
+            await channel_layer.group_send(group_name, event)
             logger.debug(f"Sent to WebSocket group: {group_name}")
         except Exception as e:
             logger.error(f"WebSocket broadcast error for {group_name}: {e}", exc_info=True)
@@ -258,9 +332,9 @@ class UnifiedRedisLogSubscriber:
             async for message in self.pubsub.listen():
                 if message["type"] == "message":
                     try:
-                        # Parse JSON message
+                        # Parse JSON message and hand it over to the batch worker
                         message_data = json.loads(message["data"])
-                        await self.process_message(message_data)
+                        await self.queue.put((time.monotonic(), message_data))
                     except json.JSONDecodeError as e:
                         logger.error(f"Invalid JSON received: {message['data'][:100]}..., error: {e}")
                     except Exception as e:
@@ -277,7 +351,12 @@ class UnifiedRedisLogSubscriber:
         """
         max_retry_delay = 60
         retry_delay = 5
-        
+
+        background_tasks = [
+            asyncio.create_task(self.batch_worker()),
+            asyncio.create_task(self.report_metrics()),
+        ]
+
         while True:
             try:
                 success = await self.connect_redis()
@@ -301,6 +380,14 @@ class UnifiedRedisLogSubscriber:
             finally:
                 await self.disconnect()
 
+        # Persist whatever is still buffered before shutting down
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=10)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            logger.warning(f"Shutting down with {self.queue.qsize()} unsaved messages")
+        for task in background_tasks:
+            task.cancel()
+
 
 # Main execution
 if __name__ == "__main__":
@@ -15,6 +15,7 @@ Description:
 
 Dependencies:
     - os, json, base64, uuid, traceback, requests
+    - deliver, token_cache from pipeline.scripts.DeliveryEngine
 
 Main Features:
     -
@@ -28,6 +29,7 @@ import traceback
 import requests
 from functools import wraps
 from utils.utils import get_developer_settings
+from pipeline.scripts.DeliveryEngine import deliver, token_cache
 
 ICAP_API_URL = os.getenv("ICAP_API_URL")
 
@@ -944,7 +946,7 @@ def upload_document_to_edm(
     files = [("files", opened_file)]
 
     print("Calling adddocumenttoedm API...")
-    response = requests.post(URL, headers=headers, data=form_data, files=files)
+    response = deliver("POST", URL, headers=headers, data=form_data, files=files)
 
     opened_file.close()
 
@@ -995,15 +997,17 @@ def upload_document_to_usa(file_path, document_type, case_id):
     }
 
     print("Calling adddocumenttousa API...")
-    response = requests.post(URL, headers=headers, json=doc_info)
+    response = deliver("POST", URL, headers=headers, json=doc_info)
     print_api_response(response)
 
     return response.status_code
 
 
-def get_fcm_token():
+def fetch_fcm_token():
+    """Fetch a new FCM token, returns (token, expires_in)"""
     API_URL = f"{CUSTOMS_API_BASE_URL}/auth/v1/token"
-    token_response = requests.post(
+    token_response = deliver(
+        "POST",
         API_URL,
         data={"grant_type": "client_credentials"},
         auth=(FCM_CLIENT_ID, FCM_CLIENT_SECRET),
@@ -1013,8 +1017,14 @@ def get_fcm_token():
     if token_response.status_code != 200:
         raise Exception("Failed to get token:", token_response.text)
 
-    access_token = token_response.json().get("access_token")
-    return access_token
+    response_json = token_response.json()
+    access_token = response_json.get("access_token")
+    return access_token, response_json.get("expires_in", 0)
+
+
+def get_fcm_token():
+    """FCM token, shared by uploads until it expires"""
+    return token_cache.get(("fcm", CUSTOMS_API_BASE_URL, FCM_CLIENT_ID), fetch_fcm_token)
 
 
 def upload_fcm_document_to_edm(file_path, document_type, fcmID):
@@ -1041,9 +1051,7 @@ def upload_fcm_document_to_edm(file_path, document_type, fcmID):
     headers = {"Authorization": f"Bearer {token}"}
 
     print("Calling adddocumentto FCM API...")
-    response = requests.post(API_URL, headers=headers, json=doc_info)
-
-    opened_file.close()
+    response = deliver("POST", API_URL, headers=headers, json=doc_info)
 
     print_api_response(response)
 
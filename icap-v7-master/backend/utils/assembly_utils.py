@@ -17,6 +17,7 @@ Dependencies:
     - Callable from typing
     - deepcopy from copy
     - ConcurrentAPIExecutor from pipeline.scripts.ConcurrentAPIExecutor
+    - deliver_concurrently from pipeline.scripts.DeliveryEngine
     - Batch, EmailParsedDocument from core.models
     - save_analyzer_log_time, get_merged_definition_settings, get_additional_doc_type from utils.utils
     - send_customs_json, upload_document_to_edm, send_dsc_wms_json, send_shipment_create_json,
@@ -25,7 +26,7 @@ Dependencies:
 
 Main Features:
     - Handle API call for multi-shipment or other projects.
-    - Handle file by file document upload.
+    - Handle file by file document upload, files are uploaded concurrently.
     - Hanlde additional document upload.
     - Clean and prepare the API request data.
     - Save API response to database.
@@ -42,6 +43,7 @@ from copy import deepcopy
 from itertools import zip_longest
 
 from pipeline.scripts.ConcurrentAPIExecutor import ConcurrentAPIExecutor
+from pipeline.scripts.DeliveryEngine import deliver_concurrently
 
 from utils.utils import (
     save_analyzer_log_time,
@@ -1815,17 +1817,21 @@ def file_wise_doc_upload(
         - Iterate over 'files_list' and skip files that don't require upload.
         - Validate file status and avoid duplicate upload based on 'uploaded_doc_names'.
         - Extract document upload information using 'get_doc_upload_info'.
-        - Upload files using 'upload_document_to_edm' or 'upload_document_to_usa'.
+        - Upload files concurrently using 'upload_document_to_edm' or 'upload_document_to_usa'.
+        - Handle the upload results in file order.
 
     Notes:
         - Log processing times and handle retries for failed upload.
         - Update 'api_response' and write log for error encountered during the process.
+        - Files uploaded while a retried upload was in flight are still recorded as uploaded.
     """
     email_id = email_instance.id
     edm_upload_error = False
     is_retrying = False
     break_outer_loop = False
 
+    # Prepared in order, uploaded concurrently, then handled in order again
+    uploads = []
     for idx, file_item in enumerate(files_list):
         file_name = file_item["name"]
         doc_type = file_item["matched_profile_doc__doc_type"]
@@ -1839,6 +1845,7 @@ def file_wise_doc_upload(
         except:
             pass
 
+        upload = {"idx": idx, "file_name": file_name, "error": None}
         try:
             info, case_id, file_path, doc_number = get_doc_upload_info(
                 file_item,
@@ -1848,56 +1855,74 @@ def file_wise_doc_upload(
                 email_instance,
                 matched_profile_instance,
             )
-
-            save_analyzer_log_time(
-                batch_id=email_id, field_name="each_document_upload_s"
+            fcm_upload = request_type != "usacustoms" and bool(
+                api_response[index].get("response_json", {}).get("fcmID")
             )
-            if request_type == "usacustoms":
-                status_code = upload_document_to_usa(file_path, doc_number, case_id)
-            else:
-                if api_response[index].get("response_json", {}).get("fcmID"):
-                    status_code = upload_fcm_document_to_edm(
-                        file_path, doc_number, customs_clearance_number
-                    )
-
-                    info["fcmID"] = customs_clearance_number
-                    if "shipmentID" in info:
-                        del info["shipmentID"]
-                else:
-                    status_code = upload_document_to_edm(
-                        file_path,
-                        doc_number,
-                        customs_clearance_number,
-                        filing_country,
-                    )
-            save_analyzer_log_time(
-                batch_id=email_id, field_name="each_document_upload_e"
+            if fcm_upload:
+                info["fcmID"] = customs_clearance_number
+                if "shipmentID" in info:
+                    del info["shipmentID"]
+
+            upload.update(
+                info=info,
+                case_id=case_id,
+                file_path=file_path,
+                doc_number=doc_number,
+                fcm_upload=fcm_upload,
             )
+        except Exception as error:
+            upload["error"] = (error, traceback.format_exc())
+        uploads.append(upload)
 
-            is_retrying, break_loop = handle_doc_upload_retry(
-                write_parent_batch_log, email_instance, status_code, info
+    def send(upload):
+        if request_type == "usacustoms":
+            return upload_document_to_usa(
+                upload["file_path"], upload["doc_number"], upload["case_id"]
+            )
+        if upload["fcm_upload"]:
+            return upload_fcm_document_to_edm(
+                upload["file_path"], upload["doc_number"], customs_clearance_number
             )
+        return upload_document_to_edm(
+            upload["file_path"],
+            upload["doc_number"],
+            customs_clearance_number,
+            filing_country,
+        )
 
-            if break_loop:
-                break_outer_loop = True
-                break
+    save_analyzer_log_time(batch_id=email_id, field_name="each_document_upload_s")
+    results = deliver_concurrently(
+        send, [upload for upload in uploads if upload["error"] is None]
+    )
+    save_analyzer_log_time(batch_id=email_id, field_name="each_document_upload_e")
 
-            edm_upload_error = post_doc_upload_process(
-                write_parent_batch_log,
-                email_instance,
-                status_code,
-                file_name,
-                info,
-                index,
-                additional_doc_item=None,
-                api_response=api_response,
-                idx=idx,
-            )
+    results = iter(results)
+    for upload in uploads:
+        file_name = upload["file_name"]
+        if upload["error"] is None:
+            status_code, error, trace = next(results)
+        else:
+            status_code, (error, trace) = None, upload["error"]
 
-            save_analyzer_log_time(batch_id=email_id, field_name="document_upload_e")
-        except Exception as error:
+        if break_outer_loop:
+            # Uploaded while the retried document was in flight, recorded so
+            # the retry does not send them again
+            if status_code == 200:
+                post_doc_upload_process(
+                    write_parent_batch_log,
+                    email_instance,
+                    status_code,
+                    file_name,
+                    upload["info"],
+                    index,
+                    additional_doc_item=None,
+                    api_response=api_response,
+                    idx=upload["idx"],
+                )
+            continue
+
+        if error is not None:
             edm_upload_error = True
-            trace = traceback.format_exc()
             message = (
                 f"Error occured while uploading document '{file_name}' to CW1 edoc."
             )
@@ -1905,7 +1930,6 @@ def file_wise_doc_upload(
                 "message": f"The following error occured in 'test_batch_p10' function : '{str(error.args[0])}' ",
                 "traceback": trace,
             }
-            error = traceback.format_exc()
 
             write_parent_batch_log(
                 message=message,
@@ -1914,6 +1938,30 @@ def file_wise_doc_upload(
                 action="display_error",
                 remarks=json.dumps(remarks, indent=4),
             )
+            continue
+
+        info = upload["info"]
+        is_retrying, break_loop = handle_doc_upload_retry(
+            write_parent_batch_log, email_instance, status_code, info
+        )
+
+        if break_loop:
+            break_outer_loop = True
+            continue
+
+        edm_upload_error = post_doc_upload_process(
+            write_parent_batch_log,
+            email_instance,
+            status_code,
+            file_name,
+            info,
+            index,
+            additional_doc_item=None,
+            api_response=api_response,
+            idx=upload["idx"],
+        )
+
+        save_analyzer_log_time(batch_id=email_id, field_name="document_upload_e")
 
     return edm_upload_error, is_retrying, break_outer_loop
 
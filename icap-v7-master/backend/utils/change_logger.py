@@ -1,4 +1,5 @@
 import os
+import hashlib
 import traceback
 import uuid
 from django.db import models
@@ -11,6 +12,8 @@ from django.forms.models import model_to_dict
 from dashboard import serializers
 
 CHANGE_LOGS_PATH = settings.CHANGE_LOGS_DOCKER_PATH
+# Changed paths kept per field, a huge edit is summarized instead of copied
+CHANGE_LOG_MAX_DIFF_PATHS = int(os.getenv("CHANGE_LOG_MAX_DIFF_PATHS", 200))
 
 
 PROFILE_ATTRIBUTES = {
@@ -59,6 +62,8 @@ class ChangeLogger:
 
         IGNORE_TIMESTAMP_FIELDS = {'id','updated_at', 'created_at', 'last_modified', 'timestamp'}
         change_categories = set()
+        # Structure digests by node, shared by every field of both versions
+        digests = {}
 
         for field_name in all_field_names:
             # Skip fields that shouldn't be tracked
@@ -70,10 +75,15 @@ class ChangeLogger:
                 new_value = new_data.get(field_name, None)
 
                 # Check if the value has changed
-                if not ChangeLogger._values_equal_deep(old_value, new_value, IGNORE_TIMESTAMP_FIELDS):
-                    # Store both old and new values in their original format
-                    old_values[field_name] = ChangeLogger._prepare_value_for_storage(old_value)
-                    new_values[field_name] = ChangeLogger._prepare_value_for_storage(new_value)
+                if not ChangeLogger._values_equal_deep(
+                    old_value, new_value, IGNORE_TIMESTAMP_FIELDS, digests
+                ):
+                    # Store the old and new values of the changed branches only
+                    field_old, field_new = ChangeLogger._diff_values(
+                        old_value, new_value, IGNORE_TIMESTAMP_FIELDS, digests, field_name
+                    )
+                    old_values[field_name] = ChangeLogger._prepare_value_for_storage(field_old)
+                    new_values[field_name] = ChangeLogger._prepare_value_for_storage(field_new)
                     has_changes = True
 
                     if instance._meta.model_name.upper() == "PROFILE":
@@ -176,12 +186,56 @@ class ChangeLogger:
             return str(obj)
 
     @staticmethod
-    def _values_equal_deep(old_val, new_val, ignore_fields=None):
+    def _structure_digest(value, ignore_fields, digests):
         """
-        Optimized deep comparison with order-independent list handling
+        Hash of the canonical form of value: dict keys in 'ignore_fields' are
+        left out and list items are hashed in any order. Equal digests mean
+        equal subtrees, so unchanged branches are compared in O(1).
+
+        Digests of dicts and lists are kept in 'digests' by node id, every
+        node is hashed once per comparison.
+        """
+        if isinstance(value, dict):
+            digest = digests.get(id(value))
+            if digest is None:
+                items = sorted(
+                    (repr(key).encode(), ChangeLogger._structure_digest(item, ignore_fields, digests))
+                    for key, item in value.items()
+                    if key not in ignore_fields
+                )
+                hasher = hashlib.blake2b(b"dict", digest_size=16)
+                for key, item_digest in items:
+                    hasher.update(b"%d:%s%d:%s" % (len(key), key, len(item_digest), item_digest))
+                digest = hasher.digest()
+                digests[id(value)] = digest
+            return digest
+
+        if isinstance(value, list):
+            digest = digests.get(id(value))
+            if digest is None:
+                hasher = hashlib.blake2b(b"list", digest_size=16)
+                for item_digest in sorted(
+                    ChangeLogger._structure_digest(item, ignore_fields, digests)
+                    for item in value
+                ):
+                    hasher.update(b"%d:%s" % (len(item_digest), item_digest))
+                digest = hasher.digest()
+                digests[id(value)] = digest
+            return digest
+
+        # Scalars are their own (short) canonical form
+        return f"{type(value).__name__}:{value!r}".encode()
+
+    @staticmethod
+    def _values_equal_deep(old_val, new_val, ignore_fields=None, digests=None):
+        """
+        Deep comparison with order-independent list handling. List items
+        not equal at the same position are matched by structure digest
         """
         if ignore_fields is None:
             ignore_fields = {'id', 'updated_at', 'created_at'}
+        if digests is None:
+            digests = {}
 
         # Quick checks first
         if old_val is new_val:
@@ -191,45 +245,124 @@ class ChangeLogger:
         if old_val == new_val:
             return True
 
-        # Handle dictionaries
-        if isinstance(old_val, dict) and isinstance(new_val, dict):
-            keys1 = set(old_val.keys()) - ignore_fields
-            keys2 = set(new_val.keys()) - ignore_fields
-            
-            if keys1 != keys2:
+        if isinstance(old_val, dict):
+            keys = set(old_val) - ignore_fields
+            if keys != set(new_val) - ignore_fields:
                 return False
-                
-            for key in keys1:
-                if not ChangeLogger._values_equal_deep(old_val[key], new_val[key], ignore_fields):
-                    return False
-            return True
+            return all(
+                ChangeLogger._values_equal_deep(old_val[key], new_val[key], ignore_fields, digests)
+                for key in keys
+            )
 
-        # Handle lists with order-independent comparison
-        elif isinstance(old_val, list) and isinstance(new_val, list):
+        if isinstance(old_val, list):
             if len(old_val) != len(new_val):
                 return False
-                
-            # Convert lists to sets of hashable representations
-            def _make_hashable(item):
-                if isinstance(item, dict):
-                    return tuple(sorted(
-                        (k, _make_hashable(v)) 
-                        for k, v in item.items() 
-                        if k not in ignore_fields
-                    ))
-                elif isinstance(item, list):
-                    return tuple(sorted(_make_hashable(i) for i in item))
-                else:
-                    return item
-                    
-            set1 = set(_make_hashable(item) for item in old_val)
-            set2 = set(_make_hashable(item) for item in new_val)
-            
-            return set1 == set2
+            removed, added = ChangeLogger._unmatched_items(old_val, new_val, ignore_fields, digests)
+            return not removed and not added
+
+        return False
+
+    @staticmethod
+    def _unmatched_items(old_list, new_list, ignore_fields, digests):
+        """
+        Indexes of the items of old_list with no equal item in new_list, and
+        the other way around, whatever their position. Items equal at the same
+        position are matched first, only the others are hashed.
+        """
+        candidates = [
+            index
+            for index, (old_item, new_item) in enumerate(zip(old_list, new_list))
+            if not (old_item is new_item or (type(old_item) == type(new_item) and old_item == new_item))
+        ]
+        shared = min(len(old_list), len(new_list))
+        old_indexes = candidates + list(range(shared, len(old_list)))
+        new_indexes = candidates + list(range(shared, len(new_list)))
+
+        unmatched = {}
+        for index in old_indexes:
+            digest = ChangeLogger._structure_digest(old_list[index], ignore_fields, digests)
+            unmatched.setdefault(digest, []).append(index)
+        added = []
+        for index in new_indexes:
+            digest = ChangeLogger._structure_digest(new_list[index], ignore_fields, digests)
+            indexes = unmatched.get(digest)
+            if indexes:
+                indexes.pop(0)
+            else:
+                added.append(index)
+        removed = sorted(index for indexes in unmatched.values() for index in indexes)
+        return removed, added
+
+    @staticmethod
+    def _diff_values(old_val, new_val, ignore_fields, digests, path, limit=None):
+        """
+        Old and new values of the branches that differ, by path
+        (e.g. 'keys[3].label'). Equal branches are not visited.
+
+        Returns: ({path: old_value}, {path: new_value}), at most 'limit'
+        paths. Further changes are counted under the '...' key.
+        """
+        if limit is None:
+            limit = CHANGE_LOG_MAX_DIFF_PATHS
+        old_values, new_values = {}, {}
+        skipped = 0
+        pending = [(path, old_val, new_val)]
+
+        while pending:
+            path, old_item, new_item = pending.pop()
+
+            if (
+                isinstance(old_item, dict)
+                and isinstance(new_item, dict)
+                and type(old_item) == type(new_item)
+            ):
+                keys = (set(old_item) | set(new_item)) - ignore_fields
+                for key in sorted(keys, key=str, reverse=True):
+                    old_child = old_item.get(key)
+                    new_child = new_item.get(key)
+                    if key in old_item and key in new_item and ChangeLogger._values_equal_deep(
+                        old_child, new_child, ignore_fields, digests
+                    ):
+                        continue
+                    pending.append((f"{path}.{key}", old_child, new_child))
+                continue
+
+            if (
+                isinstance(old_item, list)
+                and isinstance(new_item, list)
+                and type(old_item) == type(new_item)
+            ):
+                # Items present on both sides (in any position) are unchanged
+                removed, added = ChangeLogger._unmatched_items(
+                    old_item, new_item, ignore_fields, digests
+                )
+
+                # Pair changed items by position to diff inside them, the
+                # rest were added or removed
+                changed = []
+                for i in range(max(len(removed), len(added))):
+                    old_index = removed[i] if i < len(removed) else None
+                    new_index = added[i] if i < len(added) else None
+                    changed.append(
+                        (
+                            f"{path}[{new_index if new_index is not None else old_index}]",
+                            old_item[old_index] if old_index is not None else None,
+                            new_item[new_index] if new_index is not None else None,
+                        )
+                    )
+                pending.extend(reversed(changed))
+                continue
+
+            if len(old_values) >= limit:
+                skipped += 1
+                continue
+            old_values[path] = old_item
+            new_values[path] = new_item
+
+        if skipped:
+            old_values["..."] = new_values["..."] = f"{skipped} more changes"
+        return old_values, new_values
 
-        # Handle other types
-        else:
-            return old_val == new_val
     @staticmethod
     def log_activity(
         user,
@@ -243,6 +376,7 @@ class ChangeLogger:
         change_category: Optional[str] = None,
         old_data_path: Optional[Dict] = None,
         new_data_path: Optional[Dict] = None,
+        changes: Optional[Dict] = None,
         description: Optional[str] = None,
         request=None
     ):
@@ -296,6 +430,7 @@ class ChangeLogger:
                 change_category=change_category,
                 old_data_path=old_data_path,
                 new_data_path=new_data_path,
+                changes=changes,
                 ip_address=ip_address,
                 user_agent=user_agent,
                 description=description or f"{action} {object_type}"
@@ -324,19 +459,13 @@ class ChangeLogger:
 
         if changes:
             change_category = changes.get('change_category', 'General')
-            if changes.get('old_values'):
-                log_id = str(uuid.uuid4())
-                old_data_path = f"{CHANGE_LOGS_PATH}/{log_id}.json"
-
-                with open(old_data_path, "w") as f:
-                    json.dump(old_data, f, indent=2)
-
-            if changes.get('new_values'):
-                log_id = str(uuid.uuid4())
-                new_data_path = f"{CHANGE_LOGS_PATH}/{log_id}.json"
+            # The full old version is kept for revert and download, the
+            # changes themselves are stored with the log entry
+            log_id = str(uuid.uuid4())
+            old_data_path = f"{CHANGE_LOGS_PATH}/{log_id}.json"
 
-                with open(new_data_path, "w") as f:
-                    json.dump(new_data, f, indent=2)
+            with open(old_data_path, "w") as f:
+                json.dump(old_data, f)
 
         module = None
         module_id = None
@@ -364,6 +493,10 @@ class ChangeLogger:
                 change_category=change_category,
                 old_data_path=old_data_path,
                 new_data_path=new_data_path,
+                changes={
+                    'old_values': changes['old_values'],
+                    'new_values': changes['new_values'],
+                },
                 request=request,
                 description=f"Updated {instance._meta.model_name}: {instance}"
             )
@@ -67,6 +67,7 @@ from utils.utils import (
     create_inmemory_file,
 )
 from pipeline.scripts.DataCap import DataCap
+from utils.payload_codec import decode_payload, encode_payload
 
 
 import PyPDF2
@@ -187,7 +188,7 @@ def handle_ocr_mismatch(request_data):
     status_code = request_data.get("status_code")
 
     job_info = redis_instance.get(job_id)
-    job_info = json.loads(job_info)
+    job_info = decode_payload(job_info)
 
     profile_name = job_info["profile_name"]
     parent_batch_id = job_info["parent_batch_id"]
@@ -1021,7 +1022,7 @@ def document_matching_p1(
     )
 
     job_info = redis_instance.get(job_id)
-    job_info = json.loads(job_info)
+    job_info = decode_payload(job_info)
     job_info = {
         **job_info,
         "doc_info": doc_info,
@@ -1030,7 +1031,7 @@ def document_matching_p1(
         "page_wise_doc_types": page_wise_doc_types,
     }
 
-    redis_instance.set(job_id, json.dumps(job_info))
+    redis_instance.set(job_id, encode_payload(job_info))
 
     request_data = {"job_id": job_id}
 
@@ -1048,7 +1049,7 @@ def document_matching_p1(
             ]
             corresponding_doc = convert_doc_instance_to_dict(corresponding_doc)
             job_info["matched_doc"] = corresponding_doc
-            redis_instance.set(job_id, json.dumps(job_info))
+            redis_instance.set(job_id, encode_payload(job_info))
             document_matching_p2(request_data)
             return
 
@@ -1107,7 +1108,7 @@ def document_matching_p2(request_data):
         # Get job info from redis
         try:
             job_info = redis_instance.get(job_id)
-            job_info = json.loads(job_info)
+            job_info = decode_payload(job_info)
         except:
             print(f"Error parsing job_info for job_id: {job_id}")
             return
@@ -1208,7 +1209,7 @@ def document_matching_p2(request_data):
         matched_doc = convert_doc_instance_to_dict(page_wise_doc_types)
         job_info.pop("page_wise_doc_types", None)
         job_info["matched_doc"] = matched_doc
-        redis_instance.set(job_id, json.dumps(job_info))
+        redis_instance.set(job_id, encode_payload(job_info))
         request_data = {"job_id": job_id}
 
         publish("continue_classification_process_queued", "to_pipeline", request_data)
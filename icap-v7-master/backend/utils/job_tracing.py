@@ -0,0 +1,203 @@
+"""
+Organization: AIDocbuilder Inc.
+File: utils/job_tracing.py
+Version: 6.0
+
+Description:
+    Lightweight tracing of Rabbitmq hops keyed by job_id. Every consumed and
+    published message records a span with queue wait, processing time and
+    payload size. Spans are kept in redis so every service writes to the same
+    store and the backend can summarize them.
+
+Dependencies:
+    - os, json, re, time, traceback, contextlib, functools
+    - redis
+
+Main Features:
+    - Publish headers carrying the publish timestamp.
+    - Consume/publish spans stored per job and sampled per stage.
+    - p50/p95 summary per service, span kind and message type.
+"""
+import json
+import os
+import re
+import time
+import traceback
+from contextlib import contextmanager
+from functools import wraps
+
+import redis
+
+JOB_TRACING = os.getenv("JOB_TRACING", "1") == "1"
+JOB_TRACE_SERVICE = os.getenv("JOB_TRACE_SERVICE", "backend")
+JOB_TRACE_TTL = int(os.getenv("JOB_TRACE_TTL", 60 * 60 * 24))  # 1 day
+JOB_TRACE_SAMPLE_SIZE = int(os.getenv("JOB_TRACE_SAMPLE_SIZE", 1000))
+
+JOB_TRACE_KEY = "job_trace:{job_id}"
+STAGE_SAMPLES_KEY = "job_trace_samples:{service}:{kind}:{message_type}"
+PUBLISHED_AT_HEADER = "x-published-at"
+# "job_id": "..." or "job_id": 12, ids never contain escaped characters
+TRACE_ID_PATTERNS = [
+    re.compile(rb'"%s"\s*:\s*(?:"([^"\\]+)"|(\d+))' % key)
+    for key in (b"job_id", b"batch_id")
+]
+
+redis_instance = redis.Redis(
+    host=os.getenv("REDIS_HOST"),
+    port=os.getenv("REDIS_PORT"),
+    db=0,
+    client_name=f"{JOB_TRACE_SERVICE}_tracing",
+)
+
+
+def get_publish_headers():
+    """Headers attached to every published message"""
+    return {PUBLISHED_AT_HEADER: time.time()}
+
+
+def get_queue_wait(properties):
+    """Seconds the message waited in the queue, None if unknown"""
+    headers = getattr(properties, "headers", None) or {}
+    published_at = headers.get(PUBLISHED_AT_HEADER)
+    if published_at is None:
+        return None
+    return max(time.time() - float(published_at), 0)
+
+
+def get_trace_id(data):
+    """
+    Messages are keyed by job_id, agent messages only carry a batch_id.
+
+    Raw message bodies are searched for the first id instead of being parsed,
+    consumers decode every body themselves.
+    """
+    if isinstance(data, (bytes, str)):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        for pattern in TRACE_ID_PATTERNS:
+            match = pattern.search(data)
+            if match:
+                return (match.group(1) or match.group(2)).decode("utf-8", "replace")
+        return None
+    if not isinstance(data, dict):
+        return None
+    return data.get("job_id") or data.get("batch_id")
+
+
+def record_span(job_id, kind, message_type, duration, payload_bytes, **extra):
+    """Store one span for the job and add it to the stage samples"""
+    if not JOB_TRACING:
+        return
+
+    try:
+        span = {
+            "job_id": job_id,
+            "service": JOB_TRACE_SERVICE,
+            "kind": kind,
+            "message_type": message_type,
+            "duration_ms": round(duration * 1000, 2),
+            "payload_bytes": payload_bytes,
+            "time": time.time(),
+            **extra,
+        }
+        samples_key = STAGE_SAMPLES_KEY.format(
+            service=JOB_TRACE_SERVICE, kind=kind, message_type=message_type
+        )
+
+        pipe = redis_instance.pipeline(transaction=False)
+        if job_id:
+            job_key = JOB_TRACE_KEY.format(job_id=job_id)
+            pipe.rpush(job_key, json.dumps(span))
+            pipe.expire(job_key, JOB_TRACE_TTL)
+        pipe.lpush(samples_key, json.dumps(span))
+        pipe.ltrim(samples_key, 0, JOB_TRACE_SAMPLE_SIZE - 1)
+        pipe.execute()
+    except Exception:
+        # Tracing must never break message processing
+        print(traceback.format_exc())
+
+
+@contextmanager
+def trace_consume(message_type, data, properties, body):
+    """Record a consume span around the processing of one message"""
+    queue_wait = get_queue_wait(properties)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        record_span(
+            get_trace_id(data if data is not None else body),
+            "consume",
+            message_type,
+            time.perf_counter() - start,
+            len(body),
+            queue_wait_ms=round(queue_wait * 1000, 2) if queue_wait is not None else None,
+            status=status,
+        )
+
+
+def traced_consumer(do_work):
+    """Decorator recording a consume span for a pika do_work callback"""
+
+    @wraps(do_work)
+    def wrapper(ch, method, properties, body):
+        with trace_consume(properties.content_type, None, properties, body):
+            return do_work(ch, method, properties, body)
+
+    return wrapper
+
+
+def trace_publish(message_type, queue_name, body, payload_bytes, duration):
+    """Record a publish span"""
+    record_span(
+        get_trace_id(body), "publish", message_type, duration, payload_bytes, queue=queue_name
+    )
+
+
+def get_job_trace(job_id):
+    """Return every span recorded for the job in order"""
+    spans = redis_instance.lrange(JOB_TRACE_KEY.format(job_id=job_id), 0, -1)
+    return [json.loads(span) for span in spans]
+
+
+def percentile(values, pct):
+    """Nearest rank percentile of a list of numbers"""
+    if not values:
+        return None
+    values = sorted(values)
+    index = max(int(round(pct / 100 * len(values))) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def get_stage_summary():
+    """p50/p95 of duration, queue wait and payload size per stage and message type"""
+    summary = []
+    for key in redis_instance.scan_iter(match="job_trace_samples:*", count=500):
+        key = key.decode("utf-8") if isinstance(key, bytes) else key
+        _, service, kind, message_type = key.split(":", 3)
+        spans = [json.loads(i) for i in redis_instance.lrange(key, 0, -1)]
+
+        durations = [i["duration_ms"] for i in spans]
+        waits = [i["queue_wait_ms"] for i in spans if i.get("queue_wait_ms") is not None]
+        sizes = [i["payload_bytes"] for i in spans]
+        summary.append(
+            {
+                "service": service,
+                "kind": kind,
+                "message_type": message_type,
+                "count": len(spans),
+                "errors": sum(1 for i in spans if i.get("status") == "error"),
+                "duration_p50_ms": percentile(durations, 50),
+                "duration_p95_ms": percentile(durations, 95),
+                "queue_wait_p50_ms": percentile(waits, 50),
+                "queue_wait_p95_ms": percentile(waits, 95),
+                "payload_p50_bytes": percentile(sizes, 50),
+                "payload_p95_bytes": percentile(sizes, 95),
+            }
+        )
+
+    return sorted(summary, key=lambda i: (i["service"], i["kind"], i["message_type"]))
@@ -0,0 +1,96 @@
+"""
+Organization: AIDocbuilder Inc.
+File: utils/payload_codec.py
+Version: 6.0
+
+Description:
+    Compact encoding for large job payloads (ra_json, data_json and the job
+    blobs stored in Redis). Rabbitmq messages stay plain JSON, consumers of
+    the other services do not decode compressed bodies.
+
+Dependencies:
+    - json, zlib
+    - zstandard, orjson (optional)
+
+Main Features:
+    - Encode payloads as plain JSON, zlib or zstd compressed JSON.
+    - Decode any of those formats transparently, so readers keep working
+      while writers are switched over one service at a time.
+"""
+import json
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Supported values: "json" (default, uncompressed), "zlib", "zstd"
+PAYLOAD_CODEC = os.getenv("PAYLOAD_CODEC", "json").lower()
+PAYLOAD_COMPRESSION_LEVEL = int(os.getenv("PAYLOAD_COMPRESSION_LEVEL", "3"))
+
+# Compressed streams are recognised by their native magic bytes, plain JSON
+# always starts with "{", "[" or whitespace.
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZLIB_MAGIC_FIRST_BYTE = 0x78
+
+
+def _dumps(data):
+    """Serialize data to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data).encode("utf-8")
+
+
+def _loads(raw):
+    """Deserialize JSON bytes or str"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def get_codec(codec=None):
+    """Return the effective codec, falling back to zlib if zstd is unavailable"""
+    codec = (codec or PAYLOAD_CODEC).lower()
+    if codec == "zstd" and zstandard is None:
+        return "zlib"
+    if codec not in ("json", "zlib", "zstd"):
+        return "json"
+    return codec
+
+
+def encode_payload(data, codec=None):
+    """Encode data with the configured codec and return bytes"""
+    codec = get_codec(codec)
+    raw = _dumps(data)
+
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=PAYLOAD_COMPRESSION_LEVEL).compress(raw)
+    if codec == "zlib":
+        return zlib.compress(raw, PAYLOAD_COMPRESSION_LEVEL)
+    return raw
+
+
+def decode_payload(raw):
+    """Decode bytes produced by encode_payload or a plain JSON string"""
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        return _loads(raw)
+
+    raw = bytes(raw)
+    if raw[:4] == ZSTD_MAGIC:
+        if zstandard is None:
+            raise ValueError("Payload is zstd compressed but zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(raw)
+    elif raw and raw[0] == ZLIB_MAGIC_FIRST_BYTE:
+        raw = zlib.decompress(raw)
+
+    return _loads(raw)
+
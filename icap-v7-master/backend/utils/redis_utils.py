@@ -1,6 +1,18 @@
 import redis
 from django.conf import settings
 
+from utils.payload_codec import decode_payload, encode_payload
+
 redis_instance = redis.Redis(
     host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0, client_name="backend"
-)
\ No newline at end of file
+)
+
+
+def get_job_data(job_id):
+    """Retrieve and decode the job payload stored in redis"""
+    return decode_payload(redis_instance.get(job_id))
+
+
+def set_job_data(job_id, job_details):
+    """Encode and store the job payload in redis"""
+    redis_instance.set(job_id, encode_payload(job_details))
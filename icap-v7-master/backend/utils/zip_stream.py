@@ -0,0 +1,130 @@
+"""
+Organization: AIDocbuilder Inc.
+File: utils/zip_stream.py
+Version: 6.0
+
+Description:
+    Streams ZIP archives to the client while they are written, instead of
+    building the whole archive in memory before the download starts.
+
+Dependencies:
+    - os, time, zipfile
+    - StreamingHttpResponse from django.http
+
+Main Features:
+    - Files read from disk in chunks and written to the archive on the fly.
+    - Already compressed media (TIFF, PDF, images, office files) stored as is,
+      everything else deflated.
+    - StreamingHttpResponse for download views.
+"""
+
+import os
+import time
+import zipfile
+
+from django.http import StreamingHttpResponse
+
+ZIP_STREAM_CHUNK_SIZE = int(os.getenv("ZIP_STREAM_CHUNK_SIZE", 1024 * 1024))
+ZIP_COMPRESS_LEVEL = int(os.getenv("ZIP_COMPRESS_LEVEL", 6))
+
+# Deflating these again costs CPU and saves (almost) nothing
+STORED_EXTENSIONS = {
+    ".tif",
+    ".tiff",
+    ".pdf",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".zip",
+    ".gz",
+    ".xlsx",
+    ".docx",
+    ".pptx",
+}
+
+
+class _ZipOutput:
+    """Write-only file for zipfile, hands out what was written since the last read"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def read_written(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def get_compress_type(zip_path):
+    if os.path.splitext(zip_path)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def iter_zip(entries):
+    """
+    Write a ZIP archive, yielding its bytes as they are produced.
+
+    Args:
+        entries (iterable): (zip_path, file_path, file_data) tuples. 'file_path'
+                            is read from disk, 'file_data' (str or bytes) is
+                            written as is, whichever is set.
+
+    Yields:
+        bytes: Next part of the archive.
+
+    Notes:
+        - The output is not seekable, so sizes and CRCs follow every entry
+          (data descriptors). Every zip reader supports it.
+        - Memory use is bounded by ZIP_STREAM_CHUNK_SIZE, whatever the archive size.
+    """
+    output = _ZipOutput()
+    with zipfile.ZipFile(output, "w", compresslevel=ZIP_COMPRESS_LEVEL) as zf:
+        for zip_path, file_path, file_data in entries:
+            if file_path:
+                zinfo = zipfile.ZipInfo.from_file(file_path, zip_path)
+                if zinfo.is_dir():
+                    zf.write(file_path, zip_path)
+                    yield output.read_written()
+                    continue
+                zinfo.compress_type = get_compress_type(zip_path)
+                with open(file_path, "rb") as src, zf.open(zinfo, "w") as dest:
+                    while True:
+                        chunk = src.read(ZIP_STREAM_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        dest.write(chunk)
+                        data = output.read_written()
+                        if data:
+                            yield data
+            else:
+                if isinstance(file_data, str):
+                    file_data = file_data.encode("utf-8")
+                zinfo = zipfile.ZipInfo(zip_path, time.localtime()[:6])
+                zinfo.compress_type = get_compress_type(zip_path)
+                zf.writestr(zinfo, file_data)
+            yield output.read_written()
+
+    # Central directory, written on close
+    yield output.read_written()
+
+
+def zip_response(entries, zip_filename):
+    """Download response streaming the ZIP archive of entries"""
+    resp = StreamingHttpResponse(iter_zip(entries))
+    resp["Content-Type"] = "application/x-zip-compressed"
+    resp["Content-Disposition"] = f"attachment; filename={zip_filename}"
+    return resp
@@ -0,0 +1,650 @@
+"""
+Organization: AIDocbuilder Inc.
+File: benchmark/pipeline_benchmark.py
+Version: 6.0
+
+Description:
+    End-to-end benchmark of the batch pipeline without the docker-compose
+    stack. Every selected service's rabbitmq do_work dispatcher is loaded in
+    one process, Rabbitmq is replaced by an in-memory broker, Redis by a
+    shared fakeredis server and the LLM/vector endpoints by a deterministic
+    local responder. A corpus of recorded fixtures is replayed and the run
+    reports docs/min, per-stage latency and peak memory.
+
+Dependencies:
+    - argparse, importlib, json, os, random, sys, threading, time, tracemalloc
+    - fakeredis, redis, pika
+
+Main Features:
+    - In-memory broker routing published messages to the loaded services.
+    - Per service module isolation so services sharing package names (app,
+      utils, handler, consumer, ...) can be loaded side by side.
+    - Deterministic HTTP responder for LLM_SERVICE_API_URL, OLLAMA_API_URL,
+      VECTOR_DATA_BASE_API and QDRANT_VECTOR_DB_BASE_URL.
+    - Separate timing and tracemalloc passes, tracing allocations would
+      otherwise distort the stage latencies.
+    - record sub command to capture a fixture from a running stack,
+      generate sub command for a synthetic invoice corpus.
+
+Usage:
+    python benchmark/pipeline_benchmark.py run --services utility,docbuilder
+    python benchmark/pipeline_benchmark.py record --job-id <job_id> \
+        --message-type keyval_extractor --queue to_utility --name invoice_1
+    python benchmark/pipeline_benchmark.py generate --count 3
+"""
+import argparse
+import contextlib
+import importlib
+import importlib.util
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Service name -> (service root, extra sys.path entries, consumer module, queue)
+SERVICES = {
+    "backend": ("backend", [], "rabbitmq_consumer", "to_pipeline"),
+    "utility": ("utility", [], "rabbitmq_consumer", "to_utility"),
+    "docbuilder": ("docbuilder", [], "rabbitmq_consumer", "to_docbuilder"),
+    "auto-extraction": ("auto-extraction", ["rabbitmq"], "consumer", "to_extraction"),
+    "ai-agent": ("ai-agent", ["rabbitmq"], "consumer", "to_ai_agent"),
+    "postprocess": ("postprocess", ["rabbitmq"], "consumer", "to_postprocess"),
+}
+
+# Services configuring Django globally, only one of them can live in a process
+DJANGO_SERVICES = {"backend", "postprocess"}
+
+# External endpoints answered by the local responder
+STUBBED_ENDPOINT_VARS = (
+    "LLM_SERVICE_API_URL",
+    "OLLAMA_API_URL",
+    "VECTOR_DATA_BASE_API",
+    "QDRANT_VECTOR_DB_BASE_URL",
+)
+
+DEFAULT_ENV = {
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "RABBITMQ_HOST": "localhost",
+    "RABBITMQ_PORT": "5672",
+    "RABBITMQ_USERNAME": "guest",
+    "RABBITMQ_PASSWORD": "guest",
+    "WORKER_TIMEOUT": "30",
+    # Keep benchmark runs out of the tracing samples of a shared redis
+    "JOB_TRACING": "0",
+}
+
+# Ollama clients expect a chat completion shaped response
+DEFAULT_RESPONSES = {
+    "/api/chat": {
+        "model": "benchmark",
+        "message": {"role": "assistant", "content": "{}"},
+        "done": True,
+        "done_reason": "stop",
+    },
+    "/api/generate": {"model": "benchmark", "response": "{}", "done": True},
+}
+
+
+class InMemoryBroker:
+    """FIFO of published messages shared by every fake connection"""
+
+    def __init__(self):
+        self.messages = deque()
+        self.lock = threading.Lock()
+        self.published = defaultdict(int)
+
+    def put(self, queue_name, message_type, body, headers=None):
+        with self.lock:
+            self.published[queue_name] += 1
+            self.messages.append((queue_name, message_type, body, headers or {}))
+
+    def get(self):
+        with self.lock:
+            return self.messages.popleft() if self.messages else None
+
+
+class FakeProperties:
+    def __init__(self, content_type, headers=None):
+        self.content_type = content_type
+        self.headers = headers
+        self.content_encoding = None
+
+
+class FakeMethod:
+    def __init__(self, delivery_tag, routing_key):
+        self.delivery_tag = delivery_tag
+        self.routing_key = routing_key
+
+
+class FakeConnection:
+    """Stand-in for pika.BlockingConnection publishing into the broker"""
+
+    broker = None
+
+    def __init__(self, *args, **kwargs):
+        self.is_open = True
+        self.is_closed = False
+
+    def channel(self):
+        return FakeChannel(self)
+
+    def add_callback_threadsafe(self, callback):
+        callback()
+
+    def process_data_events(self, *args, **kwargs):
+        pass
+
+    def close(self):
+        self.is_open = False
+        self.is_closed = True
+
+
+class FakeChannel:
+    def __init__(self, connection):
+        self.connection = connection
+        self.is_open = True
+        self.acked = 0
+
+    def queue_declare(self, *args, **kwargs):
+        pass
+
+    def basic_qos(self, *args, **kwargs):
+        pass
+
+    def basic_ack(self, delivery_tag=None, *args, **kwargs):
+        self.acked += 1
+
+    def basic_publish(self, exchange="", routing_key="", body=b"", properties=None, **kwargs):
+        FakeConnection.broker.put(
+            routing_key,
+            getattr(properties, "content_type", None),
+            body,
+            getattr(properties, "headers", None),
+        )
+
+    def close(self):
+        self.is_open = False
+
+
+class ResponderHandler(BaseHTTPRequestHandler):
+    """Answer every request with the fixture response for its path"""
+
+    responses = {}
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        path = self.path.split("?", 1)[0]
+        payload = json.dumps(self.responses.get(path, DEFAULT_RESPONSES.get(path, {})))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload.encode("utf-8"))
+
+    do_GET = do_POST = do_PUT = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class ServiceRuntime:
+    """
+    One service loaded into the benchmark process.
+
+    Modules imported from the service root are swapped out of sys.modules
+    while another service runs, so identically named packages don't clash.
+    """
+
+    def __init__(self, name):
+        root, extra_paths, self.module_name, self.queue = SERVICES[name]
+        self.name = name
+        self.root = os.path.join(REPO_ROOT, root)
+        self.paths = [os.path.join(self.root, i) for i in extra_paths] + [self.root]
+        self.modules = {}
+        self.do_work = None
+
+    def _owns(self, module):
+        try:
+            files = [getattr(module, "__file__", None)] + list(getattr(module, "__path__", None) or [])
+        except Exception:
+            # Namespace package whose parent was already removed
+            return False
+        return any(i and os.path.abspath(i).startswith(self.root + os.sep) for i in files)
+
+    @contextlib.contextmanager
+    def activate(self):
+        saved_path, saved_cwd = list(sys.path), os.getcwd()
+        sys.path[:0] = self.paths
+        sys.modules.update(self.modules)
+        os.chdir(self.root)
+        try:
+            yield
+        finally:
+            # Collect modules imported lazily during the call as well
+            owned = [name for name, module in list(sys.modules.items()) if self._owns(module)]
+            for name in owned:
+                self.modules[name] = sys.modules.pop(name)
+            sys.path[:] = saved_path
+            os.chdir(saved_cwd)
+
+    def load(self):
+        with self.activate():
+            self.do_work = importlib.import_module(self.module_name).do_work
+
+    def handle(self, message_type, body, headers, delivery_tag):
+        connection = FakeConnection()
+        channel = connection.channel()
+        with self.activate():
+            self.do_work(
+                channel,
+                FakeMethod(delivery_tag, self.queue),
+                FakeProperties(message_type, headers),
+                body,
+            )
+
+
+def percentile(values, pct):
+    """Nearest rank percentile of a list of numbers"""
+    if not values:
+        return None
+    values = sorted(values)
+    index = max(int(round(pct / 100 * len(values))) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def load_payload_codec():
+    """Load the backend payload codec without importing Django"""
+    path = os.path.join(REPO_ROOT, "backend", "utils", "payload_codec.py")
+    spec = importlib.util.spec_from_file_location("benchmark_payload_codec", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_corpus(fixtures_dir):
+    """Read every fixture, sorted by file name for a stable replay order"""
+    corpus = []
+    for file_name in sorted(os.listdir(fixtures_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        with open(os.path.join(fixtures_dir, file_name)) as f:
+            fixture = json.load(f)
+        fixture.setdefault("name", os.path.splitext(file_name)[0])
+        corpus.append(fixture)
+    return corpus
+
+
+def install_stand_ins(responses):
+    """Patch redis and pika, start the responder and point endpoints to it"""
+    import fakeredis
+    import pika
+    import redis
+
+    server = fakeredis.FakeServer()
+
+    class SharedFakeRedis(fakeredis.FakeRedis):
+        def __init__(self, *args, **kwargs):
+            kwargs["server"] = server
+            super().__init__(*args, **kwargs)
+
+    redis.Redis = redis.StrictRedis = SharedFakeRedis
+
+    broker = InMemoryBroker()
+    FakeConnection.broker = broker
+    pika.BlockingConnection = FakeConnection
+
+    ResponderHandler.responses = responses
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ResponderHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    responder_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    for var in STUBBED_ENDPOINT_VARS:
+        os.environ[var] = responder_url
+
+    for key, value in DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+
+    return SharedFakeRedis(), broker, httpd
+
+
+def new_stats():
+    return {
+        "latency": defaultdict(list),
+        "errors": defaultdict(int),
+        "unrouted": defaultdict(int),
+    }
+
+
+def replay_fixture(fixture, runtimes, redis_client, broker, stats, max_messages):
+    """Seed redis, publish the entry messages and drain the broker"""
+    for key, value in fixture.get("redis", {}).items():
+        redis_client.set(key, value if isinstance(value, str) else json.dumps(value))
+
+    for message in fixture["messages"]:
+        broker.put(message["queue"], message["message_type"], json.dumps(message["body"]))
+
+    handled = 0
+    while handled < max_messages:
+        item = broker.get()
+        if item is None:
+            break
+        queue_name, message_type, body, headers = item
+        runtime = runtimes.get(queue_name)
+        if runtime is None:
+            stats["unrouted"][f"{queue_name}:{message_type}"] += 1
+            continue
+
+        handled += 1
+        start = time.perf_counter()
+        try:
+            runtime.handle(message_type, body, headers, handled)
+        except Exception:
+            stats["errors"][f"{runtime.name}:{message_type}"] += 1
+            print(traceback.format_exc())
+        stats["latency"][(runtime.name, message_type)].append(time.perf_counter() - start)
+    else:
+        print(f"Fixture {fixture['name']} stopped after {max_messages} messages")
+
+
+def run(args):
+    services = [i.strip() for i in args.services.split(",") if i.strip()]
+    unknown = set(services) - set(SERVICES)
+    if unknown:
+        raise SystemExit(f"Unknown services: {', '.join(sorted(unknown))}")
+    if len(DJANGO_SERVICES.intersection(services)) > 1:
+        raise SystemExit("backend and postprocess both configure Django, benchmark them separately")
+
+    corpus = load_corpus(args.fixtures)
+    if not corpus:
+        raise SystemExit(
+            f"No fixtures found in {args.fixtures}, create some with the generate or record sub command"
+        )
+
+    responses = {}
+    for fixture in corpus:
+        responses.update(fixture.get("responses", {}))
+    redis_client, broker, httpd = install_stand_ins(responses)
+
+    runtimes = {}
+    for name in services:
+        runtime = ServiceRuntime(name)
+        runtime.load()
+        runtimes[runtime.queue] = runtime
+
+    # Warm up imports and caches outside of the measured window
+    for fixture in corpus[: args.warmup]:
+        replay_fixture(fixture, runtimes, redis_client, broker, new_stats(), args.max_messages)
+
+    # Timing pass, tracemalloc stays off so it doesn't skew the latencies
+    stats = new_stats()
+    documents = 0
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for fixture in corpus:
+            replay_fixture(fixture, runtimes, redis_client, broker, stats, args.max_messages)
+            documents += fixture.get("documents", 1)
+    elapsed = time.perf_counter() - start
+
+    # Memory pass, one replay of the corpus with allocation tracing
+    peak_traced = None
+    if not args.skip_memory:
+        tracemalloc.start()
+        for fixture in corpus:
+            replay_fixture(fixture, runtimes, redis_client, broker, new_stats(), args.max_messages)
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    httpd.shutdown()
+
+    report = {
+        "services": services,
+        "fixtures": len(corpus),
+        "repeat": args.repeat,
+        "documents": documents,
+        "elapsed_seconds": round(elapsed, 3),
+        "docs_per_minute": round(documents / elapsed * 60, 2) if elapsed else None,
+        "peak_traced_memory_mb": (
+            round(peak_traced / 1024 / 1024, 2) if peak_traced is not None else None
+        ),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        "stages": [
+            {
+                "service": service,
+                "message_type": message_type,
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "max_ms": round(max(values) * 1000, 2),
+                "total_ms": round(sum(values) * 1000, 2),
+            }
+            for (service, message_type), values in sorted(stats["latency"].items())
+        ],
+        "errors": dict(stats["errors"]),
+        "unrouted": dict(stats["unrouted"]),
+    }
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def print_report(report):
+    print()
+    print(f"Services:   {', '.join(report['services'])}")
+    print(f"Documents:  {report['documents']} in {report['elapsed_seconds']}s")
+    print(f"Throughput: {report['docs_per_minute']} docs/min")
+    print(f"Peak mem:   {report['peak_traced_memory_mb']} MB traced, {report['peak_rss_mb']} MB rss")
+    print()
+    print(f"{'service':<16}{'message_type':<40}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'max ms':>11}")
+    for stage in report["stages"]:
+        print(
+            f"{stage['service']:<16}{stage['message_type']:<40}{stage['count']:>7}"
+            f"{stage['p50_ms']:>11}{stage['p95_ms']:>11}{stage['max_ms']:>11}"
+        )
+    if report["errors"]:
+        print(f"\nErrors: {report['errors']}")
+    if report["unrouted"]:
+        print(f"Unrouted (service not loaded): {report['unrouted']}")
+
+
+def record(args):
+    """Capture the redis job blob of a running stack as a fixture"""
+    import redis
+
+    client = redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), db=0)
+    raw = client.get(args.job_id)
+    if raw is None:
+        raise SystemExit(f"Job {args.job_id} not found in redis")
+
+    fixture = {
+        "name": args.name,
+        "documents": args.documents,
+        "redis": {args.job_id: load_payload_codec().decode_payload(raw)},
+        "messages": [
+            {
+                "queue": args.queue,
+                "message_type": args.message_type,
+                "body": {"job_id": args.job_id},
+            }
+        ],
+        "responses": {},
+    }
+
+    os.makedirs(args.fixtures, exist_ok=True)
+    path = os.path.join(args.fixtures, f"{args.name}.json")
+    with open(path, "w") as f:
+        json.dump(fixture, f)
+    print(f"Fixture written to {path}")
+
+
+# Label / value pairs of the generated invoices, values are drawn per fixture
+GENERATED_FIELDS = (
+    ("invoiceNumber", "Invoice No", lambda rnd: f"INV-{rnd.randint(10000, 99999)}"),
+    ("invoiceDate", "Invoice Date", lambda rnd: f"2024-{rnd.randint(1, 12):02}-{rnd.randint(1, 28):02}"),
+    ("orderNumber", "Order No", lambda rnd: f"PO{rnd.randint(100000, 999999)}"),
+    ("currency", "Currency", lambda rnd: rnd.choice(["USD", "EUR", "JPY"])),
+    ("totalAmount", "Total", lambda rnd: f"{rnd.randint(100, 99999)}.{rnd.randint(0, 99):02}"),
+)
+GENERATED_ITEM_WORDS = ("Carton", "Pallet", "Steel", "Bolt", "Cable", "Panel", "Fitting", "Valve")
+
+
+def generate_page(rnd, document_id, page_idx, lines_per_page):
+    """Word nodes of one page laid out as label/value header lines and item lines"""
+    words = []
+
+    def add_line(top, texts):
+        left = 50
+        for text in texts:
+            right = left + 9 * len(text)
+            words.append(
+                {
+                    "id": f"{document_id}.p{page_idx}.w{len(words)}",
+                    "type": "word",
+                    "v": text,
+                    "pos": f"{left},{top},{right},{top + 12}",
+                }
+            )
+            left = right + 12
+
+    top = 40
+    if page_idx == 0:
+        for _, label, value in GENERATED_FIELDS:
+            add_line(top, label.split() + [value(rnd)])
+            top += 20
+    while top < 40 + 20 * lines_per_page:
+        add_line(
+            top,
+            [
+                str(rnd.randint(1, 999)),
+                rnd.choice(GENERATED_ITEM_WORDS),
+                rnd.choice(GENERATED_ITEM_WORDS).lower(),
+                f"{rnd.randint(1, 999)}.{rnd.randint(0, 99):02}",
+            ],
+        )
+        top += 20
+    return {"id": f"{document_id}.p{page_idx}", "type": "page", "children": words}
+
+
+def generate_fixture(name, rnd, pages, lines_per_page):
+    """A keyval_extractor job for one synthetic multi page invoice"""
+    job_id = f"benchmark-{name}"
+    document_id = f"{name}-doc"
+    ra_document = {
+        "id": document_id,
+        "type": "document",
+        "ext": ".pdf",
+        "Vendor": "Benchmark",
+        "DocType": "Invoice",
+        "children": [generate_page(rnd, document_id, i, lines_per_page) for i in range(pages)],
+    }
+    key_items = [
+        {
+            "id": f"key-{key_label}",
+            "keyLabel": key_label,
+            "type": "anchors",
+            "anchorShapes": {
+                "left": {
+                    "text": label,
+                    "pos": f"50,{40 + 20 * idx},{50 + 9 * len(label)},{52 + 20 * idx}",
+                    "pageIndex": 0,
+                }
+            },
+        }
+        for idx, (key_label, label, _) in enumerate(GENERATED_FIELDS)
+    ]
+    job = {
+        "batch_id": name,
+        "project": "Benchmark",
+        "skip_key_processing": False,
+        "skip_table_processing": True,
+        "skip_post_processor": True,
+        "ra_json": {"id": name, "nodes": [ra_document]},
+        "data_json": {
+            "id": name,
+            "DefinitionID": "Benchmark",
+            "nodes": [{"id": document_id, "DocType": "Invoice", "children": []}],
+        },
+        "definitions": [
+            {
+                "id": "benchmark-invoice",
+                "type": "Invoice",
+                "key": {"models": [{}], "items": key_items},
+                "table": [],
+            }
+        ],
+        "definition_settings": {"options": {"options-keys": {"items": []}}, "profileSettings": {}},
+        "master_dictionaries": {},
+    }
+    return {
+        "name": name,
+        "documents": 1,
+        "redis": {job_id: job},
+        "messages": [{"queue": "to_utility", "message_type": "keyval_extractor", "body": {"job_id": job_id}}],
+        "responses": {},
+    }
+
+
+def generate(args):
+    """Write a corpus of synthetic invoice fixtures, same seed gives the same corpus"""
+    rnd = random.Random(args.seed)
+    os.makedirs(args.fixtures, exist_ok=True)
+    for idx in range(args.count):
+        name = f"generated_{idx + 1:02}"
+        pages = rnd.randint(1, args.max_pages)
+        fixture = generate_fixture(name, rnd, pages, args.lines_per_page)
+        path = os.path.join(args.fixtures, f"{name}.json")
+        with open(path, "w") as f:
+            json.dump(fixture, f, indent=1)
+        print(f"Fixture written to {path} ({pages} pages)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded jobs through the pipeline services")
+    sub_parsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub_parsers.add_parser("run", help="Replay the fixture corpus")
+    run_parser.add_argument("--services", default="utility,docbuilder,auto-extraction,ai-agent")
+    run_parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    run_parser.add_argument("--repeat", type=int, default=1)
+    run_parser.add_argument("--warmup", type=int, default=1, help="Fixtures replayed before measuring")
+    run_parser.add_argument("--max-messages", type=int, default=500, help="Guard against message loops")
+    run_parser.add_argument("--skip-memory", action="store_true", help="Skip the tracemalloc pass")
+    run_parser.add_argument("--output", help="Write the report as JSON")
+    run_parser.set_defaults(func=run)
+
+    record_parser = sub_parsers.add_parser("record", help="Capture a fixture from redis")
+    record_parser.add_argument("--job-id", required=True)
+    record_parser.add_argument("--message-type", required=True)
+    record_parser.add_argument("--queue", required=True, choices=[i[3] for i in SERVICES.values()])
+    record_parser.add_argument("--name", required=True)
+    record_parser.add_argument("--documents", type=int, default=1)
+    record_parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    record_parser.set_defaults(func=record)
+
+    generate_parser = sub_parsers.add_parser("generate", help="Write synthetic invoice fixtures")
+    generate_parser.add_argument("--count", type=int, default=3)
+    generate_parser.add_argument("--max-pages", type=int, default=3)
+    generate_parser.add_argument("--lines-per-page", type=int, default=30)
+    generate_parser.add_argument("--seed", type=int, default=7)
+    generate_parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    generate_parser.set_defaults(func=generate)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
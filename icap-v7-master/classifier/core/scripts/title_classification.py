@@ -6,8 +6,25 @@ from rapidfuzz import process, fuzz, utils
 import re
 import spacy
 import copy
+import hashlib
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
 
 nlp = spacy.load("/app/core/model/en_core_web_sm-3.7.1")
+# find_location only needs the entities, the other components are skipped
+NER_DISABLED = [name for name in nlp.pipe_names if name not in ("tok2vec", "ner")]
+
+# pages of a document are classified in worker processes, 0 = up to 4 processes, 1 = in process
+TITLE_CLASSIFICATION_WORKERS = int(os.getenv("TITLE_CLASSIFICATION_WORKERS", "0"))
+TITLE_CLASSIFICATION_PARALLEL_MIN_PAGES = int(
+    os.getenv("TITLE_CLASSIFICATION_PARALLEL_MIN_PAGES", "4")
+)
+KEYWORD_MATCHER_CACHE_SIZE = 32
 
 
 # takes the a list(page) by preprocessing_xml_withoutPrintArea  and a list of position(bounding box)as parameter and return the desired text inside the bounding box
@@ -346,41 +363,112 @@ def find_s_id(line, label):
             return word[2]
 
 
+# keywords of a category profile preprocessed once, every line of a page is scored against all of them in one call
+class KeywordMatcher:
+    def __init__(self, category):
+        # flat list of the keywords, each label owns the slice keywords[start:end]
+        self.keywords = []
+        self.labels = []
+        for label, keywords in category.items():
+            start = len(self.keywords)
+            self.keywords.extend(keywords)
+            # labels without keywords can never match
+            if len(self.keywords) > start:
+                self.labels.append((label, start, len(self.keywords)))
+        self.choices = [utils.default_process(keyword) for keyword in self.keywords]
+
+    # returns the token_set_ratio and WRatio matrices, one row per text and one column per keyword
+    def score(self, texts):
+        queries = [utils.default_process(text) for text in texts]
+        token_set_scores = process.cdist(
+            queries, self.choices, scorer=fuzz.token_set_ratio, dtype=np.float64
+        )
+        wratio_scores = process.cdist(
+            queries, self.choices, scorer=fuzz.WRatio, dtype=np.float64
+        )
+        return token_set_scores, wratio_scores
+
+    # scores every line predict_layout and find_document_ids can look at (top 45% of the page)
+    # returns {line_index: (inp_str, token_set_scores, wratio_scores)}
+    def score_page(self, doc, extremas, area=45):
+        bottom_limit = extremas[1] + (extremas[3] - extremas[1]) * (area / 100)
+        line_indexes = [
+            line_index
+            for line_index, line in enumerate(doc)
+            if len(line) > 0 and line[0][1][1] <= bottom_limit
+        ]
+        texts = [
+            " ".join(sublist[0] for sublist in doc[line_index])
+            for line_index in line_indexes
+        ]
+        token_set_scores, wratio_scores = self.score(texts)
+        return {
+            line_index: (texts[row], token_set_scores[row], wratio_scores[row])
+            for row, line_index in enumerate(line_indexes)
+        }
+
+
+_keyword_matchers = OrderedDict()
+_keyword_matchers_lock = threading.Lock()
+
+
+# returns the cached matcher of a category profile, a changed profile gets a new matcher
+def get_keyword_matcher(category):
+    key = hashlib.sha1(
+        json.dumps(category, default=str).encode("utf-8")
+    ).hexdigest()
+    with _keyword_matchers_lock:
+        matcher = _keyword_matchers.get(key)
+        if matcher is not None:
+            _keyword_matchers.move_to_end(key)
+            return matcher
+
+    matcher = KeywordMatcher(category)
+    with _keyword_matchers_lock:
+        _keyword_matchers[key] = matcher
+        if len(_keyword_matchers) > KEYWORD_MATCHER_CACHE_SIZE:
+            _keyword_matchers.popitem(last=False)
+    return matcher
+
+
 # Version v9 - New Classification logic with matrix now called from the predict_layout_method method and matrix also used for validation if necessary
 def predict_layout(
-    doc, category, memory_points, style_list, extremas, priority_direction, threshold=85
+    doc,
+    category,
+    memory_points,
+    style_list,
+    extremas,
+    priority_direction,
+    threshold=85,
+    matcher=None,
+    line_scores=None,
 ):
     if len(style_list) == 0:
         return "Blank", {"Blank": 150}, None
+    if matcher is None:
+        matcher = get_keyword_matcher(category)
+    if line_scores is None:
+        line_scores = matcher.score_page(doc, extremas)
+    keywords = matcher.keywords
     cat_prob = create_cat_dict(priority_direction["category"])
     bottom_limit = extremas[1] + (extremas[3] - extremas[1]) * (40 / 100)
     dynamic_threshold = False
     best_category, best_score = None, 0
     for i in range(2):
-        for line in doc:
+        for line_index, line in enumerate(doc):
             if len(line) > 0 and line[0][1][1] <= bottom_limit:
-                # build the string for the line
-                inp_str = " ".join(
-                    sublist[0] for sublist in line
-                )  # concate the words of the line separated by space
+                # the string of the line and its scores against all keywords
+                inp_str, token_set_scores, wratio_scores = line_scores[line_index]
                 # print(inp_str)
                 if (
                     len(inp_str) > 4
                 ):  # only processing the string if the length of the string is 5
-                    for label, keywords in category.items():
-                        # Using process.extractOne to find the best match within each category
-                        match1, score, idx1 = process.extractOne(
-                            inp_str,
-                            keywords,
-                            scorer=fuzz.token_set_ratio,
-                            processor=utils.default_process,
-                        )
-                        match2, score2, idx2 = process.extractOne(
-                            inp_str,
-                            keywords,
-                            scorer=fuzz.WRatio,
-                            processor=utils.default_process,
-                        )
+                    for label, start, end in matcher.labels:
+                        # best match within each category, the first one on ties like process.extractOne
+                        idx1 = start + int(np.argmax(token_set_scores[start:end]))
+                        idx2 = start + int(np.argmax(wratio_scores[start:end]))
+                        match1, score = keywords[idx1], float(token_set_scores[idx1])
+                        match2, score2 = keywords[idx2], float(wratio_scores[idx2])
                         # if label=="Bill Of Entry":
                         # print(match1,match2,score,score2,keywords[idx1],inp_str)
                         # print(score,score2,keywords[idx])
@@ -642,26 +730,55 @@ def find_location(text, category):
     return False
 
 
-def find_document_ids(doc, style_list, extremas, category, scan_threshold=40):
+# batched find_location, keyword scores come from the page scores and spaCy runs once over the remaining lines
+def find_locations(texts, wratio_scores):
+    locations = [False] * len(texts)
+    candidates = [
+        row
+        for row, scores in enumerate(wratio_scores)
+        if not (len(scores) > 0 and scores.max() > 90)
+    ]
+    docs = nlp.pipe((texts[row] for row in candidates), disable=NER_DISABLED)
+    for row, doc in zip(candidates, docs):
+        # Detect locations (GPE: Geopolitical Entity)
+        locations[row] = any(ent.label_ == "GPE" for ent in doc.ents)
+    return locations
+
+
+def find_document_ids(
+    doc,
+    style_list,
+    extremas,
+    category,
+    scan_threshold=40,
+    matcher=None,
+    line_scores=None,
+):
     if len(style_list) == 0:
         return 0
+    if line_scores is None:
+        if matcher is None:
+            matcher = get_keyword_matcher(category)
+        line_scores = matcher.score_page(doc, extremas)
 
     bottom_limit = extremas[1] + (extremas[3] - extremas[1]) * (40 / 100)
+    lines = [
+        line_scores[line_index]
+        for line_index, line in enumerate(doc)
+        if len(line) > 0 and line[0][1][1] <= bottom_limit
+    ]
+    texts = [inp_str for inp_str, _, _ in lines]
+    locations = find_locations(texts, [wratio_scores for _, _, wratio_scores in lines])
     all_line_text = []
-    for line in doc:
-        if len(line) > 0 and line[0][1][1] <= bottom_limit:
-            # build the string for the line
-            inp_str = " ".join(
-                sublist[0] for sublist in line
-            )  # concate the words of the line separated by space
-            if find_location(inp_str, category) == False:
-                avoiding_entity = detect_avoiding_entities(inp_str)
-                for entities in avoiding_entity.values():
-                    for ent in entities:
-                        if ent != None:
-                            # print("Phone/Date: ",ent)
-                            inp_str = inp_str.replace(ent, "")
-                all_line_text.append(inp_str)
+    for inp_str, location in zip(texts, locations):
+        if location == False:
+            avoiding_entity = detect_avoiding_entities(inp_str)
+            for entities in avoiding_entity.values():
+                for ent in entities:
+                    if ent != None:
+                        # print("Phone/Date: ",ent)
+                        inp_str = inp_str.replace(ent, "")
+            all_line_text.append(inp_str)
     return extract_ids(all_line_text)
 
 
@@ -1012,6 +1129,116 @@ def merge_dictionary(dict1, dict2):
     return merged_dict
 
 
+# classifies a single page, returns None when the page could not be classified
+# returns (label, title_prob, matrix_prob, matrix_status, page_number, doc_ids)
+def classify_page(path, category, memory_points, priority_direction, matcher):
+    try:
+        page, style_list, extremas = preprocessing_xml_withoutPrintArea(path)
+        # scored once, shared by predict_layout passes and find_document_ids
+        line_scores = matcher.score_page(page, extremas)
+        # predicting the class of the xml
+        matrix_prob = None
+        label, title_prob, matrix_prob, matrix_status = predict_layout(
+            page,
+            category,
+            memory_points,
+            style_list,
+            extremas,
+            priority_direction,
+            matcher=matcher,
+            line_scores=line_scores,
+        )
+        try:
+            if label == "Blank":
+                page_number = (None, None)
+            else:
+                page_number = predict_page_number(
+                    page, priority_direction["page_direction"], extremas
+                )
+        except:
+            page_number = (None, None)
+
+        if label == None:
+            label = "None"
+
+        doc_ids = None
+        try:
+            if len(style_list) > 0:
+                doc_ids = find_document_ids(
+                    page,
+                    style_list,
+                    extremas,
+                    category,
+                    matcher=matcher,
+                    line_scores=line_scores,
+                )
+        except:
+            doc_ids = None
+
+        return label, title_prob, matrix_prob, matrix_status, page_number, doc_ids
+    except:
+        return None
+
+
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+
+# returns the shared process pool used to classify pages
+def get_page_pool(workers):
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            # forkserver, forking the threaded consumer or a Django view could
+            # copy locks held by other threads. The server preloads this module,
+            # workers forked from it reuse its loaded spaCy model.
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+            _page_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _page_pool
+
+
+# drops a broken pool so the next document starts a new one
+def reset_page_pool():
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is not None:
+            _page_pool.shutdown(wait=False)
+        _page_pool = None
+
+
+# classifies the pages in the worker pool, results are in the order of paths
+def classify_pages(paths, category, memory_points, priority_direction, matcher):
+    workers = TITLE_CLASSIFICATION_WORKERS
+    if workers <= 0:
+        workers = min(os.cpu_count() or 1, 4)
+    if workers <= 1 or len(paths) < TITLE_CLASSIFICATION_PARALLEL_MIN_PAGES:
+        return [
+            classify_page(path, category, memory_points, priority_direction, matcher)
+            for path in paths
+        ]
+
+    try:
+        return list(
+            get_page_pool(workers).map(
+                classify_page,
+                paths,
+                [category] * len(paths),
+                [memory_points] * len(paths),
+                [priority_direction] * len(paths),
+                [matcher] * len(paths),
+                chunksize=max(len(paths) // (workers * 4), 1),
+            )
+        )
+    except BrokenProcessPool:
+        # a worker died (e.g. OOM), classify in process
+        reset_page_pool()
+        return [
+            classify_page(path, category, memory_points, priority_direction, matcher)
+            for path in paths
+        ]
+
+
 def predictLabel(
     file_path,
     page_range,
@@ -1027,79 +1254,26 @@ def predictLabel(
     without_split_labels = {}
     count = 1
     if type(file_path) == list:
-        for current_range in page_range:
-            page_details = {}
-            page_count = 0
+        matcher = get_keyword_matcher(category)
+        range_paths = [
+            file_path[current_range[0] - 1 : current_range[1]]
+            for current_range in page_range
+        ]
+        # pages are classified independently, only rel_score depends on the previous page
+        page_results = iter(
+            classify_pages(
+                [path for paths in range_paths for path in paths],
+                category,
+                memory_points,
+                priority_direction,
+                matcher,
+            )
+        )
+        for paths in range_paths:
             prev_doc_ids = None
-            for path in file_path[current_range[0] - 1 : current_range[1]]:
-                try:
-
-                    page, style_list, extremas = preprocessing_xml_withoutPrintArea(
-                        path
-                    )
-                    # predicting the class of the xml
-                    matrix_prob = None
-                    label, title_prob, matrix_prob, matrix_status = predict_layout(
-                        page,
-                        category,
-                        memory_points,
-                        style_list,
-                        extremas,
-                        priority_direction,
-                    )
-                    # print(title_prob,matrix_prob)
-                    try:
-                        if label == "Blank":
-                            page_number = (None, None)
-                        else:
-                            page_number = predict_page_number(
-                                page, priority_direction["page_direction"], extremas
-                            )
-                    except:
-                        page_number = (None, None)
-
-                    # print(count,path,label, page_number)
-                    if label == None:
-                        label = "None"
-
-                    rel_score = 0
-                    # print(current_doc_ids)
-                    try:
-                        if len(style_list) > 0:
-                            current_doc_ids = find_document_ids(
-                                page, style_list, extremas, category
-                            )
-                            # print(current_doc_ids)
-                            if prev_doc_ids != None:
-                                rel_score = check_relevency_with_previous_page(
-                                    prev_doc_ids, current_doc_ids
-                                )
-                            # print(count,file_path, label, page_number, rel_score, matrix_status)
-                            prev_doc_ids = current_doc_ids
-                    except:
-                        rel_score = 0
-
-                    page_details[page_count] = {
-                        "File_path": file_path,
-                        "label": label,
-                        "Score1": title_prob,
-                        "Score2": matrix_prob,
-                        "Page_number": page_number,
-                        "rel_score": rel_score,
-                        "used matrix": matrix_status,
-                    }
-
-                    details[count] = {
-                        "File_path": file_path,
-                        "label": label,
-                        "Score1": title_prob,
-                        "Score2": matrix_prob,
-                        "Page_number": page_number,
-                        "rel_score": rel_score,
-                        "used matrix": matrix_status,
-                    }
-                    count += 1
-                except:
+            for _ in paths:
+                result = next(page_results)
+                if result is None:
                     details[count] = {
                         "File_path": file_path,
                         "label": None,
@@ -1110,6 +1284,30 @@ def predictLabel(
                         "used matrix": 0,
                     }
                     count += 1
+                    continue
+
+                label, title_prob, matrix_prob, matrix_status, page_number, doc_ids = (
+                    result
+                )
+                rel_score = 0
+                # None when the ids could not be found, the page is then not compared
+                if doc_ids is not None:
+                    if prev_doc_ids != None:
+                        rel_score = check_relevency_with_previous_page(
+                            prev_doc_ids, doc_ids
+                        )
+                    prev_doc_ids = doc_ids
+
+                details[count] = {
+                    "File_path": file_path,
+                    "label": label,
+                    "Score1": title_prob,
+                    "Score2": matrix_prob,
+                    "Page_number": page_number,
+                    "rel_score": rel_score,
+                    "used matrix": matrix_status,
+                }
+                count += 1
 
         if len(details) > 0:
             if automatic_split == True:
@@ -44,6 +44,7 @@ import django
 django.setup()
 
 from handler import process_title_classification_task
+from job_tracing import traced_consumer
 
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST")
 RABBITMQ_PORT = os.getenv("RABBITMQ_PORT")
@@ -61,6 +62,7 @@ def ack_message(ch, delivery_tag):
         print("Channel is already closed, so we can't ACK this message")
 
 
+@traced_consumer
 def do_work(ch, method, properties, body):
     message_type = properties.content_type
 
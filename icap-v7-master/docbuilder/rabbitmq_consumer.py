@@ -40,6 +40,7 @@ from pika.exceptions import AMQPConnectionError, ConnectionClosedByBroker
 
 import flask_app
 from rabbitmq_publisher import publish
+from job_tracing import traced_consumer
 from timeout_utils import FunctionTimedOut, func_timeout
 
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST")
@@ -60,6 +61,7 @@ def ack_message(ch, delivery_tag):
         print("Channel is already closed, so we can't ACK this message")
 
 
+@traced_consumer
 def do_work(ch, method, properties, body):
     """Process the job based on message type"""
     message_type = properties.content_type
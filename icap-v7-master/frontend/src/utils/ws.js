@@ -38,6 +38,7 @@
  *   - `joinRoom`: Joins a WebSocket room, with subscription count management
  *   - `leaveRoom`: Leaves a WebSocket room, ensuring no active subscriptions remain
  *   - `messageHandler`: Processes incoming WebSocket messages and triggers events
+ *   - `expandEventData`: Expands throttled messages carrying several updates
  *   - `isConnectionHealthy`: Verifies if the WebSocket connection is active
  *   - `resolvePendingOperations`: Resolves queued operations once the connection is healthy
  *   - `pendingOperations`: Queue for pending room join/leave operations
@@ -82,11 +83,19 @@ const isConnectionHealthy = () => {
   return connection && connection.readyState === 1
 }
 
-// Enhanced message handler with AI agent support
-const messageHandler = event => {
-  const eventData = JSON.parse(event.data)
+// Throttled messages carry several updates in `items`, with the fields shared by
+// all of them sent once in `common`. Rebuild the full objects in arrival order.
+const expandEventData = eventData => {
+  if (!Array.isArray(eventData.items)) {
+    return [eventData.data]
+  }
 
-  // Emit events based on the message type
+  const common = eventData.common || {}
+  return eventData.items.map(item => ({ ...common, ...item }))
+}
+
+// Emit events based on the message type
+const emitEvent = eventData => {
   switch (eventData.type) {
     case 'batch_status':
       bus.$emit('wsData/batchStatus', eventData.data)
@@ -120,6 +129,15 @@ const messageHandler = event => {
   }
 }
 
+// Enhanced message handler with AI agent support
+const messageHandler = event => {
+  const eventData = JSON.parse(event.data)
+
+  expandEventData(eventData).forEach(data => {
+    emitEvent({ ...eventData, data })
+  })
+}
+
 // Function to join a WebSocket room
 const joinRoom = roomName => {
   if (!isConnectionHealthy()) {
@@ -0,0 +1,391 @@
+"""
+Django command to run a local fake Microsoft Graph server.
+
+Serves the token endpoints, mail folder and drive delta queries, $batch and
+the downloads used by the input channels, so paging, throttling (429 with
+Retry-After) and delta token resets can be exercised offline:
+
+    python manage.py fake_graph_server --port 8443 --certfile cert.pem --keyfile key.pem
+
+    GRAPH_BASE_URL=https://localhost:8443/v1.0
+    GRAPH_AUTHORITY_HOST=https://localhost:8443
+    REQUESTS_CA_BUNDLE=cert.pem  (msal only accepts https authorities)
+
+Test data is added through the /_fake endpoints:
+
+    POST /_fake/messages {"mailbox": "a@b.com", "count": 30}
+    POST /_fake/files {"owner": "sites/demo", "folder": "Shared Documents/In", "names": ["a.pdf"]}
+    POST /_fake/reset-delta      every issued delta token answers 410 Gone
+    GET  /_fake/stats            request counts
+"""
+import base64
+import json
+import ssl
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from django.core.management.base import BaseCommand
+
+FAKE_HOST = "contoso.sharepoint.com"
+
+
+class FakeGraph:
+    """In-memory mailboxes and drives with a change sequence for delta queries"""
+
+    def __init__(self, page_size, throttle_every):
+        self.page_size = page_size
+        self.throttle_every = throttle_every
+        self.lock = threading.Lock()
+        self.sequence = 0
+        # Delta tokens issued before this sequence are expired (410)
+        self.min_delta_token = 0
+        self.requests = 0
+        self.throttled = 0
+        self.messages = {}  # id -> message
+        self.items = {}  # id -> drive item
+
+    def next_sequence(self):
+        self.sequence += 1
+        return self.sequence
+
+    def should_throttle(self):
+        self.requests += 1
+        if self.throttle_every and self.requests % self.throttle_every == 0:
+            self.throttled += 1
+            return True
+        return False
+
+    def add_messages(self, mailbox, count):
+        ids = []
+        for _ in range(count):
+            message_id = uuid.uuid4().hex
+            self.messages[message_id] = {
+                "id": message_id,
+                "mailbox": mailbox.lower(),
+                "folder": "inbox",
+                "isRead": False,
+                "from": {"emailAddress": {"address": "sender@example.com"}},
+                "changed": self.next_sequence(),
+                "mime": (
+                    f"From: sender@example.com\r\nTo: {mailbox}\r\n"
+                    f"Subject: Fake {message_id}\r\n\r\nBody {message_id}\r\n"
+                ).encode("utf-8"),
+            }
+            ids.append(message_id)
+        return ids
+
+    def get_folder(self, owner, path):
+        """Drive folder item of an owner ('sites/<name>' or 'users/<email>'), created on demand"""
+        parent_id = None
+        current = ""
+        for name in [part for part in path.split("/") if part]:
+            current = f"{current}/{name}" if current else name
+            folder = next(
+                (
+                    item for item in self.items.values()
+                    if item["owner"] == owner and item["path"] == current and "folder" in item
+                ),
+                None,
+            )
+            if folder is None:
+                folder = self.add_item(owner, current, parent_id, folder=True)
+            parent_id = folder["id"]
+        return self.items[parent_id]
+
+    def add_item(self, owner, path, parent_id, folder=False):
+        item_id = uuid.uuid4().hex
+        parent_path = path.rsplit("/", 1)[0] if "/" in path else ""
+        if owner.startswith("sites/"):
+            web_url = f"https://{FAKE_HOST}/{owner}/{path}"
+        else:
+            web_url = f"https://{FAKE_HOST}/personal/{owner.split('/', 1)[1]}/{path}"
+        item = {
+            "id": item_id,
+            "owner": owner,
+            "path": path,
+            "name": path.rsplit("/", 1)[-1],
+            "webUrl": web_url,
+            "parentReference": {
+                "id": parent_id,
+                "path": f"/drives/{owner.replace('/', '_')}/root:/{parent_path}".rstrip("/"),
+            },
+            "createdBy": {"user": {"email": owner.split("/", 1)[1]}},
+            "changed": self.next_sequence(),
+        }
+        item["folder" if folder else "file"] = {}
+        self.items[item_id] = item
+        return item
+
+    def add_files(self, owner, folder_path, names):
+        folder = self.get_folder(owner, folder_path)
+        return [
+            self.add_item(owner, f"{folder['path']}/{name}", folder["id"])["id"]
+            for name in names
+        ]
+
+    def get_item_json(self, item):
+        data = {key: value for key, value in item.items() if key not in ("owner", "path", "changed")}
+        if "folder" in item:
+            data["folder"] = {
+                "childCount": sum(
+                    1 for child in self.items.values()
+                    if child["parentReference"]["id"] == item["id"]
+                )
+            }
+        return data
+
+    def get_delta_page(self, changes, token, skip, base_url):
+        """One page of a delta response, the last page carries the deltaLink"""
+        page = changes[skip : skip + self.page_size]
+        response = {"value": page}
+        if skip + self.page_size < len(changes):
+            response["@odata.nextLink"] = f"{base_url}?$skiptoken={token}.{skip + self.page_size}"
+        else:
+            response["@odata.deltaLink"] = f"{base_url}?$deltatoken={self.sequence}"
+        return response
+
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    graph = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, data, headers=None):
+        self.send_body(status, json.dumps(data).encode("utf-8"), "application/json", headers)
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        # Token requests are form encoded, their content is not used
+        if not body or "json" not in (self.headers.get("Content-Type") or ""):
+            return {}
+        return json.loads(body)
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_PATCH(self):
+        self.handle_request("PATCH")
+
+    def handle_request(self, method):
+        parsed = urlparse(self.path)
+        path = unquote(parsed.path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        body = self.read_json() if method in ("POST", "PATCH") else {}
+
+        with self.graph.lock:
+            if path.startswith("/_fake/"):
+                status, data, content_type = self.handle_fake(method, path, body)
+            elif "/oauth2/v2.0/token" in path or path.endswith("/.well-known/openid-configuration"):
+                status, data, content_type = self.handle_auth(path)
+            elif self.graph.should_throttle():
+                self.send_json(429, {"error": {"code": "TooManyRequests"}}, {"Retry-After": "1"})
+                return
+            elif path == "/v1.0/$batch":
+                status, data, content_type = self.handle_batch(body)
+            else:
+                status, data, content_type = self.route(method, path[len("/v1.0"):], query, body)
+
+        if content_type == "application/json":
+            self.send_json(status, data)
+        else:
+            self.send_body(status, data, content_type)
+
+    def get_base_url(self):
+        scheme = "https" if isinstance(self.connection, ssl.SSLSocket) else "http"
+        return f"{scheme}://{self.headers['Host']}"
+
+    def handle_auth(self, path):
+        tenant = path.strip("/").split("/")[0]
+        base = f"{self.get_base_url()}/{tenant}"
+        if path.endswith("/.well-known/openid-configuration"):
+            return 200, {
+                "issuer": f"{base}/v2.0",
+                "authorization_endpoint": f"{base}/oauth2/v2.0/authorize",
+                "token_endpoint": f"{base}/oauth2/v2.0/token",
+                "device_authorization_endpoint": f"{base}/oauth2/v2.0/devicecode",
+            }, "application/json"
+        return 200, {
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "access_token": uuid.uuid4().hex,
+        }, "application/json"
+
+    def handle_fake(self, method, path, body):
+        graph = self.graph
+        if path == "/_fake/messages":
+            return 200, {"ids": graph.add_messages(body["mailbox"], body.get("count", 1))}, "application/json"
+        if path == "/_fake/files":
+            return 200, {"ids": graph.add_files(body["owner"], body["folder"], body["names"])}, "application/json"
+        if path == "/_fake/reset-delta":
+            graph.min_delta_token = graph.next_sequence()
+            return 200, {"min_delta_token": graph.min_delta_token}, "application/json"
+        if path == "/_fake/stats":
+            return 200, {"requests": graph.requests, "throttled": graph.throttled}, "application/json"
+        return 404, {"error": {"code": "NotFound"}}, "application/json"
+
+    def handle_batch(self, body):
+        responses = []
+        for request in body.get("requests", []):
+            inner = urlparse(request["url"])
+            query = {key: values[0] for key, values in parse_qs(inner.query).items()}
+            if self.graph.throttle_every and self.graph.should_throttle():
+                responses.append({"id": request["id"], "status": 429, "headers": {"Retry-After": "1"}})
+                continue
+            status, data, content_type = self.route(
+                request["method"], unquote(inner.path), query, request.get("body") or {}
+            )
+            if content_type != "application/json":
+                data = base64.b64encode(data).decode("ascii")
+            responses.append(
+                {"id": request["id"], "status": status, "headers": {"Content-Type": content_type}, "body": data}
+            )
+        return 200, {"responses": responses}, "application/json"
+
+    def route(self, method, path, query, body):
+        graph = self.graph
+        parts = path.strip("/").split("/")
+        not_found = (404, {"error": {"code": "itemNotFound"}}, "application/json")
+
+        # /users/{mailbox}/mailFolders/{folder}/messages/delta
+        if len(parts) == 6 and parts[0] == "users" and parts[2] == "mailFolders" and parts[5] == "delta":
+            mailbox, folder = parts[1].lower(), parts[3].lower()
+            return self.message_delta(mailbox, folder, query, path)
+
+        # /users/{mailbox}/messages/{id}[/$value|/move]
+        if len(parts) >= 4 and parts[0] == "users" and parts[2] == "messages":
+            message = graph.messages.get(parts[3])
+            if message is None:
+                return not_found
+            if len(parts) == 5 and parts[4] == "$value":
+                return 200, message["mime"], "message/rfc822"
+            if len(parts) == 5 and parts[4] == "move" and method == "POST":
+                message["folder"] = body.get("destinationId", "archive").lower()
+                message["changed"] = graph.next_sequence()
+                return 201, {"id": message["id"]}, "application/json"
+            if method == "PATCH":
+                message.update({key: value for key, value in body.items() if key == "isRead"})
+                message["changed"] = graph.next_sequence()
+            return 200, {key: message[key] for key in ("id", "isRead", "from")}, "application/json"
+
+        # /shares/u!{encoded}/driveItem
+        if len(parts) == 3 and parts[0] == "shares":
+            encoded = parts[1][2:]
+            url = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode("utf-8")
+            item = next((i for i in graph.items.values() if i["webUrl"] == url), None)
+            return (200, graph.get_item_json(item), "application/json") if item else not_found
+
+        # /sites/{host}:/sites/{name}
+        if parts[0] == "sites" and len(parts) == 4 and parts[1].endswith(":"):
+            return 200, {"id": parts[3]}, "application/json"
+
+        # /{sites|users}/{owner}/drive/...
+        if len(parts) >= 4 and parts[0] in ("sites", "users") and parts[2] == "drive":
+            owner = f"{parts[0]}/{parts[1]}"
+            rest = "/".join(parts[3:])
+            if rest == "root/delta":
+                return self.drive_delta(owner, query, path)
+            if rest.startswith("root:/") and rest.endswith(":/children"):
+                folder_path = rest[len("root:/") : -len(":/children")]
+                folder = graph.get_folder(owner, folder_path)
+                children = [
+                    graph.get_item_json(i) for i in graph.items.values()
+                    if i["parentReference"]["id"] == folder["id"]
+                ]
+                return 200, {"value": children}, "application/json"
+            if len(parts) == 6 and parts[3] == "items" and parts[5] == "content":
+                item = graph.items.get(parts[4])
+                return (200, f"content of {item['name']}".encode("utf-8"), "application/octet-stream") if item else not_found
+
+        return not_found
+
+    def check_delta_token(self, query):
+        """Returns (token, skip), token None when expired"""
+        if "$skiptoken" in query:
+            token, skip = query["$skiptoken"].split(".")
+            token, skip = int(token), int(skip)
+        else:
+            token, skip = int(query.get("$deltatoken", 0)), 0
+        if token and token < self.graph.min_delta_token:
+            return None, 0
+        return token, skip
+
+    def message_delta(self, mailbox, folder, query, path):
+        token, skip = self.check_delta_token(query)
+        if token is None:
+            return 410, {"error": {"code": "syncStateNotFound"}}, "application/json"
+
+        changes = []
+        for message in sorted(self.graph.messages.values(), key=lambda m: m["changed"]):
+            if message["mailbox"] != mailbox or message["changed"] <= token:
+                continue
+            if message["folder"] == folder:
+                changes.append({key: message[key] for key in ("id", "isRead", "from")})
+            elif token:
+                changes.append({"id": message["id"], "@removed": {"reason": "deleted"}})
+        return 200, self.graph.get_delta_page(changes, token, skip, f"{self.get_base_url()}/v1.0{path}"), "application/json"
+
+    def drive_delta(self, owner, query, path):
+        if query.get("token") == "latest":
+            return 200, {"value": [], "@odata.deltaLink": f"{self.get_base_url()}/v1.0{path}?$deltatoken={self.graph.sequence}"}, "application/json"
+        token, skip = self.check_delta_token(query)
+        if token is None:
+            return 410, {"error": {"code": "resyncRequired"}}, "application/json"
+
+        changes = [
+            self.graph.get_item_json(item)
+            for item in sorted(self.graph.items.values(), key=lambda i: i["changed"])
+            if item["owner"] == owner and item["changed"] > token
+        ]
+        return 200, self.graph.get_delta_page(changes, token, skip, f"{self.get_base_url()}/v1.0{path}"), "application/json"
+
+
+class Command(BaseCommand):
+    """Django command to run a fake Graph server."""
+
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8443)
+        parser.add_argument("--certfile", help="Serve https, needed by msal")
+        parser.add_argument("--keyfile")
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument(
+            "--throttle-every", type=int, default=0,
+            help="Answer every Nth Graph request with 429 Retry-After: 1",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        handler = type(
+            "Handler",
+            (FakeGraphHandler,),
+            {"graph": FakeGraph(options["page_size"], options["throttle_every"])},
+        )
+        server = ThreadingHTTPServer((options["host"], options["port"]), handler)
+        if options["certfile"]:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(options["certfile"], options["keyfile"])
+            server.socket = context.wrap_socket(server.socket, server_side=True)
+
+        self.stdout.write(f"Fake Graph server on {options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
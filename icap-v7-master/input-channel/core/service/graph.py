@@ -1,13 +1,50 @@
 import os
 import msal
 import time
+import base64
+import hashlib
+import threading
 import requests
 
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", 3))
 GRAPH_TIMEOUT = int(os.getenv("GRAPH_TIMEOUT", 30))
+GRAPH_BASE_URL = os.getenv("GRAPH_BASE_URL")
+# Overridden to run against a local fake Graph server (manage.py fake_graph_server)
+GRAPH_AUTHORITY_HOST = os.getenv("GRAPH_AUTHORITY_HOST", "https://login.microsoftonline.com")
+# Tokens are reused until this many seconds before they expire
+GRAPH_TOKEN_REFRESH_MARGIN = int(os.getenv("GRAPH_TOKEN_REFRESH_MARGIN", 300))
+# Requests per $batch call, 20 is the Graph limit
+GRAPH_BATCH_SIZE = 20
 
 _session = requests.Session()
 
+# msal applications and access tokens shared by every client of the same app,
+# clients are created per job and would otherwise authenticate every time
+_applications = {}
+_tokens = {}
+_cache_lock = threading.Lock()
+
+
+def filter_files(files, extensions=None):
+    """Keep files (not folders) with one of the extensions"""
+    if extensions:
+        extensions = [ext.lower() for ext in extensions]
+        files = [
+            f for f in files
+            if "file" in f  # ensure it's a file, not folder
+            and any(f["name"].lower().endswith(ext) for ext in extensions)
+        ]
+    return files
+
+
+def get_batch_content(response):
+    """Body of a $batch response, non JSON bodies are base64 encoded by Graph"""
+    body = response.get("body")
+    if isinstance(body, str):
+        return base64.b64decode(body)
+    return body
+
+
 class GraphClient:
     def __init__(self, client_id, client_secret, tenant_id=None):
         if not (client_id and client_secret):
@@ -18,30 +55,52 @@ class GraphClient:
         self._tenant_id = tenant_id
 
         if self._tenant_id:
-            self._authority = f"https://login.microsoftonline.com/{self._tenant_id}"
+            self._authority = f"{GRAPH_AUTHORITY_HOST}/{self._tenant_id}"
         else:
-            self._authority = "https://login.microsoftonline.com/common"
-
-        self._token_cache = msal.SerializableTokenCache()
-        self._cca = msal.ConfidentialClientApplication(
-            client_id=self._client_id,
-            client_credential=self._client_secret,
-            authority=self._authority,
-            token_cache=self._token_cache
-        )
+            self._authority = f"{GRAPH_AUTHORITY_HOST}/common"
+
+        secret_hash = hashlib.sha256(self._client_secret.encode("utf-8")).hexdigest()
+        self._cache_key = (self._authority, self._client_id, secret_hash)
+
+        with _cache_lock:
+            cca = _applications.get(self._cache_key)
+            if cca is None:
+                cca = msal.ConfidentialClientApplication(
+                    client_id=self._client_id,
+                    client_credential=self._client_secret,
+                    authority=self._authority,
+                    token_cache=msal.SerializableTokenCache(),
+                    instance_discovery=GRAPH_AUTHORITY_HOST == "https://login.microsoftonline.com",
+                )
+                _applications[self._cache_key] = cca
+        self._cca = cca
 
     def _get_token(self, scopes=None):
-        # Try silent first
         if scopes is None:
             scopes = ["https://graph.microsoft.com/.default"]
-        result = self._cca.acquire_token_silent(scopes, account=None)
-        if not result:
-            result = self._cca.acquire_token_for_client(scopes=scopes)
+
+        key = (*self._cache_key, tuple(scopes))
+        with _cache_lock:
+            token = _tokens.get(key)
+        if token and token["expires_at"] - GRAPH_TOKEN_REFRESH_MARGIN > time.time():
+            return token["access_token"]
+
+        result = self._cca.acquire_token_for_client(scopes=scopes)
         if "access_token" not in result:
             raise RuntimeError(result)
 
+        with _cache_lock:
+            _tokens[key] = {
+                "access_token": result["access_token"],
+                "expires_at": time.time() + int(result.get("expires_in", 0)),
+            }
         return result["access_token"]
 
+    def _drop_token(self):
+        with _cache_lock:
+            for key in [key for key in _tokens if key[:3] == self._cache_key]:
+                del _tokens[key]
+
     def _request(self, method, url, **kwargs):
         token = self._get_token()
         headers = kwargs.pop("headers", {})
@@ -62,14 +121,89 @@ class GraphClient:
             if 200 <= response.status_code < 300:
                 return response
 
+            # Cached token revoked before its expiry, authenticate again
+            if response.status_code == 401 and attempt == 1:
+                self._drop_token()
+                headers["Authorization"] = f"Bearer {self._get_token()}"
+                continue
+
             try:
                 body = response.json()
             except Exception:
                 body = response.text
             print("Graph request failed (%s): %s", response.status_code, body)
 
+            # Expired delta links and other client errors do not succeed on retry
+            if 400 <= response.status_code < 500:
+                break
+
         return response
 
+    def _get_delta(self, initial_url, delta_link=None, headers=None):
+        """
+        Follow a delta query through all of its pages.
+
+        Starts from the stored delta_link, or from initial_url on the first
+        sync and when Graph no longer knows the delta token (410 Gone).
+        Returns the changed items and the deltaLink of the next sync.
+        """
+        items = []
+        url = delta_link or initial_url
+        can_resync = delta_link is not None
+        while True:
+            response = self._request("GET", url, headers=dict(headers or {}))
+            if response.status_code == 410 and can_resync:
+                print("Graph delta token expired, full resync: %s", initial_url)
+                items, url, can_resync = [], initial_url, False
+                continue
+            if not response.ok:
+                raise RuntimeError(response.json())
+
+            data = response.json()
+            items.extend(data.get("value", []))
+            if "@odata.nextLink" in data:
+                url = data["@odata.nextLink"]
+            else:
+                return items, data.get("@odata.deltaLink")
+
+    def _batch(self, batch_requests):
+        """
+        Run requests through $batch, GRAPH_BATCH_SIZE per call.
+
+        Returns the responses by request id, throttled requests are sent
+        again after their Retry-After.
+        """
+        responses = {}
+        for start in range(0, len(batch_requests), GRAPH_BATCH_SIZE):
+            pending = batch_requests[start : start + GRAPH_BATCH_SIZE]
+            for attempt in range(1, MAX_RETRIES + 1):
+                response = self._request(
+                    "POST",
+                    f"{GRAPH_BASE_URL}/$batch",
+                    json={"requests": pending},
+                    headers={"Content-Type": "application/json"},
+                )
+                if not response.ok:
+                    raise RuntimeError(response.json())
+
+                requests_by_id = {request["id"]: request for request in pending}
+                throttled, retry_after = [], 1
+                for item in response.json().get("responses", []):
+                    if item["status"] in (429, 503, 504) and attempt < MAX_RETRIES:
+                        throttled.append(requests_by_id[item["id"]])
+                        item_retry_after = str(item.get("headers", {}).get("Retry-After", ""))
+                        if item_retry_after.isdigit():
+                            retry_after = max(retry_after, int(item_retry_after))
+                    else:
+                        responses[item["id"]] = item
+
+                if not throttled:
+                    break
+                time.sleep(retry_after)
+                pending = throttled
+
+        return responses
+
     def to_dict(self):
         return {
             "client_id": self._client_id,
@@ -1,7 +1,10 @@
 import os
-from .graph import GraphClient
+from .graph import GraphClient, get_batch_content
 
 GRAPH_BASE_URL = os.getenv("GRAPH_BASE_URL")
+# Mail folder synced with delta queries
+OUTLOOK_DELTA_FOLDER = os.getenv("OUTLOOK_DELTA_FOLDER", "inbox")
+EML_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 class OutlookService(GraphClient):
     def get_unread_emails(self, mailbox):
@@ -12,6 +15,46 @@ class OutlookService(GraphClient):
         messages = response.json().get("value", [])
         return messages
 
+    def get_new_emails(self, mailbox, delta_link=None):
+        """
+        Get unread emails received or changed since delta_link.
+        Returns the emails and the deltaLink of the next sync.
+        """
+        initial_url = (
+            f"{GRAPH_BASE_URL}/users/{mailbox}/mailFolders/{OUTLOOK_DELTA_FOLDER}"
+            "/messages/delta?$select=id,isRead,from"
+        )
+        headers = {"Prefer": "odata.maxpagesize=100"}
+        changes, delta_link = self._get_delta(initial_url, delta_link, headers=headers)
+
+        messages = [
+            msg for msg in changes
+            if "@removed" not in msg
+            and not msg.get("isRead")
+            and (msg.get("from") or {}).get("emailAddress", {}).get("address", "").lower()
+            != mailbox.lower()
+        ]
+        return messages, delta_link
+
+    def fetch_emails(self, mailbox, message_ids):
+        """Fetch eml messages through $batch, messages that failed are left out"""
+        batch_requests = [
+            {
+                "id": str(index),
+                "method": "GET",
+                "url": f"/users/{mailbox}/messages/{message_id}/$value",
+            }
+            for index, message_id in enumerate(message_ids)
+        ]
+        responses = self._batch(batch_requests)
+
+        emails = {}
+        for index, message_id in enumerate(message_ids):
+            response = responses.get(str(index))
+            if response and 200 <= response["status"] < 300:
+                emails[message_id] = get_batch_content(response)
+        return emails
+
     def fetch_email(self, mailbox, message_id):
         """Fetch eml message"""
         url = f"{GRAPH_BASE_URL}/users/{mailbox}/messages/{message_id}/$value"
@@ -19,6 +62,19 @@ class OutlookService(GraphClient):
         response = self._request("GET", url, headers=headers)
         return response.content
 
+    def download_email(self, mailbox, message_id, path):
+        """Stream eml message to path without loading it in memory"""
+        url = f"{GRAPH_BASE_URL}/users/{mailbox}/messages/{message_id}/$value"
+        headers={"Accept": "message/rfc822"}
+        response = self._request("GET", url, headers=headers, stream=True)
+        with response:
+            if not response.ok:
+                raise RuntimeError(response.text)
+            with open(path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=EML_DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        return path
+
     def mark_read(self, mailbox, message_id):
         """Mark the mail as read"""
         url = f"{GRAPH_BASE_URL}/users/{mailbox}/messages/{message_id}"
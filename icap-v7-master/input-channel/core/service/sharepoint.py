@@ -1,5 +1,5 @@
 import os
-from .graph import GraphClient
+from .graph import GraphClient, filter_files
 
 GRAPH_BASE_URL = os.getenv("GRAPH_BASE_URL")
 
@@ -22,16 +22,29 @@ class SharePointService(GraphClient):
         url = f"{GRAPH_BASE_URL}/sites/{site_id}/drive/root:/{folder_path}:/children"
         response = self._request("GET", url)
         files = response.json().get("value", [])
+        return filter_files(files, extensions)
 
-        if extensions:
-            extensions = [ext.lower() for ext in extensions]
-            files = [
-                f for f in files
-                if "file" in f  # ensure it's a file, not folder
-                and any(f["name"].lower().endswith(ext) for ext in extensions)
-            ]
+    def get_new_files(self, site_id, folder_id, folder_path, extensions=None, delta_link=None):
+        """
+        Get files added to or changed in the folder since delta_link.
+        Returns the files and the deltaLink of the next sync.
+        """
+        if delta_link is None:
+            # First sync, the folder is listed and changes are tracked from now on
+            url = f"{GRAPH_BASE_URL}/sites/{site_id}/drive/root/delta?token=latest"
+            _, delta_link = self._get_delta(url)
+            files = self.list_files(site_id, folder_path, extensions=extensions)
+            return files, delta_link
 
-        return files
+        # Delta is only supported on the drive root, items are matched by parent id
+        initial_url = f"{GRAPH_BASE_URL}/sites/{site_id}/drive/root/delta"
+        changes, delta_link = self._get_delta(initial_url, delta_link)
+        files = [
+            item for item in changes
+            if "deleted" not in item
+            and item.get("parentReference", {}).get("id") == folder_id
+        ]
+        return filter_files(files, extensions), delta_link
 
     def download_file(self, site_id, file_id):
         """Download file from SharePoint"""
@@ -4,6 +4,7 @@ from celery import shared_task
 from django.conf import settings
 from rabbitmq_publisher import publish
 from core.utils.utils import get_config_data
+from core.utils.process_basic_auth import is_mailbox_polling
 from utils.redis_utils import gerenate_job_id
 from utils.logger_config import get_logger
 
@@ -70,6 +71,11 @@ def read_basic_email():
 
             auth_method = config.get("authMethod")
             if auth_method == "BasicAuth":
+                # Still downloading from the previous run, polled again next time
+                if is_mailbox_polling(config.get("email")):
+                    logger.info(f"Mailbox of '{project}' is still being polled, skipping...")
+                    continue
+
                 job_id = gerenate_job_id()
                 redis_instance.set(job_id, json.dumps(config))
 
@@ -1,4 +1,7 @@
+import os
+import re
 import json
+import uuid
 import imaplib
 from core.models import ProcessLog
 from rabbitmq_publisher import publish
@@ -8,75 +11,283 @@ from utils.logger_config import get_logger
 
 logger = get_logger(__name__)
 
-def process_basic_auth(data):
-    try:
-        job_id = data["job_id"]
-        project = data["project"]
+# Messages downloaded per FETCH round trip, bounded by count and by size
+IMAP_FETCH_BATCH_SIZE = int(os.getenv("IMAP_FETCH_BATCH_SIZE", "25"))
+IMAP_FETCH_BATCH_BYTES = int(os.getenv("IMAP_FETCH_BATCH_BYTES", 50 * 1024 * 1024))
+# A mailbox is polled by one consumer at a time, the lock expires if a poll dies
+IMAP_POLL_LOCK_TIMEOUT = int(os.getenv("IMAP_POLL_LOCK_TIMEOUT", "900"))
+# Polls a failing message is downloaded again before it is flagged and skipped
+IMAP_MAX_ATTEMPTS = int(os.getenv("IMAP_MAX_ATTEMPTS", "3"))
 
-        config = get_redis_data(job_id)
-        redis_instance.delete(job_id)
+MAILBOX_STATE_KEY = "imap_state:{server}:{mailbox}"
+MAILBOX_LOCK_KEY = "lock:basic_auth:{mailbox}"
 
-        mailbox = config["email"]
-        mail = imaplib.IMAP4_SSL(config["server"], config["port"])
-        mail.login(config["email"], config["password"])
-        mail.select("inbox")
+# Deletes the lock only if it is still held by this poll, not by one started
+# after it expired
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+FETCH_START = re.compile(rb"^\d+ \(")
+FETCH_UID = re.compile(rb"UID (\d+)")
+FETCH_SIZE = re.compile(rb"RFC822\.SIZE (\d+)")
+
+
+def get_message_set(uids):
+    """Compress uids into an IMAP message set, e.g. [1, 2, 3, 7] -> '1:3,7'"""
+    ranges = []
+    for uid in sorted(uids):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(start) if start == end else f"{start}:{end}" for start, end in ranges)
+
+
+def parse_fetch_response(response):
+    """Map uid to the size and content of a UID FETCH response"""
+    messages = {}
+    current = None
+    for item in response:
+        if isinstance(item, tuple):
+            header, literal = item[0], item[1]
+        elif isinstance(item, bytes):
+            header, literal = item, None
+        else:
+            continue
+
+        # Continuation lines (e.g. ' UID 12)') belong to the previous message
+        if FETCH_START.match(header):
+            current = {}
+        if current is None:
+            continue
+
+        uid = FETCH_UID.search(header)
+        if uid:
+            messages[int(uid.group(1))] = current
+        size = FETCH_SIZE.search(header)
+        if size:
+            current["size"] = int(size.group(1))
+        if literal is not None:
+            current["content"] = literal
+    return messages
+
+
+def get_uidvalidity(mail):
+    """UIDVALIDITY of the selected mailbox, None if the server did not send it"""
+    _, response = mail.response("UIDVALIDITY")
+    if response and response[0]:
+        return int(response[0])
+    return None
+
+
+def get_mailbox_state(state_key):
+    state = redis_instance.get(state_key)
+    return json.loads(state) if state else None
+
+
+def search_new_messages(mail, state, uidvalidity):
+    """
+    Uids of the unread messages received since the last poll.
+
+    The full UNSEEN scan is only done on the first poll of a mailbox or when
+    its UIDVALIDITY changed, stored uids are meaningless then.
+    """
+    if state and uidvalidity is not None and state["uidvalidity"] == uidvalidity:
+        last_uid = state["last_uid"]
+        _, response = mail.uid("SEARCH", None, "UNSEEN", "UID", f"{last_uid + 1}:*")
+        # 'n:*' always matches the last message, even when its uid is below n
+        return [uid for uid in map(int, response[0].split()) if uid > last_uid]
+
+    _, response = mail.uid("SEARCH", None, "UNSEEN")
+    return [int(uid) for uid in response[0].split()]
+
+
+def get_fetch_batches(mail, uids):
+    """Group uids into FETCH batches using the message sizes"""
+    sizes = {}
+    for start in range(0, len(uids), 500):
+        message_set = get_message_set(uids[start : start + 500])
+        _, response = mail.uid("FETCH", message_set, "(UID RFC822.SIZE)")
+        for uid, attributes in parse_fetch_response(response).items():
+            sizes[uid] = attributes.get("size", 0)
+
+    batches = []
+    batch, batch_bytes = [], 0
+    for uid in uids:
+        size = sizes.get(uid, 0)
+        if batch and (
+            len(batch) >= IMAP_FETCH_BATCH_SIZE
+            or batch_bytes + size > IMAP_FETCH_BATCH_BYTES
+        ):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(uid)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def process_message(project, mailbox, log_instance, eml_content):
+    """Save the message and hand it over to the pipeline"""
+    email_path = save_eml_file(mailbox, eml_content)
+    log_instance.status = "downloaded"
+    log_instance.path = email_path
+    log_instance.save(update_fields=["status", "path"])
 
-        _, response = mail.search(None, 'UNSEEN')
-        messages = response[0].split()
+    job_id = gerenate_job_id()
+    data = {
+        "log_id": log_instance.id,
+        "input_channel": "basicauth"
+    }
+    redis_instance.set(job_id, json.dumps(data))
 
-        logger.info(f"{len(messages)} unread emails found")
+    request_data = {
+        "job_id": job_id,
+        "file_path": email_path,
+        "input_channel": "email",
+        "project": project
+    }
+    publish("start_transaction_process", "to_pipeline", request_data)
 
-        for msg in messages:
-            log_instance = ProcessLog.objects.create(
+
+def set_log_error(log_instance, ex):
+    logger.error(str(ex))
+    log_instance.status = "error"
+    log_instance.message="Somethings Went Wrong"
+    log_instance.remarks=str(ex)
+    log_instance.save(update_fields=["status", "message", "remarks"])
+
+
+def process_mailbox(mail, project, mailbox, server):
+    """Download the new messages of the selected mailbox in batches"""
+    state_key = MAILBOX_STATE_KEY.format(server=server, mailbox=mailbox)
+    uidvalidity = get_uidvalidity(mail)
+    state = get_mailbox_state(state_key)
+    if state and state["uidvalidity"] == uidvalidity:
+        last_uid = state["last_uid"]
+        # Failed attempts per uid, json keys are strings
+        attempts = state.get("attempts", {})
+    else:
+        last_uid, attempts = 0, {}
+
+    uids = search_new_messages(mail, state, uidvalidity)
+    logger.info(f"{len(uids)} unread emails found")
+    # Lowest uid not handed over, the high-water mark stays below it
+    first_failed = None
+
+    for batch in get_fetch_batches(mail, uids):
+        log_instances = {
+            uid: ProcessLog.objects.create(
                 project=project,
                 service="BasicAuth",
                 mailbox=mailbox,
                 status="queued",
             )
+            for uid in batch
+        }
+        try:
+            # PEEK, messages are flagged once handed over to the pipeline
+            _, response = mail.uid("FETCH", get_message_set(batch), "(UID BODY.PEEK[])")
+            messages = parse_fetch_response(response)
+        except Exception as ex:
+            for log_instance in log_instances.values():
+                set_log_error(log_instance, ex)
+            # The batch is fetched again on the next poll
+            break
+
+        processed, failed = [], []
+        for uid in batch:
+            log_instance = log_instances[uid]
             try:
-                _, email_data = mail.fetch(msg, '(RFC822)')
-
-                for data in email_data:
-                    if isinstance(data, tuple):
-                        eml_content = data[1]
-
-                email_path = save_eml_file(mailbox, eml_content)
-                log_instance.status = "downloaded"
-                log_instance.path = email_path
-                log_instance.save(update_fields=["status", "path"])
-
-                job_id = gerenate_job_id()
-                data = {
-                    "log_id": log_instance.id,
-                    "input_channel": "basicauth"
-                }
-                redis_instance.set(job_id, json.dumps(data))
-
-                request_data = {
-                    "job_id": job_id,
-                    "file_path": email_path,
-                    "input_channel": "email",
-                    "project": project
-                }
-                publish("start_transaction_process", "to_pipeline", request_data)
-
-                mail.store(msg, "+FLAGS", "\\Seen")
-                log_instance.status = "processed"
-                log_instance.save(update_fields=["status"])
+                eml_content = messages.get(uid, {}).get("content")
+                if eml_content is None:
+                    raise ValueError(f"Message {uid} could not be fetched")
+                process_message(project, mailbox, log_instance, eml_content)
+                processed.append(uid)
+            except Exception as ex:
+                set_log_error(log_instance, ex)
+                attempts[str(uid)] = attempts.get(str(uid), 0) + 1
+                if attempts[str(uid)] < IMAP_MAX_ATTEMPTS:
+                    failed.append(uid)
+                    continue
+
+                # Give up, flag it so it is not downloaded on every poll
+                logger.error(
+                    f"Message {uid} of '{mailbox}' failed {attempts.pop(str(uid))} "
+                    "times, flagged as read and skipped"
+                )
+                log_instance.message = f"Skipped after {IMAP_MAX_ATTEMPTS} failed attempts"
+                log_instance.save(update_fields=["message"])
+                try:
+                    mail.uid("STORE", str(uid), "+FLAGS", "(\\Seen)")
+                except Exception as store_ex:
+                    logger.error(str(store_ex))
+
+        if processed:
+            mail.uid("STORE", get_message_set(processed), "+FLAGS", "(\\Seen)")
+            for uid in processed:
+                attempts.pop(str(uid), None)
+                log_instances[uid].status = "processed"
+                log_instances[uid].save(update_fields=["status"])
 
                 # mail.copy(msg, "[Gmail]/All Mail")
                 # mail.store(msg, '+FLAGS', '\\Deleted')
                 # log_instance.status = "archived"
                 # log_instance.save(update_fields=["status"])
 
-            except Exception as ex:
-                logger.error(str(ex))
-                log_instance.status = "error"
-                log_instance.message="Somethings Went Wrong"
-                log_instance.remarks=str(ex)
-                log_instance.save(update_fields=["status", "message", "remarks"])
+        # Failed messages stay unread and are downloaded again on the next
+        # poll until IMAP_MAX_ATTEMPTS, the mark only moves up to the first of them
+        if failed and (first_failed is None or min(failed) < first_failed):
+            first_failed = min(failed)
+        if first_failed is None:
+            last_uid = max(last_uid, *batch)
+        else:
+            last_uid = max(last_uid, first_failed - 1)
+        if uidvalidity is not None:
+            redis_instance.set(
+                state_key,
+                json.dumps(
+                    {"uidvalidity": uidvalidity, "last_uid": last_uid, "attempts": attempts}
+                ),
+            )
+
+
+def is_mailbox_polling(mailbox):
+    """A poll of the mailbox is still running"""
+    return bool(redis_instance.exists(MAILBOX_LOCK_KEY.format(mailbox=mailbox)))
+
+
+def process_basic_auth(data):
+    try:
+        job_id = data["job_id"]
+        project = data["project"]
+
+        config = get_redis_data(job_id)
+        redis_instance.delete(job_id)
+
+        mailbox = config["email"]
+        lock_key = MAILBOX_LOCK_KEY.format(mailbox=mailbox)
+        lock_token = uuid.uuid4().hex
+        lock_set = redis_instance.set(lock_key, lock_token, nx=True, ex=IMAP_POLL_LOCK_TIMEOUT)
+        if not lock_set:
+            logger.warning(f"'{mailbox}' is already being polled, skipping...")
+            return
+
+        try:
+            mail = imaplib.IMAP4_SSL(config["server"], config["port"])
+            mail.login(config["email"], config["password"])
+            mail.select("inbox")
+
+            process_mailbox(mail, project, mailbox, config["server"])
 
-        mail.logout()
+            mail.logout()
+        finally:
+            redis_instance.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, lock_token)
         logger.info(f"Processing completed for '{project}'")
 
     except Exception as ex:
@@ -87,4 +298,4 @@ def process_basic_auth(data):
             status="error",
             message="Authentication Failed",
             remarks=str(ex)
-        )
\ No newline at end of file
+        )
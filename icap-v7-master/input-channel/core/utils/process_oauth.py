@@ -1,9 +1,9 @@
 import json
 from core.models import ProcessLog
 from rabbitmq_publisher import publish
-from core.utils.utils import save_eml_file, normalized_error
+from core.utils.utils import save_eml_file, get_eml_path, normalized_error, get_delta_link, set_delta_link
 from utils.redis_utils import redis_instance, get_redis_data, gerenate_job_id
-from core.service.outlook import OutlookService
+from core.service.outlook import OutlookService, OUTLOOK_DELTA_FOLDER
 from utils.logger_config import get_logger
 
 logger = get_logger(__name__)
@@ -45,10 +45,12 @@ def process_outlook(data):
 def process_mailbox(client, project, mailbox):
     """This function parse email from mailbox and process mailbox"""
     try:
-        messages = client.get_unread_emails(mailbox)
+        delta_source = f"outlook:{mailbox}:{OUTLOOK_DELTA_FOLDER}"
+        messages, delta_link = client.get_new_emails(mailbox, get_delta_link(delta_source))
 
         logger.info(f"{len(messages)} unread emails found")
 
+        new_messages = []
         for msg in messages:
             msg_id = msg["id"]
 
@@ -56,7 +58,17 @@ def process_mailbox(client, project, mailbox):
             if previous_log and previous_log.status != "error":
                 logger.warning(f"Email already queued in processing. Queue_id: {msg_id}")
                 continue
+            new_messages.append(msg_id)
 
+        try:
+            emails = client.fetch_emails(mailbox, new_messages) if new_messages else {}
+        except Exception as ex:
+            # Fetched one by one below
+            logger.error(str(ex))
+            emails = {}
+
+        failed = False
+        for msg_id in new_messages:
             log_instance = ProcessLog.objects.create(
                 project=project,
                 service="OAuth",
@@ -65,8 +77,12 @@ def process_mailbox(client, project, mailbox):
                 status="queued"
             )
             try:
-                eml_content = client.fetch_email(mailbox, msg_id)
-                email_path = save_eml_file(mailbox, eml_content)
+                # Released once saved, large messages are streamed to disk
+                eml_content = emails.pop(msg_id, None)
+                if eml_content is None:
+                    email_path = client.download_email(mailbox, msg_id, get_eml_path(mailbox))
+                else:
+                    email_path = save_eml_file(mailbox, eml_content)
 
                 log_instance.status = "downloaded"
                 log_instance.path = email_path
@@ -91,12 +107,17 @@ def process_mailbox(client, project, mailbox):
                 publish("start_transaction_process", "to_pipeline", request_data)
 
             except Exception as ex:
+                failed = True
                 logger.error(str(ex))
                 log_instance.status = "error"
                 log_instance.message = "Somethings Went Wrong"
                 log_instance.remarks = str(ex)
                 log_instance.save(update_fields=["status", "message", "remarks"])
 
+        # Failed emails are retried from the same delta on the next run
+        if not failed:
+            set_delta_link(delta_source, delta_link)
+
     except Exception as ex:
         message = normalized_error(ex)
         logger.error(message)
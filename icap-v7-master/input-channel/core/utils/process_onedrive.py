@@ -1,7 +1,7 @@
 import json
 from core.models import ProcessLog
 from rabbitmq_publisher import publish
-from core.utils.utils import save_file, normalized_error
+from core.utils.utils import save_file, normalized_error, get_delta_link, set_delta_link
 from .process_sharepoint import get_encoded_url
 from core.service.onedrive import OneDriveService
 from utils.redis_utils import redis_instance, get_redis_data, gerenate_job_id
@@ -66,14 +66,23 @@ def process_folder(client, project, folder_url, extensions, training=False):
         (
             file_count, 
             user_email, 
-            folder_path
+            folder_path,
+            folder_id
         ) = parse_graph_item(client, project, folder_url)
 
         if file_count and file_count > 0:
-            files = client.list_files(user_email=user_email, folder_path=folder_path, extensions=extensions)
+            delta_source = f"onedrive:{user_email}:{folder_id}"
+            files, delta_link = client.get_new_files(
+                user_email=user_email,
+                folder_id=folder_id,
+                folder_path=folder_path,
+                extensions=extensions,
+                delta_link=get_delta_link(delta_source)
+            )
 
             logger.info(f"{len(files)} files found")
 
+            failed = False
             for file in files:
                 file_id = file.get("id")
                 file_name = file.get("name")
@@ -121,12 +130,17 @@ def process_folder(client, project, folder_url, extensions, training=False):
                         publish("start_training_process", "to_pipeline", request_data)
 
                 except Exception as ex:
+                    failed = True
                     logger.error(str(ex))
                     log_instance.status = "error"
                     log_instance.message = "Somethings Went Wrong"
                     log_instance.remarks = str(ex)
                     log_instance.save(update_fields=["status", "message", "remarks"])
 
+            # Failed files are retried from the same delta on the next run
+            if not failed:
+                set_delta_link(delta_source, delta_link)
+
     except Exception as ex:
         message = normalized_error(ex)
         logger.error(message)
@@ -150,7 +164,7 @@ def parse_graph_item(client, project, folder_url):
             message="Invalid Folder URL",
             remarks = folder_data.get("error")
         )
-        return None, None, None
+        return None, None, None, None
 
     file_count = folder_data.get("folder", {}).get("childCount")
     user_email = folder_data.get("createdBy", {}).get("user", {}).get("email")
@@ -164,5 +178,5 @@ def parse_graph_item(client, project, folder_url):
     item_name = folder_data.get("name", "")
     folder_path = f"{parent_path}/{item_name}" if parent_path else item_name
 
-    return file_count, user_email, folder_path
+    return file_count, user_email, folder_path, folder_data.get("id")
 
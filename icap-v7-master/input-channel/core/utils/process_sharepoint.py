@@ -4,7 +4,7 @@ from core.models import ProcessLog
 from rabbitmq_publisher import publish
 from urllib.parse import urlparse, parse_qs, unquote
 from core.service.sharepoint import SharePointService
-from core.utils.utils import save_file, normalized_error
+from core.utils.utils import save_file, normalized_error, get_delta_link, set_delta_link
 from utils.redis_utils import redis_instance, get_redis_data, gerenate_job_id
 from utils.logger_config import get_logger
 
@@ -68,15 +68,24 @@ def process_folder(client, project, folder_url, extensions, training=False):
             file_count, 
             folder_path,
             host_name,
-            site_name
+            site_name,
+            folder_id
         ) = parse_graph_item(client, project, folder_url)
 
         if file_count and file_count > 0:
             site_id = client.get_site_id(host_name=host_name, site_name=site_name)
-            files = client.list_files(site_id=site_id, folder_path=folder_path, extensions=extensions)
+            delta_source = f"sharepoint:{site_id}:{folder_id}"
+            files, delta_link = client.get_new_files(
+                site_id=site_id,
+                folder_id=folder_id,
+                folder_path=folder_path,
+                extensions=extensions,
+                delta_link=get_delta_link(delta_source)
+            )
 
             logger.info(f"{len(files)} files found")
 
+            failed = False
             for file in files:
                 file_id = file["id"]
                 file_name = file["name"]
@@ -123,12 +132,17 @@ def process_folder(client, project, folder_url, extensions, training=False):
                         publish("start_training_process", "to_pipeline", request_data)
 
                 except Exception as ex:
+                    failed = True
                     logger.error(str(ex))
                     log_instance.status = "error"
                     log_instance.message = "Somethings Went Wrong"
                     log_instance.remarks = str(ex)
                     log_instance.save(update_fields=["status", "message", "remarks"])
 
+            # Failed files are retried from the same delta on the next run
+            if not failed:
+                set_delta_link(delta_source, delta_link)
+
     except Exception as ex:
         message = normalized_error(ex)
         logger.error(message)
@@ -153,7 +167,7 @@ def parse_graph_item(client, project, folder_url):
             message="Invalid Folder URL",
             remarks=folder_data.get("error")
         )
-        return None, None, None, None
+        return None, None, None, None, None
 
     file_count = folder_data.get("folder", {}).get("childCount")
 
@@ -177,7 +191,7 @@ def parse_graph_item(client, project, folder_url):
         if site_index + 1 < len(path_parts):
             site_name = path_parts[site_index + 1]
 
-    return file_count, folder_path, host_name, site_name
+    return file_count, folder_path, host_name, site_name, folder_data.get("id")
 
 
 def get_encoded_url(raw_url):
@@ -34,6 +34,21 @@ def get_config_data(input_type):
     return config
 
 
+DELTA_LINK_KEY = "graph_delta:{source}"
+
+
+def get_delta_link(source):
+    """Stored Graph deltaLink of a mailbox folder or drive folder, None before the first sync"""
+    delta_link = redis_instance.get(DELTA_LINK_KEY.format(source=source))
+    return delta_link.decode("utf-8") if delta_link else None
+
+
+def set_delta_link(source, delta_link):
+    """Store the deltaLink the next sync continues from"""
+    if delta_link:
+        redis_instance.set(DELTA_LINK_KEY.format(source=source), delta_link)
+
+
 def save_file(name, content, folder):
     """Helper function to save any file"""
     file_dir = os.path.join(INPUT_FILES_PATH, folder)
@@ -53,14 +68,19 @@ def save_file(name, content, folder):
     return path
 
 
-def save_eml_file(email, content):
-    """Helper function to save eml file"""
+def get_eml_path(email):
+    """Helper function to get a new eml file path"""
     eml_dir = os.path.join(INPUT_FILES_PATH, "Email")
     os.makedirs(eml_dir, exist_ok=True)
 
     safe_email = email.replace("@", "_")
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    path = os.path.join(eml_dir, f"{timestamp}_{safe_email}.eml")
+    return os.path.join(eml_dir, f"{timestamp}_{safe_email}.eml")
+
+
+def save_eml_file(email, content):
+    """Helper function to save eml file"""
+    path = get_eml_path(email)
     with open(path, "wb") as f:
         f.write(content)
     return path
@@ -20,12 +20,15 @@ from core.utils.process_basic_auth import process_basic_auth
 from core.utils.process_sharepoint import process_sharepoint
 from core.utils.process_onedrive import process_onedrive
 from core.utils.utils import update_status
+from utils.job_tracing import traced_consumer
 
 
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST")
 RABBITMQ_PORT = os.getenv("RABBITMQ_PORT")
 RABBITMQ_USERNAME = os.getenv("RABBITMQ_USERNAME")
 RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD")
+# Messages processed concurrently, a slow mailbox does not hold the other projects
+INPUT_CHANNEL_CONCURRENCY = int(os.getenv("INPUT_CHANNEL_CONCURRENCY", "4"))
 
 credentials = pika.PlainCredentials(RABBITMQ_USERNAME, RABBITMQ_PASSWORD)
 
@@ -38,6 +41,7 @@ def ack_message(ch, delivery_tag):
         print("Channel is already closed, so we can't ACK this message")
 
 
+@traced_consumer
 def do_work(ch, method, properties, body):
     """"Process the job based on message type"""
     message_type = properties.content_type
@@ -81,7 +85,7 @@ def main():
     channel.queue_declare(queue='to_pipeline', durable=True)
     channel.queue_declare(queue="to_input_channel", durable=True)
 
-    channel.basic_qos(prefetch_count=1)
+    channel.basic_qos(prefetch_count=INPUT_CHANNEL_CONCURRENCY)
     channel.basic_consume(queue="to_input_channel", on_message_callback=callback)
 
     print("Waiting for messages...")
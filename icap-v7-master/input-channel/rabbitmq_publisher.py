@@ -1,7 +1,9 @@
 import json
 import pika
 import os
+import time
 from utils.logger_config import get_logger
+from utils.job_tracing import get_publish_headers, trace_publish
 
 logger = get_logger(__name__)
 
@@ -23,16 +25,20 @@ params = pika.ConnectionParameters(
 def publish(method, queue_name, body):
 
     logger.info("Message recived to publish")
+    start = time.perf_counter()
+    payload = json.dumps(body)
     connection = pika.BlockingConnection(params)
     channel = connection.channel()
 
     channel.basic_publish(
         exchange='',
         routing_key=queue_name,
-        body=json.dumps(body),
+        body=payload,
         properties=pika.BasicProperties(
             method,
-            delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE
+            delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE,
+            headers=get_publish_headers(),
         ))
 
     connection.close()
+    trace_publish(method, queue_name, body, len(payload), time.perf_counter() - start)
@@ -1,9 +1,15 @@
 import json
+import zlib
 import random
 import string
 import redis
 from django.conf import settings
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 
 redis_instance = redis.Redis(
     host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0, client_name="input_channel"
@@ -17,17 +23,32 @@ def gerenate_job_id():
     return job_id
 
 
+def decode_redis_payload(data):
+    """Decode a job payload that may be zlib/zstd compressed by the backend"""
+    if isinstance(data, (bytes, bytearray)):
+        if data[:4] == b"\x28\xb5\x2f\xfd":
+            if zstandard is None:
+                raise ValueError(
+                    "Payload is zstd compressed but zstandard is not installed, "
+                    "install it or set PAYLOAD_CODEC=zlib on the backend"
+                )
+            data = zstandard.ZstdDecompressor().decompress(bytes(data))
+        elif data[:1] == b"\x78":
+            data = zlib.decompress(data)
+    return json.loads(data)
+
+
 def get_redis_data(job_id):
     """Retrieve information from redis"""
     data = redis_instance.get(job_id)
-    data = json.loads(data)
+    data = decode_redis_payload(data)
     return data
 
 
 def set_redis_data(job_id, key_name, result_data):
     """Set partial information in redis for given key"""
     data = redis_instance.get(job_id)
-    data = json.loads(data)
+    data = decode_redis_payload(data)
     data[key_name] = result_data
     data = json.dumps(data)
     redis_instance.set(job_id, data)
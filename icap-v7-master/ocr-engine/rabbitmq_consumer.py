@@ -11,6 +11,7 @@ from timeout_utils import func_timeout, FunctionTimedOut
 from app import ocrengine_api
 
 from rabbitmq_publisher import publish
+from job_tracing import traced_consumer
 
 # Required to load robot modules from external scripts folder
 
@@ -31,6 +32,7 @@ def ack_message(ch, delivery_tag):
         print("Channel is already closed, so we can't ACK this message")
 
 
+@traced_consumer
 def do_work(ch, method, properties, body):
     """Process the job"""
     message_type = properties.content_type
@@ -7,7 +7,10 @@ class CoreConfig(AppConfig):
     name = "core"
 
     def ready(self):
-        # Start periodic task when explicitly enabled
+        # Prompt changes are sent to the scheduler from every process
+        from . import signals  # noqa: F401
+
+        # Start the prompt scheduler when explicitly enabled
         # Use file-based lock to prevent duplicate execution in both dev and production
         if os.environ.get("ENABLE_PERIODIC_TASK") == "true":
             lock_file = "/tmp/periodic_task.lock"
@@ -40,7 +43,7 @@ class CoreConfig(AppConfig):
                 with open(lock_file, 'x') as f:
                     f.write(f"locked_by_pid_{current_pid}")
                 
-                # Lock acquired successfully, start periodic task
+                # Lock acquired successfully, start the prompt scheduler
                 from .tasks import start_periodic_task
                 start_periodic_task()
                 
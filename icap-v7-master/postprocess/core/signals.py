@@ -0,0 +1,22 @@
+from django.db import connection
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.models import PromptDictionary
+
+# Postgres channel listened to by the prompt scheduler (core.tasks)
+PROMPT_CHANGED_CHANNEL = "prompt_changed"
+
+
+@receiver(post_save, sender=PromptDictionary)
+def notify_prompt_changed(sender, instance, **kwargs):
+    """
+    Tell the prompt scheduler that a prompt was saved.
+
+    The notification goes through Postgres so the scheduler gets it whichever
+    web worker saved the prompt, and only once the transaction is committed.
+    """
+    if not instance.name:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", [PROMPT_CHANGED_CHANNEL, instance.name])
@@ -1,78 +1,188 @@
 import hashlib
 import os
+import select
 import threading
 import time
+from django.db import connections, close_old_connections
 from core.models import PostProcess, PromptDictionary
 from core.services.code_generator import CodeGenerator
+from core.signals import PROMPT_CHANGED_CHANNEL
+
+# Quiet period after the last change of a prompt before its code is regenerated
+PROMPT_DEBOUNCE_SECONDS = float(os.getenv("PROMPT_DEBOUNCE_SECONDS", "5"))
+# Regenerate anyway once changes keep coming for this long
+PROMPT_DEBOUNCE_MAX_SECONDS = float(os.getenv("PROMPT_DEBOUNCE_MAX_SECONDS", "60"))
+PROMPT_LISTEN_RETRY_SECONDS = int(os.getenv("PROMPT_LISTEN_RETRY_SECONDS", "30"))
+# Backoff of a prompt whose code generation failed, doubled on every failure
+PROMPT_RETRY_SECONDS = float(os.getenv("PROMPT_RETRY_SECONDS", "30"))
+PROMPT_RETRY_MAX_SECONDS = float(os.getenv("PROMPT_RETRY_MAX_SECONDS", "600"))
 
 
 def _hash_prompt(prompt: str) -> str:
     return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
 
 
-def update_postprocess_cron():
+def regenerate_postprocess(prompt_entry):
     """
-    1. get all prompts from the prompt dictionary
-    2. for each prompt, get the hash from the prompt dictionary table
-    3. take the process name from the prompt dictionary table
-    4. get postprocess record using the process name
-    5. compare the hash from the postprocess table with the hash from the prompt dictionary table
-    6. if hash doesnt match, delete the record from postprocess table
-    7. generate the new code and save it to the postprocess table
+    1. take the process name from the prompt dictionary entry
+    2. get postprocess record using the process name
+    3. compare the hash from the postprocess table with the hash of the prompt
+    4. if hash doesnt match, delete the old records from postprocess table
+    5. generate the new code and save it to the postprocess table
     """
-    prompts = PromptDictionary.objects.exclude(prompt__isnull=True).exclude(prompt="")
+    process_name = prompt_entry.name
+    prompt_hash = prompt_entry.unique_hash
+
+    postprocess = (
+        PostProcess.objects.filter(process=process_name)
+        .order_by("-created_at")
+        .first()
+    )
+    postprocess_hash = postprocess.unique_hash if postprocess else None
+
+    if postprocess_hash == prompt_hash:
+        print(f"  - {process_name}: Hash matches, skipping")
+        return
+
+    if postprocess and postprocess_hash != prompt_hash:
+        # Get all postprocess records for this process, ordered by creation date
+        all_records = PostProcess.objects.filter(process=process_name).order_by('-created_at')
+        
+        # Keep only the last 3 records, delete the rest
+        if all_records.count() >= 3:
+            records_to_delete = all_records[2:]  # Delete everything except the first 3 (newest)
+            for record in records_to_delete:
+                record.delete()
+            print(f"  - {process_name}: Deleted {records_to_delete.count()} old records, keeping last 3")
+
+    print(f"  - {process_name}: Generating new code...")
+    generator = CodeGenerator()
+    generated_code = generator.generate(prompt_entry.prompt)
+
+    PostProcess.objects.create(
+        prompt=prompt_entry.prompt,
+        code=generated_code,
+        process=process_name,
+    )
+    print(f"  - {process_name}: New code generated and saved")
+
+
+def _get_prompts():
+    return PromptDictionary.objects.exclude(prompt__isnull=True).exclude(prompt="")
+
+
+def update_postprocess_cron():
+    """Regenerate the code of every prompt that changed"""
+    prompts = _get_prompts()
     print(f"Processing {prompts.count()} prompts from PromptDictionary")
 
     for prompt_entry in prompts:
-        process_name = prompt_entry.name
-        prompt_hash = prompt_entry.unique_hash
-
-        postprocess = (
-            PostProcess.objects.filter(process=process_name)
-            .order_by("-created_at")
-            .first()
-        )
-        postprocess_hash = postprocess.unique_hash if postprocess else None
-
-        if postprocess_hash == prompt_hash:
-            print(f"  - {process_name}: Hash matches, skipping")
-            continue
-
-        if postprocess and postprocess_hash != prompt_hash:
-            # Get all postprocess records for this process, ordered by creation date
-            all_records = PostProcess.objects.filter(process=process_name).order_by('-created_at')
-            
-            # Keep only the last 3 records, delete the rest
-            if all_records.count() >= 3:
-                records_to_delete = all_records[2:]  # Delete everything except the first 3 (newest)
-                for record in records_to_delete:
-                    record.delete()
-                print(f"  - {process_name}: Deleted {records_to_delete.count()} old records, keeping last 3")
-
-        print(f"  - {process_name}: Generating new code...")
-        generator = CodeGenerator()
-        generated_code = generator.generate(prompt_entry.prompt)
-
-        PostProcess.objects.create(
-            prompt=prompt_entry.prompt,
-            code=generated_code,
-            process=process_name,
-        )
-        print(f"  - {process_name}: New code generated and saved")
+        regenerate_postprocess(prompt_entry)
+
+
+def update_changed_prompts(process_names):
+    """Regenerate the code of the given prompts only, returns the names that failed"""
+    print(f"Processing changed prompts: {', '.join(sorted(process_names))}")
+    failed = set()
+    for process_name in process_names:
+        try:
+            prompt_entry = (
+                _get_prompts().filter(name=process_name).order_by("-created_at").first()
+            )
+            if prompt_entry:
+                regenerate_postprocess(prompt_entry)
+        except Exception as e:
+            print(f"  - {process_name}: Code generation failed: {e}")
+            failed.add(process_name)
+    return failed
+
+
+def _listen(on_connected):
+    """
+    Wait for prompt change notifications and regenerate their code.
+
+    Names are collected until no change came for PROMPT_DEBOUNCE_SECONDS
+    (or for at most PROMPT_DEBOUNCE_MAX_SECONDS), so rapid edits of a prompt
+    end in a single code generation. Prompts whose generation failed are
+    retried with a backoff of PROMPT_RETRY_SECONDS, doubled on every failure.
+    """
+    db = connections["default"]
+    listen_connection = db.get_new_connection(db.get_connection_params())
+    listen_connection.autocommit = True
+    try:
+        with listen_connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {PROMPT_CHANGED_CHANNEL}")
+        on_connected()
+
+        pending, first_change, last_change = set(), None, None
+        # Prompts whose generation failed: name -> (failures, retry time)
+        retries = {}
+        while True:
+            deadlines = [retry_at for _, retry_at in retries.values()]
+            if pending:
+                deadlines.append(
+                    min(
+                        last_change + PROMPT_DEBOUNCE_SECONDS,
+                        first_change + PROMPT_DEBOUNCE_MAX_SECONDS,
+                    )
+                )
+            now = time.monotonic()
+            timeout = min(deadlines) - now if deadlines else None
+
+            if timeout is None or timeout > 0:
+                select.select([listen_connection], [], [], timeout)
+                listen_connection.poll()
+                while listen_connection.notifies:
+                    pending.add(listen_connection.notifies.pop(0).payload)
+                    last_change = time.monotonic()
+                    first_change = first_change or last_change
+                continue
+
+            names = {name for name, (_, retry_at) in retries.items() if retry_at <= now}
+            if pending and min(
+                last_change + PROMPT_DEBOUNCE_SECONDS,
+                first_change + PROMPT_DEBOUNCE_MAX_SECONDS,
+            ) <= now:
+                names |= pending
+                pending, first_change, last_change = set(), None, None
+
+            try:
+                close_old_connections()
+                failed = update_changed_prompts(names)
+            except Exception as e:
+                print(f"Prompt scheduler error: {e}")
+                failed = names
+
+            for name in names:
+                if name not in failed:
+                    retries.pop(name, None)
+                    continue
+                failures = retries.get(name, (0, None))[0] + 1
+                delay = min(
+                    PROMPT_RETRY_SECONDS * 2 ** min(failures - 1, 16), PROMPT_RETRY_MAX_SECONDS
+                )
+                retries[name] = (failures, time.monotonic() + delay)
+                print(f"  - {name}: Retrying in {delay:.0f}s")
+    finally:
+        listen_connection.close()
 
 
 def start_periodic_task():
-    """Start the periodic task in a daemon thread"""
-    interval_seconds = int(os.getenv("RUN_INTERVAL_SECONDS", "30"))
+    """Start the prompt scheduler in a daemon thread"""
+
+    def on_connected():
+        # Prompts changed while nobody was listening
+        close_old_connections()
+        update_postprocess_cron()
 
     def run():
         while True:
             try:
-                update_postprocess_cron()
+                _listen(on_connected)
             except Exception as e:
-                print(f"Periodic task error: {e}")
-            time.sleep(interval_seconds)
+                print(f"Prompt scheduler error: {e}, listening again in {PROMPT_LISTEN_RETRY_SECONDS}s")
+            time.sleep(PROMPT_LISTEN_RETRY_SECONDS)
 
     thread = threading.Thread(target=run, daemon=True)
     thread.start()
-    print(f"Started periodic prompt scheduler task (interval: {interval_seconds}s)")
+    print(f"Started prompt scheduler task (debounce: {PROMPT_DEBOUNCE_SECONDS}s)")
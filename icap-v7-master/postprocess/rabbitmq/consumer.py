@@ -45,6 +45,8 @@ django.setup()
 
 from rabbitmq.handler import handle_transform_message
 from rabbitmq.producer import publish
+from rabbitmq.transform_pool import start_pool
+from job_tracing import traced_consumer
 
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST")
 RABBITMQ_PORT = os.getenv("RABBITMQ_PORT")
@@ -62,6 +64,7 @@ def ack_message(ch, delivery_tag):
         print("Channel is already closed, so we can't ACK this message")
 
 
+@traced_consumer
 def do_work(ch, method, properties, body):
     message_type = properties.content_type or "postprocess_output_json"
     try:
@@ -99,6 +102,9 @@ def main():
     """Main consumer function"""
     wait_for_connection()
 
+    # Warm up the transform workers before the first message
+    start_pool()
+
     credentials = pika.PlainCredentials(RABBITMQ_USERNAME, RABBITMQ_PASSWORD)
     params = pika.ConnectionParameters(
         host=RABBITMQ_HOST,
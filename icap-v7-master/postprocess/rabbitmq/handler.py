@@ -1,6 +1,15 @@
+import os
 import json
+import time
 from core.models import PostProcess
 from rabbitmq.producer import publish
+from rabbitmq.transform_pool import transform_items, TransformCodeError
+
+# Seconds the code of a process is reused before it is read again
+POSTPROCESS_CODE_TTL = float(os.getenv("POSTPROCESS_CODE_TTL", 10))
+
+# process_name -> (code, expires_at)
+_postprocess_codes = {}
 
 
 def _send_error_response(batch_id, error_message, response_queue):
@@ -43,48 +52,44 @@ def _validate_payload(payload):
 
 def _get_postprocess_code(process_name):
     """Get the latest postprocess code for the given process name"""
+    cached = _postprocess_codes.get(process_name)
+    if cached and cached[1] > time.monotonic():
+        return cached[0], None
+
     postprocess = (
         PostProcess.objects.filter(process=process_name)
         .order_by("-created_at")
+        .only("code")
         .first()
     )
     
     if not postprocess or not postprocess.code:
         return None, f"PostProcess not found for '{process_name}'"
     
+    _postprocess_codes[process_name] = (
+        postprocess.code,
+        time.monotonic() + POSTPROCESS_CODE_TTL,
+    )
     return postprocess.code, None
 
 
-def _execute_transform_code(code):
-    """Execute the transform code and return the transform function"""
+def _transform_data_items(process_name, code, final_output_jsons):
+    """Transform each item in the final_output_jsons array"""
+    updated_output_jsons = list(final_output_jsons)
+    # Non-dict items are kept as-is
+    positions = [i for i, item in enumerate(final_output_jsons) if isinstance(item, dict)]
+
     try:
-        exec_namespace = {}
-        exec(code, exec_namespace)
-        transform_func = exec_namespace.get('transform_json')
-        
-        if not transform_func:
-            return None, "transform_json function not found in code"
-        
-        return transform_func, None
+        transformed_items = transform_items(
+            process_name, code, [final_output_jsons[i] for i in positions]
+        )
+    except TransformCodeError:
+        raise
     except Exception as e:
-        return None, f"Code execution error: {str(e)}"
+        raise Exception(f"Transform error on item: {str(e)}")
 
-
-def _transform_data_items(transform_func, final_output_jsons):
-    """Transform each item in the final_output_jsons array"""
-    updated_output_jsons = []
-    
-    for item in final_output_jsons:
-        if isinstance(item, dict):
-            try:
-                transformed_item = transform_func(item)
-                updated_output_jsons.append(transformed_item)
-            except Exception as e:
-                raise Exception(f"Transform error on item: {str(e)}")
-        else:
-            # Keep non-dict items as-is
-            updated_output_jsons.append(item)
-    
+    for position, transformed_item in zip(positions, transformed_items):
+        updated_output_jsons[position] = transformed_item
     return updated_output_jsons
 
 
@@ -111,15 +116,9 @@ def handle_transform_message(body, response_queue="to_pipeline"):
             _send_error_response(batch_id, error, response_queue)
             return
         
-        # Execute transform code
-        transform_func, error = _execute_transform_code(code)
-        if error:
-            _send_error_response(batch_id, error, response_queue)
-            return
-        
-        # Transform data
+        # Transform data, the code runs in the transform pool
         try:
-            updated_output_jsons = _transform_data_items(transform_func, final_output_jsons)
+            updated_output_jsons = _transform_data_items(process_name, code, final_output_jsons)
         except Exception as e:
             _send_error_response(batch_id, str(e), response_queue)
             return
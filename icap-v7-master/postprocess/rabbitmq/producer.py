@@ -19,9 +19,12 @@ Main Features:
 
 import json
 import os
+import time
 
 import pika
 
+from job_tracing import get_publish_headers, trace_publish
+
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST")
 RABBITMQ_PORT = os.getenv("RABBITMQ_PORT")
 RABBITMQ_USERNAME = os.getenv("RABBITMQ_USERNAME")
@@ -40,16 +43,21 @@ params = pika.ConnectionParameters(
 def publish(method, queue_name, body):
     """Publish a JSON serialized message to a Rabbitmq queue"""
     print("Message recived to publish")
+    start = time.perf_counter()
+    payload = json.dumps(body)
     connection = pika.BlockingConnection(params)
     channel = connection.channel()
 
     channel.basic_publish(
         exchange="",
         routing_key=queue_name,
-        body=json.dumps(body),
+        body=payload,
         properties=pika.BasicProperties(
-            method, delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE
+            method,
+            delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE,
+            headers=get_publish_headers(),
         ),
     )
 
     connection.close()
+    trace_publish(method, queue_name, body, len(payload), time.perf_counter() - start)
@@ -0,0 +1,239 @@
+"""
+Organization: AIDocbuilder Inc.
+File: rabbitmq/transform_pool.py
+Version: 6.0
+
+Description:
+    Runs generated 'transform_json' code in a pool of pre-warmed worker
+    processes, away from the Rabbitmq consumer. Every call is limited in CPU
+    and wall time, a runaway transform only costs its worker.
+
+Dependencies:
+    - os, time, signal, hashlib, resource, threading, multiprocessing
+    - OrderedDict from collections
+    - concurrent.futures
+
+Main Features:
+    - Forkserver process pool started and warmed up before consuming.
+    - Per worker cache of executed transform code keyed by process name and code hash.
+    - Per call CPU and wall time limits, optional memory limit per worker.
+    - Items of a message transformed in parallel, results kept in order.
+    - Per call deadline from the moment the call is queued for the workers,
+      messages caught in a pool restart are retried once.
+"""
+
+import os
+import time
+import signal
+import hashlib
+import resource
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+from concurrent.futures.process import BrokenProcessPool
+
+TRANSFORM_WORKERS = int(os.getenv("TRANSFORM_WORKERS", os.cpu_count() or 1))
+# Limits of a single transform_json call, in seconds
+TRANSFORM_CPU_LIMIT = float(os.getenv("TRANSFORM_CPU_LIMIT", 10))
+TRANSFORM_TIMEOUT = float(os.getenv("TRANSFORM_TIMEOUT", 30))
+# Address space of a worker process in MB, 0 disables the limit
+TRANSFORM_MEMORY_LIMIT = int(os.getenv("TRANSFORM_MEMORY_LIMIT", 1024))
+# The pool marks a call running once it is queued for the workers, at most
+# workers + 1 calls are queued so up to two calls (each limited to
+# TRANSFORM_TIMEOUT by the worker) may run before it. Past that a worker is
+# stuck in code the timers can not interrupt (e.g. a long running C call).
+TRANSFORM_DEADLINE = 3 * TRANSFORM_TIMEOUT
+TRANSFORM_WATCHDOG_INTERVAL = 1
+# Transform functions kept by every worker
+TRANSFORM_CACHE_SIZE = int(os.getenv("TRANSFORM_CACHE_SIZE", 64))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Worker process side: (process_name, code_hash) -> transform function
+_transforms = OrderedDict()
+
+
+class TransformCodeError(Exception):
+    """The transform code could not be executed or has no transform_json"""
+
+
+class TransformTimeout(Exception):
+    """A transform_json call went over its CPU or wall time limit"""
+
+
+class _Interrupted(BaseException):
+    """Raised inside the transform, out of reach of its 'except Exception' blocks"""
+
+
+def get_code_hash(code):
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def _raise_timeout(signum, frame):
+    kind = "CPU" if signum == signal.SIGPROF else "time"
+    raise _Interrupted(f"Transform exceeded its {kind} limit")
+
+
+def _init_worker():
+    """Set up limits of a worker process"""
+    # Interrupts are handled by the consumer, not by every worker
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGPROF, _raise_timeout)
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    if TRANSFORM_MEMORY_LIMIT > 0:
+        limit = TRANSFORM_MEMORY_LIMIT * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _warm_up():
+    return os.getpid()
+
+
+def _load_transform(process_name, code_hash, code):
+    """transform_json of the code, executed once per worker"""
+    key = (process_name, code_hash)
+    transform_func = _transforms.get(key)
+    if transform_func is not None:
+        _transforms.move_to_end(key)
+        return transform_func
+
+    try:
+        exec_namespace = {}
+        exec(compile(code, f"<postprocess {process_name}>", "exec"), exec_namespace)
+    except Exception as e:
+        raise TransformCodeError(f"Code execution error: {str(e)}")
+
+    transform_func = exec_namespace.get("transform_json")
+    if not transform_func:
+        raise TransformCodeError("transform_json function not found in code")
+
+    _transforms[key] = transform_func
+    if len(_transforms) > TRANSFORM_CACHE_SIZE:
+        _transforms.popitem(last=False)
+    return transform_func
+
+
+def _run_transform(process_name, code_hash, code, item):
+    """Apply transform_json to one item, inside a worker process"""
+    transform_func = _load_transform(process_name, code_hash, code)
+
+    signal.setitimer(signal.ITIMER_PROF, TRANSFORM_CPU_LIMIT)
+    signal.setitimer(signal.ITIMER_REAL, TRANSFORM_TIMEOUT)
+    try:
+        return transform_func(item)
+    except _Interrupted as e:
+        raise TransformTimeout(str(e))
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def start_pool():
+    """Start the worker processes, returns the running pool"""
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            # Workers are forked from a single threaded server, not from the
+            # consumer which runs a thread per message
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+            workers = max(1, TRANSFORM_WORKERS)
+            pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=context, initializer=_init_worker
+            )
+            # Submitted together, every task gets its own new worker
+            wait([pool.submit(_warm_up) for _ in range(workers)])
+            _pool = pool
+            print(f"Transform pool started with {workers} workers")
+        return _pool
+
+
+def _discard_pool(pool):
+    """Kill the workers of a pool stuck on (or broken by) a transform"""
+    global _pool
+
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _collect_results(pool, futures):
+    """
+    Wait for the futures of one message.
+
+    Every future gets its own deadline from the moment the pool queues it for
+    the workers, time spent waiting behind other messages does not count.
+    """
+    started = {}
+    not_done = set(futures)
+    while not_done:
+        done, not_done = wait(
+            not_done, timeout=TRANSFORM_WATCHDOG_INTERVAL, return_when=FIRST_EXCEPTION
+        )
+        for future in done:
+            if future.cancelled():
+                # Cancelled by a restart of the pool
+                raise BrokenProcessPool("Transform pool was restarted")
+            if future.exception() is not None:
+                for pending in not_done:
+                    pending.cancel()
+                raise future.exception()
+
+        now = time.monotonic()
+        for future in not_done:
+            if future.running():
+                started.setdefault(future, now)
+        if any(
+            now - started[future] > TRANSFORM_DEADLINE
+            for future in not_done
+            if future in started
+        ):
+            _discard_pool(pool)
+            raise TransformTimeout("Transform did not finish in time, workers restarted")
+
+    return [future.result() for future in futures]
+
+
+def transform_items(process_name, code, items):
+    """
+    Apply the transform_json of 'code' to every item, in parallel.
+
+    Args:
+        process_name (str): PostProcess name, used in the code cache key.
+        code (str): Source defining 'transform_json'.
+        items (list): Items to transform.
+
+    Returns:
+        list: Transformed items in the order of 'items'.
+
+    Raises:
+        TransformCodeError: The code can not be executed.
+        TransformTimeout: No result within the limits, the pool is restarted.
+        BrokenProcessPool: The pool broke again while retrying the items.
+        Exception: Raised by transform_json on the first failing item.
+    """
+    if not items:
+        return []
+
+    code_hash = get_code_hash(code)
+    for attempt in range(2):
+        pool = start_pool()
+        try:
+            futures = [
+                pool.submit(_run_transform, process_name, code_hash, code, item)
+                for item in items
+            ]
+            return _collect_results(pool, futures)
+        except BrokenProcessPool:
+            # Usually restarted because of a stuck transform of another
+            # message, the items are retried once on a new pool
+            _discard_pool(pool)
+            if attempt:
+                raise
+            print(f"Transform pool broke, retrying {len(items)} items of {process_name}")
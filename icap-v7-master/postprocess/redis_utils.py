@@ -1,8 +1,14 @@
 import redis
 import json
+import zlib
 import os
 import pickle
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
@@ -16,14 +22,27 @@ redis_instance = redis.Redis(
 )
 
 
+def decode_redis_payload(data):
+    """Decode a job payload that may be zlib/zstd compressed by the backend"""
+    if isinstance(data, (bytes, bytearray)):
+        if data[:4] == b"\x28\xb5\x2f\xfd":
+            if zstandard is None:
+                raise ValueError(
+                    "Payload is zstd compressed but zstandard is not installed, "
+                    "install it or set PAYLOAD_CODEC=zlib on the backend"
+                )
+            data = zstandard.ZstdDecompressor().decompress(bytes(data))
+        elif data[:1] == b"\x78":
+            data = zlib.decompress(data)
+    return json.loads(data)
+
+
 def get_redis_data(job_id):
     """Retrieve information from redis"""
     data = redis_instance.get(job_id)
     if data is None:
         return None
-    if isinstance(data, (bytes, bytearray)):
-        data = data.decode("utf-8")
-    return json.loads(data)
+    return decode_redis_payload(data)
 
 
 def set_redis_data(job_id, key_name, result_data):
@@ -32,9 +51,7 @@ def set_redis_data(job_id, key_name, result_data):
     if data is None:
         data = {}
     else:
-        if isinstance(data, (bytes, bytearray)):
-            data = data.decode("utf-8")
-        data = json.loads(data)
+        data = decode_redis_payload(data)
     data[key_name] = result_data
     data = json.dumps(data)
     redis_instance.set(job_id, data)
@@ -34,6 +34,7 @@ from handler import ignore_dense_pages_task, categorize_pdfs_task, process_files
 from producer import publish
 from utils.timeout_utils import FunctionTimedOut
 from utils.config import Config
+from utils.job_tracing import traced_consumer
 
 # Configure logging
 logging.basicConfig(
@@ -53,6 +54,7 @@ def ack_message(ch, delivery_tag):
         logger.warning("Channel is already closed, cannot ACK message")
 
 
+@traced_consumer
 def do_work(ch, method, properties, body):
     message_type = properties.content_type
 
@@ -9,17 +9,48 @@ import sys
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import logging
+import multiprocessing
+import threading
 import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
 from producer import publish
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.dense_page_detector.app import detect_dense_pages
-from services.detect_pdf import is_electronic_pdf
+from services.detect_pdf import categorize_pdf
 from services.electronic_pdf import process_files
+from utils.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Categorization is CPU bound, the pool is kept for the lifetime of the
+# worker so processes are not spawned again for every upload
+_categorization_pool = None
+_categorization_pool_lock = threading.Lock()
+
+
+def get_categorization_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Return the shared process pool used to categorize PDFs"""
+    global _categorization_pool
+    with _categorization_pool_lock:
+        if _categorization_pool is None:
+            _categorization_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=Config.PDF_CATEGORIZATION_WORKERS or os.cpu_count(),
+                # spawn, forking the threaded rabbitmq consumer is unsafe
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _categorization_pool
+
+
+def reset_categorization_pool():
+    """Drop a broken pool so the next task starts a new one"""
+    global _categorization_pool
+    with _categorization_pool_lock:
+        if _categorization_pool is not None:
+            _categorization_pool.shutdown(wait=False, cancel_futures=True)
+        _categorization_pool = None
+
 
 def ignore_dense_pages_task(data: dict) -> Dict[str, Any]:
     """
@@ -94,13 +125,20 @@ def categorize_pdfs_task(data: dict) -> Dict[str, Any]:
             publish('pdf_categorization_response', 'to_pipeline', result)
             return
         
-        # Call is_electronic_pdf in parallel for each PDF path
+        # Call categorize_pdf in parallel for each PDF path
         categorization_results = {}
         
-        with concurrent.futures.ThreadPoolExecutor() as executor:
+        if len(pdf_paths) == 1:
+            # Not worth a round trip to the pool
+            pdf_path = pdf_paths[0]
+            categorization_results[str(pdf_path)] = {
+                "is_electronic": categorize_pdf(str(pdf_path))
+            }
+        else:
+            executor = get_categorization_pool()
             # Submit all tasks
             future_to_pdf_path = {
-                executor.submit(is_electronic_pdf, str(pdf_path)): pdf_path 
+                executor.submit(categorize_pdf, str(pdf_path)): pdf_path 
                 for pdf_path in pdf_paths
             }
             
@@ -114,6 +152,8 @@ def categorize_pdfs_task(data: dict) -> Dict[str, Any]:
                     }
                 except Exception as e:
                     logger.error(f"Error processing PDF {pdf_path}: {e}")
+                    if isinstance(e, BrokenProcessPool):
+                        reset_categorization_pool()
                     categorization_results[str(pdf_path)] = {
                         "is_electronic": False,
                         "error": str(e)
@@ -145,8 +185,7 @@ def process_files_task(data: dict) -> Dict[str, Any]:
         logger.info("Process Files Task Started")
         
         # Get job info from Redis
-        from utils.redis import redis_instance
-        import json
+        from utils.redis import redis_instance, decode_redis_payload
         
         job_info_str = redis_instance.get(job_id)
         if not job_info_str:
@@ -156,7 +195,7 @@ def process_files_task(data: dict) -> Dict[str, Any]:
             publish('electronic_pdf_response', 'to_pipeline', result)
             return
         
-        job_info = json.loads(job_info_str)
+        job_info = decode_redis_payload(job_info_str)
         
         # Extract required fields from job_info
         file_paths = job_info.get("file_paths", [])
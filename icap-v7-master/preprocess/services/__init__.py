@@ -7,10 +7,12 @@ This package contains all service modules for PDF processing:
 - dense_page_detector: ML-based dense page detection
 """
 
-from .detect_pdf import is_electronic_pdf
+from .detect_pdf import categorize_pdf, is_electronic_pdf, is_electronic_pdf_fast
 from .electronic_pdf import process_files
 
 __all__ = [
+    'categorize_pdf',
     'is_electronic_pdf',
+    'is_electronic_pdf_fast',
     'process_files',
 ]
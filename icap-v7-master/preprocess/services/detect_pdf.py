@@ -9,6 +9,86 @@ import io
 import os
 import glob
 
+from utils.config import Config
+
+
+def classify_image(img_area_ratio, img_width_ratio, img_height_ratio):
+    """Classify an image by its size relative to the page: large, small, content or None"""
+    is_content_image = (
+        img_area_ratio > 0.15
+        or img_area_ratio > 0.05
+        or (img_area_ratio > 0.01 and img_width_ratio > 0.1 and img_height_ratio > 0.1)
+        or img_width_ratio > 0.5
+        or img_height_ratio > 0.5
+    )
+
+    if img_area_ratio > 0.85:
+        return "large"
+    elif img_area_ratio <= 0.01:
+        return "small"
+    elif is_content_image:
+        return "content"
+    return None
+
+
+def is_scanned_page(large_images_on_page, content_images_on_page, total_image_ratio, page_text_length, page_has_non_selectable_text):
+    """Per page scanned detection, a single scanned page makes the PDF scanned"""
+    if large_images_on_page > 0 and page_text_length < 80:
+        # Large image with minimal text
+        return True
+    
+    if total_image_ratio > 0.85:
+        # Very high image density on this page
+        return True
+    
+    if content_images_on_page > 0 and page_text_length < 100:
+        # Content images with minimal text
+        return True
+    
+    if page_has_non_selectable_text and content_images_on_page > 0:
+        # Non-selectable text with content images indicates scanned
+        return True
+    
+    if total_image_ratio > 0.6 and page_text_length < 200:
+        # High image density with low text
+        return True
+    
+    return False
+
+
+def get_text_selectability(page, text, flags=None):
+    """Return "selectable", "non_selectable" or None when the page has no text"""
+    try:
+        # Get text spans to check if text is properly embedded
+        if flags is None:
+            blocks = page.get_text("dict")  # Get text as dictionary
+        else:
+            blocks = page.get_text("dict", flags=flags)
+        selectable_text_chars = 0
+        total_text_chars = len(text)
+        
+        for block in blocks["blocks"]:
+            if "lines" in block:  # Text block
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        # Check if the span has proper font info and position
+                        # This indicates properly embedded text vs OCR text on images
+                        if span.get("font", "") and span.get("size", 0) > 0:
+                            selectable_text_chars += len(span["text"])
+        
+        # If there's text but very few properly embedded characters, it might be a scanned PDF with OCR
+        if total_text_chars > 0 and selectable_text_chars < total_text_chars * 0.5:  # Less than 50% of text is properly embedded
+            return "non_selectable"
+        elif total_text_chars > 0:
+            return "selectable"
+            
+    except:
+        # If there's an error getting text spans, assume it's selectable
+        if len(text) > 0:
+            return "selectable"
+    return None
+
+
 def is_electronic_pdf(pdf_path):
     try:
         doc = fitz.open(pdf_path)
@@ -42,32 +122,11 @@ def is_electronic_pdf(pdf_path):
             total_text_length += len(text)
             
             # Check text selectability by analyzing text spans and their properties
-            text_instances = 0
-            try:
-                # Get text spans to check if text is properly embedded
-                blocks = page.get_text("dict")  # Get text as dictionary
-                selectable_text_chars = 0
-                total_text_chars = len(text)
-                
-                for block in blocks["blocks"]:
-                    if "lines" in block:  # Text block
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                # Check if the span has proper font info and position
-                                # This indicates properly embedded text vs OCR text on images
-                                if span.get("font", "") and span.get("size", 0) > 0:
-                                    selectable_text_chars += len(span["text"])
-                
-                # If there's text but very few properly embedded characters, it might be a scanned PDF with OCR
-                if total_text_chars > 0 and selectable_text_chars < total_text_chars * 0.5:  # Less than 50% of text is properly embedded
-                    pages_with_text_non_selectable += 1
-                elif total_text_chars > 0:
-                    pages_with_text_selectable += 1
-                    
-            except:
-                # If there's an error getting text spans, assume it's selectable
-                if len(text) > 0:
-                    pages_with_text_selectable += 1
+            selectability = get_text_selectability(page, text)
+            if selectability == "non_selectable":
+                pages_with_text_non_selectable += 1
+            elif selectability == "selectable":
+                pages_with_text_selectable += 1
             
             # Get page dimensions
             page_rect = page.rect
@@ -113,19 +172,12 @@ def is_electronic_pdf(pdf_path):
                         img_file.write(img_data)
 
                     # Classify image
-                    is_content_image = (
-                        img_area_ratio > 0.15
-                        or img_area_ratio > 0.05
-                        or (img_area_ratio > 0.01 and img_width_ratio > 0.1 and img_height_ratio > 0.1)
-                        or img_width_ratio > 0.5
-                        or img_height_ratio > 0.5
-                    )
-
-                    if img_area_ratio > 0.85:
+                    image_class = classify_image(img_area_ratio, img_width_ratio, img_height_ratio)
+                    if image_class == "large":
                         large_images_on_page += 1
-                    elif img_area_ratio <= 0.01:
+                    elif image_class == "small":
                         small_images_on_page += 1
-                    elif is_content_image:
+                    elif image_class == "content":
                         content_images_on_page += 1
 
                     pix = None
@@ -158,129 +210,298 @@ def is_electronic_pdf(pdf_path):
             page_has_non_selectable_text = (pages_with_text_non_selectable > 0)
             
             # Check if current page is scanned
-            if large_images_on_page > 0 and page_text_length < 80:
-                # Large image with minimal text
-                doc.close()
-                return False
-            
-            if total_image_ratio > 0.85:
-                # Very high image density on this page
-                doc.close()
-                return False
-            
-            if content_images_on_page > 0 and page_text_length < 100:
-                # Content images with minimal text
-                doc.close()
-                return False
-            
-            if page_has_non_selectable_text and content_images_on_page > 0:
-                # Non-selectable text with content images indicates scanned
-                doc.close()
-                return False
-            
-            if total_image_ratio > 0.6 and page_text_length < 200:
-                # High image density with low text
+            if is_scanned_page(large_images_on_page, content_images_on_page, total_image_ratio, page_text_length, page_has_non_selectable_text):
                 doc.close()
                 return False
         
         doc.close()
         
-        # Calculate ratios
-        avg_text_per_page = total_text_length / pages_to_check
-        large_image_ratio = pages_with_large_images / pages_to_check
-        content_image_ratio = pages_with_content_images / pages_to_check
-        non_selectable_text_ratio = pages_with_text_non_selectable / pages_to_check
-        high_image_density_ratio = pages_with_high_image_density / pages_to_check
-        
-        # NEW: Check if there's non-selectable text which indicates scanned PDF with OCR
-        if non_selectable_text_ratio > 0.3:  # More than 30% of pages have non-selectable text
-            print("non_selectable_text_ratio > 0.3")
-            return False  # Scanned - text exists but not truly selectable
-        
-        # NEW: High image density with non-selectable text
-        if high_image_density_ratio > 0.5 and non_selectable_text_ratio > 0.2:
-            print("high_image_density_ratio > 0.5 and non_selectable_text_ratio > 0.2")
-            return False  # Scanned - high image density with partially non-selectable text
-        
-        # Decision logic:
-        
-        # Strong indicators of scanned PDF:
-        # 1. Large images covering significant page area
-        if large_image_ratio >= 0.85:  # 50% of pages have large images
-            print("large_image_ratio >= 0.85")
-            if large_image_ratio >= 0.85 and avg_text_per_page < 80:
-                print("large_image_ratio >= 0.85 and avg_text_per_page < 80")
-                return False
-            if large_image_ratio >= 0.85 and avg_text_per_page >= 80 and pages_with_text_non_selectable == 0:
-                print("large_image_ratio >= 0.85 but text is substantial and selectable")
-                return True
-            # return False  # Scanned
-        
-        # 2. High ratio of content images (not just tiny decorations)
-        if content_image_ratio >= 0.7 and avg_text_per_page < 200:
-            print("content_image_ratio >= 0.7 and avg_text_per_page < 200")
-            return False  # Scanned - many content images with little text
-        
-        # 3. High content image density with moderate text
-        if content_image_ratio >= 0.5 and avg_text_per_page < 100:
-            print("content_image_ratio >= 0.5 and avg_text_per_page < 100")
-            return False  # Scanned - significant content images with minimal text
-        
-        # NEW: If there are images AND text is not fully selectable, it's likely scanned
-        if content_image_ratio > 0.3 and non_selectable_text_ratio > 0.1:
-            print("content_image_ratio > 0.3 and non_selectable_text_ratio > 0.1")
-            return False  # Scanned - images present with partially non-selectable text
-        
-        # NEW: If there are many images but text selectability is low
-        if content_image_ratio > 0.4 and pages_with_text_selectable < pages_to_check * 0.5:
-            print("content_image_ratio > 0.4 and pages_with_text_selectable < pages_to_check * 0.5")
-            return False  # Scanned - many images with poor text selectability
-        
-        # NEW: High image density even if some text exists
-        if high_image_density_ratio > 0.7:
-            print("high_image_density_ratio > 0.7")
-            return False  # Scanned - very high image density
-        
-        # Strong indicators of electronic PDF:
-        # 1. Substantial text with few content images and good selectability
-        if avg_text_per_page > 150 and content_image_ratio < 0.3 and pages_with_text_non_selectable == 0:
-            print("avg_text_per_page > 150 and content_image_ratio < 0.3 and pages_with_text_non_selectable == 0")
-            return True  # Electronic - lots of text, few content images, all text selectable
-        
-        # 2. Moderate text with only small decorative images and good selectability
-        if avg_text_per_page > 50 and content_image_ratio < 0.2 and pages_with_text_non_selectable == 0:
-            print("avg_text_per_page > 50 and content_image_ratio < 0.2 and pages_with_text_non_selectable == 0")
-            return True  # Electronic - text exists, only small decorations, all text selectable
-        
-        # 3. Good text-to-content-image ratio with good selectability
-        if avg_text_per_page > 80 and content_image_ratio < 0.4 and pages_with_text_non_selectable == 0:
-            print("avg_text_per_page > 80 and content_image_ratio < 0.4 and pages_with_text_non_selectable == 0")
-            return True  # Electronic - reasonable text amount with few content images, all text selectable
-        
-        # NEW: If text exists but has poor selectability, lean towards scanned
-        if avg_text_per_page > 50 and non_selectable_text_ratio > 0.2:
-            print("avg_text_per_page > 50 and non_selectable_text_ratio > 0.2")
-            return False  # Scanned - some text exists but not properly selectable
-        
-        # NEW: If high image density exists, even with some text, likely scanned
-        if high_image_density_ratio > 0.4 and content_image_ratio > 0.4:
-            print("high_image_density_ratio > 0.4 and content_image_ratio > 0.4")
-            return False  # Scanned - high image density with content images
-        
-        # Fallback: if text is substantial and selectable, consider electronic
-        if avg_text_per_page > 100 and pages_with_text_non_selectable == 0:
-            print("avg_text_per_page > 100 and pages_with_text_non_selectable == 0")
+        return decide_pdf_type(
+            pages_to_check,
+            total_text_length,
+            pages_with_large_images,
+            pages_with_content_images,
+            pages_with_text_selectable,
+            pages_with_text_non_selectable,
+            pages_with_high_image_density,
+        )
+            
+    except Exception as e:
+        print(f"Error processing {pdf_path}: {e}")
+        return False
+
+
+def decide_pdf_type(pages_to_check, total_text_length, pages_with_large_images, pages_with_content_images,
+                    pages_with_text_selectable, pages_with_text_non_selectable, pages_with_high_image_density):
+    """Decide electronic (True) or scanned (False) from the per page counters"""
+    # Calculate ratios
+    avg_text_per_page = total_text_length / pages_to_check
+    large_image_ratio = pages_with_large_images / pages_to_check
+    content_image_ratio = pages_with_content_images / pages_to_check
+    non_selectable_text_ratio = pages_with_text_non_selectable / pages_to_check
+    high_image_density_ratio = pages_with_high_image_density / pages_to_check
+    
+    # NEW: Check if there's non-selectable text which indicates scanned PDF with OCR
+    if non_selectable_text_ratio > 0.3:  # More than 30% of pages have non-selectable text
+        print("non_selectable_text_ratio > 0.3")
+        return False  # Scanned - text exists but not truly selectable
+    
+    # NEW: High image density with non-selectable text
+    if high_image_density_ratio > 0.5 and non_selectable_text_ratio > 0.2:
+        print("high_image_density_ratio > 0.5 and non_selectable_text_ratio > 0.2")
+        return False  # Scanned - high image density with partially non-selectable text
+    
+    # Decision logic:
+    
+    # Strong indicators of scanned PDF:
+    # 1. Large images covering significant page area
+    if large_image_ratio >= 0.85:  # 50% of pages have large images
+        print("large_image_ratio >= 0.85")
+        if large_image_ratio >= 0.85 and avg_text_per_page < 80:
+            print("large_image_ratio >= 0.85 and avg_text_per_page < 80")
+            return False
+        if large_image_ratio >= 0.85 and avg_text_per_page >= 80 and pages_with_text_non_selectable == 0:
+            print("large_image_ratio >= 0.85 but text is substantial and selectable")
             return True
+        # return False  # Scanned
+    
+    # 2. High ratio of content images (not just tiny decorations)
+    if content_image_ratio >= 0.7 and avg_text_per_page < 200:
+        print("content_image_ratio >= 0.7 and avg_text_per_page < 200")
+        return False  # Scanned - many content images with little text
+    
+    # 3. High content image density with moderate text
+    if content_image_ratio >= 0.5 and avg_text_per_page < 100:
+        print("content_image_ratio >= 0.5 and avg_text_per_page < 100")
+        return False  # Scanned - significant content images with minimal text
+    
+    # NEW: If there are images AND text is not fully selectable, it's likely scanned
+    if content_image_ratio > 0.3 and non_selectable_text_ratio > 0.1:
+        print("content_image_ratio > 0.3 and non_selectable_text_ratio > 0.1")
+        return False  # Scanned - images present with partially non-selectable text
+    
+    # NEW: If there are many images but text selectability is low
+    if content_image_ratio > 0.4 and pages_with_text_selectable < pages_to_check * 0.5:
+        print("content_image_ratio > 0.4 and pages_with_text_selectable < pages_to_check * 0.5")
+        return False  # Scanned - many images with poor text selectability
+    
+    # NEW: High image density even if some text exists
+    if high_image_density_ratio > 0.7:
+        print("high_image_density_ratio > 0.7")
+        return False  # Scanned - very high image density
+    
+    # Strong indicators of electronic PDF:
+    # 1. Substantial text with few content images and good selectability
+    if avg_text_per_page > 150 and content_image_ratio < 0.3 and pages_with_text_non_selectable == 0:
+        print("avg_text_per_page > 150 and content_image_ratio < 0.3 and pages_with_text_non_selectable == 0")
+        return True  # Electronic - lots of text, few content images, all text selectable
+    
+    # 2. Moderate text with only small decorative images and good selectability
+    if avg_text_per_page > 50 and content_image_ratio < 0.2 and pages_with_text_non_selectable == 0:
+        print("avg_text_per_page > 50 and content_image_ratio < 0.2 and pages_with_text_non_selectable == 0")
+        return True  # Electronic - text exists, only small decorations, all text selectable
+    
+    # 3. Good text-to-content-image ratio with good selectability
+    if avg_text_per_page > 80 and content_image_ratio < 0.4 and pages_with_text_non_selectable == 0:
+        print("avg_text_per_page > 80 and content_image_ratio < 0.4 and pages_with_text_non_selectable == 0")
+        return True  # Electronic - reasonable text amount with few content images, all text selectable
+    
+    # NEW: If text exists but has poor selectability, lean towards scanned
+    if avg_text_per_page > 50 and non_selectable_text_ratio > 0.2:
+        print("avg_text_per_page > 50 and non_selectable_text_ratio > 0.2")
+        return False  # Scanned - some text exists but not properly selectable
+    
+    # NEW: If high image density exists, even with some text, likely scanned
+    if high_image_density_ratio > 0.4 and content_image_ratio > 0.4:
+        print("high_image_density_ratio > 0.4 and content_image_ratio > 0.4")
+        return False  # Scanned - high image density with content images
+    
+    # Fallback: if text is substantial and selectable, consider electronic
+    if avg_text_per_page > 100 and pages_with_text_non_selectable == 0:
+        print("avg_text_per_page > 100 and pages_with_text_non_selectable == 0")
+        return True
+    
+    # If there's text but poor selectability, consider scanned
+    if avg_text_per_page > 0 and non_selectable_text_ratio > 0.4:
+        print("avg_text_per_page > 0 and non_selectable_text_ratio > 0.4")
+        return False  # Scanned - text exists but mostly non-selectable
+    
+    # Default to scanned if text is minimal
+    print("default")
+    return False
+
+
+def get_sample_pages(num_pages, max_pages):
+    """Pages to check in sampling order: first, last, middle, then evenly spread"""
+    if num_pages <= max_pages:
+        return list(range(num_pages))
+    
+    spread = [round(i * (num_pages - 1) / (max_pages - 1)) for i in range(max_pages)]
+    ordered = [0, num_pages - 1, num_pages // 2] + spread
+    return list(dict.fromkeys(ordered))[:max_pages]
+
+
+def export_page_images(doc, page, page_num, pdf_path):
+    """Write every image of the page to the per-PDF folder, only used for debugging"""
+    pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    pdf_images_folder = os.path.join(os.path.dirname(pdf_path), pdf_name)
+    os.makedirs(pdf_images_folder, exist_ok=True)
+    
+    for image_no, img in enumerate(page.get_images()):
+        try:
+            pix = fitz.Pixmap(doc, img[0])
+            if pix.n - pix.alpha < 4:
+                img_data, img_ext = pix.tobytes("png"), ".png"
+            else:
+                img_data, img_ext = pix.tobytes("jpeg"), ".jpg"
+            with open(os.path.join(pdf_images_folder, f"{pdf_name}_{page_num}_{image_no}{img_ext}"), "wb") as img_file:
+                img_file.write(img_data)
+        except Exception as e:
+            print(f"Error saving image {image_no} from page {page_num} of {pdf_path}: {e}")
+
+
+def measure_page(page):
+    """
+    Text and image metrics of a page without decoding any image.
+    
+    Image sizes are the native pixel sizes stored in the image xref metadata
+    (page.get_images), related to the page size in points like
+    is_electronic_pdf does with the decoded pixmaps, so both modes compute the
+    same ratios and share the thresholds. These are not coverage fractions:
+    a 300 dpi full page scan has an area ratio of about 17.
+    """
+    text = page.get_text().strip()
+    # Skip image blocks so the dict extraction doesn't decode pixels either
+    selectability = get_text_selectability(
+        page, text, flags=fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+    )
+    
+    page_rect = page.rect
+    page_width = page_rect.width
+    page_height = page_rect.height
+    page_area = page_width * page_height
+    
+    total_image_area = 0
+    large_images = 0
+    content_images = 0
+    small_images = 0
+    # Same list as is_electronic_pdf, (xref, smask, width, height, ...)
+    for img in page.get_images(full=True):
+        img_width = img[2]
+        img_height = img[3]
+        img_area = img_width * img_height
+        total_image_area += img_area
+        img_area_ratio = img_area / page_area if page_area > 0 else 0
+        img_width_ratio = img_width / page_width if page_width > 0 else 0
+        img_height_ratio = img_height / page_height if page_height > 0 else 0
         
-        # If there's text but poor selectability, consider scanned
-        if avg_text_per_page > 0 and non_selectable_text_ratio > 0.4:
-            print("avg_text_per_page > 0 and non_selectable_text_ratio > 0.4")
-            return False  # Scanned - text exists but mostly non-selectable
-        
-        # Default to scanned if text is minimal
-        print("default")
-        return False
+        image_class = classify_image(img_area_ratio, img_width_ratio, img_height_ratio)
+        if image_class == "large":
+            large_images += 1
+        elif image_class == "small":
+            small_images += 1
+        elif image_class == "content":
+            content_images += 1
+    
+    return {
+        "text_length": len(text),
+        "selectability": selectability,
+        "large_images": large_images,
+        "content_images": content_images,
+        "image_ratio": total_image_area / page_area if page_area > 0 else 0,
+    }
+
+
+def is_electronic_pdf_fast(pdf_path, debug_images=None):
+    """
+    Sampling based categorization, returns True for electronic PDFs.
+    
+    Checks the first, last and middle page, then pages spread over the
+    document, and stops as soon as a page looks scanned or enough sampled
+    pages are clearly electronic. Uses the same page rules and decision logic
+    as is_electronic_pdf, on the sampled pages only.
+    """
+    if debug_images is None:
+        debug_images = Config.PDF_CATEGORIZATION_DEBUG_IMAGES
+    
+    try:
+        with fitz.open(pdf_path) as doc:
+            num_pages = doc.page_count
+            if num_pages == 0:
+                return False  # Empty PDF
+            
+            sample_pages = get_sample_pages(num_pages, max(Config.PDF_CATEGORIZATION_SAMPLE_PAGES, 1))
+            confident_pages = min(Config.PDF_CATEGORIZATION_CONFIDENT_PAGES, len(sample_pages))
             
+            pages_checked = 0
+            clearly_electronic_pages = 0
+            total_text_length = 0
+            pages_with_large_images = 0
+            pages_with_content_images = 0
+            pages_with_text_selectable = 0
+            pages_with_text_non_selectable = 0
+            pages_with_high_image_density = 0
+            
+            for page_num in sample_pages:
+                page = doc.load_page(page_num)
+                if debug_images:
+                    export_page_images(doc, page, page_num, pdf_path)
+                
+                stats = measure_page(page)
+                pages_checked += 1
+                total_text_length += stats["text_length"]
+                if stats["selectability"] == "non_selectable":
+                    pages_with_text_non_selectable += 1
+                elif stats["selectability"] == "selectable":
+                    pages_with_text_selectable += 1
+                if stats["image_ratio"] > 0.6:
+                    pages_with_high_image_density += 1
+                if stats["large_images"] > 0:
+                    pages_with_large_images += 1
+                if stats["content_images"] > 0:
+                    pages_with_content_images += 1
+                
+                if is_scanned_page(
+                    stats["large_images"],
+                    stats["content_images"],
+                    stats["image_ratio"],
+                    stats["text_length"],
+                    pages_with_text_non_selectable > 0,
+                ):
+                    print(f"Page {page_num} looks scanned")
+                    return False
+                
+                # Plenty of selectable text and no content images
+                if (
+                    stats["selectability"] == "selectable"
+                    and stats["text_length"] >= 200
+                    and stats["large_images"] == 0
+                    and stats["content_images"] == 0
+                    and stats["image_ratio"] < 0.3
+                ):
+                    clearly_electronic_pages += 1
+                
+                if clearly_electronic_pages == pages_checked >= confident_pages:
+                    print(f"{pages_checked} sampled pages are clearly electronic")
+                    return True
+            
+            return decide_pdf_type(
+                pages_checked,
+                total_text_length,
+                pages_with_large_images,
+                pages_with_content_images,
+                pages_with_text_selectable,
+                pages_with_text_non_selectable,
+                pages_with_high_image_density,
+            )
+    
     except Exception as e:
         print(f"Error processing {pdf_path}: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+def categorize_pdf(pdf_path):
+    """Categorize a PDF with the configured mode, True for electronic"""
+    if Config.PDF_CATEGORIZATION_MODE == "full":
+        return is_electronic_pdf(pdf_path)
+    return is_electronic_pdf_fast(pdf_path)
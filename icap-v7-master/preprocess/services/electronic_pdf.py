@@ -9,6 +9,10 @@ from datetime import datetime
 from collections import defaultdict
 from pdf2image import convert_from_path
 import gc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.config import Config
 
 
 def extract_font_info(word_info):
@@ -146,14 +150,19 @@ def process_word(chars, span_info, page_num, page_height, scale_factor, output_d
     })
 
 
-def extract_words_with_pdfplumber(pdf_path, dpi=300):
-    """Extract words using PDFPlumber with enhanced style detection"""
+def extract_words_with_pdfplumber(pdf_path, dpi=300, first_page=1, last_page=None):
+    """Extract words using PDFPlumber with enhanced style detection
+    
+    first_page/last_page (1-based, inclusive) limit extraction to a page range
+    so ranges can be extracted in separate processes.
+    """
     scale_factor = dpi / 72.0
     output_data = []
     page_dims = {}
 
     with pdfplumber.open(pdf_path) as pdf:
-        for page_num, page in enumerate(pdf.pages):
+        pages = pdf.pages[first_page - 1:last_page]
+        for page_num, page in enumerate(pages, first_page - 1):
             # Get page dimensions
             width_pts = page.width
             height_pts = page.height
@@ -198,6 +207,9 @@ def extract_words_with_pdfplumber(pdf_path, dpi=300):
                     
                     process_word(word_char, font_info, page_num, height_pts, 
                                scale_factor, output_data, pixel_block_bbox)
+            
+            # Release the cached page objects, ranges can be large
+            page.flush_cache()
     
     return output_data, page_dims
 
@@ -244,6 +256,52 @@ def detect_blocks_from_words(words, block_threshold=50):
     
     return blocks
 
+def rasterize_page_range(pdf_path, batch_folder, first_page, last_page, first_tm_no, dpi=300):
+    """
+    Convert a page range of a PDF to TIFF images named from first_tm_no.
+    
+    Returns:
+        List of (page number, tif filename, tm number) in page order
+    """
+    pages = convert_from_path(
+        pdf_path,
+        dpi=dpi,
+        first_page=first_page,
+        last_page=last_page
+    )
+    
+    saved = []
+    for offset, page in enumerate(pages):
+        tm_no = first_tm_no + offset
+        tif_filename = f"tm{str(tm_no).zfill(6)}.tif"
+        output_file = os.path.join(batch_folder, tif_filename)
+        
+        # Save the TIF
+        page.save(output_file, 'TIFF', dpi=(dpi, dpi), compression='tiff_lzw')
+        saved.append((first_page + offset, tif_filename, tm_no))
+    
+    # Clear range from memory
+    del pages
+    gc.collect()
+    return saved
+
+
+def register_tiff_pages(saved_pages, tif_files, pdf_info, pdf_key, pdf_path, parent_image, num_pages):
+    """Record rasterized pages in tif_files and pdf_info"""
+    for page_counter, tif_filename, tm_no in saved_pages:
+        tif_files[page_counter] = tif_filename
+        
+        # Store page info in PDF info
+        pdf_info[pdf_key][f'TM{str(tm_no).zfill(6)}'] = {
+            'pdf': os.path.basename(pdf_path),
+            'tiff': tif_filename,
+            'parent': parent_image,
+            'xml': f"TM{str(tm_no).zfill(6)}_layout.xml",
+        }
+        
+        print(f"Saved TIFF file: {tif_filename} (Page {page_counter} of {num_pages})")
+
+
 def convert_and_save_tiffs_batched(pdf_path, batch_folder, tm_no, pdf_info, pdf_key, parent_image, dpi=300, batch_size=5):
     """
     Convert PDF to TIFF images in batches and save immediately to manage memory.
@@ -267,51 +325,66 @@ def convert_and_save_tiffs_batched(pdf_path, batch_folder, tm_no, pdf_info, pdf_
     
     print(f"Converting PDF to images in batches to manage memory...")
     tif_files = {}
-    page_counter = 1
     
     # Process in batches
     for start_page in range(1, num_pages + 1, batch_size):
         end_page = min(start_page + batch_size - 1, num_pages)
         print(f"Converting pages {start_page}-{end_page} of {num_pages}...")
         
-        batch_pages = convert_from_path(
-            pdf_path,
-            dpi=dpi,
-            first_page=start_page,
-            last_page=end_page
-        )
-        
-        # Save TIFF files immediately
-        for page in batch_pages:
-            tif_id = f"tm{str(tm_no).zfill(6)}"
-            tif_filename = f"{tif_id}.tif"
-            output_file = os.path.join(batch_folder, tif_filename)
-            
-            # Save the TIF
-            page.save(output_file, 'TIFF', dpi=(dpi, dpi), compression='tiff_lzw')
-            tif_files[page_counter] = tif_filename
-            
-            # Store page info in PDF info
-            pdf_info[pdf_key][f'TM{str(tm_no).zfill(6)}'] = {
-                'pdf': os.path.basename(pdf_path),
-                'tiff': tif_filename,
-                'parent': parent_image,
-                'xml': f"TM{str(tm_no).zfill(6)}_layout.xml",
-            }
-            
-            print(f"Saved TIFF file: {tif_filename} (Page {page_counter} of {num_pages})")
-            
-            tm_no += 1
-            page_counter += 1
-        
-        # Clear batch from memory
-        del batch_pages
-        gc.collect()
+        saved_pages = rasterize_page_range(pdf_path, batch_folder, start_page, end_page, tm_no, dpi=dpi)
+        register_tiff_pages(saved_pages, tif_files, pdf_info, pdf_key, pdf_path, parent_image, num_pages)
+        tm_no += len(saved_pages)
     
     print(f"Converted {num_pages} pages from PDF to image")
     return tif_files, tm_no
 
 
+def get_electronic_pdf_workers():
+    """Number of worker processes for page-parallel processing"""
+    workers = Config.ELECTRONIC_PDF_WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def process_pdf_pages_parallel(executor, pdf_path, num_pages, batch_folder, tm_no, pdf_info, pdf_key, parent_image, dpi=300, pages_per_task=5):
+    """
+    Extract words and rasterize TIFFs of one PDF in page ranges across processes.
+    
+    Word extraction and rasterization of the same range are submitted next to
+    each other so they run concurrently. Results are merged in page order, so
+    the output matches the serial path.
+    
+    Returns:
+        Tuple of (extracted_data, page_dims, tif_files, updated tm_no)
+    """
+    word_futures = []
+    tiff_futures = []
+    for start_page in range(1, num_pages + 1, pages_per_task):
+        end_page = min(start_page + pages_per_task - 1, num_pages)
+        word_futures.append(
+            executor.submit(extract_words_with_pdfplumber, pdf_path, dpi, start_page, end_page)
+        )
+        tiff_futures.append(
+            executor.submit(rasterize_page_range, pdf_path, batch_folder, start_page, end_page, tm_no + start_page - 1, dpi)
+        )
+    
+    extracted_data = []
+    page_dims = {}
+    for future in word_futures:
+        words, dims = future.result()
+        extracted_data.extend(words)
+        page_dims.update(dims)
+    
+    tif_files = {}
+    for future in tiff_futures:
+        saved_pages = future.result()
+        register_tiff_pages(saved_pages, tif_files, pdf_info, pdf_key, pdf_path, parent_image, num_pages)
+        tm_no += len(saved_pages)
+    
+    return extracted_data, page_dims, tif_files, tm_no
+
+
 def generate_font_style_string(word):
     """Generate style string in the format expected by the new RAJson format"""
     font_style = "font-name: " + word['font'].lower() + "; font-family: " + word.get('family', 'swiss') + ";"
@@ -665,72 +738,106 @@ def process_files(file_paths, output_folder, batch_id, profile_name, project, do
     # PDF info dictionary for tracking
     pdf_info = {}
     
-    # Process each renamed PDF
-    for doc_index, pdf_path in enumerate(renamed_pdfs.keys(), 1):
-        try:
-            print(f"\n===== Processing {pdf_path} ({doc_index} of {len(renamed_pdfs)}) =====")
+    # Page-parallel mode, the pool is shared by every PDF of the batch and
+    # only started once a PDF spans more than one page range
+    workers = get_electronic_pdf_workers()
+    pages_per_task = max(Config.ELECTRONIC_PDF_PAGES_PER_TASK, 1)
+    executor = None
+    
+    try:
+        # Process each renamed PDF
+        for doc_index, pdf_path in enumerate(renamed_pdfs.keys(), 1):
+            try:
+                print(f"\n===== Processing {pdf_path} ({doc_index} of {len(renamed_pdfs)}) =====")
             
-            # Create document ID with sequential numbering 
-            document_id = f"{batch_id}.{doc_index:02d}"
+                # Create document ID with sequential numbering 
+                document_id = f"{batch_id}.{doc_index:02d}"
             
-            # Get the parent image (the renamed PDF name)
-            parent_image, original_file_path = renamed_pdfs[pdf_path]
+                # Get the parent image (the renamed PDF name)
+                parent_image, original_file_path = renamed_pdfs[pdf_path]
             
-            # Extract base_id from parent_image (remove .pdf extension)
-            base_id = parent_image[:-4]
+                # Extract base_id from parent_image (remove .pdf extension)
+                base_id = parent_image[:-4]
             
-            # Create a unique key for this PDF
-            pdf_key = f"{batch_folder}_{os.path.basename(pdf_path)}"
-            pdf_info[pdf_key] = {}
+                # Create a unique key for this PDF
+                pdf_key = f"{batch_folder}_{os.path.basename(pdf_path)}"
+                pdf_info[pdf_key] = {}
             
-            # Count pages in PDF
-            with pdfplumber.open(pdf_path) as pdf:
-                num_pages = len(pdf.pages)
-                print(f"PDF contains {num_pages} pages")
+                # Count pages in PDF
+                with pdfplumber.open(pdf_path) as pdf:
+                    num_pages = len(pdf.pages)
+                    print(f"PDF contains {num_pages} pages")
             
-            # Extract text data using PDFPlumber's word extraction
-            print(f"Extracting text from PDF: {pdf_path}")
-            extracted_data, page_dims = extract_words_with_pdfplumber(pdf_path, dpi=dpi)
-            print(f"Extracted {len(extracted_data)} words from {len(page_dims)} pages")
-            
-            # Convert PDF to images in batches and save immediately
-            tif_files, tm_no = convert_and_save_tiffs_batched(
-                pdf_path=pdf_path,
-                batch_folder=batch_folder,
-                tm_no=tm_no,
-                pdf_info=pdf_info,
-                pdf_key=pdf_key,
-                parent_image=parent_image,
-                dpi=dpi,
-                batch_size=5
-            )
-
-            # Convert to RA JSON format for this document
-            ra_json = convert_to_ra_json(extracted_data, tif_files, original_file_path, page_dims, base_id=base_id, parent_image=parent_image)
+                if workers > 1 and num_pages > pages_per_task:
+                    if executor is None:
+                        # spawn, forking the threaded rabbitmq consumer is unsafe
+                        executor = ProcessPoolExecutor(
+                            max_workers=workers,
+                            mp_context=multiprocessing.get_context("spawn")
+                        )
+                    print(f"Extracting text and images from PDF in parallel: {pdf_path} ({workers} workers)")
+                    extracted_data, page_dims, tif_files, tm_no = process_pdf_pages_parallel(
+                        executor=executor,
+                        pdf_path=pdf_path,
+                        num_pages=num_pages,
+                        batch_folder=batch_folder,
+                        tm_no=tm_no,
+                        pdf_info=pdf_info,
+                        pdf_key=pdf_key,
+                        parent_image=parent_image,
+                        dpi=dpi,
+                        pages_per_task=pages_per_task
+                    )
+                    print(f"Extracted {len(extracted_data)} words from {len(page_dims)} pages")
+                else:
+                    # Extract text data using PDFPlumber's word extraction
+                    print(f"Extracting text from PDF: {pdf_path}")
+                    extracted_data, page_dims = extract_words_with_pdfplumber(pdf_path, dpi=dpi)
+                    print(f"Extracted {len(extracted_data)} words from {len(page_dims)} pages")
+                
+                    # Convert PDF to images in batches and save immediately
+                    tif_files, tm_no = convert_and_save_tiffs_batched(
+                        pdf_path=pdf_path,
+                        batch_folder=batch_folder,
+                        tm_no=tm_no,
+                        pdf_info=pdf_info,
+                        pdf_key=pdf_key,
+                        parent_image=parent_image,
+                        dpi=dpi,
+                        batch_size=pages_per_task
+                    )
+
+                # Convert to RA JSON format for this document
+                ra_json = convert_to_ra_json(extracted_data, tif_files, original_file_path, page_dims, base_id=base_id, parent_image=parent_image)
             
-            # We only take the first document node
-            if ra_json["nodes"] and len(ra_json["nodes"]) > 0:
-                document_node = ra_json["nodes"][0]
+                # We only take the first document node
+                if ra_json["nodes"] and len(ra_json["nodes"]) > 0:
+                    document_node = ra_json["nodes"][0]
                 
-                # Update document node properties
-                document_node["id"] = document_id
-                document_node["Vendor"] = vendor
-                document_node["DocType"] = doc_type
-                document_node["Project"] = project
-                document_node["Language"] = language
-                document_node["DefinitionID"] = profile_name
-                document_node["NameMatchingText"] = None
+                    # Update document node properties
+                    document_node["id"] = document_id
+                    document_node["Vendor"] = vendor
+                    document_node["DocType"] = doc_type
+                    document_node["Project"] = project
+                    document_node["Language"] = language
+                    document_node["DefinitionID"] = profile_name
+                    document_node["NameMatchingText"] = None
                 
-                # Add this document node to the combined result
-                combined_ra_json["nodes"].append(document_node)
-                print(f"Added document node {document_id} with {len(document_node['children'])} pages")
-            else:
-                print(f"WARNING: No document nodes in RA JSON for {pdf_path}")
+                    # Add this document node to the combined result
+                    combined_ra_json["nodes"].append(document_node)
+                    print(f"Added document node {document_id} with {len(document_node['children'])} pages")
+                else:
+                    print(f"WARNING: No document nodes in RA JSON for {pdf_path}")
                 
-        except Exception as e:
-            print(f"ERROR processing {pdf_path}: {e}")
-            import traceback
-            traceback.print_exc()
+            except Exception as e:
+                print(f"ERROR processing {pdf_path}: {e}")
+                import traceback
+                traceback.print_exc()
+    
+    finally:
+        # Also on errors, the pool processes would outlive the task
+        if executor is not None:
+            executor.shutdown()
     
     # Save the final combined JSON with the output.json name
     output_ra_json_path = os.path.join(batch_folder, "output.json")
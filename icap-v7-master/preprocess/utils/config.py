@@ -29,6 +29,19 @@ class Config:
     # Worker Configuration
     WORKER_TIMEOUT: Optional[int] = int(os.getenv("WORKER_TIMEOUT", "30"))
     
+    # Electronic PDF Configuration
+    # Processes used to extract and rasterize pages, 0 = one per CPU, 1 = serial
+    ELECTRONIC_PDF_WORKERS: int = int(os.getenv("ELECTRONIC_PDF_WORKERS", "0"))
+    ELECTRONIC_PDF_PAGES_PER_TASK: int = int(os.getenv("ELECTRONIC_PDF_PAGES_PER_TASK", "5"))
+    
+    # PDF Categorization Configuration
+    # "fast" samples pages and never decodes images, "full" checks every page
+    PDF_CATEGORIZATION_MODE: str = os.getenv("PDF_CATEGORIZATION_MODE", "fast").lower()
+    PDF_CATEGORIZATION_SAMPLE_PAGES: int = int(os.getenv("PDF_CATEGORIZATION_SAMPLE_PAGES", "8"))
+    PDF_CATEGORIZATION_CONFIDENT_PAGES: int = int(os.getenv("PDF_CATEGORIZATION_CONFIDENT_PAGES", "3"))
+    PDF_CATEGORIZATION_DEBUG_IMAGES: bool = os.getenv("PDF_CATEGORIZATION_DEBUG_IMAGES", "false").lower() == "true"
+    PDF_CATEGORIZATION_WORKERS: int = int(os.getenv("PDF_CATEGORIZATION_WORKERS", "0"))
+    
     # Logging Configuration
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
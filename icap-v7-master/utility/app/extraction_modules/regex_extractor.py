@@ -23,6 +23,11 @@ Functions:
    - **Returns**:
      - The top position (`key1`) of the matching line.
 
+   **get_anchor_index(data)** builds the normalized chunk texts of every page once per
+   document, so anchors are searched with a single rapidfuzz call per page and key.
+
+   **get_compiled_pattern(pattern, flags)** returns the cached compiled regex.
+
 3. **get_left_pos(pos)**, **get_top_pos(pos)**, **get_right_pos(pos)**, **get_bottom_pos(pos)**:
    Extracts the respective position values (left, top, right, bottom) from a position string.
    - **Parameters**:
@@ -86,9 +91,12 @@ print(output_list)
 """
 
 import re
+import threading
 import traceback
+from collections import OrderedDict
+from functools import lru_cache
 
-from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz, process, utils
 
 from ..json_chunking import json_chunking_main
 from .value_directed_script import replace_page_id_string
@@ -116,12 +124,66 @@ def get_value_pos_from_list(input_list):
     return output_pos
 
 
-def find_line_top_pos(data_detail, find_key):
+# fuzzywuzzy WRatio rounded the score and required more than 90
+ANCHOR_SCORE_CUTOFF = 90.5
+ANCHOR_INDEX_CACHE_SIZE = 32
+
+_anchor_indexes = OrderedDict()
+_anchor_indexes_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1024)
+def get_compiled_pattern(pattern, flags=0):
+    """Compiled regex of a user pattern, compiled once per pattern and flags"""
+    return re.compile(pattern, flags)
+
+
+def build_page_anchor_index(data_detail):
+    """Line keys and normalized texts of every chunk of a page, in line order"""
+    line_keys = list()
+    texts = list()
     for key1, value1 in data_detail.items():
         for elem in value1:
-            text = elem[0]
-            if (fuzz.WRatio(text, find_key)) > 90:
-                return key1
+            line_keys.append(key1)
+            texts.append(utils.default_process(elem[0]))
+    return line_keys, texts
+
+
+def get_anchor_index(data):
+    """
+    Anchor index of a document's chunking data, built once and shared by every
+    regex key of the document. The entry keeps a reference to the data so its
+    id can not be reused while cached.
+    """
+    key = id(data)
+    with _anchor_indexes_lock:
+        entry = _anchor_indexes.get(key)
+        if entry is not None and entry[0] is data:
+            _anchor_indexes.move_to_end(key)
+            return entry[1]
+
+    index = {page: build_page_anchor_index(line) for page, line in data.items()}
+    with _anchor_indexes_lock:
+        _anchor_indexes[key] = (data, index)
+        if len(_anchor_indexes) > ANCHOR_INDEX_CACHE_SIZE:
+            _anchor_indexes.popitem(last=False)
+    return index
+
+
+def find_line_top_pos(data_detail, find_key, page_index=None):
+    """Top position of the first line with a chunk matching find_key"""
+    line_keys, texts = page_index or build_page_anchor_index(data_detail)
+    matches = process.extract(
+        utils.default_process(find_key),
+        texts,
+        scorer=fuzz.WRatio,
+        score_cutoff=ANCHOR_SCORE_CUTOFF,
+        limit=None,
+    )
+    if not matches:
+        return None
+    # First matching chunk in reading order, like the line by line scan
+    return line_keys[min(match[2] for match in matches)]
 
 
 def get_left_pos(pos):
@@ -223,6 +285,8 @@ def regex_extractor_function(
         except:
             pass
 
+        anchor_index = get_anchor_index(data) if top_anchor or bottom_anchor else {}
+
         """
         Primary loop
         """
@@ -232,9 +296,13 @@ def regex_extractor_function(
 
             try:
                 if top_anchor:
-                    paragraph_top = find_line_top_pos(data[page], top_anchor)
+                    paragraph_top = find_line_top_pos(
+                        data[page], top_anchor, anchor_index[page]
+                    )
                 if bottom_anchor:
-                    paragraph_bottom = find_line_top_pos(data[page], bottom_anchor)
+                    paragraph_bottom = find_line_top_pos(
+                        data[page], bottom_anchor, anchor_index[page]
+                    )
             except:
                 pass
 
@@ -283,6 +351,7 @@ def regex_extractor_function(
 
                 for regex in regex_list:
                     try:
+                        pattern = get_compiled_pattern(regex)
                         """
                         Finds and extracts all regex matches form chunking dictionary and appends to the output list
                         """
@@ -291,7 +360,7 @@ def regex_extractor_function(
                         ):
 
                             additional_lines = None
-                            matched_list = list(re.finditer(regex, line_text))
+                            matched_list = list(pattern.finditer(line_text))
 
                             if (
                                 grab_extra_trigger
@@ -306,7 +375,7 @@ def regex_extractor_function(
                                 if additional_lines:
                                     line_text = f"{line_text} {additional_lines}"
 
-                            matched_list = re.findall(regex, line_text)
+                            matched_list = pattern.findall(line_text)
 
                             if matched_list:
                                 regex_found = True
@@ -337,7 +406,7 @@ def regex_extractor_function(
                         else:
 
                             additional_lines = None
-                            matched_list = list(re.finditer(regex, line_text))
+                            matched_list = list(pattern.finditer(line_text))
 
                             if (
                                 grab_extra_trigger
@@ -351,7 +420,7 @@ def regex_extractor_function(
                                 )
                                 if additional_lines:
                                     line_text = f"{line_text} {additional_lines}"
-                            matched_list = list(re.finditer(regex, line_text))
+                            matched_list = list(pattern.finditer(line_text))
                             if matched_list:
                                 regex_found = True
                                 page_no_format = "TM000000"
@@ -4,7 +4,7 @@ from collections import OrderedDict
 from app.extraction_modules.excel_sub_module import excel_extraction_request
 
 from ..response_formator import populate_error_response
-from .key_module_central import extraction_tools_request
+from .key_module_central import cached_extraction_tools_request
 
 """
 This script is a Python module that performs key-value extraction from documents and incorporates data from external sources, such as robots and Excel files. Here's a technical summary:
@@ -126,7 +126,7 @@ def main(request_data, d_json, messages, query_key_list):
                     if key.get("isCompoundKey") == True:
                         keyLabel = key["keyLabel"]
                         compound_key_list = key["compoundItems"]
-                        compound_results, messages = extraction_tools_request(
+                        compound_results, messages = cached_extraction_tools_request(
                             compound_key_list, request_data, input_doc_idx, messages
                         )
                         for index, compound_result in enumerate(compound_results[:]):
@@ -172,7 +172,7 @@ def main(request_data, d_json, messages, query_key_list):
             except:
                 print(traceback.print_exc())
                 pass
-            results, messages = extraction_tools_request(
+            results, messages = cached_extraction_tools_request(
                 query_key_list, request_data, input_doc_idx, messages
             )
 
@@ -8,7 +8,13 @@ from datetime import date
 
 import requests
 from fuzzywuzzy import fuzz
-from redis_utils import get_redis_data
+from job_context import get_job_context, get_job_value
+from stage_cache import (
+    get_digest,
+    get_memo_digest,
+    mark_stage_failed,
+    memoize_stage,
+)
 
 from app.extraction_modules.regex_extractor import regex_extractor_function
 from app.extraction_modules.selector import get_value_pos_from_list, selector_function
@@ -243,6 +249,89 @@ AWB_BATCH_DATA = {}
 AWB_BATCH_DATA_WORD_ONLY = {}
 
 
+def cached_extraction_tools_request(
+    input_query_key_list, request_data, input_doc_idx, messages
+):
+    """
+    extraction_tools_request reusing the output of a previous run when the
+    document, the queried keys and the definition data they read did not change.
+    """
+    ra_json = request_data["ra_json"]
+    d_json = request_data["data_json"]
+    job_id = request_data["job_id"]
+    target_doc = d_json["nodes"][input_doc_idx]
+    context = get_job_context(job_id)
+    memo = context.digests if context is not None else None
+
+    def get_document():
+        # Only the block nodes of the data json document are read
+        return {
+            "attributes": {k: v for k, v in target_doc.items() if k != "children"},
+            "blocks": [
+                node
+                for node in target_doc.get("children", [])
+                if "blocks" in node["id"].lower()
+            ],
+        }
+
+    if target_doc.get("DocType") == "Airway Bill":
+        # AWB batches are built from the whole ra_json
+        ra_digest = get_memo_digest(memo, "ra_json", lambda: ra_json)
+    else:
+        ra_digest = get_memo_digest(
+            memo, f"ra_document:{input_doc_idx}", lambda: ra_json["nodes"][input_doc_idx]
+        )
+
+    # Only the parts of the definitions and settings extraction reads, editing
+    # a table or another key does not invalidate the stored keys
+    definition_settings = request_data.get("definition_settings") or {}
+    jap_eng_convert_profiles = (definition_settings.get("profileSettings") or {}).get(
+        "jap_eng_convert_profiles", []
+    )
+    key_types = {key.get("type") for key in input_query_key_list}
+
+    digests = {
+        "keys": get_digest(input_query_key_list),
+        "anchor_thresholds": extract_anchor_thresholds(request_data),
+        "single_line_mode": d_json.get("DefinitionID") in jap_eng_convert_profiles,
+        "ra_json": ra_digest,
+        "document": get_memo_digest(memo, f"document:{input_doc_idx}", get_document),
+        "chunking": get_memo_digest(
+            memo,
+            f"chunking:{input_doc_idx}",
+            lambda: (get_job_value(job_id, "chunking_dictionary") or {}).get(
+                str(input_doc_idx)
+            ),
+        ),
+        "master_dictionaries": get_memo_digest(
+            memo,
+            "awb_key_data",
+            lambda: (request_data.get("master_dictionaries") or {}).get("awb_key_data"),
+        ),
+        "project": request_data.get("project"),
+    }
+    if "singleColumn" in key_types:
+        # Sent to the single column extractor, table definitions are not keys
+        digests["key_definitions"] = get_memo_digest(
+            memo,
+            "key_definitions",
+            lambda: [
+                {k: v for k, v in definition.items() if k != "table"}
+                for definition in request_data.get("definitions") or []
+            ],
+        )
+    if "today" in key_types:
+        digests["today"] = date.today().isoformat()
+    return memoize_stage(
+        "key_extraction",
+        digests,
+        lambda messages: extraction_tools_request(
+            input_query_key_list, request_data, input_doc_idx, messages
+        ),
+        messages,
+    )
+
+
 def extraction_tools_request(
     input_query_key_list, request_data, input_doc_idx, messages
 ):
@@ -286,7 +375,7 @@ def extraction_tools_request(
 
     # For anchors
     json_chunking_thresholds = extract_anchor_thresholds(request_data)
-    input_dict = get_redis_data(job_id).get("chunking_dictionary")
+    input_dict = get_job_value(job_id, "chunking_dictionary")
 
     single_line_mode = False
     definition_settings = request_data["definition_settings"]
@@ -515,6 +604,7 @@ def extraction_tools_request(
                                 anchor_values.append(value)
                     except:
                         print(traceback.print_exc())
+                        mark_stage_failed()
                         pass
 
                 else:
@@ -523,6 +613,7 @@ def extraction_tools_request(
 
             except:
                 print(traceback.print_exc())
+                mark_stage_failed()
                 pass
 
         elif "type" in key.keys() and key["type"] == "static":
@@ -571,6 +662,7 @@ def extraction_tools_request(
                 results.append(key_val_dict)
             except:
                 print(traceback.print_exc())
+                mark_stage_failed()
 
         elif key.get("type") == "auto":
             discontinue = False
@@ -610,6 +702,7 @@ def extraction_tools_request(
                     )
                 except:
                     print(traceback.print_exc())
+                    mark_stage_failed()
 
                 if extraction_data:
                     extracted_block["text"] = extraction_data["text"]
@@ -735,6 +828,7 @@ def extraction_tools_request(
                     )
                 except:
                     print(traceback.print_exc())
+                    mark_stage_failed()
                     discontinue = True
 
                 if not discontinue:
@@ -751,11 +845,12 @@ def extraction_tools_request(
 
                     extracted_data = None
                     try:
-                        extracted_data = (
-                            requests.post(url, json=data).json().get("data")
-                        )
+                        response = requests.post(url, json=data)
+                        response.raise_for_status()
+                        extracted_data = response.json().get("data")
                     except:
                         print(traceback.print_exc())
+                        mark_stage_failed()
                         pass
 
                     # print(extracted_data)
@@ -839,6 +934,7 @@ def extraction_tools_request(
                                 results.append(key_val_dict)
             except:
                 print(traceback.print_exc())
+                mark_stage_failed()
                 pass
 
         elif key.get("type") == "barcode":
@@ -869,6 +965,7 @@ def extraction_tools_request(
 
             except:
                 print(traceback.print_exc())
+                mark_stage_failed()
 
                 pass
 
@@ -968,6 +1065,7 @@ def extraction_tools_request(
                                         )
                                     except:
                                         print(traceback.print_exc())
+                                        mark_stage_failed()
                                         pass
 
                                 # checking if the queried shape contains at qualifer value
@@ -1081,6 +1179,7 @@ def extraction_tools_request(
                                 )
                             except:
                                 print(traceback.print_exc())
+                                mark_stage_failed()
                                 pass
                         else:
                             # print(key_val_match_holder)
@@ -1093,6 +1192,7 @@ def extraction_tools_request(
                                     )
                                 except:
                                     print(traceback.print_exc())
+                                    mark_stage_failed()
                                     pass
                                 copied_block["text"] = text
 
@@ -1157,6 +1257,7 @@ def extraction_tools_request(
                 messages.append(lineSpace)
     except:
         print(traceback.print_exc())
+        mark_stage_failed()
         pass
 
     return results, messages
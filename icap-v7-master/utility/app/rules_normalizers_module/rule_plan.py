@@ -0,0 +1,351 @@
+"""
+Compiled rule plans.
+
+Rule definitions are turned into plans once and reused: every value rule is
+bound to its sub rule function and inputs, so applying it to a value is a
+single call instead of a walk through the rule type chain, and sub rules
+that were evaluated twice (once as a predicate, once for the result) are
+evaluated once. Plans are cached by a hash of the rules they were compiled
+from, a changed definition gets a new plan.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import partial
+from operator import methodcaller
+
+from app.rules_normalizers_module.sub_rules.add_prefix import apply_prefix_rule
+from app.rules_normalizers_module.sub_rules.add_suffix import apply_suffix_rule
+from app.rules_normalizers_module.sub_rules.calculate import apply_calculate_function
+from app.rules_normalizers_module.sub_rules.case_rules import (
+    set_lowercase_values_rule,
+    set_uppercase_values_rule,
+)
+from app.rules_normalizers_module.sub_rules.conditioned_central import (
+    apply_conditioned_rule,
+)
+from app.rules_normalizers_module.sub_rules.contains import apply_contains_function
+from app.rules_normalizers_module.sub_rules.convert_decimal import (
+    apply_convert_decimals_to_cw1,
+)
+from app.rules_normalizers_module.sub_rules.correct_data_type import (
+    apply_correct_data_type,
+)
+from app.rules_normalizers_module.sub_rules.delete_from import apply_delete_from
+from app.rules_normalizers_module.sub_rules.delete_until import apply_delete_Until
+from app.rules_normalizers_module.sub_rules.dimension_seperator_ocr_fix import (
+    apply_dimension_sep_fix,
+)
+from app.rules_normalizers_module.sub_rules.ends_with import apply_ends_with_function
+from app.rules_normalizers_module.sub_rules.ends_with_v5 import (
+    apply_endswithv5_function,
+)
+from app.rules_normalizers_module.sub_rules.exclude import apply_exclude_rules_on
+from app.rules_normalizers_module.sub_rules.extract import (
+    apply_extract_substring_function,
+)
+from app.rules_normalizers_module.sub_rules.extract_pattern import apply_extract_pattern
+from app.rules_normalizers_module.sub_rules.numeric_value_format import (
+    apply_format_currency_to_na_standard,
+)
+from app.rules_normalizers_module.sub_rules.replace_function import (
+    apply_replace_function,
+)
+from app.rules_normalizers_module.sub_rules.round_decimal import (
+    apply_round_decimal_rule,
+)
+from app.rules_normalizers_module.sub_rules.starts_with import (
+    apply_starts_with_function,
+)
+from app.rules_normalizers_module.sub_rules.starts_with_v5 import (
+    apply_startswithv5_function,
+)
+from app.rules_normalizers_module.sub_rules.trim_values import trim_values_rule
+
+PLAN_CACHE_SIZE = 256
+
+
+class PlanCache:
+    """Small thread safe LRU of compiled plans keyed by rules hash"""
+
+    def __init__(self, size=PLAN_CACHE_SIZE):
+        self.size = size
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, rules, compile_function):
+        key = get_rules_hash(rules)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                return plan
+
+        plan = compile_function(rules)
+        with self._lock:
+            self._plans[key] = plan
+            if len(self._plans) > self.size:
+                self._plans.popitem(last=False)
+        return plan
+
+
+class RuleCache:
+    """
+    LRU of compiled rules keyed by the rule object itself.
+
+    Rules come from cached plans so the same objects are seen for every value,
+    the entry keeps a reference to its rule so the id can not be reused.
+    """
+
+    def __init__(self, size=PLAN_CACHE_SIZE * 16):
+        self.size = size
+        self._rules = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, rule, compile_function):
+        key = id(rule)
+        with self._lock:
+            entry = self._rules.get(key)
+            if entry is not None and entry[0] is rule:
+                self._rules.move_to_end(key)
+                return entry[1]
+
+        compiled = compile_function(rule)
+        with self._lock:
+            self._rules[key] = (rule, compiled)
+            if len(self._rules) > self.size:
+                self._rules.popitem(last=False)
+        return compiled
+
+
+def get_rules_hash(rules):
+    """Hash of a rule definition, used as plan cache key"""
+    serialized = json.dumps(rules, sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+def get_rule_inputs(rule):
+    try:
+        return rule["inputs"]
+    except:
+        return rule["data"]["inputs"]
+
+
+"""
+Key rules (rules_functionality.execute_rule)
+"""
+
+
+def keep_if(predicate, rule_inputs, value):
+    """Filter rules: keep the value only when the predicate passes"""
+    return value if predicate(rule_inputs, value) else None
+
+
+def result_or_none(function, rule_inputs, value):
+    """Rules whose empty result discards the value"""
+    return function(rule_inputs, value) or None
+
+
+def result_or_value(function, rule_inputs, value):
+    """Rules whose empty result keeps the original value"""
+    return function(rule_inputs, value) or value
+
+
+def keep_value(value):
+    return value
+
+
+KEY_RULE_TRANSFORMS = {
+    "exclude": apply_exclude_rules_on,
+    "deleteFrom": apply_delete_from,
+    "replaceValue": apply_replace_function,
+    "extractSubstring": apply_extract_substring_function,
+}
+KEY_RULE_FILTERS = {
+    "contains": apply_contains_function,
+    "startsWith": apply_starts_with_function,
+    "endsWith": apply_ends_with_function,
+}
+KEY_RULE_RESULT_OR_NONE = {
+    "addPrefix": apply_prefix_rule,
+    "addSuffix": apply_suffix_rule,
+    "deleteUntil": apply_delete_Until,
+    "roundDecimal": apply_round_decimal_rule,
+}
+KEY_RULE_RESULT_OR_VALUE = {
+    "extractPattern": apply_extract_pattern,
+    "correctDataType": apply_correct_data_type,
+}
+
+
+def compile_key_rule(rule):
+    """Bind a key rule to a callable taking the value and returning the new value"""
+    rule_type = rule["type"]
+    rule_inputs = rule["inputs"]
+
+    if rule_type in KEY_RULE_TRANSFORMS:
+        return partial(KEY_RULE_TRANSFORMS[rule_type], rule_inputs)
+    if rule_type in KEY_RULE_FILTERS:
+        return partial(keep_if, KEY_RULE_FILTERS[rule_type], rule_inputs)
+    if rule_type in KEY_RULE_RESULT_OR_NONE:
+        return partial(result_or_none, KEY_RULE_RESULT_OR_NONE[rule_type], rule_inputs)
+    if rule_type in KEY_RULE_RESULT_OR_VALUE:
+        return partial(
+            result_or_value, KEY_RULE_RESULT_OR_VALUE[rule_type], rule_inputs
+        )
+    if rule_type == "convertToUppercase":
+        return methodcaller("upper")
+    if rule_type == "convertToLowercase":
+        return methodcaller("lower")
+    return keep_value
+
+
+def compile_key_rule_plan(rules_definitions):
+    """
+    Group the ruleItems of a definition by the key node they apply on.
+
+    Returns:
+        tuple: (rules_applied_on, rules_applied_on_address_child) as used by
+               rules_functionality.keyNode_level_rule.
+    """
+    rules_applied_on = dict()
+    rules_applied_on_address_child = dict()
+    for rule_item in rules_definitions:
+        if rule_item and rule_item.get("rules"):  # 112233
+            key_id = rule_item.get("keyId")
+            identifier = rule_item["id"]
+            if "." in rule_item["id"]:
+                mother_node = rule_item["id"].split(".")[0]
+                if key_id:
+                    mother_node = mother_node + "_" + key_id
+
+                child_key_name = rule_item["id"].split(".")[-1]
+                if not mother_node in rules_applied_on_address_child.keys():
+                    rules_applied_on_address_child[mother_node] = [
+                        {"childName": child_key_name, "data": rule_item["rules"]}
+                    ]
+                else:
+                    rules_applied_on_address_child[mother_node].append(
+                        {"childName": child_key_name, "data": rule_item["rules"]}
+                    )
+                if key_id:
+                    for x in rules_applied_on_address_child[mother_node]:
+                        x.update({"unique_id": key_id})
+            else:
+                if key_id:
+                    identifier = identifier + "_" + key_id
+
+                rules_applied_on[identifier] = {"data": rule_item["rules"]}
+
+                if key_id:
+                    rules_applied_on[identifier].update(
+                        {"unique_id": rule_item["keyId"]}
+                    )
+
+    return rules_applied_on, rules_applied_on_address_child
+
+
+_key_rules = RuleCache()
+_key_rule_plans = PlanCache()
+
+
+def get_key_rule(rule):
+    """Compiled callable of a key rule"""
+    return _key_rules.get(rule, compile_key_rule)
+
+
+def get_key_rule_plan(rules_definitions):
+    """Compiled key rule plan of a definition's ruleItems"""
+    return _key_rule_plans.get(rules_definitions, compile_key_rule_plan)
+
+
+"""
+Table rules (table_rules_centre.row_level_rule)
+"""
+
+
+def ignore_errors(function, rule_inputs, value):
+    try:
+        return function(rule_inputs, value)
+    except:
+        return value
+
+
+TABLE_RULE_TRANSFORMS = {
+    "replaceValue": apply_replace_function,
+    "startsWithV5": apply_startswithv5_function,
+    "endsWithV5": apply_endswithv5_function,
+    "trim": trim_values_rule,
+    "exclude": apply_exclude_rules_on,
+    "convertDecimalsToCW1": apply_convert_decimals_to_cw1,
+    "extractSubstring": apply_extract_substring_function,
+    "deleteFrom": apply_delete_from,
+    "deleteUntil": apply_delete_Until,
+    "extractPattern": apply_extract_pattern,
+    "convertToUppercase": set_uppercase_values_rule,
+    "convertToLowercase": set_lowercase_values_rule,
+    "calculate": apply_calculate_function,
+}
+TABLE_RULE_SAFE_TRANSFORMS = {
+    "addPrefix": apply_prefix_rule,
+    "addSuffix": apply_suffix_rule,
+}
+# Only applied on cells that were not disregarded
+TABLE_RULE_KEPT_TRANSFORMS = {
+    "roundDecimal": apply_round_decimal_rule,
+    "conditionedRule": apply_conditioned_rule,
+    "correctDataType": apply_correct_data_type,
+}
+TABLE_RULE_KEPT_TEXT_TRANSFORMS = {
+    "dimensionSeperatorFix": apply_dimension_sep_fix,
+    "formatCurrencyToNAStandard": apply_format_currency_to_na_standard,
+}
+
+
+def compile_table_rule(rule):
+    """
+    Bind a table rule to a value transform.
+
+    Returns:
+        tuple: (transform, only_kept) where transform is None for rules that
+               need the row context (parse, copy, merge, split...) and
+               only_kept tells the transform is skipped for disregarded cells.
+    """
+    rule_type = rule["type"]
+    try:
+        rule_inputs = get_rule_inputs(rule)
+    except:
+        # Left to row_level_rule, which reports the broken rule per cell
+        return None, False
+
+    if rule_type in TABLE_RULE_TRANSFORMS:
+        return partial(TABLE_RULE_TRANSFORMS[rule_type], rule_inputs), False
+    if rule_type in TABLE_RULE_SAFE_TRANSFORMS:
+        transform = partial(
+            ignore_errors, TABLE_RULE_SAFE_TRANSFORMS[rule_type], rule_inputs
+        )
+        return transform, False
+    if rule_type in TABLE_RULE_KEPT_TRANSFORMS:
+        return partial(TABLE_RULE_KEPT_TRANSFORMS[rule_type], rule_inputs), True
+    if rule_type in TABLE_RULE_KEPT_TEXT_TRANSFORMS:
+        return TABLE_RULE_KEPT_TEXT_TRANSFORMS[rule_type], True
+    return None, False
+
+
+def compile_table_rule_plan(rules_applied_on):
+    """
+    Compile the rules of a table, label: [(rule, transform, only_kept)].
+    """
+    return {
+        label: [(rule, *compile_table_rule(rule)) for rule in rules]
+        for label, rules in rules_applied_on.items()
+    }
+
+
+_table_rule_plans = PlanCache()
+
+
+def get_table_rule_plan(rules_applied_on):
+    """Compiled plan of a table's rules, shared by every row of the table"""
+    return _table_rule_plans.get(rules_applied_on, compile_table_rule_plan)
@@ -31,6 +31,7 @@ from app.rules_normalizers_module.sub_rules.numeric_value_format import (
     apply_format_currency_to_na_standard,
 )
 from app.rules_normalizers_module.sub_rules.parse import parse_index_finder
+from app.rules_normalizers_module.rule_plan import get_key_rule, get_key_rule_plan
 from app.rules_normalizers_module.sub_rules.remove_duplicates_from_string import (
     apply_remove_duplicates_from_string,
 )
@@ -186,73 +187,8 @@ def get_children(parent, address_keys):
 
 
 def execute_rule(rule, child):
-    rule_type = rule["type"]
-    rule_inputs = rule["inputs"]
-    child_value = child["v"]
-    if rule_type == "exclude":
-        return apply_exclude_rules_on(rule_inputs, child_value)
-    elif rule_type == "deleteFrom":
-        return apply_delete_from(rule_inputs, child_value)
-    elif rule_type == "replaceValue":
-        return apply_replace_function(rule_inputs, child_value)
-    elif rule_type == "extractSubstring":
-        return apply_extract_substring_function(rule_inputs, child_value)
-    elif rule_type == "contains":
-        if apply_contains_function(rule_inputs, child_value):
-            return child_value
-        else:
-            return None
-    elif rule_type == "startsWith":
-        if apply_starts_with_function(rule_inputs, child_value):
-            return child_value
-        else:
-            return None
-    elif rule_type == "endsWith":
-        if apply_ends_with_function(rule_inputs, child_value):
-            return child_value
-        else:
-            return None
-
-    elif rule_type == "addPrefix":
-        if apply_prefix_rule(rule_inputs, child_value):
-            child_value = apply_prefix_rule(rule_inputs, child_value)
-            return child_value
-        else:
-            return None
-    elif rule_type == "addSuffix":
-        if apply_suffix_rule(rule_inputs, child_value):
-            child_value = apply_suffix_rule(rule_inputs, child_value)
-            return child_value
-        else:
-            return None
-    elif rule_type == "deleteUntil":
-        if apply_delete_Until(rule_inputs, child_value):
-            child_value = apply_delete_Until(rule_inputs, child_value)
-            return child_value
-        else:
-            return None
-    elif rule_type == "convertToUppercase":
-        return child_value.upper()
-
-    elif rule_type == "convertToLowercase":
-        return child_value.lower()
-
-    elif rule_type == "extractPattern":
-        if apply_extract_pattern(rule_inputs, child_value):
-            child_value = apply_extract_pattern(rule_inputs, child_value)
-            return child_value
-    elif rule_type == "roundDecimal":
-        if apply_round_decimal_rule(rule_inputs, child_value):
-            child_value = apply_round_decimal_rule(rule_inputs, child_value)
-            return child_value
-        else:
-            return None
-    elif rule_type == "correctDataType":
-        if apply_correct_data_type(rule_inputs, child_value):
-            child_value = apply_correct_data_type(rule_inputs, child_value)
-            return child_value
-
-    return child["v"]
+    """Apply a rule on a child value through its compiled callable"""
+    return get_key_rule(rule)(child["v"])
 
 
 def process_rules(key_node, rules_data_set, address_keys, key_node_list):
@@ -854,42 +790,15 @@ def rules_centre(request_data, d_json, address_keys):
         if not rules_definitions:
             return rules_version, d_json
 
-        rules_applied_on = dict()
-        rules_applied_on_address_child = dict()
         for rule_item in rules_definitions:
             if rule_item:
                 if rule_item.get("id"):
                     rule_item["id"] = rule_item["id"].replace("pickUp", "pickup")
-            if rule_item and rule_item.get("rules"):  # 112233
-                key_id = rule_item.get("keyId")
-                identifier = rule_item["id"]
-                if "." in rule_item["id"]:
-                    mother_node = rule_item["id"].split(".")[0]
-                    if key_id:
-                        mother_node = mother_node + "_" + key_id
-
-                    child_key_name = rule_item["id"].split(".")[-1]
-                    if not mother_node in rules_applied_on_address_child.keys():
-                        rules_applied_on_address_child[mother_node] = [
-                            {"childName": child_key_name, "data": rule_item["rules"]}
-                        ]
-                    else:
-                        rules_applied_on_address_child[mother_node].append(
-                            {"childName": child_key_name, "data": rule_item["rules"]}
-                        )
-                    if key_id:
-                        for x in rules_applied_on_address_child[mother_node]:
-                            x.update({"unique_id": key_id})
-                else:
-                    if key_id:
-                        identifier = identifier + "_" + key_id
-
-                    rules_applied_on[identifier] = {"data": rule_item["rules"]}
 
-                    if key_id:
-                        rules_applied_on[identifier].update(
-                            {"unique_id": rule_item["keyId"]}
-                        )
+        # Compiled once per definition and reused while it does not change
+        rules_applied_on, rules_applied_on_address_child = get_key_rule_plan(
+            rules_definitions
+        )
 
         docs = d_json["nodes"]
 
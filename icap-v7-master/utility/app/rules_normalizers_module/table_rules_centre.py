@@ -24,57 +24,16 @@ from app.parsing_central.parsers import (
     width_uom,
 )
 from app.rules_normalizers_module.sub_rules import convert_date
-from app.rules_normalizers_module.sub_rules.add_prefix import apply_prefix_rule
-from app.rules_normalizers_module.sub_rules.add_suffix import apply_suffix_rule
-from app.rules_normalizers_module.sub_rules.calculate import apply_calculate_function
 from app.rules_normalizers_module.sub_rules.calculate_fields import (
     apply_calculate_fields,
 )
-from app.rules_normalizers_module.sub_rules.conditioned_central import (
-    apply_conditioned_rule,
-)
 from app.rules_normalizers_module.sub_rules.contains import (
     apply_contains_function,
     apply_contains_function_list,
 )
-from app.rules_normalizers_module.sub_rules.convert_decimal import (
-    apply_convert_decimals_to_cw1,
-)
-from app.rules_normalizers_module.sub_rules.correct_data_type import (
-    apply_correct_data_type,
-)
-from app.rules_normalizers_module.sub_rules.delete_from import apply_delete_from
-from app.rules_normalizers_module.sub_rules.delete_until import apply_delete_Until
-from app.rules_normalizers_module.sub_rules.dimension_seperator_ocr_fix import (
-    apply_dimension_sep_fix,
-)
-from app.rules_normalizers_module.sub_rules.ends_with_v5 import (
-    apply_endswithv5_function,
-)
-from app.rules_normalizers_module.sub_rules.exclude import apply_exclude_rules_on
-from app.rules_normalizers_module.sub_rules.extract import (
-    apply_extract_substring_function,
-)
-from app.rules_normalizers_module.sub_rules.extract_pattern import apply_extract_pattern
-from app.rules_normalizers_module.sub_rules.numeric_value_format import (
-    apply_format_currency_to_na_standard,
-)
 from app.rules_normalizers_module.sub_rules.parse import parse_index_finder
-from app.rules_normalizers_module.sub_rules.replace_function import (
-    apply_replace_function,
-)
-from app.rules_normalizers_module.sub_rules.round_decimal import (
-    apply_round_decimal_rule,
-)
+from app.rules_normalizers_module.rule_plan import get_table_rule_plan
 from app.rules_normalizers_module.sub_rules.split_by import apply_split_by_seperator
-from app.rules_normalizers_module.sub_rules.starts_with_v5 import (
-    apply_startswithv5_function,
-)
-from app.rules_normalizers_module.sub_rules.trim_values import trim_values_rule
-from app.rules_normalizers_module.sub_rules.case_rules import (
-    set_uppercase_values_rule,
-    set_lowercase_values_rule,
-)
 from app.custom_pipeline_modules.trunication import normalize_number_format
 
 """
@@ -691,6 +650,8 @@ def row_level_rule(
         "dimension_package_count_reverse_profiles", []
     )
     is_exceptional_profile = True if definition_id in exceptional_profiles else False
+    # Same compiled plan for every row of the table
+    rule_plan = get_table_rule_plan(rules_applied_on)
 
     for row_idx, row in enumerate(rows):
         cells = row["children"]
@@ -711,14 +672,22 @@ def row_level_rule(
                             continue
                     label = cell["label"]
 
-                    rules_data_set = rules_applied_on[label]
+                    rules_data_set = rule_plan[label]
                     # print(rules_data_set, "-------", cell["label"])
                     original_text = cell["v"]
                     changed_text = original_text
                     if not rules_data_set:
                         continue
 
-                    for rule_idx, rule in enumerate(rules_data_set):
+                    for rule_idx, (rule, transform, only_kept) in enumerate(
+                        rules_data_set
+                    ):
+                        # Value rules are pre-bound, others need the row context
+                        if transform is not None:
+                            if not (only_kept and disregarded):
+                                changed_text = transform(changed_text)
+                            continue
+
                         try:
                             rule_inputs = rule["inputs"]
                         except:
@@ -736,25 +705,6 @@ def row_level_rule(
                                     disregarded = True
                                     cell["rule_decision"] = "disregarded"
 
-                        elif rule["type"] == "replaceValue":
-                            changed_text = apply_replace_function(
-                                rule_inputs, changed_text
-                            )
-                        elif rule["type"] == "startsWithV5":
-                            changed_text = apply_startswithv5_function(
-                                rule_inputs, changed_text
-                            )
-                        elif rule["type"] == "endsWithV5":
-                            changed_text = apply_endswithv5_function(
-                                rule_inputs, changed_text
-                            )
-                        elif rule["type"] == "trim":
-                            changed_text = trim_values_rule(rule_inputs, changed_text)
-                        elif rule["type"] == "exclude":
-                            changed_text = apply_exclude_rules_on(
-                                rule_inputs, changed_text
-                            )
-
                         elif rule["type"] == "parseFrom":
                             # TODO: Reconfirm
                             parse_index = parse_index_finder(rule_inputs, changed_text)
@@ -804,30 +754,10 @@ def row_level_rule(
                         elif rule["type"] == "distributeRows":
                             if not label in distribute_column_storage.keys():
                                 distribute_column_storage[label] = rule
-                        elif rule["type"] == "convertDecimalsToCW1":
-                            changed_text = apply_convert_decimals_to_cw1(
-                                rule_inputs, changed_text
-                            )
                         elif rule["type"] == "formatDate":
                             if not cell.get("formated_date"):
                                 changed_text = convert_date.process(changed_text)
 
-                        elif rule["type"] == "extractSubstring":
-                            changed_text = apply_extract_substring_function(
-                                rule_inputs, changed_text
-                            )
-
-                        elif rule["type"] == "deleteFrom":
-                            changed_text = apply_delete_from(rule_inputs, changed_text)
-
-                        elif rule["type"] == "deleteUntil":
-                            changed_text = apply_delete_Until(rule_inputs, changed_text)
-
-                        elif rule["type"] == "extractPattern":
-                            changed_text = apply_extract_pattern(
-                                rule_inputs, changed_text
-                            )
-
                         elif rule["type"] == "setValue":
                             if not disregarded:
                                 data = {
@@ -838,36 +768,6 @@ def row_level_rule(
                                 if not data in set_value_storage:
                                     set_value_storage.append(data)
 
-                        elif rule["type"] == "convertToUppercase":
-                            changed_text = set_uppercase_values_rule(
-                                rule_inputs, changed_text
-                            )
-
-                        elif rule["type"] == "addPrefix":
-                            try:
-                                changed_text = apply_prefix_rule(
-                                    rule_inputs, changed_text
-                                )
-                            except:
-                                pass
-
-                        elif rule["type"] == "addSuffix":
-                            try:
-                                changed_text = apply_suffix_rule(
-                                    rule_inputs, changed_text
-                                )
-                            except:
-                                pass
-
-                        elif rule["type"] == "convertToLowercase":
-                            changed_text = set_lowercase_values_rule(
-                                rule_inputs, changed_text
-                            )
-
-                        elif rule["type"] == "calculate":
-                            changed_text = apply_calculate_function(
-                                rule_inputs, changed_text
-                            )
                         elif rule["type"] == "calculateFields":
                             calculateFields = True
 
@@ -902,30 +802,6 @@ def row_level_rule(
                                             updated_cells.insert(placement, parsed_cell)
                                         else:
                                             end_cells.append(parsed_cell)
-                        elif rule["type"] == "roundDecimal":
-                            if not disregarded:
-                                changed_text = apply_round_decimal_rule(
-                                    rule_inputs, changed_text
-                                )
-
-                        elif rule["type"] == "conditionedRule":
-                            if not disregarded:
-                                changed_text = apply_conditioned_rule(
-                                    rule_inputs, changed_text
-                                )
-                        elif rule["type"] == "dimensionSeperatorFix":
-                            if not disregarded:
-                                changed_text = apply_dimension_sep_fix(changed_text)
-                        elif rule["type"] == "formatCurrencyToNAStandard":
-                            if not disregarded:
-                                changed_text = apply_format_currency_to_na_standard(
-                                    changed_text
-                                )
-                        elif rule["type"] == "correctDataType":
-                            if not disregarded:
-                                changed_text = apply_correct_data_type(
-                                    rule_inputs, changed_text
-                                )
                         elif rule["type"] == "DoNotTruncate":
                             cell["DoNotTruncate"] = "true"
                         elif rule["type"] == "split":
@@ -1,6 +1,6 @@
 import traceback
 
-from redis_utils import get_redis_data
+from job_context import get_job_value
 
 from app.json_chunking import json_chunking_main
 
@@ -40,7 +40,7 @@ def replace_page_id_string(s, key, first_page_id):
 
 
 def special_extraction_function(ra_json, doc_idx_in_loop, job_id):
-    input_dict = get_redis_data(job_id).get("chunking_dictionary")
+    input_dict = get_job_value(job_id, "chunking_dictionary")
     values = input_dict[str(doc_idx_in_loop)]
     data = values["data"]
 
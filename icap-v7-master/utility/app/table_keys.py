@@ -1,12 +1,12 @@
 import traceback
 
 from rabbitmq_publisher import publish
-from redis_utils import get_redis_data, set_redis_data
+from job_context import open_job_context
 
 from app.json_chunking import json_chunking_main
 from app.key_central.key_module_central import (
     extract_anchor_thresholds,
-    extraction_tools_request,
+    cached_extraction_tools_request,
 )
 from app.misc_modules.unique_id import assign_unique_id_helper
 from app.rules_normalizers_module.table_rules_centre import get_first_valid_row
@@ -149,6 +149,7 @@ def check_if_empty_row(cells):
 
 
 def process_table_keys(request_data):
+    context = None
     try:
         # Version = 6.00.07022024
         # @Emon on 24/09/2022: Initiated the script
@@ -163,7 +164,9 @@ def process_table_keys(request_data):
         # @Emon on 30/12/2022 : Added multiple extraction data to tables generating blank rows
         # @Emon on 02/02/2022 : Multiples will also take totals set as 0
         job_id = request_data["job_id"]
-        request_data = get_redis_data(job_id)
+        # Job data is decoded once and shared with the extraction modules
+        context = open_job_context(job_id)
+        request_data = context.data
         request_data["job_id"] = job_id
         d_json = request_data["data_json"]
         print("🐍 File: app/table_keys.py | Line: 169 | process_table_keys ~ d_json",d_json)
@@ -173,7 +176,7 @@ def process_table_keys(request_data):
         chunking_dictionary = json_chunking_main(
             request_data["ra_json"], json_chunking_thresholds
         )
-        set_redis_data(job_id, "chunking_dictionary", chunking_dictionary)
+        context.set("chunking_dictionary", chunking_dictionary)
 
         try:
             definitions_list = request_data.get("definitions", [])
@@ -242,7 +245,7 @@ def process_table_keys(request_data):
                             continue
 
                         # Taking query key list and sending them to key module extraction tools
-                        results, messages = extraction_tools_request(
+                        results, messages = cached_extraction_tools_request(
                             query_key_list, request_data, input_doc_idx, messages
                         )
 
@@ -559,11 +562,17 @@ def process_table_keys(request_data):
 
         data_json = d_json
         result = {"job_id": job_id, "status_code": 200, "messages": messages}
-        set_redis_data(job_id, "data_json", data_json)
+        context.set("data_json", data_json)
+        context.save()
         publish("process_table_keys_response", "to_pipeline", result)
 
     except:
         data_json = d_json
         result = {"job_id": job_id, "status_code": 200}
-        set_redis_data(job_id, "data_json", data_json)
+        context.set("data_json", data_json)
+        context.save()
         publish("process_table_keys_response", "to_pipeline", result)
+
+    finally:
+        if context is not None:
+            context.close()
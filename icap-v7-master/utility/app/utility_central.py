@@ -5,9 +5,8 @@ from app.key_central.key_module_central import (
     extract_anchor_thresholds,
     update_shipment_type_key,
 )
-from redis_utils import get_redis_data, set_redis_data
+from job_context import open_job_context
 from rabbitmq_publisher import publish
-from redis_utils import get_redis_data, set_redis_data
 
 from app.add_ons.dictionary_central import dictionary_main
 
@@ -120,10 +119,13 @@ def UtilityCentral(request_data):
         }
     )
 
+    context = None
     try:
         print("Processing Request")
         job_id = request_data["job_id"]
-        request_data = get_redis_data(job_id)
+        # Job data is decoded once and shared with the extraction modules
+        context = open_job_context(job_id)
+        request_data = context.data
         request_data["job_id"] = job_id
         definitions = request_data["definitions"]
         d_json = request_data["data_json"]
@@ -137,7 +139,7 @@ def UtilityCentral(request_data):
         chunking_dictionary = json_chunking_main(
             request_data["ra_json"], json_chunking_thresholds
         )
-        set_redis_data(job_id, "chunking_dictionary", chunking_dictionary)
+        context.set("chunking_dictionary", chunking_dictionary)
 
         # Fixing
         for x_idx, x in enumerate(d_json.get("nodes")):
@@ -400,7 +402,8 @@ def UtilityCentral(request_data):
             print(traceback.print_exc())
             pass
         data_json = d_json
-        set_redis_data(job_id, "data_json", data_json)
+        context.set("data_json", data_json)
+        context.save()
 
         result = {
             "job_id": job_id,
@@ -419,3 +422,7 @@ def UtilityCentral(request_data):
             "status_code": 400,
         }
         publish("keyval_extractor_response", "to_pipeline", result)
+
+    finally:
+        if context is not None:
+            context.close()
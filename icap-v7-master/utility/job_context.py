@@ -0,0 +1,69 @@
+"""
+In-process state of the job being processed by a utility stage.
+
+A stage loads the job data from redis once and keeps it decoded in a
+JobContext. Values computed during the stage (e.g. chunking_dictionary) are
+kept in memory, modules deeper in the stage read them through the job_id and
+everything that changed is written back to redis once, before the stage
+publishes its response.
+"""
+import threading
+
+from redis_utils import get_redis_data, set_redis_fields
+
+# Every message is processed in its own thread, contexts are keyed by job_id
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+
+class JobContext:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.data = get_redis_data(job_id)
+        # Input digests of the stage cache, the job data is hashed once per stage
+        self.digests = {}
+        self._changed = set()
+
+    def get(self, key, default=None):
+        """Return a value of the job data"""
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        """Update a value in memory, it is persisted by save()"""
+        self.data[key] = value
+        self._changed.add(key)
+
+    def save(self):
+        """Write the changed values to redis"""
+        if not self._changed:
+            return
+        set_redis_fields(self.job_id, {key: self.data[key] for key in self._changed})
+        self._changed.clear()
+
+    def close(self):
+        """Stop sharing the context, unsaved changes are dropped"""
+        with _contexts_lock:
+            if _contexts.get(self.job_id) is self:
+                del _contexts[self.job_id]
+
+
+def open_job_context(job_id):
+    """Load the job data and share it with the modules of the current stage"""
+    context = JobContext(job_id)
+    with _contexts_lock:
+        _contexts[job_id] = context
+    return context
+
+
+def get_job_context(job_id):
+    """Return the open context of the job, None outside of a stage"""
+    with _contexts_lock:
+        return _contexts.get(job_id)
+
+
+def get_job_value(job_id, key):
+    """Read a value of the job data, from memory when the job is being processed"""
+    context = get_job_context(job_id)
+    if context is not None:
+        return context.get(key)
+    return get_redis_data(job_id).get(key)
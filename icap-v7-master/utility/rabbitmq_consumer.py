@@ -16,6 +16,7 @@ from app.table_api_excel import process_excel_table
 from app.table_keys_excel import excel_table_keys
 
 from rabbitmq_publisher import publish
+from job_tracing import traced_consumer
 
 
 # Required to load robot modules from external scripts folder
@@ -38,6 +39,7 @@ def ack_message(ch, delivery_tag):
         print("Channel is already closed, so we can't ACK this message")
 
 
+@traced_consumer
 def do_work(ch, method, properties, body):
     """Process the job"""
     message_type = properties.content_type
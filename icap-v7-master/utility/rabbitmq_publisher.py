@@ -1,6 +1,9 @@
 import json
 import pika
 import os
+import time
+
+from job_tracing import get_publish_headers, trace_publish
 
 
 RABBITMQ_HOST = os.getenv('RABBITMQ_HOST')
@@ -20,16 +23,20 @@ params = pika.ConnectionParameters(
 def publish(method, queue_name, body):
 
     print("Message recived to publish")
+    start = time.perf_counter()
+    payload = json.dumps(body)
     connection = pika.BlockingConnection(params)
     channel = connection.channel()
 
     channel.basic_publish(
         exchange='',
         routing_key=queue_name,
-        body=json.dumps(body),
+        body=payload,
         properties=pika.BasicProperties(
             method,
-            delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE
+            delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE,
+            headers=get_publish_headers(),
         ))
 
     connection.close()
+    trace_publish(method, queue_name, body, len(payload), time.perf_counter() - start)
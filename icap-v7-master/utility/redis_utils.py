@@ -1,8 +1,14 @@
 import redis
 import json
+import zlib
 import os
 import pickle
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 
 REDIS_HOST = os.getenv('REDIS_HOST')
 REDIS_PORT = os.getenv('REDIS_PORT')
@@ -16,18 +22,38 @@ redis_instance = redis.Redis(
 )
 
 
+def decode_redis_payload(data):
+    """Decode a job payload that may be zlib/zstd compressed by the backend"""
+    if isinstance(data, (bytes, bytearray)):
+        if data[:4] == b"\x28\xb5\x2f\xfd":
+            if zstandard is None:
+                raise ValueError(
+                    "Payload is zstd compressed but zstandard is not installed, "
+                    "install it or set PAYLOAD_CODEC=zlib on the backend"
+                )
+            data = zstandard.ZstdDecompressor().decompress(bytes(data))
+        elif data[:1] == b"\x78":
+            data = zlib.decompress(data)
+    return json.loads(data)
+
+
 def get_redis_data(job_id):
     """Retrieve information from redis"""
     data = redis_instance.get(job_id)
-    data = json.loads(data)
+    data = decode_redis_payload(data)
     return data
 
 
 def set_redis_data(job_id, key_name, result_data):
     """Set partial information in redis for given key"""
+    set_redis_fields(job_id, {key_name: result_data})
+
+
+def set_redis_fields(job_id, fields):
+    """Set several keys of the job data in redis with a single read and write"""
     data = redis_instance.get(job_id)
-    data = json.loads(data)
-    data[key_name] = result_data
+    data = decode_redis_payload(data)
+    data.update(fields)
     data = json.dumps(data)
     redis_instance.set(job_id, data)
 
@@ -0,0 +1,116 @@
+"""
+Memoization of utility stage outputs for incremental re-runs.
+
+Re-testing a single document or table from the UI runs the whole utility
+chain again. Outputs of the expensive per document / per table extraction
+are stored in redis under a hash of everything they are computed from
+(the document subtree, the queried keys and the definition data they read),
+so inputs that did not change since the previous run reuse the stored output.
+"""
+import hashlib
+import json
+import os
+import threading
+import traceback
+
+from redis_utils import redis_instance
+
+STAGE_CACHE = os.getenv("STAGE_CACHE", "1") == "1"
+STAGE_CACHE_TTL = int(os.getenv("STAGE_CACHE_TTL", 60 * 60 * 24))  # 1 day
+# Bump to invalidate every stored output, e.g. after changing extraction logic
+STAGE_CACHE_VERSION = os.getenv("STAGE_CACHE_VERSION", "1")
+
+STAGE_CACHE_KEY = "stage_cache:{stage}:{digest}"
+
+# Set while a stage computes, by the errors it swallows
+_state = threading.local()
+
+
+def get_digest(value):
+    """sha256 of the JSON form of value"""
+    serialized = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def get_memo_digest(memo, name, get_value):
+    """
+    Digest of get_value(), computed once per memo.
+
+    Stages pass the memo of their job context, inputs shared by many calls
+    (e.g. the document) are then hashed once per stage.
+    """
+    if memo is None:
+        return get_digest(get_value())
+    digest = memo.get(name)
+    if digest is None:
+        digest = get_digest(get_value())
+        memo[name] = digest
+    return digest
+
+
+def get_stage_key(stage, digests):
+    """Cache key of a stage output, a hash of the digests of its inputs"""
+    digest = get_digest([STAGE_CACHE_VERSION, digests])
+    return STAGE_CACHE_KEY.format(stage=stage, digest=digest)
+
+
+def mark_stage_failed():
+    """Keep the output being computed out of the cache, part of it failed"""
+    _state.failed = True
+
+
+def get_stage_output(key):
+    """Stored output of a stage, None if not cached"""
+    try:
+        output = redis_instance.get(key)
+        if output is not None:
+            return json.loads(output)
+    except Exception:
+        print(traceback.format_exc())
+    return None
+
+
+def set_stage_output(key, output):
+    """Store a stage output until STAGE_CACHE_TTL expires"""
+    try:
+        redis_instance.set(key, json.dumps(output), ex=STAGE_CACHE_TTL)
+    except Exception:
+        print(traceback.format_exc())
+
+
+def memoize_stage(stage, digests, compute, messages):
+    """
+    Return the output of compute() for the given input digests, computing it
+    only when the inputs changed since it was last stored.
+
+    compute(messages) must return (output, messages) like the extraction
+    functions, messages logged by it are stored and replayed on a cache hit.
+    Empty outputs and outputs of a compute that called mark_stage_failed()
+    are not stored.
+    """
+    if not STAGE_CACHE:
+        return compute(messages)
+
+    key = get_stage_key(stage, digests)
+    cached = get_stage_output(key)
+    if cached is not None:
+        output, new_messages = cached
+        messages.extend(new_messages)
+        return output, messages
+
+    message_count = len(messages)
+    _state.failed = False
+    try:
+        computed = compute(messages)
+    finally:
+        failed = _state.failed
+        _state.failed = False
+
+    # Error responses are returned as they are, not as (output, messages)
+    if failed or not isinstance(computed, tuple) or not computed[0]:
+        return computed
+
+    output, messages = computed
+    # Stored serialized, callers are free to modify the returned output
+    set_stage_output(key, (output, messages[message_count:]))
+    return output, messages